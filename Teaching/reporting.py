@@ -0,0 +1,178 @@
+"""
+Indicateurs du suivi pédagogique (tableau de bord et statistiques de ``Teaching``).
+
+Chaque indicateur est calculé par agrégats conditionnels groupés : le nombre de
+requêtes ne dépend ni du nombre de programmes, ni du nombre de niveaux, ni du
+nombre de fiches de suivi.
+"""
+
+from django.db.models import Avg, Count, F, Q
+
+from academic.models import Course, Level, Program
+from planification.models import CourseSession
+
+from .models import Evaluation, Lecturer, TeachingMonitoring
+
+
+CHAPTER_COVERAGE = F('chapitre_fait') * 100.0 / F('totalChapterCount')
+SESSION_COVERAGE = F('contenu_effectif_seance') * 100.0 / F('contenu_seance_prevu')
+
+# Mêmes règles que TeachingMonitoring.statut_avancement().
+STATUS_CONDITIONS = {
+    'retard': Q(contenu_effectif_seance=0),
+    'en_cours': ~Q(contenu_effectif_seance=0) & Q(contenu_effectif_seance__lt=F('contenu_seance_prevu')),
+    'termine': ~Q(contenu_effectif_seance=0) & Q(contenu_effectif_seance__gte=F('contenu_seance_prevu')),
+}
+
+PEDAGOGICAL_ACTIVITY_FIELDS = {
+    'travaux_prep': 'travaux_preparatoires',
+    'group_work': 'groupWork',
+    'class_work': 'classWork',
+    'home_work': 'homeWork',
+    'pedagogic_activities': 'pedagogicActivities',
+    'td_tp': 'TDandTP',
+}
+
+EVALUATION_FIELDS = {
+    'support_accessible': 'support_cours_acessible',
+    'bonne_explication': 'bonne_explication_cours',
+    'bonne_reponse': 'bonne_reponse_questions',
+    'donne_td': 'donne_TD',
+    'donne_projet': 'donne_projet',
+    'difficultes': 'difficulte_rencontree',
+}
+
+
+def _percentage(count, total):
+    return round((count / total) * 100, 1) if total else 0
+
+
+def get_monitoring_summary(monitorings):
+    """Couverture, répartition par statut et activités pédagogiques des fiches de suivi, en une requête."""
+    aggregates = monitorings.aggregate(
+        total=Count('id'),
+        chapter_coverage=Avg(CHAPTER_COVERAGE),
+        session_coverage=Avg(SESSION_COVERAGE),
+        **{f'status_{status}': Count('id', filter=condition) for status, condition in STATUS_CONDITIONS.items()},
+        **{key: Count('id', filter=Q(**{field: True})) for key, field in PEDAGOGICAL_ACTIVITY_FIELDS.items()},
+    )
+    total = aggregates['total']
+    if total:
+        global_coverage = ((aggregates['chapter_coverage'] or 0) + (aggregates['session_coverage'] or 0)) / 2
+    else:
+        global_coverage = 0
+
+    return {
+        'total_entries': total,
+        'global_coverage': round(global_coverage, 1),
+        'status_distribution': {status: aggregates[f'status_{status}'] for status in STATUS_CONDITIONS},
+        'pedagogical_activities': {
+            key: _percentage(aggregates[key], total) for key in PEDAGOGICAL_ACTIVITY_FIELDS
+        },
+    }
+
+
+def get_evaluation_summary(evaluations):
+    """Taux de réponses positives et score de satisfaction des évaluations, en une requête."""
+    aggregates = evaluations.aggregate(
+        total=Count('id'),
+        **{key: Count('id', filter=Q(**{field: True})) for key, field in EVALUATION_FIELDS.items()},
+    )
+    total = aggregates['total']
+    stats = {key: _percentage(aggregates[key], total) for key in EVALUATION_FIELDS}
+    satisfaction_score = (
+        (stats['support_accessible'] + stats['bonne_explication'] + stats['bonne_reponse']) / 3 if total else 0
+    )
+    return {
+        'stats': stats,
+        'satisfaction_score': round(satisfaction_score, 1),
+        'total_evaluations': total,
+    }
+
+
+def get_program_level_matrix(academic_year):
+    """
+    Retourne ``{programme: [statistiques par niveau]}`` pour tous les programmes ayant des cours.
+
+    Chaque niveau porte le nombre de cours du couple programme × niveau, le taux moyen de
+    chapitres faits et un score sur 20 tiré des évaluations positives (explication et
+    support), ces deux derniers uniquement lorsque le couple a des fiches de suivi.
+    """
+    course_counts = {
+        (item['program_id'], item['level_id']): item['count']
+        for item in Course.objects.filter(program__isnull=False, level__isnull=False).values(
+            'program_id', 'level_id'
+        ).annotate(count=Count('pk')).order_by()
+    }
+    if not course_counts:
+        return {}
+
+    coverages = {
+        (item['course__program_id'], item['level_id']): item
+        for item in TeachingMonitoring.objects.filter(academic_year=academic_year).values(
+            'course__program_id', 'level_id'
+        ).annotate(count=Count('id'), coverage=Avg(CHAPTER_COVERAGE)).order_by()
+    }
+    evaluations = {
+        (item['course__program_id'], item['level_id']): item
+        for item in Evaluation.objects.filter(academic_year=academic_year).values(
+            'course__program_id', 'level_id'
+        ).annotate(
+            total=Count('id'),
+            positive=Count('id', filter=Q(bonne_explication_cours=True, support_cours_acessible=True)),
+        ).order_by()
+    }
+
+    levels = Level.objects.in_bulk({level_id for _, level_id in course_counts})
+    levels_by_program = {}
+    for program in Program.objects.filter(pk__in={program_id for program_id, _ in course_counts}).order_by('name'):
+        level_stats = []
+        program_levels = sorted(
+            (levels[level_id] for program_id, level_id in course_counts if program_id == program.pk),
+            key=lambda level: level.name,
+        )
+        for level in program_levels:
+            key = (program.pk, level.pk)
+            coverage = 0
+            avg_score = 0
+            monitoring = coverages.get(key)
+            if monitoring and monitoring['count']:
+                coverage = monitoring['coverage'] or 0
+                evaluation = evaluations.get(key)
+                if evaluation and evaluation['total']:
+                    avg_score = (evaluation['positive'] / evaluation['total']) * 20
+            level_stats.append({
+                'level': level,
+                'course_count': course_counts[key],
+                'coverage': round(coverage, 1),
+                'avg_score': round(avg_score, 1),
+            })
+        levels_by_program[program] = level_stats
+    return levels_by_program
+
+
+def get_teaching_statistics(academic_year, program=None):
+    """Indicateurs complets de la page des statistiques pour une année (et éventuellement un programme)."""
+    program_filter = {'course__program': program} if program else {}
+    monitoring_summary = get_monitoring_summary(
+        TeachingMonitoring.objects.filter(academic_year=academic_year, **program_filter)
+    )
+    evaluation_summary = get_evaluation_summary(
+        Evaluation.objects.filter(academic_year=academic_year, **program_filter)
+    )
+
+    return {
+        'kpis': {
+            'total_lecturers': Lecturer.objects.count(),
+            'total_courses': Course.objects.filter(**({'program': program} if program else {})).count(),
+            'global_coverage': monitoring_summary['global_coverage'],
+            'total_sessions': CourseSession.objects.filter(academic_year=academic_year, **program_filter).count(),
+        },
+        'monitoring_stats': {
+            'status_distribution': monitoring_summary['status_distribution'],
+            'pedagogical_activities': monitoring_summary['pedagogical_activities'],
+            'total_entries': monitoring_summary['total_entries'],
+        },
+        'evaluation_stats': evaluation_summary,
+        'levels_by_program': get_program_level_matrix(academic_year),
+    }
@@ -1,3 +1,131 @@
+from collections import Counter
+from datetime import date
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from academic.models import AcademicYear, Course, Level, Program
+from students.models import Student
+from Teaching.models import Evaluation, Lecturer, TeachingMonitoring
+from Teaching.reporting import get_monitoring_summary, get_program_level_matrix, get_teaching_statistics
+
+
+class TeachingReportingTests(TestCase):
+    def setUp(self):
+        self.year = AcademicYear.objects.create(
+            start_at=date(2025, 9, 1),
+            end_at=date(2026, 6, 30),
+            is_active=True,
+        )
+        self.level_1 = Level.objects.create(name='Licence 1')
+        self.level_2 = Level.objects.create(name='Licence 2')
+        self.program_1 = Program.objects.create(name='Informatique')
+        self.program_2 = Program.objects.create(name='Gestion')
+        self.lecturer = Lecturer.objects.create(
+            matricule='ENS-STAT-01',
+            firstname='Jean',
+            lastname='Dupont',
+            date_naiss=date(1980, 1, 1),
+            grade='Professeur',
+            gender='M',
+        )
+        self.student = Student.objects.create(
+            matricule='STAT-TEACH-01',
+            firstname='Alice',
+            lastname='Nanga',
+            gender='F',
+            status='registered',
+        )
+        self.course_1 = self.create_course('INF101', self.program_1, self.level_1)
+        self.create_course('INF102', self.program_1, self.level_1)
+        self.course_2 = self.create_course('INF201', self.program_1, self.level_2)
+        self.create_course('GES101', self.program_2, self.level_1)
+
+        self.create_monitoring(self.course_1, self.level_1, chapters=(10, 5), sessions=(4, 0))
+        self.create_monitoring(self.course_1, self.level_1, chapters=(10, 10), sessions=(4, 2), groupWork=False)
+        self.create_monitoring(self.course_2, self.level_2, chapters=(8, 2), sessions=(4, 4))
+        self.create_evaluation(self.course_1, self.level_1)
+        self.create_evaluation(self.course_1, self.level_1, bonne_explication_cours=False, difficulte_rencontree=True)
+
+    def create_course(self, code, program, level):
+        return Course.objects.create(course_code=code, label=code, credit_count=3, program=program, level=level)
+
+    def create_monitoring(self, course, level, chapters, sessions, **extra):
+        return TeachingMonitoring.objects.create(
+            lecturer=self.lecturer,
+            course=course,
+            level=level,
+            academic_year=self.year,
+            totalChapterCount=chapters[0],
+            chapitre_fait=chapters[1],
+            contenu_seance_prevu=sessions[0],
+            contenu_effectif_seance=sessions[1],
+            **extra,
+        )
+
+    def create_evaluation(self, course, level, **extra):
+        return Evaluation.objects.create(
+            student=self.student,
+            course=course,
+            level=level,
+            academic_year=self.year,
+            actionSSAC='RAS',
+            **extra,
+        )
+
+    def test_status_distribution_matches_statut_avancement(self):
+        monitorings = TeachingMonitoring.objects.filter(academic_year=self.year)
+
+        summary = get_monitoring_summary(monitorings)
+
+        expected = Counter(monitoring.statut_avancement() for monitoring in monitorings)
+        self.assertEqual(summary['status_distribution'], {status: expected[status] for status in ('retard', 'en_cours', 'termine')})
+        self.assertEqual(summary['total_entries'], 3)
+        self.assertEqual(summary['pedagogical_activities']['group_work'], 66.7)
+        self.assertEqual(summary['pedagogical_activities']['td_tp'], 100.0)
+        # Chapitres : (50 + 100 + 25) / 3 ; séances : (0 + 50 + 100) / 3.
+        self.assertEqual(summary['global_coverage'], round((175 / 3 + 150 / 3) / 2, 1))
+
+    def test_program_level_matrix(self):
+        matrix = get_program_level_matrix(self.year)
+
+        self.assertEqual(list(matrix), [self.program_2, self.program_1])
+        self.assertEqual(
+            [(row['level'], row['course_count'], row['coverage'], row['avg_score']) for row in matrix[self.program_1]],
+            [(self.level_1, 2, 75.0, 10.0), (self.level_2, 1, 25.0, 0)],
+        )
+        self.assertEqual(
+            [(row['level'], row['course_count'], row['coverage']) for row in matrix[self.program_2]],
+            [(self.level_1, 1, 0)],
+        )
+
+    def test_statistics_filtered_by_program(self):
+        statistics = get_teaching_statistics(self.year, program=self.program_2)
+
+        self.assertEqual(statistics['kpis']['total_courses'], 1)
+        self.assertEqual(statistics['monitoring_stats']['total_entries'], 0)
+        self.assertEqual(statistics['evaluation_stats']['total_evaluations'], 0)
+        self.assertEqual(len(statistics['levels_by_program']), 2)
+
+        statistics = get_teaching_statistics(self.year, program=self.program_1)
+        self.assertEqual(statistics['evaluation_stats']['total_evaluations'], 2)
+        self.assertEqual(statistics['evaluation_stats']['stats']['bonne_explication'], 50.0)
+        self.assertEqual(statistics['evaluation_stats']['satisfaction_score'], round((100 + 50 + 100) / 3, 1))
+
+    def test_query_count_does_not_depend_on_programs_and_levels(self):
+        with CaptureQueriesContext(connection) as small_queries:
+            get_teaching_statistics(self.year)
+
+        for index in range(3):
+            program = Program.objects.create(name=f'Programme {index}')
+            level = Level.objects.create(name=f'Niveau {index}')
+            course = self.create_course(f'EXT{index}', program, level)
+            self.create_monitoring(course, level, chapters=(5, 1), sessions=(3, 1))
+            self.create_evaluation(course, level)
+
+        with CaptureQueriesContext(connection) as large_queries:
+            statistics = get_teaching_statistics(self.year)
 
-# Create your tests here.
+        self.assertEqual(len(statistics['levels_by_program']), 5)
+        self.assertEqual(len(large_queries), len(small_queries))
@@ -23,11 +23,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'Teaching/dashboard.html'
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Avg, F
+        from django.db.models import F
         from django.utils import timezone
         from datetime import timedelta
         from academic.models import AcademicYear, Program, Course
         from planification.models import CourseSession
+        from Teaching.reporting import get_monitoring_summary
 
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Tableau de bord'
@@ -53,24 +54,10 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 courses__teaching_monitorings__academic_year=current_year
             ).distinct().count()
 
-            # Suivi des enseignements pour l'année
-            teaching_monitorings = TeachingMonitoring.objects.filter(
-                academic_year=current_year
-            )
-
             # Calcul du taux de couverture global
-            if teaching_monitorings.exists():
-                avg_coverage_chapters = teaching_monitorings.aggregate(
-                    avg_coverage=Avg(F('chapitre_fait') * 100.0 / F('totalChapterCount'))
-                )['avg_coverage'] or 0
-
-                avg_coverage_sessions = teaching_monitorings.aggregate(
-                    avg_coverage=Avg(F('contenu_effectif_seance') * 100.0 / F('contenu_seance_prevu'))
-                )['avg_coverage'] or 0
-
-                global_coverage = round((avg_coverage_chapters + avg_coverage_sessions) / 2, 1)
-            else:
-                global_coverage = 0
+            global_coverage = get_monitoring_summary(
+                TeachingMonitoring.objects.filter(academic_year=current_year)
+            )['global_coverage']
 
             context['kpis'] = {
                 'total_lecturers': total_lecturers,
@@ -494,9 +481,8 @@ class StatistiquesView(LoginRequiredMixin, TemplateView):
     template_name = 'Teaching/statistiques.html'
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Count, Avg, Q, F
-        from academic.models import AcademicYear, Program, Course, Level
-        from planification.models import CourseSession
+        from academic.models import AcademicYear, Program
+        from Teaching.reporting import get_teaching_statistics
 
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Statistiques'
@@ -529,191 +515,7 @@ class StatistiquesView(LoginRequiredMixin, TemplateView):
         context['selected_program'] = selected_program
 
         if current_year:
-            # Filtres de base
-            base_filters = {'academic_year': current_year}
-            if selected_program:
-                base_filters['course__program'] = selected_program
-
-            # 1. KPIs principaux
-            total_lecturers = Lecturer.objects.count()
-            total_courses = Course.objects.filter(**{k: v for k, v in base_filters.items() if k != 'academic_year'}).count()
-
-            # Suivi des enseignements pour l'année
-            teaching_monitorings = TeachingMonitoring.objects.filter(**base_filters)
-            total_monitoring_entries = teaching_monitorings.count()
-
-            # Calcul du taux de couverture global
-            if total_monitoring_entries > 0:
-                avg_coverage_chapters = teaching_monitorings.aggregate(
-                    avg_coverage=Avg(F('chapitre_fait') * 100.0 / F('totalChapterCount'))
-                )['avg_coverage'] or 0
-
-                avg_coverage_sessions = teaching_monitorings.aggregate(
-                    avg_coverage=Avg(F('contenu_effectif_seance') * 100.0 / F('contenu_seance_prevu'))
-                )['avg_coverage'] or 0
-
-                global_coverage = (avg_coverage_chapters + avg_coverage_sessions) / 2
-            else:
-                global_coverage = 0
-
-            # Séances programmées
-            session_filters = base_filters.copy()
-            if 'course__program' in session_filters:
-                session_filters['course__program'] = session_filters.pop('course__program')
-            total_sessions = CourseSession.objects.filter(**session_filters).count()
-
-            context['kpis'] = {
-                'total_lecturers': total_lecturers,
-                'total_courses': total_courses,
-                'global_coverage': round(global_coverage, 1),
-                'total_sessions': total_sessions,
-            }
-
-            # 2. Statistiques de suivi pédagogique
-            # Répartition par statut d'avancement
-            status_stats = {
-                'retard': 0,
-                'en_cours': 0,
-                'termine': 0
-            }
-
-            for monitoring in teaching_monitorings:
-                status = monitoring.statut_avancement()
-                if status in status_stats:
-                    status_stats[status] += 1
-
-            # Activités pédagogiques
-            if total_monitoring_entries > 0:
-                pedagogical_activities = teaching_monitorings.aggregate(
-                    travaux_prep=Count('id', filter=Q(travaux_preparatoires=True)),
-                    group_work=Count('id', filter=Q(groupWork=True)),
-                    class_work=Count('id', filter=Q(classWork=True)),
-                    home_work=Count('id', filter=Q(homeWork=True)),
-                    pedagogic_activities=Count('id', filter=Q(pedagogicActivities=True)),
-                    td_tp=Count('id', filter=Q(TDandTP=True)),
-                )
-
-                # Convertir en pourcentages
-                for key, value in pedagogical_activities.items():
-                    pedagogical_activities[key] = round((value / total_monitoring_entries) * 100, 1)
-            else:
-                pedagogical_activities = {
-                    'travaux_prep': 0, 'group_work': 0, 'class_work': 0,
-                    'home_work': 0, 'pedagogic_activities': 0, 'td_tp': 0
-                }
-
-            context['monitoring_stats'] = {
-                'status_distribution': status_stats,
-                'pedagogical_activities': pedagogical_activities,
-                'total_entries': total_monitoring_entries,
-            }
-
-            # 3. Statistiques d'évaluation
-            evaluation_filters = base_filters.copy()
-            evaluations = Evaluation.objects.filter(**evaluation_filters)
-            total_evaluations = evaluations.count()
-
-            if total_evaluations > 0:
-                evaluation_stats = evaluations.aggregate(
-                    support_accessible=Count('id', filter=Q(support_cours_acessible=True)),
-                    bonne_explication=Count('id', filter=Q(bonne_explication_cours=True)),
-                    bonne_reponse=Count('id', filter=Q(bonne_reponse_questions=True)),
-                    donne_td=Count('id', filter=Q(donne_TD=True)),
-                    donne_projet=Count('id', filter=Q(donne_projet=True)),
-                    difficultes=Count('id', filter=Q(difficulte_rencontree=True)),
-                )
-
-                # Convertir en pourcentages
-                for key, value in evaluation_stats.items():
-                    evaluation_stats[key] = round((value / total_evaluations) * 100, 1)
-
-                # Score de satisfaction global
-                satisfaction_score = (
-                    evaluation_stats['support_accessible'] +
-                    evaluation_stats['bonne_explication'] +
-                    evaluation_stats['bonne_reponse']
-                ) / 3
-            else:
-                evaluation_stats = {
-                    'support_accessible': 0, 'bonne_explication': 0, 'bonne_reponse': 0,
-                    'donne_td': 0, 'donne_projet': 0, 'difficultes': 0
-                }
-                satisfaction_score = 0
-
-            context['evaluation_stats'] = {
-                'stats': evaluation_stats,
-                'satisfaction_score': round(satisfaction_score, 1),
-                'total_evaluations': total_evaluations,
-            }
-
-            # 4. Statistiques par niveau et programme
-            # Récupérer tous les programmes
-            programs = Program.objects.all().order_by('name')
-            levels_by_program = {}
-
-            for program in programs:
-                # Filtrer les suivis par programme
-                program_filters = base_filters.copy()
-                program_filters['course__program'] = program
-
-                # Récupérer les niveaux pour ce programme
-                levels = Level.objects.filter(
-                    courses__program=program
-                ).distinct().order_by('name')
-
-                level_stats = []
-                for level in levels:
-                    # Filtrer les suivis par niveau
-                    level_filters = program_filters.copy()
-                    level_filters['level'] = level
-
-                    # Compter les cours pour ce niveau et programme
-                    course_count = Course.objects.filter(
-                        program=program,
-                        level=level
-                    ).count()
-
-                    # Calculer le taux de couverture pour ce niveau
-                    level_monitorings = TeachingMonitoring.objects.filter(**level_filters)
-                    level_monitoring_count = level_monitorings.count()
-
-                    if level_monitoring_count > 0:
-                        level_coverage = level_monitorings.aggregate(
-                            avg_coverage=Avg(F('chapitre_fait') * 100.0 / F('totalChapterCount'))
-                        )['avg_coverage'] or 0
-
-                        # Calculer la moyenne des notes (si disponible)
-                        level_evaluations = Evaluation.objects.filter(
-                            academic_year=current_year,
-                            level=level,
-                            course__program=program
-                        )
-
-                        # Ici, on pourrait calculer une moyenne si on avait un champ de note
-                        # Pour l'instant, on utilise un score fictif basé sur les évaluations positives
-                        if level_evaluations.count() > 0:
-                            positive_eval_count = level_evaluations.filter(
-                                bonne_explication_cours=True,
-                                support_cours_acessible=True
-                            ).count()
-                            avg_score = (positive_eval_count / level_evaluations.count()) * 20
-                        else:
-                            avg_score = 0
-                    else:
-                        level_coverage = 0
-                        avg_score = 0
-
-                    level_stats.append({
-                        'level': level,
-                        'course_count': course_count,
-                        'coverage': round(level_coverage, 1),
-                        'avg_score': round(avg_score, 1)
-                    })
-
-                if level_stats:  # Ne pas ajouter de programmes sans niveaux
-                    levels_by_program[program] = level_stats
-
-            context['levels_by_program'] = levels_by_program
+            context.update(get_teaching_statistics(current_year, program=selected_program))
 
         return context
 
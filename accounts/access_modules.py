@@ -72,6 +72,15 @@ def get_module_for_path(path):
     return None
 
 
+def get_modules_data(codes):
+    """Retourne la configuration d'affichage des modules donnés, dans leur ordre."""
+    return [
+        {'code': code, **MODULE_CONFIG[code]}
+        for code in codes
+        if code in MODULE_CONFIG
+    ]
+
+
 def get_module_dashboard(code):
     config = MODULE_CONFIG.get(code) or {}
     return config.get('dashboard_url')
@@ -1,6 +1,7 @@
 """Context processors liés aux accès modules des utilisateurs internes."""
 
-from .access_modules import get_module_for_path
+from .access_modules import get_module_for_path, get_modules_data
+from .module_cache import get_request_module_codes
 
 
 def accessible_modules(request):
@@ -18,7 +19,7 @@ def accessible_modules(request):
         return {}
 
     try:
-        modules = user.get_accessible_modules_data()
+        modules = get_modules_data(get_request_module_codes(request))
     except Exception:
         return {}
 
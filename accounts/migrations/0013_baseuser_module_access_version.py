@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_baseuser_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baseuser',
+            name='module_access_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrémentée à chaque modification des modules accessibles (invalide les caches de session).', verbose_name='Version des accès modules'),
+        ),
+    ]
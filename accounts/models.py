@@ -1,7 +1,7 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 
-from .access_modules import ALL_MODULE_CODES, MODULE_CHOICES, MODULE_CONFIG, ROLE_MODULES_MAP
+from .access_modules import ALL_MODULE_CODES, MODULE_CHOICES, ROLE_MODULES_MAP, get_modules_data
 
 
 
@@ -69,6 +69,12 @@ class BaseUser(AbstractUser):
         null=True,
         verbose_name="Dernier module accédé",
     )
+    module_access_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Version des accès modules",
+        help_text="Incrémentée à chaque modification des modules accessibles (invalide les caches de session).",
+    )
     two_factor_enabled = models.BooleanField(
         default=False,
         verbose_name="Double authentification activée",
@@ -90,29 +96,39 @@ class BaseUser(AbstractUser):
 
     objects = BaseUserManager()
 
+    _module_codes_cache = None
+
     def get_accessible_module_codes(self):
-        """Retourne les codes modules autorisés pour l'utilisateur."""
+        """
+        Retourne les codes modules autorisés pour l'utilisateur.
+
+        Le résultat est mémorisé sur l'instance (donc pour la durée de la requête) et
+        oublié dès que les modules de l'utilisateur changent.
+        """
         if self.is_superuser:
             return list(ALL_MODULE_CODES)
 
-        if self.pk:
-            codes = list(
+        if not self.pk:
+            return []
+
+        if self._module_codes_cache is None:
+            self._module_codes_cache = tuple(
                 self.accessible_modules.filter(is_active=True).values_list('code', flat=True)
             )
-            if codes:
-                return codes
+        return list(self._module_codes_cache)
+
+    def clear_module_codes_cache(self):
+        self._module_codes_cache = None
 
-        return []
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.clear_module_codes_cache()
 
     def has_module_access(self, module_code):
         return module_code in self.get_accessible_module_codes()
 
     def get_accessible_modules_data(self):
-        return [
-            {'code': code, **MODULE_CONFIG[code]}
-            for code in self.get_accessible_module_codes()
-            if code in MODULE_CONFIG
-        ]
+        return get_modules_data(self.get_accessible_module_codes())
 
     def get_default_module_code(self):
         codes = self.get_accessible_module_codes()
@@ -0,0 +1,51 @@
+"""
+Cache des codes modules accessibles aux utilisateurs internes.
+
+Les codes sont mémorisés à deux niveaux : sur l'instance utilisateur de la requête,
+puis dans la session, accompagnés de ``BaseUser.module_access_version``. Cette version
+est chargée avec l'utilisateur à chaque requête et incrémentée dès que ses modules
+changent : un cache de session périmé est détecté sans aucune requête supplémentaire.
+"""
+
+from django.db.models import F
+
+from .models import BaseUser
+
+
+MODULE_CODES_SESSION_KEY = "accessible_module_codes"
+
+
+def get_request_module_codes(request):
+    """Retourne les codes modules de l'utilisateur de la requête (au plus une requête SQL par session)."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return []
+    if user.is_superuser or user._module_codes_cache is not None:
+        return user.get_accessible_module_codes()
+
+    session = getattr(request, 'session', None)
+    if session is not None:
+        cached = session.get(MODULE_CODES_SESSION_KEY)
+        if cached and cached.get('user') == user.pk and cached.get('version') == user.module_access_version:
+            user._module_codes_cache = tuple(cached['codes'])
+            return list(cached['codes'])
+
+    codes = user.get_accessible_module_codes()
+    if session is not None:
+        session[MODULE_CODES_SESSION_KEY] = {
+            'user': user.pk,
+            'version': user.module_access_version,
+            'codes': codes,
+        }
+    return codes
+
+
+def request_has_module_access(request, module_code):
+    return module_code in get_request_module_codes(request)
+
+
+def bump_module_access_version(user_pks):
+    """Invalide les codes modules mis en cache (requête et sessions) des utilisateurs donnés."""
+    user_pks = [pk for pk in user_pks if pk is not None]
+    if user_pks:
+        BaseUser.objects.filter(pk__in=user_pks).update(module_access_version=F('module_access_version') + 1)
@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import AccessModule, BaseUser
+from accounts.module_cache import bump_module_access_version
+
+
+@receiver(m2m_changed, sender=BaseUser.accessible_modules.through)
+def invalidate_module_codes_on_assignment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Les utilisateurs concernés ne sont plus connus après la suppression des liens.
+        instance._module_access_user_pks = list(instance.users.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        user_pks = pk_set if action != 'post_clear' else instance.__dict__.pop('_module_access_user_pks', [])
+        bump_module_access_version(user_pks or [])
+        return
+
+    bump_module_access_version([instance.pk])
+    instance.refresh_from_db(fields=['module_access_version'])
+
+
+@receiver(post_save, sender=AccessModule)
+def invalidate_module_codes_on_module_change(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+
+    bump_module_access_version(instance.users.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=AccessModule)
+def invalidate_module_codes_on_module_delete(sender, instance, **kwargs):
+    bump_module_access_version(instance.users.values_list('pk', flat=True))
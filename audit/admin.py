@@ -1,17 +1,54 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+
+from main.pagination import CURSOR_PARAM, KeysetPaginator
 
 from .models import AuditLog
 
 
+class AuditLogChangeList(ChangeList):
+    """Liste paginée par curseur : le coût d'une page ne dépend pas de sa profondeur."""
+
+    def get_results(self, request):
+        paginator = KeysetPaginator(self.queryset, self.list_per_page)
+        page = paginator.get_page(getattr(request, "audit_cursor", None))
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = page.object_list
+        # Pas de lien « Tout afficher » ni de numéros de page : navigation par curseur.
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = paginator
+        self.page = page
+        self.previous_page_url = (
+            self.get_query_string({CURSOR_PARAM: page.previous_cursor}) if page.has_previous() else None
+        )
+        self.next_page_url = self.get_query_string({CURSOR_PARAM: page.next_cursor}) if page.has_next() else None
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ["created_at", "category", "action", "actor_display", "target_model", "target_repr"]
     list_filter = ["category", "action", "actor_type", "target_app_label", "target_model", "created_at"]
     search_fields = ["actor_identifier", "actor_display", "target_object_id", "target_repr", "message"]
     readonly_fields = [field.name for field in AuditLog._meta.fields]
+    show_full_result_count = False
 
     def has_add_permission(self, request):
         return False
 
     def has_change_permission(self, request, obj=None):
         return False
+
+    def get_changelist(self, request, **kwargs):
+        return AuditLogChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # Le curseur n'est pas un filtre : il est retiré avant l'analyse des paramètres.
+        if CURSOR_PARAM in request.GET:
+            request.GET = request.GET.copy()
+            request.audit_cursor = request.GET.pop(CURSOR_PARAM)[-1]
+        return super().changelist_view(request, extra_context)
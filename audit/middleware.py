@@ -1,4 +1,5 @@
 from .context import audit_request
+from .pipeline import audit_batch
 
 
 class AuditContextMiddleware:
@@ -6,5 +7,5 @@ class AuditContextMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        with audit_request(request):
+        with audit_request(request), audit_batch():
             return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Création'), ('update', 'Modification'), ('delete', 'Suppression'), ('m2m_add', 'Ajout M2M'), ('m2m_remove', 'Suppression M2M'), ('m2m_clear', 'Vidage M2M'), ('login', 'Connexion'), ('logout', 'Déconnexion'), ('login_failed', 'Échec de connexion'), ('password_change', 'Changement de mot de passe'), ('bulk_create', 'Création en masse'), ('bulk_update', 'Mise à jour en masse'), ('bulk_delete', 'Suppression en masse')], max_length=30),
+        ),
+    ]
@@ -21,6 +21,7 @@ class AuditLog(models.Model):
         ("logout", "Déconnexion"),
         ("login_failed", "Échec de connexion"),
         ("password_change", "Changement de mot de passe"),
+        ("bulk_create", "Création en masse"),
         ("bulk_update", "Mise à jour en masse"),
         ("bulk_delete", "Suppression en masse"),
     ]
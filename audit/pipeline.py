@@ -0,0 +1,230 @@
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, ProgrammingError, close_old_connections, connection, transaction
+
+from .context import suspend_audit
+from .models import AuditLog
+
+
+logger = logging.getLogger("audit")
+
+WRITE_MODE_IMMEDIATE = "immediate"
+WRITE_MODE_BUFFERED = "buffered"
+WRITE_MODE_BACKGROUND = "background"
+WRITE_BATCH_SIZE = 500
+
+_current_buffer = ContextVar("audit_current_buffer", default=None)
+
+
+def get_write_mode():
+    return getattr(settings, "AUDIT_WRITE_MODE", WRITE_MODE_BUFFERED)
+
+
+def get_buffer_max_size():
+    return getattr(settings, "AUDIT_BUFFER_MAX_SIZE", WRITE_BATCH_SIZE)
+
+
+class AuditPipelineMetrics:
+    """Compteurs du pipeline d'audit (taille des tampons et latence des écritures)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events_buffered = 0
+            self.max_buffer_size = 0
+            self.flush_count = 0
+            self.entries_written = 0
+            self.write_errors = 0
+            self.last_flush_size = 0
+            self.last_flush_latency_ms = 0.0
+            self.max_flush_latency_ms = 0.0
+            self.total_flush_latency_ms = 0.0
+
+    def record_buffered(self, buffer_size):
+        with self._lock:
+            self.events_buffered += 1
+            self.max_buffer_size = max(self.max_buffer_size, buffer_size)
+
+    def record_flush(self, size, latency_ms, failed=False):
+        with self._lock:
+            self.flush_count += 1
+            self.last_flush_size = size
+            self.last_flush_latency_ms = latency_ms
+            self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+            self.total_flush_latency_ms += latency_ms
+            if failed:
+                self.write_errors += 1
+            else:
+                self.entries_written += size
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "events_buffered": self.events_buffered,
+                "max_buffer_size": self.max_buffer_size,
+                "flush_count": self.flush_count,
+                "entries_written": self.entries_written,
+                "write_errors": self.write_errors,
+                "last_flush_size": self.last_flush_size,
+                "last_flush_latency_ms": round(self.last_flush_latency_ms, 3),
+                "max_flush_latency_ms": round(self.max_flush_latency_ms, 3),
+                "average_flush_latency_ms": round(self.total_flush_latency_ms / self.flush_count, 3) if self.flush_count else 0.0,
+                "background_queue_size": _background_writer.queue.qsize() if _background_writer else 0,
+            }
+
+
+metrics = AuditPipelineMetrics()
+
+
+def get_audit_pipeline_metrics():
+    return metrics.snapshot()
+
+
+class AuditBuffer:
+    """Tampon d'événements d'audit d'une requête ou d'un bloc ``audit_batch``."""
+
+    def __init__(self):
+        self.entries = []
+        self.audit_enabled = None
+        self.closed = False
+
+    def append(self, entry):
+        self.entries.append(entry)
+        metrics.record_buffered(len(self.entries))
+        if len(self.entries) >= get_buffer_max_size():
+            self.flush()
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        flush_entries(entries)
+
+
+def get_current_buffer():
+    return _current_buffer.get()
+
+
+@contextmanager
+def audit_batch():
+    """
+    Regroupe les événements d'audit émis dans le bloc et les écrit en un ``bulk_create``.
+
+    Les événements émis dans une transaction ne rejoignent le tampon qu'après sa
+    validation (``transaction.on_commit``) : ceux d'une transaction annulée sont perdus
+    avec elle. Les blocs imbriqués partagent le tampon du bloc englobant.
+    """
+    buffer = _current_buffer.get()
+    if buffer is not None:
+        yield buffer
+        return
+
+    buffer = AuditBuffer()
+    token = _current_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_buffer.reset(token)
+        buffer.closed = True
+        buffer.flush()
+
+
+def enqueue_audit_entry(entry):
+    """Confie une entrée d'audit (non enregistrée) au pipeline d'écriture."""
+    if get_write_mode() == WRITE_MODE_IMMEDIATE:
+        write_entries([entry])
+        return
+
+    buffer = _current_buffer.get()
+    if connection.in_atomic_block:
+        transaction.on_commit(partial(_dispatch_entry, entry, buffer))
+    else:
+        _dispatch_entry(entry, buffer)
+
+
+def _dispatch_entry(entry, buffer):
+    if buffer is not None and not buffer.closed:
+        buffer.append(entry)
+    else:
+        flush_entries([entry])
+
+
+def flush_entries(entries):
+    if not entries:
+        return
+    if get_write_mode() == WRITE_MODE_BACKGROUND:
+        get_background_writer().submit(entries)
+    else:
+        write_entries(entries)
+
+
+def write_entries(entries):
+    """Écrit un lot d'entrées d'audit en base et dans le journal applicatif."""
+    started_at = time.perf_counter()
+    try:
+        with suspend_audit():
+            AuditLog.objects.bulk_create(entries, batch_size=WRITE_BATCH_SIZE)
+    except (DatabaseError, OperationalError, ProgrammingError):
+        metrics.record_flush(len(entries), (time.perf_counter() - started_at) * 1000, failed=True)
+        logger.warning("Impossible d'écrire dans le journal d'audit.")
+        return []
+
+    metrics.record_flush(len(entries), (time.perf_counter() - started_at) * 1000)
+    for entry in entries:
+        logger.info(json.dumps({
+            "category": entry.category,
+            "action": entry.action,
+            "actor": entry.actor_identifier or entry.actor_display,
+            "target": entry.target_repr,
+            "path": entry.request_path or None,
+            "message": entry.message,
+        }, ensure_ascii=False, default=str))
+    return entries
+
+
+class BackgroundAuditWriter:
+    """Écrit les lots d'audit depuis un thread dédié, hors du cycle de la requête."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, entries):
+        self.queue.put(list(entries))
+
+    def drain(self):
+        """Attend l'écriture de tous les lots en file."""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            entries = self.queue.get()
+            try:
+                write_entries(entries)
+            except Exception:
+                logger.exception("Échec du thread d'écriture de l'audit.")
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+_background_writer = None
+_background_writer_lock = threading.Lock()
+
+
+def get_background_writer():
+    global _background_writer
+    with _background_writer_lock:
+        if _background_writer is None:
+            _background_writer = BackgroundAuditWriter()
+    return _background_writer
@@ -2,6 +2,7 @@ from django.apps import apps
 from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 
 from .context import is_audit_suspended
+from .pipeline import get_current_buffer
 from .utils import diff_states, is_auditable_model, log_audit_event, serialize_instance
 
 
@@ -11,6 +12,9 @@ SIGNALS_REGISTERED = False
 def capture_previous_state(sender, instance, raw=False, **kwargs):
     if raw or is_audit_suspended() or not is_auditable_model(sender) or not instance.pk:
         return
+    buffer = get_current_buffer()
+    if buffer is not None and buffer.audit_enabled is False:
+        return
     try:
         previous = sender._default_manager.get(pk=instance.pk)
     except sender.DoesNotExist:
@@ -1,4 +1,3 @@
-import json
 import logging
 from decimal import Decimal
 from functools import lru_cache
@@ -7,15 +6,16 @@ from uuid import UUID
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import File
-from django.db import DatabaseError, OperationalError, ProgrammingError, connection
+from django.db import connection
 from django.db.models import Model
 
-from .context import get_actor_override, get_current_request, suspend_audit
+from .context import get_actor_override, get_current_request
 from .models import AuditLog
+from .pipeline import enqueue_audit_entry, get_current_buffer
 
 
 logger = logging.getLogger("audit")
-EXCLUDED_APPS = {"audit", "corsheaders", "rest_framework", "rest_framework_simplejwt"}
+EXCLUDED_APPS = {"audit", "corsheaders", "jobs", "rest_framework", "rest_framework_simplejwt", "search"}
 EXCLUDED_FIELDS = {"created_at", "updated_at", "last_updated", "last_modified", "last_login"}
 SENSITIVE_TOKENS = ("password", "secret", "token", "api_key", "session")
 
@@ -171,14 +171,25 @@ def is_audit_enabled(instance=None):
         return False
     if instance is not None and getattr(instance, "_meta", None) and instance._meta.label_lower == "main.systemsettings":
         return True
+
+    buffer = get_current_buffer()
+    if buffer is not None and buffer.audit_enabled is not None:
+        return buffer.audit_enabled
+
+    enabled = read_audit_setting()
+    if buffer is not None:
+        buffer.audit_enabled = enabled
+    return enabled
+
+
+def read_audit_setting():
     try:
         if not system_settings_table_exists():
             return True
-        with connection.cursor():
-            from main.models import SystemSettings
+        from main.models import SystemSettings
 
-            value = SystemSettings.objects.filter(pk=1).values_list("audit_log", flat=True).first()
-            return True if value is None else bool(value)
+        system_settings = SystemSettings.get_settings(create=False)
+        return True if system_settings is None else bool(getattr(system_settings, "audit_log", True))
     except Exception:
         return True
 
@@ -198,19 +209,6 @@ def log_audit_event(*, category, action, instance=None, actor=None, changes=None
     payload.update(build_target_payload(instance=instance, target=target))
     payload.update(get_request_details())
 
-    try:
-        with suspend_audit():
-            entry = AuditLog.objects.create(**payload)
-    except (DatabaseError, OperationalError, ProgrammingError):
-        logger.warning("Impossible d'écrire dans le journal d'audit.")
-        return None
-
-    logger.info(json.dumps({
-        "category": category,
-        "action": action,
-        "actor": payload.get("actor_identifier") or payload.get("actor_display"),
-        "target": payload.get("target_repr"),
-        "path": payload.get("request_path"),
-        "message": message,
-    }, ensure_ascii=False, default=str))
+    entry = AuditLog(**payload)
+    enqueue_audit_entry(entry)
     return entry
@@ -6,12 +6,16 @@ from accounts.access_modules import (
     get_module_for_path,
     get_module_label,
 )
+from accounts.module_cache import get_request_module_codes, request_has_module_access
 
 
 CURRENT_MODULE_SESSION_KEY = "current_module"
 
 
 def _set_last_accessed_module(request, module_code):
+    """Mémorise le module courant ; rien n'est écrit tant que la session reste sur le même module."""
+    if request.session.get(CURRENT_MODULE_SESSION_KEY) == module_code:
+        return
     user = request.user
     request.session[CURRENT_MODULE_SESSION_KEY] = module_code
     if getattr(user, 'last_accessed_module', None) != module_code:
@@ -22,7 +26,7 @@ def _set_last_accessed_module(request, module_code):
 def _redirect_to_user_entrypoint(request):
     print("Redirection vers le point d'entrée utilisateur++++++++")
     user = request.user
-    module_codes = user.get_accessible_module_codes()
+    module_codes = get_request_module_codes(request)
     if not module_codes:
         return redirect('authentication:select_module')
     if len(module_codes) == 1:
@@ -86,7 +90,7 @@ class RoleBasedAccessMiddleware:
 
         module_code = get_module_for_path(request.path)
         if module_code:
-            if request.user.has_module_access(module_code):
+            if request_has_module_access(request, module_code):
                 _set_last_accessed_module(request, module_code)
                 return self.get_response(request)
 
@@ -114,7 +118,7 @@ class DashboardRedirectMiddleware:
         if (request.path == '/' and
             request.user.is_authenticated and
             not request.session.get('student_authenticated')):
-            module_codes = request.user.get_accessible_module_codes()
+            module_codes = get_request_module_codes(request)
             print(f"DashboardRedirectMiddleware: user={request.user}, last_accessed_module={request.user.last_accessed_module}, accessible_modules={module_codes}")
             if not module_codes:
                 return redirect('authentication:select_module')
@@ -141,7 +145,7 @@ class ProspectionAccessMiddleware:
         if request.path.startswith('/prospection/'):
             if not request.user.is_authenticated or request.session.get('student_authenticated'):
                 return self.get_response(request)
-            if request.user.is_superuser or request.user.has_module_access('prospection'):
+            if request.user.is_superuser or request_has_module_access(request, 'prospection'):
                 return self.get_response(request)
             messages.error(request, "Accès interdit. Vous n'avez pas accès au module Prospection.")
             return _redirect_to_user_entrypoint(request)
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from accounts.models import AccessModule
@@ -64,3 +66,61 @@ class ModuleAccessLoginTests(TestCase):
 
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse('main:dashboard'))
+
+
+class ModuleAccessCacheTests(TestCase):
+    def setUp(self):
+        self.scholar = AccessModule.objects.get_or_create(
+            code='scholar', defaults={'name': 'Scolarité'}
+        )[0]
+        self.planning = AccessModule.objects.get_or_create(
+            code='planning', defaults={'name': 'Planification'}
+        )[0]
+        self.user = User.objects.create_user(username='cached', password='secret123')
+        self.user.accessible_modules.add(self.scholar)
+        self.client.force_login(self.user)
+
+    def _module_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'accounts_baseuser_accessible_modules' in query['sql'] or query['sql'].startswith('UPDATE "accounts_baseuser"')
+        ]
+
+    def test_module_codes_and_last_module_are_cached_in_session(self):
+        response, first_queries = self._module_queries('/')
+        self.assertRedirects(response, reverse('main:dashboard'), fetch_redirect_response=False)
+        self.assertTrue(first_queries)
+
+        response, second_queries = self._module_queries('/')
+        self.assertRedirects(response, reverse('main:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(second_queries, [])
+
+    def test_module_assignment_change_invalidates_session_cache(self):
+        self.client.get('/')
+        version = self.user.module_access_version
+
+        self.user.accessible_modules.remove(self.scholar)
+        self.user.accessible_modules.add(self.planning)
+
+        self.assertGreater(self.user.module_access_version, version)
+        response = self.client.get('/')
+        self.assertRedirects(response, reverse('planification:dashboard'), fetch_redirect_response=False)
+
+    def test_module_deactivation_invalidates_session_cache(self):
+        self.user.accessible_modules.add(self.planning)
+        self.client.get(reverse('planification:dashboard'))
+
+        self.planning.is_active = False
+        self.planning.save()
+
+        response = self.client.get(reverse('planification:dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('main:dashboard'))
+
+    def test_user_instance_memoizes_module_codes(self):
+        self.user.get_accessible_module_codes()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.get_accessible_module_codes(), ['scholar'])
@@ -1,10 +1,16 @@
 #!/bin/bash
 # set -e
 
-echo "Exécution des migrations..."
-# python manage.py makemigrations --noinput
-python manage.py migrate --noinput
-python manage.py collectstatic --noinput
+echo "Vérification de la configuration..."
+python manage.py check || exit 1
 
-echo "Démarrage de Gunicorn..."
+# Le service worker réutilise l'image : migrations et fichiers statiques restent au service web.
+if [ "${RUN_MIGRATIONS:-1}" = "1" ]; then
+    echo "Exécution des migrations..."
+    # python manage.py makemigrations --noinput
+    python manage.py migrate --noinput
+    python manage.py collectstatic --noinput
+fi
+
+echo "Démarrage : $*"
 exec "$@"
@@ -1,12 +1,23 @@
 from django.contrib import admin
 
-from .models import EmailLog
+from .models import EmailDelivery, EmailLog
+
+
+class EmailDeliveryInline(admin.TabularInline):
+    model = EmailDelivery
+    extra = 0
+    can_delete = False
+    readonly_fields = ('recipient', 'status', 'error', 'sent_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(EmailLog)
 class EmailLogAdmin(admin.ModelAdmin):
     list_display = ('subject', 'sender', 'success_count', 'failure_count', 'created_at')
     list_filter = ('created_at',)
+    inlines = [EmailDeliveryInline]
     search_fields = ('subject', 'recipients', 'body')
     readonly_fields = (
         'subject', 'body', 'recipients', 'sender',
@@ -0,0 +1,176 @@
+"""
+Envoi groupé d'emails gabarisés.
+
+Le gabarit est rendu une seule fois ; chaque destinataire reçoit ensuite une copie
+individuelle du message (pas de fuite d'adresses). Tous les messages passent par une
+même connexion (``get_connection()``), ouverte une fois pour l'envoi, par lots de
+``EMAIL_BATCH_SIZE`` messages et au plus ``EMAIL_RATE_LIMIT`` messages par seconde
+pour rester sous les quotas du serveur SMTP. Le résultat de chaque destinataire est
+retourné pour être enregistré dans le journal (``EmailDelivery``).
+"""
+
+import logging
+import smtplib
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+from templated_mail.mail import BaseEmailMessage
+
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_SENT = 'sent'
+DELIVERY_FAILED = 'failed'
+
+
+def get_batch_size():
+    return max(1, getattr(settings, 'EMAIL_BATCH_SIZE', 50))
+
+
+def get_rate_limit():
+    return getattr(settings, 'EMAIL_RATE_LIMIT', 0)
+
+
+@dataclass
+class DeliveryResult:
+    recipient: str
+    status: str
+    error: str = ''
+    sent_at: object = None
+
+    @property
+    def succeeded(self):
+        return self.status == DELIVERY_SENT
+
+
+def render_email(template_name, context):
+    """Rend le gabarit et retourne ``(objet, corps texte, corps HTML)``."""
+    message = BaseEmailMessage(context=context, template_name=template_name)
+    message.render()
+    return message.subject, message.body, message.html
+
+
+def build_message(rendered, recipient, from_email, connection=None):
+    subject, body, html = rendered
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        to=[recipient],
+        connection=connection,
+    )
+    # Même structure que BaseEmailMessage._attach_body.
+    if body and html:
+        message.attach_alternative(html, 'text/html')
+    elif html:
+        message.body = html
+        message.content_subtype = 'html'
+    return message
+
+
+def send_bulk_email(template_name, context, recipients, from_email, batch_size=None, rate_limit=None,
+                    connection=None, progress=None):
+    """
+    Envoie le gabarit ``template_name`` à chaque destinataire et retourne la liste des ``DeliveryResult``.
+
+    ``progress`` est appelé avec ``(messages_traités, total)`` après chaque lot.
+    """
+    rendered = render_email(template_name, context)
+    return send_rendered_email(
+        rendered, recipients, from_email,
+        batch_size=batch_size, rate_limit=rate_limit, connection=connection, progress=progress,
+    )
+
+
+def send_rendered_email(rendered, recipients, from_email, batch_size=None, rate_limit=None,
+                        connection=None, progress=None):
+    batch_size = get_batch_size() if batch_size is None else max(1, batch_size)
+    rate_limit = get_rate_limit() if rate_limit is None else rate_limit
+    recipients = list(recipients)
+    total = len(recipients)
+    results = []
+    if not recipients:
+        return results
+
+    connection = connection or get_connection(fail_silently=False)
+    throttle = _Throttle(rate_limit)
+    try:
+        connection.open()
+    except Exception as error:
+        logger.exception("Connexion au serveur d'envoi impossible.")
+        return [DeliveryResult(recipient, DELIVERY_FAILED, _describe(error)) for recipient in recipients]
+
+    try:
+        for start in range(0, total, batch_size):
+            chunk = recipients[start:start + batch_size]
+            throttle.wait(len(chunk))
+            for recipient in chunk:
+                message = build_message(rendered, recipient, from_email, connection=connection)
+                results.append(_deliver(connection, message, recipient))
+            if progress is not None:
+                progress(len(results), total)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning("Fermeture de la connexion d'envoi impossible.")
+
+    return results
+
+
+def _deliver(connection, message, recipient):
+    # Les messages d'un lot sont remis un à un à la connexion partagée : send_messages
+    # interrompt le lot au premier refus sans indiquer quels messages sont partis.
+    for attempt in range(2):
+        try:
+            sent = connection.send_messages([message])
+        except smtplib.SMTPServerDisconnected as error:
+            if attempt:
+                return _failure(recipient, error)
+            logger.warning("Connexion d'envoi interrompue, reconnexion.")
+            connection.close()
+            try:
+                connection.open()
+            except Exception as reconnect_error:
+                return _failure(recipient, reconnect_error)
+        except Exception as error:
+            return _failure(recipient, error)
+        else:
+            if sent:
+                return DeliveryResult(recipient, DELIVERY_SENT, sent_at=timezone.now())
+            return DeliveryResult(recipient, DELIVERY_FAILED, "Message refusé par le serveur d'envoi.")
+    return _failure(recipient, None)
+
+
+def _failure(recipient, error):
+    logger.warning("Échec de l'envoi de l'email à %s : %s", recipient, error)
+    return DeliveryResult(recipient, DELIVERY_FAILED, _describe(error))
+
+
+def _describe(error):
+    if error is None:
+        return "Échec de l'envoi."
+    return f"{type(error).__name__}: {error}"[:500]
+
+
+class _Throttle:
+    """Espace les lots pour ne pas dépasser ``rate`` messages par seconde."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started_at = None
+        self.scheduled = 0
+
+    def wait(self, count):
+        if not self.rate or self.rate <= 0:
+            return
+        now = time.monotonic()
+        if self.started_at is None:
+            self.started_at = now
+        delay = self.started_at + self.scheduled / self.rate - now
+        if delay > 0:
+            time.sleep(delay)
+        self.scheduled += count
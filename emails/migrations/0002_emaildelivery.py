@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.CharField(max_length=254, verbose_name='Destinataire')),
+                ('status', models.CharField(choices=[('sent', 'Envoyé'), ('failed', 'Échec')], max_length=10, verbose_name='Statut')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Envoyé le')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='emails.emaillog', verbose_name='Email')),
+            ],
+            options={
+                'verbose_name': 'Envoi',
+                'verbose_name_plural': 'Envois',
+                'ordering': ['log', 'id'],
+            },
+        ),
+    ]
@@ -31,3 +31,31 @@ class EmailLog(models.Model):
     @property
     def recipients_list(self):
         return [r.strip() for r in (self.recipients or '').split(',') if r.strip()]
+
+
+class EmailDelivery(models.Model):
+    """Résultat de l'envoi d'un email composé à un destinataire."""
+
+    STATUS_CHOICES = [
+        ('sent', 'Envoyé'),
+        ('failed', 'Échec'),
+    ]
+
+    log = models.ForeignKey(
+        EmailLog,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name="Email",
+    )
+    recipient = models.CharField(max_length=254, verbose_name="Destinataire")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, verbose_name="Statut")
+    error = models.TextField(blank=True, default='', verbose_name="Erreur")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Envoyé le")
+
+    class Meta:
+        verbose_name = "Envoi"
+        verbose_name_plural = "Envois"
+        ordering = ['log', 'id']
+
+    def __str__(self):
+        return f"{self.recipient} ({self.get_status_display()})"
@@ -4,16 +4,18 @@ import logging
 from urllib.parse import urljoin
 
 from django.conf import settings
-from templated_mail.mail import BaseEmailMessage
+from django.db import transaction
 
 from main.models import SystemSettings
 
-from .models import EmailLog
+from .bulk import DELIVERY_FAILED, DeliveryResult, send_bulk_email
+from .models import EmailDelivery, EmailLog
 
 
 logger = logging.getLogger(__name__)
 
 COMPOSED_EMAIL_TEMPLATE = 'emails/emails/composed_email.html'
+DELIVERY_LOG_BATCH_SIZE = 500
 
 
 def _build_absolute_url(base_url, path):
@@ -29,7 +31,7 @@ def _build_absolute_url(base_url, path):
     return urljoin(normalized_base, path.lstrip('/'))
 
 
-def _branding_context(request=None):
+def _branding_context(request=None, base_url=''):
     """Construit le contexte de branding réutilisé par les emails."""
     institution_name = 'YSEM'
     contact_email = ''
@@ -48,8 +50,7 @@ def _branding_context(request=None):
     except Exception:
         logger.exception("Impossible de charger SystemSettings pour l'email composé.")
 
-    base_url = ''
-    if request is not None:
+    if request is not None and not base_url:
         try:
             base_url = request.build_absolute_uri('/').rstrip('/')
         except Exception:
@@ -68,13 +69,17 @@ def _branding_context(request=None):
     }
 
 
-def send_composed_email(subject, html_body, recipients, request=None, sender=None):
+def send_composed_email(subject, html_body, recipients, request=None, sender=None, base_url='', progress=None):
     """Envoie un email composé à un ou plusieurs destinataires.
 
-    Chaque destinataire reçoit un message individuel (pas de fuite d'adresses).
+    Chaque destinataire reçoit un message individuel (pas de fuite d'adresses) ;
+    le gabarit est rendu une fois et les messages partent par lots sur une même
+    connexion (voir ``emails.bulk``). ``base_url`` remplace la requête pour
+    construire les liens absolus lorsque l'envoi a lieu hors requête (tâche de fond).
+    Le résultat de chaque destinataire est enregistré dans ``EmailDelivery``.
     Retourne un tuple ``(success_count, failure_count)``.
     """
-    branding = _branding_context(request=request)
+    branding = _branding_context(request=request, base_url=base_url)
     from_email = (
         getattr(settings, 'DEFAULT_FROM_EMAIL', '')
         or getattr(settings, 'EMAIL_HOST_USER', '')
@@ -88,28 +93,39 @@ def send_composed_email(subject, html_body, recipients, request=None, sender=Non
         **branding,
     }
 
-    success_count = 0
-    failure_count = 0
-    for recipient in recipients:
-        try:
-            BaseEmailMessage(
-                context=context,
-                template_name=COMPOSED_EMAIL_TEMPLATE,
-            ).send(to=[recipient], from_email=from_email)
-            success_count += 1
-        except Exception:
-            logger.exception("Échec de l'envoi de l'email composé à %s", recipient)
-            failure_count += 1
+    recipients = list(recipients)
+    try:
+        results = send_bulk_email(COMPOSED_EMAIL_TEMPLATE, context, recipients, from_email, progress=progress)
+    except Exception as error:
+        logger.exception("Échec de la préparation de l'email composé.")
+        results = [DeliveryResult(recipient, DELIVERY_FAILED, str(error)[:500]) for recipient in recipients]
+
+    success_count = sum(1 for result in results if result.succeeded)
+    failure_count = len(results) - success_count
 
     try:
-        EmailLog.objects.create(
-            subject=subject,
-            body=html_body,
-            recipients=', '.join(recipients),
-            sender=sender if getattr(sender, 'pk', None) else None,
-            success_count=success_count,
-            failure_count=failure_count,
-        )
+        with transaction.atomic():
+            email_log = EmailLog.objects.create(
+                subject=subject,
+                body=html_body,
+                recipients=', '.join(recipients),
+                sender=sender if getattr(sender, 'pk', None) else None,
+                success_count=success_count,
+                failure_count=failure_count,
+            )
+            EmailDelivery.objects.bulk_create(
+                [
+                    EmailDelivery(
+                        log=email_log,
+                        recipient=result.recipient,
+                        status=result.status,
+                        error=result.error,
+                        sent_at=result.sent_at,
+                    )
+                    for result in results
+                ],
+                batch_size=DELIVERY_LOG_BATCH_SIZE,
+            )
     except Exception:
         logger.exception("Impossible d'enregistrer le journal d'email composé.")
 
@@ -0,0 +1,17 @@
+from jobs.registry import register_task
+
+from .services import send_composed_email
+
+
+@register_task('emails.send_composed_email')
+def send_composed_email_task(job, subject, html_body, recipients, base_url=''):
+    """Envoie un email composé depuis le worker de tâches de fond."""
+    success_count, failure_count = send_composed_email(
+        subject=subject,
+        html_body=html_body,
+        recipients=recipients,
+        sender=job.created_by,
+        base_url=base_url,
+        progress=lambda done, total: job.report_progress(done, total, f"{done}/{total} email(s) traité(s)"),
+    )
+    return {'success_count': success_count, 'failure_count': failure_count}
@@ -1,3 +1,120 @@
-from django.test import TestCase
+import smtplib
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+
+from .bulk import DELIVERY_FAILED, DELIVERY_SENT, send_bulk_email
+from .models import EmailDelivery, EmailLog
+from .services import COMPOSED_EMAIL_TEMPLATE, send_composed_email
+
+
+class FlakyConnection:
+    """Connexion factice : refuse certains destinataires, se déconnecte une fois si demandé."""
+
+    def __init__(self, refused=(), disconnect_once=()):
+        self.refused = set(refused)
+        self.disconnect_once = set(disconnect_once)
+        self.sent = []
+        self.opened = 0
+        self.closed = 0
+
+    def open(self):
+        self.opened += 1
+
+    def close(self):
+        self.closed += 1
+
+    def send_messages(self, messages):
+        for message in messages:
+            recipient = message.to[0]
+            if recipient in self.disconnect_once:
+                self.disconnect_once.discard(recipient)
+                raise smtplib.SMTPServerDisconnected('Connexion perdue')
+            if recipient in self.refused:
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b'Mailbox unavailable')})
+            self.sent.append(recipient)
+        return len(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', EMAIL_RATE_LIMIT=0)
+class BulkEmailTests(TestCase):
+    recipients = ['a@example.com', 'b@example.com', 'c@example.com']
+
+    def test_composed_email_renders_once_and_shares_one_connection(self):
+        with mock.patch('emails.bulk.get_connection', wraps=get_connection) as connection_factory, \
+                mock.patch('emails.bulk.BaseEmailMessage.render', autospec=True,
+                           side_effect=lambda message: setattr(message, 'html', '<p>Bonjour</p>')) as render:
+            success_count, failure_count = send_composed_email('Rentrée', '<p>Bonjour</p>', self.recipients)
+
+        self.assertEqual((success_count, failure_count), (3, 0))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(connection_factory.call_count, 1)
+        self.assertEqual([message.to for message in mail.outbox], [[recipient] for recipient in self.recipients])
+
+        email_log = EmailLog.objects.get()
+        self.assertEqual((email_log.success_count, email_log.failure_count), (3, 0))
+        self.assertEqual(
+            list(email_log.deliveries.values_list('recipient', 'status')),
+            [(recipient, DELIVERY_SENT) for recipient in self.recipients],
+        )
+        self.assertTrue(all(delivery.sent_at for delivery in email_log.deliveries.all()))
+
+    def test_rendered_message_keeps_html_alternative(self):
+        send_composed_email('Rentrée', '<p>Bonjour</p>', ['a@example.com'])
+
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Rentrée')
+        self.assertIn('Bonjour', message.body)
+
+    def test_refused_recipient_is_recorded_without_stopping_the_batch(self):
+        connection = FlakyConnection(refused={'b@example.com'})
+
+        results = send_bulk_email(
+            COMPOSED_EMAIL_TEMPLATE, {'subject': 'Rentrée', 'body': 'Bonjour'}, self.recipients,
+            'noreply@example.com', batch_size=2, connection=connection,
+        )
+
+        self.assertEqual([result.status for result in results], [DELIVERY_SENT, DELIVERY_FAILED, DELIVERY_SENT])
+        self.assertIn('SMTPRecipientsRefused', results[1].error)
+        self.assertEqual(connection.sent, ['a@example.com', 'c@example.com'])
+        self.assertEqual((connection.opened, connection.closed), (1, 1))
+
+    def test_disconnected_connection_is_reopened_and_message_retried(self):
+        connection = FlakyConnection(disconnect_once={'b@example.com'})
+
+        results = send_bulk_email(
+            COMPOSED_EMAIL_TEMPLATE, {'subject': 'Rentrée', 'body': 'Bonjour'}, self.recipients,
+            'noreply@example.com', connection=connection,
+        )
+
+        self.assertTrue(all(result.succeeded for result in results))
+        self.assertEqual(connection.sent, self.recipients)
+        self.assertEqual(connection.opened, 2)
+
+    def test_batches_are_throttled_to_the_configured_rate(self):
+        recipients = [f'etudiant{index}@example.com' for index in range(5)]
+        progress = mock.Mock()
+
+        with mock.patch('emails.bulk.time.monotonic', return_value=100.0), \
+                mock.patch('emails.bulk.time.sleep') as sleep:
+            send_bulk_email(
+                COMPOSED_EMAIL_TEMPLATE, {'subject': 'Rentrée', 'body': 'Bonjour'}, recipients,
+                'noreply@example.com', batch_size=2, rate_limit=10, progress=progress,
+            )
+
+        self.assertEqual(sleep.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args_list[0].args[0], 0.2)
+        self.assertAlmostEqual(sleep.call_args_list[1].args[0], 0.4)
+        self.assertEqual([call.args for call in progress.call_args_list], [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failed_deliveries_are_counted_in_the_log(self):
+        with mock.patch('emails.bulk.get_connection', return_value=FlakyConnection(refused={'c@example.com'})):
+            success_count, failure_count = send_composed_email('Rentrée', '<p>Bonjour</p>', self.recipients)
+
+        self.assertEqual((success_count, failure_count), (2, 1))
+        failed = EmailDelivery.objects.get(status=DELIVERY_FAILED)
+        self.assertEqual(failed.recipient, 'c@example.com')
+        self.assertIsNone(failed.sent_at)
@@ -4,8 +4,9 @@ from django.shortcuts import redirect, render
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.cache import never_cache
 
+from jobs.queue import enqueue
+
 from .forms import ComposeEmailForm
-from .services import send_composed_email
 
 
 @never_cache
@@ -25,17 +26,18 @@ def compose_email(request):
     if request.method == 'POST':
         form = ComposeEmailForm(request.POST)
         if form.is_valid():
-            success, failure = send_composed_email(
-                subject=form.cleaned_data['subject'],
-                html_body=form.cleaned_data['body'],
-                recipients=form.cleaned_data['recipients'],
-                request=request,
-                sender=request.user if request.user.is_authenticated else None,
+            recipients = form.cleaned_data['recipients']
+            enqueue(
+                'emails.send_composed_email',
+                {
+                    'subject': form.cleaned_data['subject'],
+                    'html_body': form.cleaned_data['body'],
+                    'recipients': recipients,
+                    'base_url': request.build_absolute_uri('/').rstrip('/'),
+                },
+                user=request.user,
             )
-            if success:
-                messages.success(request, f"Email envoyé à {success} destinataire(s).")
-            if failure:
-                messages.error(request, f"Échec de l'envoi pour {failure} destinataire(s).")
+            messages.success(request, f"L'envoi de l'email à {len(recipients)} destinataire(s) a été programmé.")
             return redirect(safe_next or 'emails:compose')
     else:
         form = ComposeEmailForm(initial={
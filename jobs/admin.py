@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'progress_percent', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task', 'created_at')
+    search_fields = ('task', 'last_error')
+    readonly_fields = (
+        'id', 'task', 'payload', 'status', 'priority', 'attempts', 'max_attempts', 'run_after',
+        'locked_by', 'locked_at', 'progress_current', 'progress_total', 'progress_message',
+        'result', 'last_error', 'created_by', 'created_at', 'started_at', 'finished_at',
+    )
+
+    def has_add_permission(self, request):
+        return False
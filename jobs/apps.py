@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = "Tâches de fond"
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # Chaque application déclare ses tâches dans un module ``tasks``.
+        autodiscover_modules('tasks')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches de fond en file (exports PDF, envois d'emails...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Traite les tâches disponibles puis s'arrête (au lieu d'attendre de nouvelles tâches).",
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help="Nombre maximum de tâches à traiter avant de s'arrêter.",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help="Délai d'attente (en secondes) entre deux consultations d'une file vide.",
+        )
+        parser.add_argument('--name', help="Nom du worker (hôte:pid par défaut).")
+
+    def handle(self, *args, **options):
+        worker = Worker(name=options.get('name'), poll_interval=options.get('poll_interval'))
+        self.stdout.write(f"Worker {worker.name} démarré.")
+        try:
+            processed = worker.run(once=options['once'], max_jobs=options.get('max_jobs'))
+        except KeyboardInterrupt:
+            self.stdout.write("Worker arrêté.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{processed} tâche(s) traitée(s)."))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('task', models.CharField(max_length=100, verbose_name='Tâche')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Paramètres')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('succeeded', 'Terminée'), ('failed', 'Échouée')], default='pending', max_length=20, verbose_name='Statut')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Priorité')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Tentatives maximum')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécutable à partir de')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name="Processus d'exécution")),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Prise en charge le')),
+                ('progress_current', models.PositiveIntegerField(default=0, verbose_name='Progression')),
+                ('progress_total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('progress_message', models.CharField(blank=True, max_length=255, verbose_name='Message de progression')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Résultat')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarrée le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminée le')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Demandée par')),
+            ],
+            options={
+                'verbose_name': 'Tâche de fond',
+                'verbose_name_plural': 'Tâches de fond',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after', 'priority'], name='job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,103 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Tâche de fond exécutée par ``manage.py run_worker``."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_SUCCEEDED, 'Terminée'),
+        (STATUS_FAILED, 'Échouée'),
+    ]
+    FINISHED_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED}
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.CharField(max_length=100, verbose_name="Tâche")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Paramètres")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Statut")
+    priority = models.SmallIntegerField(default=0, verbose_name="Priorité")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Tentatives maximum")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Exécutable à partir de")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Processus d'exécution")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Prise en charge le")
+    progress_current = models.PositiveIntegerField(default=0, verbose_name="Progression")
+    progress_total = models.PositiveIntegerField(default=0, verbose_name="Total")
+    progress_message = models.CharField(max_length=255, blank=True, verbose_name="Message de progression")
+    result = models.JSONField(null=True, blank=True, verbose_name="Résultat")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name="Demandée par",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Démarrée le")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminée le")
+
+    class Meta:
+        verbose_name = "Tâche de fond"
+        verbose_name_plural = "Tâches de fond"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'priority'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def progress_percent(self):
+        if self.status == self.STATUS_SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(int(self.progress_current * 100 / self.progress_total), 100)
+
+    def report_progress(self, current, total=None, message=None):
+        """Enregistre l'avancement de la tâche (sans passer par ``save`` ni l'audit)."""
+        self.progress_current = current
+        if total is not None:
+            self.progress_total = total
+        if message is not None:
+            self.progress_message = message[:255]
+        Job.objects.filter(pk=self.pk).update(
+            progress_current=self.progress_current,
+            progress_total=self.progress_total,
+            progress_message=self.progress_message,
+        )
+
+    def as_status_dict(self):
+        return {
+            'id': str(self.pk),
+            'task': self.task,
+            'status': self.status,
+            'status_label': self.get_status_display(),
+            'attempts': self.attempts,
+            'progress': {
+                'current': self.progress_current,
+                'total': self.progress_total,
+                'percent': self.progress_percent,
+                'message': self.progress_message,
+            },
+            'result': self.result,
+            'error': self.last_error.splitlines()[-1] if self.status == self.STATUS_FAILED and self.last_error else '',
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,40 @@
+"""Mise en file des tâches de fond."""
+
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+from .registry import UnknownTaskError, is_registered
+
+
+def is_eager():
+    return getattr(settings, 'JOBS_EAGER', False)
+
+
+def enqueue(task, payload=None, *, user=None, priority=0, max_attempts=None, run_after=None):
+    """
+    Ajoute une tâche à la file et retourne la ``Job`` créée.
+
+    La tâche n'est visible du worker qu'après la validation de la transaction courante.
+    Avec ``JOBS_EAGER`` (développement sans worker), elle est exécutée dans le processus
+    courant juste après cette validation.
+    """
+    if not is_registered(task):
+        raise UnknownTaskError(f"Tâche inconnue : {task}")
+
+    job = Job.objects.create(
+        task=task,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 3),
+        run_after=run_after or timezone.now(),
+        created_by=user if getattr(user, 'pk', None) else None,
+    )
+    if is_eager():
+        from .worker import Worker
+
+        transaction.on_commit(partial(Worker(name='eager').run_pending_job, job.pk))
+    return job
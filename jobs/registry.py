@@ -0,0 +1,32 @@
+"""Registre des tâches exécutables par la file de tâches de fond."""
+
+_tasks = {}
+
+
+class UnknownTaskError(LookupError):
+    """Aucune tâche n'est enregistrée sous ce nom."""
+
+
+def register_task(name):
+    """
+    Enregistre une fonction comme tâche de fond.
+
+    La fonction reçoit la ``Job`` en cours puis les paramètres de ``Job.payload`` en
+    arguments nommés ; sa valeur de retour (sérialisable en JSON) devient ``Job.result``.
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownTaskError(f"Tâche inconnue : {name}") from None
+
+
+def is_registered(name):
+    return name in _tasks
@@ -0,0 +1,44 @@
+"""
+Stockage des fichiers produits par les tâches de fond.
+
+Les fichiers (exports PDF...) sont rangés sous ``JOBS_OUTPUT_ROOT/<id>/``, hors de
+``MEDIA_ROOT`` : ils ne sont jamais servis directement et ne se téléchargent que par
+la vue authentifiée ``jobs:download``, réservée au demandeur de la tâche.
+"""
+
+import os
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+def get_job_output_root():
+    return getattr(settings, 'JOBS_OUTPUT_ROOT', None) or os.path.join(settings.BASE_DIR, 'var', 'jobs')
+
+
+def get_job_storage():
+    return FileSystemStorage(location=get_job_output_root())
+
+
+def get_job_output_directory(job_pk):
+    return str(job_pk)
+
+
+def save_job_output(job, file_name, content):
+    """Enregistre un fichier produit par ``job`` et retourne son nom dans le stockage des tâches."""
+    return get_job_storage().save(f'{get_job_output_directory(job.pk)}/{file_name}', content)
+
+
+def delete_job_output(job_pk):
+    """Supprime les fichiers produits par une tâche, répertoire compris."""
+    storage = get_job_storage()
+    directory = get_job_output_directory(job_pk)
+    try:
+        _, file_names = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file_name in file_names:
+        storage.delete(f'{directory}/{file_name}')
+    with suppress(OSError):
+        os.rmdir(storage.path(directory))
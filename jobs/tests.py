@@ -0,0 +1,200 @@
+import os
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from jobs.registry import UnknownTaskError, register_task
+from jobs.storage import get_job_storage, save_job_output
+from jobs.worker import Worker, get_retry_delay
+
+
+User = get_user_model()
+
+
+@register_task('jobs.tests.echo')
+def echo_task(job, value, steps=2):
+    for step in range(1, steps + 1):
+        job.report_progress(step, steps)
+    return {'value': value}
+
+
+@register_task('jobs.tests.fail')
+def failing_task(job):
+    raise RuntimeError("Échec volontaire")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobs_user', password='secret123')
+        self.worker = Worker(name='test-worker', poll_interval=0)
+
+    def test_enqueue_rejects_unknown_task(self):
+        with self.assertRaises(UnknownTaskError):
+            enqueue('jobs.tests.unknown')
+
+    def test_worker_runs_job_and_records_result_and_progress(self):
+        job = enqueue('jobs.tests.echo', {'value': 42, 'steps': 3}, user=self.user)
+
+        self.assertEqual(self.worker.run(once=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {'value': 42})
+        self.assertEqual((job.progress_current, job.progress_total), (3, 3))
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        job = enqueue('jobs.tests.fail', max_attempts=2)
+
+        self.worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now() + get_retry_delay(1) - timedelta(seconds=5))
+        self.assertIn('Échec volontaire', job.last_error)
+        self.assertEqual(self.worker.run(once=True), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_doubles_and_is_capped(self):
+        with override_settings(JOBS_RETRY_BASE_DELAY=10, JOBS_RETRY_MAX_DELAY=60):
+            self.assertEqual(
+                [get_retry_delay(attempt).total_seconds() for attempt in (1, 2, 3, 4)],
+                [10, 20, 40, 60],
+            )
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue('jobs.tests.echo', {'value': 1})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_RUNNING,
+            attempts=1,
+            locked_by='crashed-worker',
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(self.worker.requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.locked_by, '')
+
+    def test_higher_priority_job_is_claimed_first(self):
+        enqueue('jobs.tests.echo', {'value': 'normal'})
+        urgent = enqueue('jobs.tests.echo', {'value': 'urgent'}, priority=10)
+
+        self.assertEqual(self.worker.claim_next().pk, urgent.pk)
+
+    @override_settings(JOBS_RETENTION_DAYS=7)
+    def test_expired_jobs_are_purged_with_their_output(self):
+        output_root = TemporaryDirectory()
+        self.addCleanup(output_root.cleanup)
+        output_override = override_settings(JOBS_OUTPUT_ROOT=output_root.name)
+        output_override.enable()
+        self.addCleanup(output_override.disable)
+        now = timezone.now()
+        expired = Job.objects.create(task='jobs.tests.echo', status=Job.STATUS_SUCCEEDED, finished_at=now - timedelta(days=8))
+        recent = Job.objects.create(task='jobs.tests.echo', status=Job.STATUS_FAILED, finished_at=now - timedelta(days=1))
+        pending = Job.objects.create(task='jobs.tests.echo')
+        expired_file = save_job_output(expired, 'export.pdf', ContentFile(b'%PDF'))
+        recent_file = save_job_output(recent, 'export.pdf', ContentFile(b'%PDF'))
+
+        self.assertEqual(self.worker.purge_expired_jobs(), 1)
+
+        storage = get_job_storage()
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+        self.assertFalse(storage.exists(expired_file))
+        self.assertFalse(storage.exists(str(expired.pk)))
+        self.assertTrue(storage.exists(recent_file))
+
+    def test_run_worker_command_processes_queue_once(self):
+        enqueue('jobs.tests.echo', {'value': 'cmd'})
+        output = StringIO()
+
+        call_command('run_worker', '--once', stdout=output)
+
+        self.assertIn('1 tâche(s) traitée(s)', output.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.STATUS_SUCCEEDED).exists())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_job_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue('jobs.tests.echo', {'value': 'eager'})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+
+
+class JobViewsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobs_owner', password='secret123')
+        self.other_user = User.objects.create_user(username='jobs_other', password='secret123')
+        self.job = enqueue('jobs.tests.echo', {'value': 'view'}, user=self.user)
+
+    def test_owner_can_poll_job_status(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('jobs:status', kwargs={'pk': self.job.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], Job.STATUS_PENDING)
+        self.assertEqual(response.json()['progress']['percent'], 0)
+
+    def test_other_user_cannot_see_job(self):
+        self.client.force_login(self.other_user)
+
+        response = self.client.get(reverse('jobs:status', kwargs={'pk': self.job.pk}))
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_output_is_stored_outside_media_root_and_served_to_its_owner(self):
+        output_root = TemporaryDirectory()
+        self.addCleanup(output_root.cleanup)
+        job = Job.objects.create(task='jobs.tests.echo', created_by=self.user, status=Job.STATUS_SUCCEEDED)
+        with override_settings(JOBS_OUTPUT_ROOT=output_root.name):
+            file_name = save_job_output(job, 'export.pdf', ContentFile(b'%PDF-job'))
+            job.result = {'file': file_name, 'filename': 'export.pdf', 'content_type': 'application/pdf'}
+            job.save()
+
+            self.client.force_login(self.user)
+            response = self.client.get(reverse('jobs:download', kwargs={'pk': job.pk}))
+            self.client.force_login(self.other_user)
+            forbidden = self.client.get(reverse('jobs:download', kwargs={'pk': job.pk}))
+
+        self.assertTrue(os.path.isfile(os.path.join(output_root.name, file_name)))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-job')
+        self.assertEqual(forbidden.status_code, 404)
+
+    def test_compose_email_view_enqueues_sending(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('emails:compose'), {
+            'recipients': 'a@example.com, b@example.com',
+            'subject': 'Rentrée',
+            'body': '<p>Bonjour</p>',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get(task='emails.send_composed_email')
+        self.assertEqual(job.payload['recipients'], ['a@example.com', 'b@example.com'])
+
+        Worker(name='test-worker').run(once=True)
+
+        self.assertEqual(len(mail.outbox), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'success_count': 2, 'failure_count': 0})
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('<uuid:pk>/', views.job_status, name='status'),
+    path('<uuid:pk>/telecharger/', views.job_download, name='download'),
+]
@@ -0,0 +1,40 @@
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import never_cache
+
+from .models import Job
+from .storage import get_job_storage
+
+
+def _get_user_job(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    if not request.user.is_superuser and job.created_by_id != request.user.pk:
+        raise Http404("Tâche introuvable.")
+    return job
+
+
+@never_cache
+@login_required
+def job_status(request, pk):
+    """Retourne le statut et la progression d'une tâche (consulté périodiquement par l'interface)."""
+    return JsonResponse(_get_user_job(request, pk).as_status_dict())
+
+
+@never_cache
+@login_required
+def job_download(request, pk):
+    """Télécharge le fichier produit par une tâche terminée."""
+    job = _get_user_job(request, pk)
+    file_name = (job.result or {}).get('file') if job.status == Job.STATUS_SUCCEEDED else None
+    storage = get_job_storage()
+    if not file_name or not storage.exists(file_name):
+        raise Http404("Aucun fichier disponible pour cette tâche.")
+
+    return FileResponse(
+        storage.open(file_name, 'rb'),
+        content_type=job.result.get('content_type') or 'application/octet-stream',
+        filename=job.result.get('filename') or os.path.basename(file_name),
+    )
@@ -0,0 +1,182 @@
+"""
+Exécution des tâches de fond.
+
+Un ``Worker`` réclame les tâches par une mise à jour conditionnelle (``pending`` ->
+``running``) : plusieurs workers peuvent tourner en parallèle sans verrou applicatif.
+Une tâche en échec est replanifiée avec un délai exponentiel jusqu'à ``max_attempts``,
+et une tâche restée ``running`` au-delà de ``JOBS_STALE_TIMEOUT`` (worker interrompu)
+est remise en attente. Les tâches terminées depuis plus de ``JOBS_RETENTION_DAYS`` jours
+sont supprimées avec les fichiers qu'elles ont produits (voir ``jobs.storage``), au plus
+une fois par ``JOBS_PURGE_INTERVAL`` secondes.
+"""
+
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from audit.context import audit_actor
+from audit.pipeline import audit_batch
+
+from .models import Job
+from .registry import get_task
+from .storage import delete_job_output
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_retry_delay(attempts):
+    """Délai avant la tentative suivante : base * 2^(tentatives - 1), plafonné."""
+    base = getattr(settings, 'JOBS_RETRY_BASE_DELAY', 30)
+    maximum = getattr(settings, 'JOBS_RETRY_MAX_DELAY', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), maximum))
+
+
+def get_stale_timeout():
+    return timedelta(seconds=getattr(settings, 'JOBS_STALE_TIMEOUT', 3600))
+
+
+def get_retention():
+    return timedelta(days=getattr(settings, 'JOBS_RETENTION_DAYS', 7))
+
+
+class Worker:
+    def __init__(self, name=None, poll_interval=None):
+        self.name = (name or f'{socket.gethostname()}:{os.getpid()}')[:100]
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(settings, 'JOBS_POLL_INTERVAL', 2.0)
+        self.purge_interval = getattr(settings, 'JOBS_PURGE_INTERVAL', 3600)
+        self._next_purge_at = 0.0
+
+    def run(self, once=False, max_jobs=None):
+        """Traite les tâches en file ; avec ``once``, s'arrête dès que la file est vide."""
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            close_old_connections()
+            self.requeue_stale_jobs()
+            if time.monotonic() >= self._next_purge_at:
+                self.purge_expired_jobs()
+                self._next_purge_at = time.monotonic() + self.purge_interval
+            job = self.claim_next()
+            if job is None:
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.execute(job)
+            processed += 1
+        return processed
+
+    def claim_next(self):
+        now = timezone.now()
+        candidates = Job.objects.filter(
+            status=Job.STATUS_PENDING,
+            run_after__lte=now,
+        ).order_by('-priority', 'run_after', 'created_at').values_list('pk', flat=True)[:10]
+
+        for pk in candidates:
+            job = self._claim(pk, now)
+            if job is not None:
+                return job
+        return None
+
+    def run_pending_job(self, pk):
+        """Exécute immédiatement une tâche donnée si elle est toujours en attente."""
+        job = self._claim(pk, timezone.now())
+        if job is not None:
+            self.execute(job)
+        return job
+
+    def _claim(self, pk, now):
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=self.name,
+            locked_at=now,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            return None
+        return Job.objects.select_related('created_by').get(pk=pk)
+
+    def execute(self, job):
+        started_at = time.perf_counter()
+        try:
+            task = get_task(job.task)
+            with audit_actor(job.created_by), audit_batch():
+                result = task(job, **job.payload)
+        except Exception:
+            self._record_failure(job, traceback.format_exc())
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_SUCCEEDED,
+                result=result,
+                finished_at=timezone.now(),
+                locked_by='',
+                locked_at=None,
+                last_error='',
+            )
+            logger.info("Tâche %s (%s) terminée en %.2fs.", job.pk, job.task, time.perf_counter() - started_at)
+        job.refresh_from_db()
+        return job
+
+    def _record_failure(self, job, error):
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            retry_at = now + get_retry_delay(job.attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_PENDING,
+                run_after=retry_at,
+                locked_by='',
+                locked_at=None,
+                last_error=error,
+            )
+            logger.warning("Tâche %s (%s) en échec, nouvelle tentative à %s.", job.pk, job.task, retry_at.isoformat())
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_FAILED,
+                finished_at=now,
+                locked_by='',
+                locked_at=None,
+                last_error=error,
+            )
+            logger.error("Tâche %s (%s) abandonnée après %s tentative(s).", job.pk, job.task, job.attempts)
+
+    def requeue_stale_jobs(self):
+        """Remet en attente (ou en échec) les tâches abandonnées par un worker interrompu."""
+        stale = Q(status=Job.STATUS_RUNNING, locked_at__lt=timezone.now() - get_stale_timeout())
+        exhausted = Job.objects.filter(stale, attempts__gte=F('max_attempts')).update(
+            status=Job.STATUS_FAILED,
+            finished_at=timezone.now(),
+            locked_by='',
+            locked_at=None,
+            last_error="Tâche interrompue (worker arrêté pendant l'exécution).",
+        )
+        requeued = Job.objects.filter(stale).update(
+            status=Job.STATUS_PENDING,
+            run_after=timezone.now(),
+            locked_by='',
+            locked_at=None,
+        )
+        return requeued + exhausted
+
+    def purge_expired_jobs(self):
+        """Supprime les tâches terminées au-delà de la durée de rétention, avec leurs fichiers."""
+        expired = Job.objects.filter(
+            status__in=Job.FINISHED_STATUSES,
+            finished_at__lt=timezone.now() - get_retention(),
+        )
+        purged = 0
+        for pk in expired.values_list('pk', flat=True).iterator():
+            delete_job_output(pk)
+            purged += Job.objects.filter(pk=pk).delete()[0]
+        if purged:
+            logger.info("%s tâche(s) terminée(s) supprimée(s) avec leurs fichiers.", purged)
+        return purged
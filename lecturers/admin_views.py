@@ -1,8 +1,7 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -16,7 +15,9 @@ from lecturers.emails import (
 from lecturers.forms import LecturerCreateForm, TeacherRecruitmentSettingsForm
 from lecturers.models import Lecturer
 from main.models import SystemSettings
+from main.pagination import CURSOR_PARAM, KeysetPaginator
 from main.pdf_exports import build_lecturer_dossier_pdf
+from search.index import search_queryset
 from recruitment.forms import (
     AdminLecturerSubjectFormSet,
     DiplomaStep2Form,
@@ -154,12 +155,7 @@ def _filter_lecturer_dossiers(params):
     if is_permanent in ('True', 'False'):
         lecturers = lecturers.filter(is_permanent=(is_permanent == 'True'))
     if search:
-        lecturers = lecturers.filter(
-            Q(matricule__icontains=search)
-            | Q(firstname__icontains=search)
-            | Q(lastname__icontains=search)
-            | Q(email__icontains=search)
-        )
+        lecturers = search_queryset(lecturers, search, 'lecturer')
 
     return lecturers.order_by('lastname', 'firstname')
 
@@ -169,7 +165,6 @@ def _filter_lecturer_dossiers(params):
 def lecturer_dossiers(request):
     """Liste les dossiers des enseignants avec filtres et pagination."""
     lecturers = _filter_lecturer_dossiers(request.GET)
-    filtered_count = lecturers.count()
 
     per_page_choices = [5, 10, 25, 50, 100]
     try:
@@ -179,17 +174,16 @@ def lecturer_dossiers(request):
     if per_page not in per_page_choices:
         per_page = 10
 
-    paginator = Paginator(lecturers, per_page)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj = KeysetPaginator(lecturers, per_page).get_page(request.GET.get(CURSOR_PARAM))
 
     has_filter = any(
         value for key, value in request.GET.items()
-        if key not in ('page', 'per_page')
+        if key not in ('page', 'per_page', CURSOR_PARAM)
     )
 
     context = {
         'lecturers': page_obj.object_list,
-        'filtered_count': filtered_count,
+        'filtered_count': page_obj.paginator.count,
         'page_obj': page_obj,
         'has_filter': has_filter,
         'per_page': per_page,
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import SystemSettings
+from .models import StatisticsCubeState, SystemSettings
+from .statistics import refresh_statistics_cube
 
 
 @admin.register(SystemSettings)
@@ -65,4 +66,27 @@ def configure_admin_site():
 
 
 # Appliquer la configuration
-configure_admin_site()
\ No newline at end of file
+configure_admin_site()
+
+
+@admin.register(StatisticsCubeState)
+class StatisticsCubeStateAdmin(admin.ModelAdmin):
+    """
+    Suivi du cube statistique de la scolarité (reconstruction : ``manage.py rebuild_statistics``)
+    """
+    list_display = ['academic_year', 'refreshed_at', 'is_up_to_date', 'has_multiple_levels']
+    readonly_fields = ['academic_year', 'version', 'built_version', 'refreshed_at', 'has_multiple_levels']
+    actions = ['rebuild_cube']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(boolean=True, description="À jour")
+    def is_up_to_date(self, obj):
+        return not obj.is_stale
+
+    @admin.action(description="Reconstruire le cube des années sélectionnées")
+    def rebuild_cube(self, request, queryset):
+        for state in queryset.select_related('academic_year'):
+            refresh_statistics_cube(state.academic_year)
+        self.message_user(request, f"Cube statistique reconstruit pour {queryset.count()} année(s).")
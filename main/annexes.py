@@ -0,0 +1,130 @@
+"""
+Conversion des pièces jointes des dossiers (étudiants, enseignants) en pages PDF.
+
+Les images téléversées sont converties une seule fois en une page PDF normalisée
+(RVB, redimensionnée pour tenir sur une page A4 à 150 dpi, compressée en JPEG),
+enregistrée à côté du fichier d'origine sous ``<nom>.<extension>.<empreinte>.annex.pdf``.
+L'empreinte est calculée sur le nom, la taille et la date de modification du fichier
+d'origine (sur son contenu si le stockage ne fournit pas de date) : un fichier
+remplacé sous le même nom ne réutilise jamais une ancienne conversion, et un export
+ne relit pas l'original pour retrouver la sienne. La conversion est faite après le
+téléversement (``main.signals``), qui supprime aussi les conversions d'un fichier
+remplacé ou supprimé ; les exports de dossiers ne font ensuite que fusionner les
+pages déjà prêtes.
+"""
+
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+ANNEX_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+ANNEX_RESOLUTION = 150.0
+ANNEX_MAX_SIZE = (1240, 1754)  # Page A4 à 150 dpi
+ANNEX_JPEG_QUALITY = 85
+CONVERTED_SUFFIX = '.annex.pdf'
+CHECKSUM_LENGTH = 16
+
+
+def get_converted_annex_name(file_name, checksum):
+    # L'extension d'origine est conservée : photo.png et photo.jpg ont des conversions distinctes.
+    return f'{file_name}.{checksum[:CHECKSUM_LENGTH]}{CONVERTED_SUFFIX}'
+
+
+def get_annex_checksum(file_field):
+    """Empreinte d'une pièce jointe d'après les métadonnées du fichier stocké."""
+    storage = file_field.storage
+    try:
+        modified_time = storage.get_modified_time(file_field.name)
+    except NotImplementedError:
+        with file_field.open('rb') as stored_file:
+            return hashlib.sha256(stored_file.read()).hexdigest()
+    signature = f'{file_field.name}|{storage.size(file_field.name)}|{modified_time.timestamp()}'
+    return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+
+def load_annex(file_field):
+    """
+    Retourne ``(statut, détails, pdf_bytes)`` pour une pièce jointe.
+
+    Les PDF sont repris tels quels ; les images sont lues depuis leur conversion
+    enregistrée, produite et enregistrée à la volée si elle n'existe pas encore.
+    """
+    extension = os.path.splitext(file_field.name)[1].lower()
+    try:
+        if extension == '.pdf':
+            with file_field.open('rb') as stored_file:
+                return 'Inclus', '', stored_file.read()
+        if extension not in ANNEX_IMAGE_EXTENSIONS:
+            if not file_field.storage.exists(file_field.name):
+                raise FileNotFoundError(file_field.name)
+            return 'Ignoré', f'Format non pris en charge ({extension or "inconnu"})', None
+        return 'Inclus', '', _get_or_convert_image(file_field)
+    except FileNotFoundError:
+        return 'Introuvable', 'Fichier absent du stockage', None
+    except (UnidentifiedImageError, OSError):
+        return 'Erreur', 'Image illisible ou corrompue', None
+
+
+def prebuild_annex(file_field):
+    """Convertit à l'avance une image téléversée ; sans effet pour les autres formats."""
+    if not file_field or not getattr(file_field, 'name', None):
+        return
+    if os.path.splitext(file_field.name)[1].lower() not in ANNEX_IMAGE_EXTENSIONS:
+        return
+    try:
+        _get_or_convert_image(file_field)
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        logger.warning("Conversion impossible de la pièce jointe %s.", file_field.name)
+
+
+def delete_converted_annexes(storage, file_name, keep=None):
+    """Supprime les conversions enregistrées d'un fichier (sauf ``keep``)."""
+    directory, base_name = os.path.split(file_name)
+    prefix = f'{base_name}.'
+    try:
+        _, file_names = storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in file_names:
+        if not (name.startswith(prefix) and name.endswith(CONVERTED_SUFFIX)):
+            continue
+        checksum = name[len(prefix):-len(CONVERTED_SUFFIX)]
+        converted_name = os.path.join(directory, name) if directory else name
+        if len(checksum) == CHECKSUM_LENGTH and converted_name != keep:
+            storage.delete(converted_name)
+
+
+def image_to_pdf(image_bytes):
+    """Convertit une image en une page PDF normalisée (RVB, format A4 maximum à 150 dpi)."""
+    with Image.open(BytesIO(image_bytes)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail(ANNEX_MAX_SIZE)
+        output = BytesIO()
+        image.save(output, format='PDF', resolution=ANNEX_RESOLUTION, quality=ANNEX_JPEG_QUALITY)
+        return output.getvalue()
+
+
+def _get_or_convert_image(file_field):
+    storage = file_field.storage
+    converted_name = get_converted_annex_name(file_field.name, get_annex_checksum(file_field))
+    try:
+        with storage.open(converted_name, 'rb') as converted_file:
+            return converted_file.read()
+    except FileNotFoundError:
+        pass
+
+    with file_field.open('rb') as stored_file:
+        pdf_bytes = image_to_pdf(stored_file.read())
+    storage.save(converted_name, ContentFile(pdf_bytes))
+    # Une conversion plus ancienne du même fichier (remplacé sous le même nom) est périmée.
+    delete_converted_annexes(storage, file_field.name, keep=converted_name)
+    return pdf_bytes
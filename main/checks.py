@@ -0,0 +1,41 @@
+"""
+Vérifications système propres au déploiement.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Les invalidations (paramètres système, résumés du portail étudiant, autocomplete)
+    passent par des versions stockées dans ``CACHES['default']`` : avec plusieurs
+    processus Gunicorn (``WEB_CONCURRENCY``), ce cache doit être partagé.
+    """
+    try:
+        workers = int(os.environ.get('WEB_CONCURRENCY') or 1)
+    except ValueError:
+        workers = 1
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if workers > 1 and backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [
+            Error(
+                f"Le cache par défaut ({backend}) est propre à chaque processus alors que "
+                f"WEB_CONCURRENCY={workers} : les modifications des paramètres système ne "
+                f"seraient pas vues par les autres processus.",
+                hint="Définir CACHE_BACKEND=django.core.cache.backends.redis.RedisCache et "
+                     "CACHE_LOCATION=redis://..., ou WEB_CONCURRENCY=1.",
+                id='main.E001',
+            )
+        ]
+    return []
@@ -4,18 +4,19 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.http import HttpResponse
 from django.http import JsonResponse
 from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.generic import TemplateView
 
+from main.filters import related_exists
 from main.forms import BulkDocumentCreationForm, OfficialDocumentForm
 from main.pdf_exports import build_registration_certificate_pdf
 from students.models import Student
 from academic.models import AcademicYear, Level
 from students.models import OfficialDocument, StudentLevel
+from search.autocomplete import autocomplete_students
 
 
 class DocumentsView(LoginRequiredMixin, TemplateView):
@@ -48,10 +49,10 @@ class DocumentsView(LoginRequiredMixin, TemplateView):
 
         if student_id:
             selected_student = Student.objects.select_related('program').filter(
+                related_exists(StudentLevel, 'student', academic_year__isnull=False),
                 pk=student_id,
-                student_levels__academic_year__isnull=False,
                 status='registered',
-            ).distinct().first()
+            ).first()
 
         if document_type:
             documents = documents.filter(type=document_type)
@@ -116,15 +117,7 @@ def document_student_search(request):
     if not query:
         return JsonResponse({'results': []})
 
-    students = Student.objects.select_related('program').filter(
-        student_levels__academic_year__isnull=False,
-        status='registered'
-    ).filter(
-        Q(matricule__icontains=query)
-        | Q(firstname__icontains=query)
-        | Q(lastname__icontains=query)
-        | Q(program__name__icontains=query)
-    ).distinct().order_by('matricule')[:10]
+    students = autocomplete_students(query, require_academic_year=True)
 
     results = [
         {
@@ -1,28 +1,30 @@
 from urllib.parse import urlencode
 
+import tempfile
 import threading
 from decimal import Decimal
 
 from django.shortcuts import render, redirect, get_object_or_404, reverse
 from main.program_documents import build_program_document_entries
-from main.utils import ensure_registration_certificate, generate_final_registration_identifiers, get_filtered_pre_inscriptions_queryset, render_student_edit, replace_student_primary_key, resolve_student_school
+from main.utils import get_filtered_pre_inscriptions_queryset, register_approved_pre_inscriptions, render_student_edit, resolve_student_school
 from students.models import Student, StudentMetaData, StudentLevel
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.db import transaction
 from django.core.exceptions import ValidationError
 
 from academic.document_requirements import DEFAULT_REQUIRED_PROGRAM_DOCUMENT_FIELDS, PROGRAM_DOCUMENT_FIELD_NAMES
 from academic.models import AcademicYear, Program, Speciality
 from audit.utils import log_audit_event
+from jobs.queue import enqueue
 
 from accounts.models import Godfather
 from schools.models import School
 from students.models import Student, StudentLevel, StudentMetaData
-from django.core.paginator import Paginator
+from main.pagination import CURSOR_PARAM, KeysetPaginator
 from academic.models import Level
 
 from django.contrib import messages
@@ -30,10 +32,20 @@ from django.shortcuts import redirect
 from main.utils import queue_student_status_email
 
 from main.forms import InscriptionCompleteForm, SecondaryDiplomaFormSet, UniversityLevelFormSet
-from main.pdf_exports import build_pre_inscription_pdf, build_pre_inscriptions_pdf
+from main.pdf_batch import (
+    export_pre_inscriptions_pdf,
+    get_pre_inscription_pdf_queryset,
+    get_spool_max_size,
+    get_sync_export_max_dossiers,
+)
+from main.pdf_exports import build_pre_inscription_pdf
 from payments.utils import get_first_installment_for_student, get_installment_paid_amount
 
 
+# Export PDF confié au worker depuis l'URL d'impression : la liste en reprend le suivi.
+EXPORT_JOB_SESSION_KEY = 'pre_inscriptions_export_job'
+
+
 class PreInscriptionsView(LoginRequiredMixin, TemplateView):
     """Vue pour la gestion des pré-inscriptions"""
     template_name = 'main/preinscription/inscriptions.html'
@@ -53,7 +65,6 @@ class PreInscriptionsView(LoginRequiredMixin, TemplateView):
             params,
             queryset=Student.objects.select_related('school', 'program', 'godfather', 'start_level').prefetch_related('program__specialities').filter(deleted_at__isnull=True)
         )
-        filtered_students_count = students.count()
 
         schools = School.objects.all()
         programs = Program.objects.all()
@@ -62,17 +73,15 @@ class PreInscriptionsView(LoginRequiredMixin, TemplateView):
         academic_years = AcademicYear.objects.all().order_by('-start_at')
 
         per_page = self.request.GET.get('per_page', 10)
-        page = self.request.GET.get('page', 1)
+        page_obj = KeysetPaginator(students, per_page).get_page(self.request.GET.get(CURSOR_PARAM))
 
-        paginator = Paginator(students, per_page)
-        page_obj = paginator.get_page(page)
-
-        has_filter = any(value for key, value in self.request.GET.items() if key != 'page' and key != 'per_page')
+        has_filter = any(value for key, value in self.request.GET.items() if key not in ('page', 'per_page', CURSOR_PARAM))
         context['students'] = page_obj.object_list
-        context['filtered_students_count'] = filtered_students_count
+        context['filtered_students_count'] = page_obj.paginator.count
         context['page_obj'] = page_obj
         context['has_filter'] = has_filter
         context['per_page'] = int(per_page)
+        context['export_job_id'] = self.request.session.pop(EXPORT_JOB_SESSION_KEY, None)
         per_page_choices = [5, 10, 25, 50, 100]
         context['per_page_choices'] = per_page_choices
         context['status'] = self.request.GET.get('status')
@@ -359,20 +368,7 @@ def pre_inscription_detail(request, pk):
 @login_required
 def pre_inscription_print_pdf(request, pk):
     """Génère un PDF administratif combiné pour une pré-inscription."""
-    student = get_object_or_404(
-        Student.objects.select_related(
-            'metadata',
-            'school',
-            'program',
-            'godfather'
-        ).prefetch_related(
-            'secondary_diplomas__school',
-            'student_levels__level',
-            'student_levels__academic_year',
-            'university_levels__university',
-        ),
-        matricule=pk
-    )
+    student = get_object_or_404(get_pre_inscription_pdf_queryset(), matricule=pk)
 
     pdf_content = build_pre_inscription_pdf(student)
     response = HttpResponse(pdf_content, content_type='application/pdf')
@@ -382,26 +378,38 @@ def pre_inscription_print_pdf(request, pk):
 
 @login_required
 def pre_inscriptions_print_pdf(request):
-    """Génère un PDF combiné pour toutes les pré-inscriptions filtrées."""
+    """
+    Génère un PDF combiné pour toutes les pré-inscriptions filtrées.
+
+    Avec ``background=1`` (bouton d'export de la liste), l'export est confié au worker de
+    tâches de fond : la réponse (202) donne les URL de suivi et de téléchargement de la
+    tâche. Sans ce paramètre, seule une petite sélection (``PDF_EXPORT_SYNC_MAX_DOSSIERS``)
+    est produite dans la requête ; au-delà, la tâche est créée et la liste la suit.
+    """
     students = get_filtered_pre_inscriptions_queryset(
         request.GET,
-        queryset=Student.objects.select_related(
-            'metadata',
-            'school',
-            'program',
-            'godfather'
-        ).prefetch_related(
-            'secondary_diplomas__school',
-            'student_levels__level',
-            'student_levels__academic_year',
-            'university_levels__university',
-        )
+        queryset=get_pre_inscription_pdf_queryset()
     )
 
-    pdf_content = build_pre_inscriptions_pdf(students)
-    response = HttpResponse(pdf_content, content_type='application/pdf')
-    response['Content-Disposition'] = 'inline; filename="preinscriptions_filtrees.pdf"'
-    return response
+    background = request.GET.get('background') == '1'
+    if background or students.count() > get_sync_export_max_dossiers():
+        filters = request.GET.dict()
+        filters.pop('background', None)
+        job = enqueue('main.export_pre_inscriptions_pdf', {'filters': filters}, user=request.user)
+        if not background:
+            messages.info(request, "L'export PDF a été lancé en tâche de fond ; le téléchargement démarrera à la fin de la génération.")
+            request.session[EXPORT_JOB_SESSION_KEY] = str(job.pk)
+            return redirect(f"{reverse('main:inscriptions')}?{urlencode(filters)}")
+        return JsonResponse({
+            'job': str(job.pk),
+            'status_url': reverse('jobs:status', kwargs={'pk': job.pk}),
+            'download_url': reverse('jobs:download', kwargs={'pk': job.pk}),
+        }, status=202)
+
+    output = tempfile.SpooledTemporaryFile(max_size=get_spool_max_size())
+    export_pre_inscriptions_pdf(students, output)
+    output.seek(0)
+    return FileResponse(output, content_type='application/pdf', filename='preinscriptions_filtrees.pdf')
 
 
 @login_required
@@ -608,12 +616,8 @@ def pre_inscription_register(request, pk):
 
     try:
         with transaction.atomic():
-            dossier_number, final_matricule = generate_final_registration_identifiers(student)
-            registered_student = replace_student_primary_key(student, final_matricule, dossier_number)
-            registered_student_level = registered_student.get_active_level()
-            if registered_student_level:
-                registered_student_level.mark_as_registered()
-            ensure_registration_certificate(registered_student)
+            registered_student = register_approved_pre_inscriptions([student])[0]
+            final_matricule = registered_student.matricule
             # queue_student_status_email(registered_student, 'registration')
             threading.Thread(target=queue_student_status_email, args=(registered_student, 'registration', ), daemon=True).start()
     except ValidationError as exc:
@@ -0,0 +1,63 @@
+"""
+Filtres déclaratifs des listes (paramètres GET -> queryset).
+
+Une liste décrit ses filtres dans un ``FilterSpec`` : ``FieldFilter`` pour une colonne
+de la table filtrée ou d'une relation simple, ``RelationFilter`` pour une relation
+multivaluée (niveaux d'un étudiant, paiements...). Ces derniers sont exprimés en
+``EXISTS`` corrélé sur la table liée plutôt qu'en jointure : la requête ne produit
+jamais de doublons et n'a donc pas besoin de ``distinct()``, qui obligerait MySQL à
+trier et dédoublonner des lignes larges.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db.models import Exists, OuterRef
+
+
+def related_exists(related, link, **lookups):
+    """
+    Prédicat ``EXISTS`` : au moins une ligne de ``related`` (modèle ou queryset) liée à
+    la ligne courante par le champ ``link`` et vérifiant ``lookups``.
+    """
+    queryset = related._default_manager.all() if isinstance(related, type) else related
+    return Exists(queryset.filter(**{link: OuterRef('pk')}, **lookups))
+
+
+@dataclass(frozen=True)
+class FieldFilter:
+    """Filtre ``lookup = valeur`` appliqué lorsque le paramètre ``param`` est renseigné."""
+    param: str
+    lookup: str
+
+    def apply(self, queryset, value):
+        return queryset.filter(**{self.lookup: value})
+
+
+@dataclass(frozen=True)
+class RelationFilter:
+    """
+    Filtre à travers une relation multivaluée : une ligne de ``model`` liée par ``link``
+    doit vérifier ``lookup = valeur`` ainsi que les ``conditions`` fixes.
+    """
+    param: str
+    model: type
+    link: str
+    lookup: str
+    conditions: dict = field(default_factory=dict)
+
+    def apply(self, queryset, value):
+        return queryset.filter(related_exists(self.model, self.link, **{self.lookup: value}, **self.conditions))
+
+
+class FilterSpec:
+    """Ensemble ordonné des filtres d'une liste."""
+
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def apply(self, queryset, params):
+        for spec_filter in self.filters:
+            value = params.get(spec_filter.param)
+            if value:
+                queryset = spec_filter.apply(queryset, value)
+        return queryset
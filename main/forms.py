@@ -10,6 +10,7 @@ from academic.document_requirements import (
     PROGRAM_DOCUMENTS_BY_FIELD,
 )
 from schools.models import School, SecondaryDiploma, UniversityLevel
+from .filters import related_exists
 from .models import SystemSettings
 from .program_documents import build_program_document_entries
 from .validators import validate_file_size, validate_phone_number
@@ -1593,8 +1594,8 @@ class OfficialDocumentForm(forms.ModelForm):
         self.fields['type'].choices = allowed_type_choices
 
         student_queryset = Student.objects.select_related('program').filter(
-            student_levels__academic_year__isnull=False,
-        ).distinct().order_by('matricule')
+            related_exists(StudentLevel, 'student', academic_year__isnull=False),
+        ).order_by('matricule')
         self.fields['student'].queryset = student_queryset
 
         selected_student = None
@@ -1864,11 +1865,9 @@ class BulkDocumentCreationForm(forms.Form):
 
         # Filtrer les étudiants qui ont un StudentLevel correspondant
         students = Student.objects.filter(
-            student_levels__academic_year=academic_year,
-            student_levels__level=level,
-            student_levels__is_registered=True,
+            related_exists(StudentLevel, 'student', academic_year=academic_year, level=level, is_registered=True),
             status='registered'
-        ).select_related('program').distinct().order_by('matricule')
+        ).select_related('program').order_by('matricule')
 
         # Filtrer par programme si spécifié
         if program:
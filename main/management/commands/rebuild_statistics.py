@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic.models import AcademicYear
+from main.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le cube statistique de la scolarité (tableau de bord des statistiques)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--academic-year',
+            type=int,
+            help="Identifiant de l'année académique à reconstruire (toutes les années par défaut).",
+        )
+
+    def handle(self, *args, **options):
+        academic_year = None
+        academic_year_id = options.get('academic_year')
+        if academic_year_id:
+            academic_year = AcademicYear.objects.filter(pk=academic_year_id).first()
+            if not academic_year:
+                raise CommandError(f"Année académique introuvable : {academic_year_id}")
+
+        count = rebuild_statistics(academic_year)
+        self.stdout.write(self.style.SUCCESS(f"Cube statistique reconstruit pour {count} année(s) académique(s)."))
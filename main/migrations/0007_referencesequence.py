@@ -0,0 +1,27 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_alter_systemsettings_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Clé de séquence')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Dernière valeur attribuée')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Séquence de référence',
+                'verbose_name_plural': 'Séquences de référence',
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0008_alter_subject_options_alter_course_subject'),
+        ('schools', '0002_initial'),
+        ('main', '0007_referencesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsCubeState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Version des données')),
+                ('built_version', models.PositiveIntegerField(blank=True, null=True, verbose_name='Version agrégée')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière agrégation')),
+                ('has_multiple_levels', models.BooleanField(default=False, help_text="Le cube compte des inscriptions : les statistiques de l'année sont alors calculées en direct.", verbose_name='Étudiants inscrits à plusieurs niveaux')),
+                ('academic_year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics_cube_state', to='academic.academicyear', verbose_name='Année académique')),
+            ],
+            options={
+                'verbose_name': 'État du cube statistique',
+                'verbose_name_plural': 'États du cube statistique',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatisticsCubeRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(blank=True, default='', max_length=10, verbose_name='Genre')),
+                ('lang', models.CharField(blank=True, default='', max_length=50, verbose_name='Langue')),
+                ('is_new_enrollment', models.BooleanField(default=False, verbose_name='Nouvelle inscription')),
+                ('document_status', models.CharField(default='*', max_length=50, verbose_name='Statut document')),
+                ('document_type', models.CharField(default='*', max_length=100, verbose_name='Type document')),
+                ('student_count', models.PositiveIntegerField(default=0, verbose_name='Inscriptions')),
+                ('document_count', models.PositiveIntegerField(default=0, verbose_name='Documents')),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics_cube_rows', to='academic.academicyear', verbose_name='Année académique')),
+                ('level', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='academic.level', verbose_name='Niveau')),
+                ('program', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='academic.program', verbose_name='Programme')),
+                ('school', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='schools.school', verbose_name='École')),
+                ('speciality', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='academic.speciality', verbose_name='Spécialité')),
+                ('start_level', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='academic.level', verbose_name="Niveau d'entrée")),
+            ],
+            options={
+                'verbose_name': 'Ligne du cube statistique',
+                'verbose_name_plural': 'Lignes du cube statistique',
+                'indexes': [models.Index(fields=['academic_year', 'document_status', 'document_type'], name='statistics_cube_slice_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,15 @@
-from django.db import models
+import copy
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, models, transaction
 from django.templatetags.static import static
 
+from audit.context import suspend_audit
+
 
 class SystemSettings(models.Model):
     """
@@ -98,12 +107,272 @@ class SystemSettings(models.Model):
         return f"Logo {self.institution_name}"
 
     @classmethod
-    def get_settings(cls):
-        """Récupère les paramètres système (crée une instance par défaut si nécessaire)"""
-        settings, created = cls.objects.get_or_create(pk=1)
-        return settings
+    def get_settings(cls, create=True):
+        """
+        Récupère les paramètres système (crée une instance par défaut si nécessaire).
+
+        L'instance est servie depuis un cache local au processus, puis depuis le cache
+        partagé de Django, sous une clé de version renouvelée à chaque enregistrement.
+        Seul l'état validé en base est mis en cache : aucune lecture faite dans une
+        transaction en cours n'alimente le cache. Une copie est retournée, l'appelant
+        peut donc la modifier sans altérer le cache. Avec ``create=False``, retourne
+        ``None`` si les paramètres n'ont jamais été enregistrés.
+        """
+        version = _system_settings_cache.get_version()
+        instance = _system_settings_cache.get_instance(version)
+        if instance is None:
+            instance = cls.objects.filter(pk=1).first()
+            if instance is None:
+                if not create:
+                    return None
+                instance, created = cls.objects.get_or_create(pk=1)
+                # La création a renouvelé la version : l'instance est rangée sous la nouvelle.
+                version = _system_settings_cache.get_version()
+            if not connection.in_atomic_block:
+                _system_settings_cache.set_instance(version, instance)
+        return copy.copy(instance)
+
+    @classmethod
+    def get_cache_version(cls):
+        """Version courante des paramètres en cache (change à chaque enregistrement)."""
+        return _system_settings_cache.get_version()
+
+    @classmethod
+    def invalidate_cache(cls):
+        """Invalide les paramètres mis en cache dans tous les processus."""
+        _system_settings_cache.bump_version()
 
     def save(self, *args, **kwargs):
         # S'assurer qu'il n'y a qu'une seule instance de paramètres
         self.pk = 1
         super().save(*args, **kwargs)
+        self._schedule_cache_invalidation()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._schedule_cache_invalidation()
+        return result
+
+    @classmethod
+    def _schedule_cache_invalidation(cls):
+        # Invalidation immédiate pour le processus courant, renouvelée après validation :
+        # un autre processus a pu remettre en cache l'ancien état avant le commit.
+        cls.invalidate_cache()
+        transaction.on_commit(cls.invalidate_cache)
+
+
+class SystemSettingsCache:
+    """
+    Cache à deux niveaux des paramètres système.
+
+    La version courante est stockée dans le cache partagé (``SYSTEM_SETTINGS_CACHE_VERSION_KEY``)
+    et l'instance sous une clé dérivée de cette version. Chaque processus garde en plus
+    sa propre copie, dont la version n'est revérifiée dans le cache partagé qu'au plus
+    toutes les ``SYSTEM_SETTINGS_LOCAL_CACHE_TTL`` secondes. Les versions sont aléatoires :
+    l'éviction de la clé de version ne peut pas faire ressurgir une ancienne instance.
+    """
+
+    VERSION_KEY = "main:system_settings:version"
+    INSTANCE_KEY = "main:system_settings:{version}"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear_local()
+
+    def clear_local(self):
+        with self._lock:
+            self._version = None
+            self._instance = None
+            self._checked_at = 0.0
+
+    def get_version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self._local_ttl():
+                return self._version
+
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            cache.add(self.VERSION_KEY, uuid4().hex, None)
+            version = cache.get(self.VERSION_KEY)
+
+        with self._lock:
+            if version != self._version:
+                self._instance = None
+            self._version = version
+            self._checked_at = now
+        return version
+
+    def get_instance(self, version):
+        with self._lock:
+            if self._version == version and self._instance is not None:
+                return self._instance
+
+        instance = cache.get(self.INSTANCE_KEY.format(version=version))
+        if instance is not None:
+            with self._lock:
+                if self._version == version:
+                    self._instance = instance
+        return instance
+
+    def set_instance(self, version, instance):
+        cache.set(self.INSTANCE_KEY.format(version=version), instance, self._shared_timeout())
+        with self._lock:
+            if self._version == version:
+                self._instance = instance
+
+    def bump_version(self):
+        version = uuid4().hex
+        cache.set(self.VERSION_KEY, version, None)
+        with self._lock:
+            self._version = version
+            self._instance = None
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _local_ttl():
+        return getattr(django_settings, "SYSTEM_SETTINGS_LOCAL_CACHE_TTL", 5)
+
+    @staticmethod
+    def _shared_timeout():
+        return getattr(django_settings, "SYSTEM_SETTINGS_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+_system_settings_cache = SystemSettingsCache()
+
+
+class ReferenceSequence(models.Model):
+    """
+    Compteur persistant utilisé pour attribuer des références séquentielles
+    (identifiants de transaction, références de groupe, numéros de dossier...).
+
+    Chaque clé (ex. ``PAY-20250101-``) possède sa propre ligne, incrémentée de façon
+    atomique : deux allocations concurrentes ne peuvent pas obtenir la même valeur.
+    """
+    key = models.CharField(max_length=100, unique=True, verbose_name="Clé de séquence")
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name="Dernière valeur attribuée")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Séquence de référence"
+        verbose_name_plural = "Séquences de référence"
+
+    def __str__(self):
+        return f"{self.key} ({self.last_value})"
+
+    @classmethod
+    def allocate(cls, key, count=1, initial=None):
+        """
+        Réserve ``count`` valeurs consécutives pour la clé et retourne le ``range`` obtenu.
+
+        ``initial`` est un callable optionnel renvoyant la dernière valeur déjà utilisée ;
+        il n'est appelé qu'à la création de la séquence (reprise de l'existant).
+        """
+        if count < 1:
+            raise ValueError("Le nombre de valeurs à réserver doit être positif.")
+
+        with transaction.atomic():
+            updated = cls.objects.filter(key=key).update(last_value=models.F('last_value') + count)
+            if not updated:
+                start_value = initial() if initial else 0
+                try:
+                    with transaction.atomic(), suspend_audit():
+                        cls.objects.create(key=key, last_value=start_value + count)
+                except IntegrityError:
+                    # Séquence créée entre-temps par une allocation concurrente.
+                    cls.objects.filter(key=key).update(last_value=models.F('last_value') + count)
+
+            last_value = cls.objects.filter(key=key).values_list('last_value', flat=True).get()
+
+        return range(last_value - count + 1, last_value + 1)
+
+
+class StatisticsCubeState(models.Model):
+    """
+    État du cube statistique d'une année académique (voir ``main.statistics``).
+
+    ``version`` est incrémentée à chaque modification des données de l'année ;
+    le cube est à jour lorsque ``built_version`` lui est égale.
+    """
+    academic_year = models.OneToOneField(
+        'academic.AcademicYear',
+        on_delete=models.CASCADE,
+        related_name='statistics_cube_state',
+        verbose_name="Année académique",
+    )
+    version = models.PositiveIntegerField(default=0, verbose_name="Version des données")
+    built_version = models.PositiveIntegerField(null=True, blank=True, verbose_name="Version agrégée")
+    refreshed_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière agrégation")
+    has_multiple_levels = models.BooleanField(
+        default=False,
+        verbose_name="Étudiants inscrits à plusieurs niveaux",
+        help_text="Le cube compte des inscriptions : les statistiques de l'année sont alors calculées en direct.",
+    )
+
+    class Meta:
+        verbose_name = "État du cube statistique"
+        verbose_name_plural = "États du cube statistique"
+
+    def __str__(self):
+        return f"Cube statistique {self.academic_year}"
+
+    @property
+    def is_stale(self):
+        return self.built_version != self.version
+
+
+class StatisticsCubeRow(models.Model):
+    """
+    Ligne agrégée du cube statistique de la scolarité.
+
+    Chaque ligne compte les inscriptions (niveaux étudiants d'étudiants inscrits) et les
+    documents officiels d'une combinaison de dimensions. ``document_status`` et
+    ``document_type`` valent ``'*'`` pour « tous » : une inscription est comptée dans les
+    lignes de chaque statut et type de document qu'elle possède, et dans la ligne ``'*'``.
+    """
+    ANY = '*'
+
+    academic_year = models.ForeignKey(
+        'academic.AcademicYear',
+        on_delete=models.CASCADE,
+        related_name='statistics_cube_rows',
+        verbose_name="Année académique",
+    )
+    program = models.ForeignKey(
+        'academic.Program', null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name="Programme",
+    )
+    school = models.ForeignKey(
+        'schools.School', null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name="École",
+    )
+    start_level = models.ForeignKey(
+        'academic.Level', null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name="Niveau d'entrée",
+    )
+    level = models.ForeignKey(
+        'academic.Level', null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name="Niveau",
+    )
+    speciality = models.ForeignKey(
+        'academic.Speciality', null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name="Spécialité",
+    )
+    gender = models.CharField(max_length=10, blank=True, default='', verbose_name="Genre")
+    lang = models.CharField(max_length=50, blank=True, default='', verbose_name="Langue")
+    is_new_enrollment = models.BooleanField(default=False, verbose_name="Nouvelle inscription")
+    document_status = models.CharField(max_length=50, default=ANY, verbose_name="Statut document")
+    document_type = models.CharField(max_length=100, default=ANY, verbose_name="Type document")
+    student_count = models.PositiveIntegerField(default=0, verbose_name="Inscriptions")
+    document_count = models.PositiveIntegerField(default=0, verbose_name="Documents")
+
+    class Meta:
+        verbose_name = "Ligne du cube statistique"
+        verbose_name_plural = "Lignes du cube statistique"
+        indexes = [
+            models.Index(fields=['academic_year', 'document_status', 'document_type'], name='statistics_cube_slice_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.academic_year_id} / {self.document_status} / {self.document_type} : {self.student_count}"
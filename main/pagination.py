@@ -0,0 +1,304 @@
+"""
+Pagination par clé (« keyset ») des grandes listes d'administration.
+
+Au lieu de ``OFFSET``, chaque page repart des valeurs de tri de la dernière ligne
+affichée : ``WHERE (tri) > (dernière ligne) ORDER BY tri LIMIT n``. Le coût d'une page
+ne dépend donc plus de sa profondeur. Les valeurs sont transmises dans un curseur
+opaque (paramètre ``cursor`` de l'URL). Le tri est celui du queryset, complété par la
+clé primaire pour être total ; les valeurs ``NULL`` sont traitées comme les plus petites.
+
+Le total n'est plus recompté à chaque page : ``KeysetPaginator.count`` est mis en
+cache quelques secondes (``PAGINATION_COUNT_CACHE_TIMEOUT``) pour une même requête
+filtrée. Les numéros de page affichés sont donc indicatifs.
+"""
+
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+
+
+CURSOR_PARAM = 'cursor'
+LAST_PAGE_CURSOR = 'last'
+COUNT_CACHE_PREFIX = 'pagination:count'
+
+
+@dataclass(frozen=True)
+class OrderingKey:
+    """Colonne de tri : chemin ORM, sens, champ final et possibilité de ``NULL``."""
+    name: str
+    descending: bool
+    field: object
+    nullable: bool
+
+    def order_by(self, backwards):
+        descending = self.descending != backwards
+        if not self.nullable:
+            return f'-{self.name}' if descending else self.name
+        # NULL le plus petit : en fin de tri décroissant, en tête de tri croissant.
+        return F(self.name).desc(nulls_last=True) if descending else F(self.name).asc(nulls_first=True)
+
+    def after(self, value, backwards):
+        """Condition « strictement après ``value`` » dans le sens de parcours, ou ``None``."""
+        descending = self.descending != backwards
+        if value is None:
+            return None if descending else Q(**{f'{self.name}__isnull': False})
+        if descending:
+            condition = Q(**{f'{self.name}__lt': value})
+            return condition | Q(**{f'{self.name}__isnull': True}) if self.nullable else condition
+        return Q(**{f'{self.name}__gt': value})
+
+    def bound(self, value, backwards):
+        """Borne large (``<=`` / ``>=``) ajoutée sur la première colonne pour guider l'index."""
+        if value is None:
+            return None
+        descending = self.descending != backwards
+        condition = Q(**{f'{self.name}__lte' if descending else f'{self.name}__gte': value})
+        if descending and self.nullable:
+            condition |= Q(**{f'{self.name}__isnull': True})
+        return condition
+
+    def equals(self, value):
+        return Q(**{f'{self.name}__isnull': True}) if value is None else Q(**{self.name: value})
+
+    def value_from(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.name]
+        *relations, _ = self.name.split('__')
+        for relation in relations:
+            obj = getattr(obj, relation, None)
+            if obj is None:
+                return None
+        return getattr(obj, self.field.attname)
+
+    def encode(self, value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    def decode(self, value):
+        return None if value is None else self.field.to_python(value)
+
+
+class KeysetPage:
+    """Page d'un ``KeysetPaginator`` ; reprend l'essentiel de l'API de ``django.core.paginator.Page``."""
+
+    def __init__(self, object_list, number, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class KeysetPaginator:
+    """
+    Paginateur par curseur d'un queryset.
+
+    ``ordering`` reprend par défaut le tri du queryset (ou celui du modèle). Seuls des
+    champs du modèle ou de ses relations sont acceptés ; la clé primaire est ajoutée
+    en dernier critère si elle n'y figure pas.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = max(int(per_page), 1)
+        self.keys = self._resolve_ordering(
+            ordering or queryset.query.order_by or queryset.model._meta.ordering
+        )
+
+    @cached_property
+    def count(self):
+        """Nombre d'objets du queryset filtré, mis en cache pour une même requête."""
+        queryset = self.queryset.order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.sha256(f'{queryset.db}|{sql}|{params!r}'.encode()).hexdigest()
+        cache_key = f'{COUNT_CACHE_PREFIX}:{digest}'
+        count = cache.get(cache_key)
+        if count is None:
+            count = queryset.count()
+            cache.set(cache_key, count, getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60))
+        return count
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def get_page(self, cursor=None):
+        """Page désignée par ``cursor`` ; un curseur absent ou invalide donne la première page."""
+        values, backwards, number = None, False, 1
+        if cursor == LAST_PAGE_CURSOR:
+            backwards = True
+        elif cursor:
+            try:
+                values, backwards, number = self._decode_cursor(cursor)
+            except ValueError:
+                values, backwards, number = None, False, 1
+
+        queryset = self.queryset.order_by(*(key.order_by(backwards) for key in self.keys))
+        if values is not None:
+            seek = self._seek_filter(values, backwards)
+            if seek is None:
+                queryset = queryset.none()
+            else:
+                queryset = queryset.filter(seek)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            if values is None:
+                number = self.num_pages
+            has_previous, has_next = has_more, values is not None
+        else:
+            has_previous, has_next = values is not None, has_more
+        number = max(number, 1)
+
+        return KeysetPage(
+            rows,
+            number,
+            self,
+            next_cursor=self._encode_cursor(rows[-1], False, number + 1) if has_next and rows else None,
+            previous_cursor=self._encode_cursor(rows[0], True, number - 1) if has_previous and rows else None,
+        )
+
+    def iterate(self, *fields):
+        """
+        Parcourt tout le queryset par tranches de ``per_page`` objets, chacune reprenant
+        après la dernière ligne de la précédente ; seule la tranche courante est en mémoire.
+
+        Avec ``fields``, produit des dictionnaires ``values()`` limités à ces champs (plus
+        les colonnes de tri) au lieu d'instances de modèle.
+        """
+        ordered = self.queryset.order_by(*(key.order_by(False) for key in self.keys))
+        if fields:
+            ordered = ordered.values(*dict.fromkeys((*fields, *(key.name for key in self.keys))))
+        queryset = ordered
+        while True:
+            rows = list(queryset[:self.per_page])
+            yield from rows
+            if len(rows) < self.per_page:
+                return
+            seek = self._seek_filter([key.value_from(rows[-1]) for key in self.keys], False)
+            if seek is None:
+                return
+            queryset = ordered.filter(seek)
+
+    def _seek_filter(self, values, backwards):
+        terms = []
+        equal = Q()
+        for key, value in zip(self.keys, values):
+            after = key.after(value, backwards)
+            if after is not None:
+                terms.append(equal & after)
+            equal &= key.equals(value)
+        if not terms:
+            return None
+
+        condition = reduce(or_, terms)
+        bound = self.keys[0].bound(values[0], backwards)
+        return bound & condition if bound is not None else condition
+
+    def _encode_cursor(self, obj, backwards, number):
+        payload = {
+            'v': [key.encode(key.value_from(obj)) for key in self.keys],
+            'b': backwards,
+            'n': number,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = payload['v']
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError("Curseur incompatible avec le tri de la liste")
+            return (
+                [key.decode(value) for key, value in zip(self.keys, values)],
+                bool(payload.get('b')),
+                int(payload.get('n') or 1),
+            )
+        except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValidationError) as exc:
+            raise ValueError("Curseur de pagination invalide") from exc
+
+    def _resolve_ordering(self, ordering):
+        model = self.queryset.model
+        keys = []
+        for item in ordering:
+            if isinstance(item, OrderBy) and isinstance(item.expression, F):
+                name, descending = item.expression.name, item.descending
+            elif isinstance(item, str) and item not in ('?', '-?'):
+                name, descending = item.lstrip('-'), item.startswith('-')
+            else:
+                raise ValueError(f"Tri non pris en charge par la pagination par clé : {item!r}")
+            keys.append(self._resolve_key(model, name, descending))
+
+        pk_name = model._meta.pk.name
+        if not any(key.name == pk_name for key in keys):
+            keys.append(self._resolve_key(model, pk_name, keys[-1].descending if keys else False))
+        return keys
+
+    @staticmethod
+    def _resolve_key(model, name, descending):
+        parts = []
+        nullable = False
+        field = None
+        for index, part in enumerate(name.split('__')):
+            try:
+                field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            except FieldDoesNotExist as exc:
+                raise ValueError(f"Tri non pris en charge par la pagination par clé : {name}") from exc
+            parts.append(field.name)
+            nullable = nullable or field.null
+            if field.is_relation:
+                if field.many_to_many or field.one_to_many or index == len(name.split('__')) - 1:
+                    raise ValueError(f"Tri non pris en charge par la pagination par clé : {name}")
+                model = field.related_model
+        return OrderingKey('__'.join(parts), descending, field, nullable)
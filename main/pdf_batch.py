@@ -0,0 +1,255 @@
+"""
+Export PDF groupé des dossiers de pré-inscription.
+
+Chaque dossier est rendu dans un fichier temporaire, en série ou, dans le worker de
+tâches de fond uniquement, dans un pool de processus (``PDF_EXPORT_WORKERS``), puis
+recopié dans l'ordre du queryset au fil du rendu. Le document final est écrit
+objet par objet dans un flux fourni par l'appelant (fichier temporaire,
+``SpooledTemporaryFile``...) : seul le dossier en cours de recopie est chargé en
+mémoire, quel que soit le nombre de dossiers.
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import QuerySet
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, EncodedStreamObject, IndirectObject, NameObject, NullObject, NumberObject, StreamObject
+
+from students.models import Student
+
+from .pdf_exports import _build_empty_batch_pdf, write_pre_inscription_pdf
+
+
+logger = logging.getLogger(__name__)
+
+PRE_INSCRIPTION_PDF_SELECT_RELATED = ('metadata', 'school', 'program', 'godfather')
+PRE_INSCRIPTION_PDF_PREFETCH_RELATED = (
+    'secondary_diplomas__school',
+    'student_levels__level',
+    'student_levels__academic_year',
+    'university_levels__university',
+)
+SERIAL_CHUNK_SIZE = 50
+PROGRESS_LOG_INTERVAL = 25
+
+
+def get_pre_inscription_pdf_queryset(queryset=None):
+    """Queryset des étudiants avec les relations lues par le rendu d'un dossier PDF."""
+    queryset = Student.objects.all() if queryset is None else queryset
+    return queryset.select_related(*PRE_INSCRIPTION_PDF_SELECT_RELATED).prefetch_related(
+        *PRE_INSCRIPTION_PDF_PREFETCH_RELATED
+    )
+
+
+def get_export_workers():
+    return getattr(settings, 'PDF_EXPORT_WORKERS', 0)
+
+
+def get_spool_max_size():
+    return getattr(settings, 'PDF_EXPORT_SPOOL_MAX_SIZE', 10 * 1024 * 1024)
+
+
+def get_sync_export_max_dossiers():
+    return getattr(settings, 'PDF_EXPORT_SYNC_MAX_DOSSIERS', 20)
+
+
+def export_pre_inscriptions_pdf(students, output, workers=0, progress=None):
+    """
+    Écrit dans ``output`` le PDF combiné des dossiers de ``students`` et retourne leur nombre.
+
+    Le rendu est en série par défaut. ``workers`` > 1 n'est à passer que depuis un
+    processus dédié (tâche de fond, commande) : le pool ferme les connexions du
+    processus courant avant de créer ses processus fils. Il n'est de plus utilisé que
+    hors transaction, les processus fils ne voyant pas les données non validées.
+    ``progress`` est appelé avec ``(dossiers_fusionnés, total)`` après chaque dossier.
+    """
+    merged_count = 0
+
+    with tempfile.TemporaryDirectory(prefix='ysem-pdf-export-') as directory:
+        if workers > 1 and isinstance(students, QuerySet) and not connection.in_atomic_block:
+            student_pks = list(students.prefetch_related(None).values_list('pk', flat=True))
+            total = len(student_pks)
+            paths = _render_in_pool(student_pks, directory, workers) if student_pks else []
+        else:
+            if isinstance(students, QuerySet):
+                total = students.count()
+                students = students.iterator(chunk_size=SERIAL_CHUNK_SIZE)
+            else:
+                students = list(students)
+                total = len(students)
+            paths = _render_serially(students, directory)
+
+        writer = PdfConcatenator(output)
+        for path in paths:
+            writer.append(path)
+            os.remove(path)
+            merged_count += 1
+            _report_progress(progress, merged_count, total)
+
+        if merged_count == 0:
+            writer.append(BytesIO(_build_empty_batch_pdf()))
+
+        writer.close()
+
+    return merged_count
+
+
+class PdfConcatenator:
+    """
+    Concaténation de PDF écrite au fil de l'eau.
+
+    Les objets de chaque document ajouté (pages et tout ce qu'elles référencent) sont
+    renumérotés et écrits immédiatement dans ``output`` ; seuls les décalages des
+    objets et les numéros des pages restent en mémoire jusqu'à ``close``, qui écrit
+    l'arbre des pages, le catalogue et la table des références croisées.
+    """
+
+    PAGES_NUMBER = 1
+    CATALOG_NUMBER = 2
+
+    def __init__(self, output):
+        self.output = output
+        self.position = 0
+        self.offsets = {}
+        self.page_numbers = []
+        self.next_number = self.CATALOG_NUMBER + 1
+        self._write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+
+    def append(self, source):
+        reader = PdfReader(source)
+        pages = {}
+        for page in reader.pages:
+            reference = page.indirect_reference
+            pages[(reference.idnum, reference.generation)] = page
+        numbers = {}
+        pending = []
+
+        def renumber(reference):
+            key = (reference.idnum, reference.generation)
+            if key not in numbers:
+                numbers[key] = self._reserve_number()
+                pending.append(key)
+            return IndirectObject(numbers[key], 0, None)
+
+        def copy(value, skip=()):
+            if isinstance(value, IndirectObject):
+                return renumber(value)
+            if isinstance(value, DictionaryObject):
+                clone = DictionaryObject()
+                if isinstance(value, StreamObject):
+                    # Flux recopié tel quel (données encore compressées).
+                    clone = EncodedStreamObject()
+                    clone._data = value._data
+                for key, item in value.items():
+                    if key not in skip:
+                        clone[key] = copy(item)
+                return clone
+            if isinstance(value, ArrayObject):
+                return ArrayObject(copy(item) for item in value)
+            return value
+
+        for page in reader.pages:
+            self.page_numbers.append(renumber(page.indirect_reference).idnum)
+
+        while pending:
+            key = pending.pop()
+            if key in pages:
+                # Les attributs hérités de l'arbre d'origine sont déjà recopiés dans la page.
+                obj = copy(pages[key], skip=('/Parent',))
+                obj[NameObject('/Parent')] = IndirectObject(self.PAGES_NUMBER, 0, None)
+            else:
+                obj = reader.get_object(IndirectObject(*key, reader))
+                obj = NullObject() if obj is None else copy(obj)
+            self._write_object(numbers[key], obj)
+
+    def close(self):
+        pages = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(number, 0, None) for number in self.page_numbers),
+            NameObject('/Count'): NumberObject(len(self.page_numbers)),
+        })
+        self._write_object(self.PAGES_NUMBER, pages)
+        self._write_object(self.CATALOG_NUMBER, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.PAGES_NUMBER, 0, None),
+        }))
+
+        xref_position = self.position
+        lines = [f'xref\n0 {self.next_number}\n', '0000000000 65535 f \n']
+        lines.extend(f'{self.offsets[number]:010d} 00000 n \n' for number in range(1, self.next_number))
+        lines.append(
+            f'trailer\n<< /Size {self.next_number} /Root {self.CATALOG_NUMBER} 0 R >>\n'
+            f'startxref\n{xref_position}\n%%EOF\n'
+        )
+        self._write(''.join(lines).encode())
+
+    def _reserve_number(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def _write_object(self, number, obj):
+        buffer = BytesIO()
+        buffer.write(f'{number} 0 obj\n'.encode())
+        obj.write_to_stream(buffer)
+        buffer.write(b'\nendobj\n')
+        self.offsets[number] = self.position
+        self._write(buffer.getvalue())
+
+    def _write(self, data):
+        self.output.write(data)
+        self.position += len(data)
+
+
+def _render_serially(students, directory):
+    for index, student in enumerate(students):
+        path = _dossier_path(directory, index)
+        with open(path, 'wb') as dossier_file:
+            write_pre_inscription_pdf(student, dossier_file)
+        yield path
+
+
+def _render_in_pool(student_pks, directory, workers):
+    # Les processus fils ne doivent pas hériter des connexions ouvertes du parent.
+    connections.close_all()
+    start_methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context('fork') if 'fork' in start_methods else None
+    paths = [_dossier_path(directory, index) for index in range(len(student_pks))]
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(student_pks)),
+        mp_context=mp_context,
+        initializer=_init_worker,
+    ) as executor:
+        yield from executor.map(_render_student_to_file, student_pks, paths)
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _render_student_to_file(student_pk, path):
+    student = get_pre_inscription_pdf_queryset().get(pk=student_pk)
+    with open(path, 'wb') as dossier_file:
+        write_pre_inscription_pdf(student, dossier_file)
+    return path
+
+
+def _dossier_path(directory, index):
+    return os.path.join(directory, f'{index:06d}.pdf')
+
+
+def _report_progress(progress, done, total):
+    if progress is not None:
+        progress(done, total)
+    if done == total or done % PROGRESS_LOG_INTERVAL == 0:
+        logger.info("Export PDF des pré-inscriptions : %s/%s dossier(s) fusionné(s).", done, total)
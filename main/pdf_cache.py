@@ -0,0 +1,230 @@
+"""
+Cache des PDF générés (certificats, reçus, relevés, dossiers enseignants).
+
+Chaque PDF est rangé sur disque sous ``PDF_CACHE_ROOT/<propriétaire>/<empreinte>.pdf``.
+L'empreinte est un SHA-256 du gabarit, du contexte de rendu (les instances de modèles
+y figurent par leur clé et leur date de modification) et de la version des paramètres
+système : toute modification visible dans le document produit une nouvelle clé. Le
+répertoire du propriétaire (étudiant, enseignant) est en outre purgé par les signaux
+de ``main.signals`` dès qu'un paiement, un document officiel ou le dossier change.
+Au-delà de ``PDF_CACHE_MAX_SIZE`` octets, les fichiers les moins récemment servis sont
+supprimés. Chaque processus suit la taille du cache (mesurée une fois, puis augmentée à
+chaque écriture) : le répertoire n'est parcouru que lorsque cette taille dépasse la
+limite, et chaque parcours recale la taille sur celle réellement mesurée.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import suppress
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Model
+
+from .models import SystemSettings
+
+
+VOLATILE_CONTEXT_KEYS = {'generated_on', 'request', 'csrf_token'}
+MODEL_VERSION_FIELDS = ('updated_at', 'last_updated')
+
+
+def is_pdf_cache_enabled():
+    return getattr(settings, 'PDF_CACHE_ENABLED', True)
+
+
+def get_pdf_cache_root():
+    return getattr(settings, 'PDF_CACHE_ROOT', None) or os.path.join(settings.BASE_DIR, 'var', 'pdf_cache')
+
+
+def get_pdf_cache_max_size():
+    return getattr(settings, 'PDF_CACHE_MAX_SIZE', 200 * 1024 * 1024)
+
+
+class PdfCacheMetrics:
+    """Compteurs du cache des PDF (succès, échecs, évictions)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.writes = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+metrics = PdfCacheMetrics()
+
+
+class PdfCacheSize:
+    """Taille du cache connue de ce processus (``None`` tant qu'elle n'a pas été mesurée)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = None
+
+    def reset(self, total=None):
+        with self._lock:
+            self.total = total
+
+    def add(self, size):
+        """Ajoute ``size`` octets et retourne la nouvelle taille (``None`` si jamais mesurée)."""
+        with self._lock:
+            if self.total is not None:
+                self.total += size
+            return self.total
+
+
+cache_size = PdfCacheSize()
+
+
+def get_pdf_cache_metrics():
+    return metrics.snapshot()
+
+
+def fingerprint(value):
+    """Réduit une valeur de contexte à une structure JSON stable."""
+    if isinstance(value, Model):
+        version = next(
+            (getattr(value, field_name) for field_name in MODEL_VERSION_FIELDS if hasattr(value, field_name)),
+            None,
+        )
+        return [value._meta.label_lower, fingerprint(value.pk), fingerprint(version)]
+    if isinstance(value, dict):
+        return {
+            str(key): fingerprint(item)
+            for key, item in sorted(value.items(), key=lambda pair: str(pair[0]))
+            if key not in VOLATILE_CONTEXT_KEYS
+        }
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [fingerprint(item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def build_cache_key(template_name, context):
+    payload = json.dumps(
+        [template_name, fingerprint(context), SystemSettings.get_cache_version()],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_or_render_pdf(owner, template_name, context, render):
+    """
+    Retourne le PDF en cache pour ``(template_name, context)`` ou le produit avec ``render()``.
+
+    ``owner`` est un couple ``(type, identifiant)`` (ex. ``('student', 12)``) qui désigne
+    le répertoire purgé par ``invalidate_owner``.
+    """
+    if not is_pdf_cache_enabled():
+        return render()
+
+    path = _artifact_path(owner, build_cache_key(template_name, context))
+    try:
+        with open(path, 'rb') as cached_file:
+            pdf_content = cached_file.read()
+    except FileNotFoundError:
+        pass
+    else:
+        with suppress(FileNotFoundError):
+            os.utime(path)
+        metrics.increment('hits')
+        return pdf_content
+
+    metrics.increment('misses')
+    pdf_content = render()
+    _write_artifact(path, pdf_content)
+    total_size = cache_size.add(len(pdf_content))
+    if total_size is None or total_size > get_pdf_cache_max_size():
+        evict_if_needed()
+    return pdf_content
+
+
+def invalidate_owner(owner_type, owner_id):
+    """Supprime tous les PDF en cache d'un propriétaire (étudiant, enseignant)."""
+    if owner_id is None:
+        return
+    directory = os.path.join(get_pdf_cache_root(), owner_type, str(owner_id))
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+        metrics.increment('invalidations')
+
+
+def evict_if_needed(max_size=None):
+    """Supprime les PDF les moins récemment servis tant que le cache dépasse sa taille maximale."""
+    max_size = get_pdf_cache_max_size() if max_size is None else max_size
+    artifacts = []
+    total_size = 0
+    for directory, _, filenames in os.walk(get_pdf_cache_root()):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            artifacts.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+    evicted = 0
+    if total_size > max_size:
+        for _, size, path in sorted(artifacts):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total_size -= size
+            evicted += 1
+        metrics.increment('evictions', evicted)
+
+    cache_size.reset(total_size)
+    return evicted
+
+
+def _artifact_path(owner, key):
+    owner_type, owner_id = owner
+    return os.path.join(get_pdf_cache_root(), owner_type, str(owner_id), f'{key}.pdf')
+
+
+def _write_artifact(path, pdf_content):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel.
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(file_descriptor, 'wb') as temporary_file:
+        temporary_file.write(pdf_content)
+    os.replace(temporary_path, path)
+    metrics.increment('writes')
@@ -5,14 +5,15 @@ from django.template.loader import render_to_string
 
 from django.utils import timezone
 from django.conf import settings as django_settings
-from PIL import Image, UnidentifiedImageError
 from pypdf import PdfReader, PdfWriter
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.pdfgen import canvas
 import weasyprint
 
+from .annexes import load_annex
 from .models import SystemSettings
+from .pdf_cache import get_or_render_pdf
 from decimal import Decimal
 from payments.models import Payment
 from payments.utils import amount_to_french_words
@@ -29,6 +30,13 @@ ANNEX_FIELD_DEFINITIONS = [
 
 
 def build_pre_inscription_pdf(student):
+    output = BytesIO()
+    write_pre_inscription_pdf(student, output)
+    return output.getvalue()
+
+
+def write_pre_inscription_pdf(student, output):
+    """Écrit le dossier complet d'une pré-inscription (fiche + annexes) dans ``output``."""
     annex_entries = _prepare_annex_entries(student)
     writer = PdfWriter()
 
@@ -40,29 +48,28 @@ def build_pre_inscription_pdf(student):
         _append_pdf_bytes(writer, _build_annex_cover_pdf(annex))
         _append_pdf_bytes(writer, annex['pdf_bytes'])
 
-    output = BytesIO()
     writer.write(output)
-    return output.getvalue()
 
 
 def build_pre_inscriptions_pdf(students):
-    writer = PdfWriter()
-    student_count = 0
-
-    for student in students:
-        _append_pdf_bytes(writer, build_pre_inscription_pdf(student))
-        student_count += 1
-
-    if student_count == 0:
-        _append_pdf_bytes(writer, _build_empty_batch_pdf())
+    from .pdf_batch import export_pre_inscriptions_pdf
 
     output = BytesIO()
-    writer.write(output)
+    export_pre_inscriptions_pdf(students, output, workers=0)
     return output.getvalue()
 
 
 def build_lecturer_dossier_pdf(lecturer, request=None):
     """Construit le dossier complet d'un enseignant (fiche + pièces jointes)."""
+    return get_or_render_pdf(
+        ('lecturer', lecturer.pk),
+        'main/pdf/lecturer_dossier_summary.html',
+        {'lecturer': lecturer},
+        lambda: _render_lecturer_dossier_pdf(lecturer, request=request),
+    )
+
+
+def _render_lecturer_dossier_pdf(lecturer, request=None):
     annex_entries = _prepare_lecturer_annex_entries(lecturer)
     writer = PdfWriter()
 
@@ -80,12 +87,13 @@ def build_lecturer_dossier_pdf(lecturer, request=None):
 
 
 def build_registration_certificate_pdf(official_document, request=None):
-    html = render_to_string(
+    context = _build_registration_certificate_context(official_document)
+    return _render_cached_pdf(
+        ('student', official_document.student_level.student_id),
         'main/pdf/registration_certificate.html',
-        _build_registration_certificate_context(official_document),
-        request=request
+        context,
+        request=request,
     )
-    return weasyprint.HTML(string=html).write_pdf()
 
 
 def build_payment_receipt_pdf(payment, request=None):
@@ -125,8 +133,7 @@ def build_payment_receipt_pdf(payment, request=None):
         'auto_print': False,
         'pdf': True,
     }
-    html = render_to_string('payments/payment_receipt.html', context, request=request)
-    return weasyprint.HTML(string=html).write_pdf()
+    return _render_cached_pdf(('student', payment.student_id), 'payments/payment_receipt.html', context, request=request)
 
 
 def build_student_account_statement_pdf(student, academic_year, statement, request=None):
@@ -150,8 +157,16 @@ def build_student_account_statement_pdf(student, academic_year, statement, reque
         'level_name': _display_value(level_name),
         'generated_on': timezone.localtime(),
     }
-    html = render_to_string('main/pdf/student_account_statement.html', context, request=request)
-    return weasyprint.HTML(string=html).write_pdf()
+    return _render_cached_pdf(('student', student.pk), 'main/pdf/student_account_statement.html', context, request=request)
+
+
+def _render_cached_pdf(owner, template_name, context, request=None):
+    """Rend un gabarit HTML en PDF via WeasyPrint, en passant par le cache des PDF."""
+    def render():
+        html = render_to_string(template_name, context, request=request)
+        return weasyprint.HTML(string=html).write_pdf()
+
+    return get_or_render_pdf(owner, template_name, context, render)
 
 
 def _build_registration_certificate_context(official_document):
@@ -237,30 +252,7 @@ def _prepare_annex_entries(student):
             continue
 
         entry['filename'] = os.path.basename(file_field.name)
-        try:
-            with file_field.open('rb') as stored_file:
-                file_bytes = stored_file.read()
-        except FileNotFoundError:
-            entry['status'] = 'Introuvable'
-            entry['details'] = 'Fichier absent du stockage'
-            entries.append(entry)
-            continue
-
-        extension = os.path.splitext(file_field.name)[1].lower()
-        if extension == '.pdf':
-            entry['status'] = 'Inclus'
-            entry['pdf_bytes'] = file_bytes
-        elif extension in {'.png', '.jpg', '.jpeg'}:
-            try:
-                entry['status'] = 'Inclus'
-                entry['pdf_bytes'] = _image_to_pdf(file_bytes)
-            except (UnidentifiedImageError, OSError):
-                entry['status'] = 'Erreur'
-                entry['details'] = 'Image illisible ou corrompue'
-        else:
-            entry['status'] = 'Ignoré'
-            entry['details'] = f'Format non pris en charge ({extension or "inconnu"})'
-
+        _attach_annex_file(entry, file_field)
         entries.append(entry)
 
     return entries
@@ -408,29 +400,8 @@ def _prepare_lecturer_annex_entries(lecturer):
 
 
 def _attach_annex_file(entry, file_field):
-    """Lit un fichier annexe et le convertit en PDF si nécessaire."""
-    try:
-        with file_field.open('rb') as stored_file:
-            file_bytes = stored_file.read()
-    except FileNotFoundError:
-        entry['status'] = 'Introuvable'
-        entry['details'] = 'Fichier absent du stockage'
-        return
-
-    extension = os.path.splitext(file_field.name)[1].lower()
-    if extension == '.pdf':
-        entry['status'] = 'Inclus'
-        entry['pdf_bytes'] = file_bytes
-    elif extension in {'.png', '.jpg', '.jpeg'}:
-        try:
-            entry['status'] = 'Inclus'
-            entry['pdf_bytes'] = _image_to_pdf(file_bytes)
-        except (UnidentifiedImageError, OSError):
-            entry['status'] = 'Erreur'
-            entry['details'] = 'Image illisible ou corrompue'
-    else:
-        entry['status'] = 'Ignoré'
-        entry['details'] = f'Format non pris en charge ({extension or "inconnu"})'
+    """Joint une pièce annexe, en réutilisant sa conversion PDF si elle existe déjà."""
+    entry['status'], entry['details'], entry['pdf_bytes'] = load_annex(file_field)
 
 
 def _build_media_uri(file_field):
@@ -652,17 +623,6 @@ def _append_pdf_bytes(writer, pdf_bytes):
         writer.add_page(page)
 
 
-def _image_to_pdf(image_bytes):
-    with Image.open(BytesIO(image_bytes)) as image:
-        if image.mode in ('RGBA', 'LA', 'P'):
-            image = image.convert('RGB')
-        elif image.mode != 'RGB':
-            image = image.convert('RGB')
-        output = BytesIO()
-        image.save(output, format='PDF', resolution=150.0)
-        return output.getvalue()
-
-
 def _get_field_label(source, field_name):
     if not source:
         return field_name.replace('_', ' ').capitalize()
@@ -0,0 +1,160 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from lecturers.models import Lecturer
+from main.annexes import delete_converted_annexes, prebuild_annex
+from main.pdf_cache import invalidate_owner
+from main.pdf_exports import ANNEX_FIELD_DEFINITIONS
+from main.statistics import mark_statistics_stale, mark_student_statistics_stale
+from payments.models import Payment
+from recruitment.models import LecturerCourse, LecturerRefusalReason, LecturerSubject
+from students.models import OfficialDocument, Student, StudentLevel, StudentMetaData
+
+
+ANNEX_UPLOAD_FIELDS = {
+    StudentMetaData: tuple(field_name for source_name, field_name in ANNEX_FIELD_DEFINITIONS if source_name == 'metadata'),
+    Lecturer: ('cv',),
+    LecturerSubject: ('proof_document',),
+}
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_pdf_cache_on_payment_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_owner('student', instance.student_id)
+
+
+@receiver(post_save, sender=OfficialDocument)
+@receiver(post_delete, sender=OfficialDocument)
+def invalidate_pdf_cache_on_official_document_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.student_level_id:
+        return
+
+    student_id = StudentLevel.objects.filter(pk=instance.student_level_id).values_list('student_id', flat=True).first()
+    invalidate_owner('student', student_id)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_pdf_cache_on_student_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_owner('student', instance.pk)
+
+
+@receiver(post_save, sender=Lecturer)
+@receiver(post_delete, sender=Lecturer)
+def invalidate_pdf_cache_on_lecturer_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_owner('lecturer', instance.pk)
+
+
+@receiver(post_save, sender=LecturerSubject)
+@receiver(post_delete, sender=LecturerSubject)
+@receiver(post_save, sender=LecturerCourse)
+@receiver(post_delete, sender=LecturerCourse)
+@receiver(post_save, sender=LecturerRefusalReason)
+@receiver(post_delete, sender=LecturerRefusalReason)
+def invalidate_pdf_cache_on_lecturer_record_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_owner('lecturer', instance.lecturer_id)
+
+
+@receiver(post_save, sender=Student)
+def mark_statistics_stale_on_student_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    mark_student_statistics_stale(instance.pk)
+
+
+@receiver(post_save, sender=StudentLevel)
+@receiver(post_delete, sender=StudentLevel)
+def mark_statistics_stale_on_student_level_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    mark_statistics_stale([instance.academic_year_id])
+
+
+@receiver(post_save, sender=OfficialDocument)
+@receiver(post_delete, sender=OfficialDocument)
+def mark_statistics_stale_on_official_document_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.student_level_id:
+        return
+
+    mark_statistics_stale(
+        StudentLevel.objects.filter(pk=instance.student_level_id).values_list('academic_year_id', flat=True)
+    )
+
+
+@receiver(pre_save, sender=StudentMetaData)
+@receiver(pre_save, sender=Lecturer)
+@receiver(pre_save, sender=LecturerSubject)
+def collect_uploaded_annexes(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    field_names = ANNEX_UPLOAD_FIELDS[sender]
+    # Un fichier tout juste téléversé n'est pas encore enregistré dans le stockage.
+    instance._uploaded_annex_fields = [
+        field_name for field_name in field_names
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+    if instance.pk is None:
+        return
+
+    # Fichiers remplacés ou retirés : leurs conversions sont à supprimer.
+    previous_names = sender.objects.filter(pk=instance.pk).values_list(*field_names).first() or ()
+    instance._replaced_annex_files = [
+        (getattr(instance, field_name).storage, previous_name)
+        for field_name, previous_name in zip(field_names, previous_names)
+        if previous_name and (
+            field_name in instance._uploaded_annex_fields or previous_name != getattr(instance, field_name).name
+        )
+    ]
+
+
+@receiver(post_save, sender=StudentMetaData)
+@receiver(post_save, sender=Lecturer)
+@receiver(post_save, sender=LecturerSubject)
+def prebuild_uploaded_annexes(sender, instance, raw=False, **kwargs):
+    field_names = instance.__dict__.pop('_uploaded_annex_fields', None)
+    replaced_files = instance.__dict__.pop('_replaced_annex_files', None)
+    if raw or not (field_names or replaced_files):
+        return
+
+    file_fields = [getattr(instance, field_name) for field_name in field_names]
+    transaction.on_commit(partial(_refresh_annex_conversions, file_fields, replaced_files or []))
+
+
+@receiver(post_delete, sender=StudentMetaData)
+@receiver(post_delete, sender=Lecturer)
+@receiver(post_delete, sender=LecturerSubject)
+def delete_annex_conversions(sender, instance, **kwargs):
+    deleted_files = [
+        (getattr(instance, field_name).storage, getattr(instance, field_name).name)
+        for field_name in ANNEX_UPLOAD_FIELDS[sender]
+        if getattr(instance, field_name)
+    ]
+    if deleted_files:
+        transaction.on_commit(partial(_refresh_annex_conversions, [], deleted_files))
+
+
+def _refresh_annex_conversions(file_fields, replaced_files):
+    # Suppression d'abord : un fichier remplacé sous le même nom est ensuite reconverti.
+    for storage, file_name in replaced_files:
+        delete_converted_annexes(storage, file_name)
+    for file_field in file_fields:
+        prebuild_annex(file_field)
@@ -0,0 +1,320 @@
+"""
+Cube statistique de la scolarité (tableau de bord ``StatistiquesView``).
+
+Les inscriptions et documents officiels d'une année académique sont pré-agrégés dans
+``StatisticsCubeRow`` par année × programme × école × genre × langue × niveau d'entrée ×
+niveau × spécialité × statut/type de document. La vue répond alors à toute combinaison
+de filtres en sommant les lignes de l'année, en une requête.
+
+Le cube d'une année est reconstruit à la lecture lorsqu'il est périmé : les signaux de
+``main.signals`` incrémentent la version de l'année à chaque modification d'un étudiant,
+d'un niveau étudiant ou d'un document officiel, et un cube plus ancien que
+``STATISTICS_CUBE_MAX_AGE`` secondes est recalculé (modifications en masse par
+``update()``). Une seule requête reconstruit le cube d'une année à la fois (verrou
+``cache.add`` dans le cache partagé) ; les requêtes concurrentes servent le cube
+précédent, ou calculent en direct si l'année n'a encore jamais été agrégée. La commande
+``rebuild_statistics`` reconstruit toutes les années.
+
+Le cube compte des inscriptions : il ne sert que lorsqu'une année est sélectionnée et
+qu'aucun étudiant n'y est inscrit à plusieurs niveaux. Les statistiques toutes années
+confondues (étudiants distincts sur plusieurs années) restent calculées en direct.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Value, When
+from django.utils import timezone
+
+from academic.models import AcademicYear
+from audit.context import suspend_audit
+from students.models import OfficialDocument, StudentLevel
+
+from .models import StatisticsCubeRow, StatisticsCubeState
+
+
+ANY = StatisticsCubeRow.ANY
+WRITE_BATCH_SIZE = 500
+REBUILD_LOCK_KEY = 'main:statistics-cube-rebuild:{}'
+
+# Dimension du cube -> chemin depuis le niveau étudiant.
+CUBE_DIMENSIONS = {
+    'program_id': 'student__program_id',
+    'school_id': 'student__school_id',
+    'gender': 'student__gender',
+    'lang': 'student__lang',
+    'start_level_id': 'student__start_level_id',
+    'level_id': 'level_id',
+    'speciality_id': 'speciality_id',
+}
+
+# Filtre de la vue -> dimension du cube.
+FILTER_DIMENSIONS = {
+    'program': 'program_id',
+    'school': 'school_id',
+    'gender': 'gender',
+    'lang': 'lang',
+    'start_level': 'start_level_id',
+    'current_level': 'level_id',
+    'speciality': 'speciality_id',
+}
+
+
+def is_statistics_cube_enabled():
+    return getattr(settings, 'STATISTICS_CUBE_ENABLED', True)
+
+
+def get_cube_max_age():
+    return getattr(settings, 'STATISTICS_CUBE_MAX_AGE', 900)
+
+
+def get_cube_lock_timeout():
+    return getattr(settings, 'STATISTICS_CUBE_LOCK_TIMEOUT', 300)
+
+
+def mark_statistics_stale(academic_year_ids):
+    """Signale que les données des années données ont changé depuis la dernière agrégation."""
+    academic_year_ids = {academic_year_id for academic_year_id in academic_year_ids if academic_year_id}
+    if not academic_year_ids:
+        return
+    StatisticsCubeState.objects.filter(academic_year_id__in=academic_year_ids).update(version=F('version') + 1)
+
+
+def mark_student_statistics_stale(student_id):
+    if not student_id:
+        return
+    mark_statistics_stale(
+        StudentLevel.objects.filter(student_id=student_id).values_list('academic_year_id', flat=True).distinct()
+    )
+
+
+def refresh_statistics_cube(academic_year):
+    """Reconstruit le cube d'une année et retourne son état."""
+    state, _ = StatisticsCubeState.objects.get_or_create(academic_year=academic_year)
+    # Version lue avant les données : une modification concurrente laisse le cube périmé.
+    built_version = state.version
+
+    student_levels = StudentLevel.objects.filter(academic_year=academic_year, student__status='registered')
+    has_multiple_levels = student_levels.values('student_id').annotate(
+        levels=Count('id')
+    ).filter(levels__gt=1).exists()
+    rows = _build_cube_rows(academic_year, student_levels)
+
+    refreshed_at = timezone.now()
+    with transaction.atomic(), suspend_audit():
+        StatisticsCubeRow.objects.filter(academic_year=academic_year).delete()
+        StatisticsCubeRow.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+        StatisticsCubeState.objects.filter(pk=state.pk).update(
+            built_version=built_version,
+            refreshed_at=refreshed_at,
+            has_multiple_levels=has_multiple_levels,
+        )
+
+    state.built_version = built_version
+    state.refreshed_at = refreshed_at
+    state.has_multiple_levels = has_multiple_levels
+    return state
+
+
+def rebuild_statistics(academic_year=None):
+    """Reconstruit le cube de l'année donnée (toutes les années par défaut) ; retourne le nombre d'années."""
+    academic_years = [academic_year] if academic_year else list(AcademicYear.objects.all())
+    for year in academic_years:
+        refresh_statistics_cube(year)
+    return len(academic_years)
+
+
+def ensure_statistics_cube(academic_year):
+    """
+    Retourne l'état du cube de l'année, reconstruit au préalable s'il est absent, périmé ou trop ancien.
+
+    Si une autre requête reconstruit déjà ce cube, l'état précédent est retourné tel quel
+    (``None`` si l'année n'a jamais été agrégée).
+    """
+    state = StatisticsCubeState.objects.filter(academic_year=academic_year).first()
+    max_age = get_cube_max_age()
+    if not (
+        state is None
+        or state.is_stale
+        or state.refreshed_at is None
+        or (max_age and state.refreshed_at < timezone.now() - timedelta(seconds=max_age))
+    ):
+        return state
+
+    lock_key = REBUILD_LOCK_KEY.format(academic_year.pk)
+    if not cache.add(lock_key, True, get_cube_lock_timeout()):
+        return state if state is not None and state.refreshed_at is not None else None
+    try:
+        return refresh_statistics_cube(academic_year)
+    finally:
+        cache.delete(lock_key)
+
+
+def get_cube_statistics(academic_year, filters):
+    """
+    Statistiques de l'année pour les ``filters`` de la vue, lues dans le cube.
+
+    Retourne ``(statistiques, état)`` ; les statistiques valent ``None`` si le cube ne peut
+    pas répondre exactement (étudiant inscrit à plusieurs niveaux sur l'année) ou si
+    son premier calcul est en cours dans une autre requête.
+    """
+    state = ensure_statistics_cube(academic_year)
+    if state is None or state.has_multiple_levels:
+        return None, state
+
+    dimension_filters = {
+        FILTER_DIMENSIONS[name]: value
+        for name, value in filters.items()
+        if name in FILTER_DIMENSIONS and value
+    }
+    rows = list(
+        StatisticsCubeRow.objects.filter(academic_year=academic_year, **dimension_filters).values(
+            'gender', 'is_new_enrollment', 'document_status', 'document_type', 'student_count', 'document_count',
+            'program__name', 'school_id', 'school__name', 'level_id', 'level__name', 'level__academic_order',
+            'speciality_id', 'speciality__name',
+        )
+    )
+    return summarize_cube_rows(
+        rows,
+        document_status=filters.get('document_status') or ANY,
+        document_type=filters.get('document_type') or ANY,
+    ), state
+
+
+def summarize_cube_rows(rows, document_status=ANY, document_type=ANY):
+    """Somme les lignes du cube ; mêmes clés et mêmes regroupements que le calcul en direct de la vue."""
+    selected = [
+        row for row in rows
+        if row['document_status'] == document_status and row['document_type'] == document_type
+    ]
+    status_counts = _sum_by(
+        (
+            row for row in rows
+            if row['document_type'] == document_type and row['document_status'] != ANY
+            and document_status in (ANY, row['document_status'])
+        ),
+        'document_status',
+        'document_count',
+    )
+    type_counts = _sum_by(
+        (
+            row for row in rows
+            if row['document_status'] == document_status and row['document_type'] != ANY
+            and document_type in (ANY, row['document_type'])
+        ),
+        'document_type',
+        'document_count',
+    )
+
+    gender_counts = _sum_by(selected, 'gender')
+    level_counts = _sum_by(selected, 'level_id')
+    level_keys = {row['level_id']: (row['level__academic_order'], row['level__name']) for row in selected}
+    program_counts = _sum_by(selected, 'program__name')
+    school_counts = _sum_by(selected, 'school__name')
+    speciality_counts = _sum_by((row for row in selected if row['speciality_id'] is not None), 'speciality__name')
+
+    return {
+        'total_students': sum(row['student_count'] for row in selected),
+        'total_documents': sum(row['document_count'] for row in selected),
+        'withdrawn_documents': status_counts.get('withdrawn', 0),
+        'available_documents': status_counts.get('available', 0),
+        'levels_count': len(level_counts),
+        'represented_schools_count': len({row['school_id'] for row in selected if row['school_id'] is not None}),
+        'active_specialities_count': len({row['speciality_id'] for row in selected if row['speciality_id'] is not None}),
+        'new_enrollments': sum(row['student_count'] for row in selected if row['is_new_enrollment']),
+        'gender_stats': [
+            {'gender': gender or None, 'count': count}
+            for gender, count in sorted(gender_counts.items())
+        ],
+        'level_stats': [
+            {'level__name': level_keys[level_id][1], 'count': count}
+            for level_id, count in sorted(level_counts.items(), key=lambda item: _sort_key(*level_keys[item[0]]))
+        ],
+        'program_stats': _ranked(program_counts, 'program__name'),
+        'school_stats': _ranked(school_counts, 'school__name')[:8],
+        'speciality_stats': _ranked(speciality_counts, 'speciality__name')[:8],
+        'document_stats': [
+            {'status': status, 'count': count}
+            for status, count in sorted(status_counts.items())
+        ],
+        'document_type_stats': _ranked(type_counts, 'type'),
+    }
+
+
+def _build_cube_rows(academic_year, student_levels):
+    dimensions = {f'dim_{name}': F(path) for name, path in CUBE_DIMENSIONS.items()}
+    rows = [
+        _cube_row(academic_year, item, ANY, ANY)
+        for item in student_levels.annotate(
+            is_new_enrollment=_is_new_enrollment(academic_year, 'student__created_at'),
+        ).values('is_new_enrollment', **dimensions).annotate(
+            student_count=Count('id', distinct=True),
+            document_count=Count('official_documents'),
+        ).order_by()
+    ]
+
+    documents = OfficialDocument.objects.filter(student_level__in=student_levels).annotate(
+        is_new_enrollment=_is_new_enrollment(academic_year, 'student_level__student__created_at'),
+    )
+    document_dimensions = {f'dim_{name}': F(f'student_level__{path}') for name, path in CUBE_DIMENSIONS.items()}
+    for document_fields in (('status', 'type'), ('status',), ('type',)):
+        grouped = documents.values('is_new_enrollment', *document_fields, **document_dimensions).annotate(
+            student_count=Count('student_level_id', distinct=True),
+            document_count=Count('id'),
+        ).order_by()
+        for item in grouped:
+            rows.append(_cube_row(academic_year, item, item.get('status', ANY), item.get('type', ANY)))
+    return rows
+
+
+def _is_new_enrollment(academic_year, created_at_path):
+    return Case(
+        When(
+            **{
+                f'{created_at_path}__date__gte': academic_year.start_at,
+                f'{created_at_path}__date__lte': academic_year.end_at,
+            },
+            then=Value(True),
+        ),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def _cube_row(academic_year, item, document_status, document_type):
+    return StatisticsCubeRow(
+        academic_year=academic_year,
+        program_id=item['dim_program_id'],
+        school_id=item['dim_school_id'],
+        gender=item['dim_gender'] or '',
+        lang=item['dim_lang'] or '',
+        start_level_id=item['dim_start_level_id'],
+        level_id=item['dim_level_id'],
+        speciality_id=item['dim_speciality_id'],
+        is_new_enrollment=item['is_new_enrollment'],
+        document_status=document_status,
+        document_type=document_type,
+        student_count=item['student_count'],
+        document_count=item['document_count'],
+    )
+
+
+def _sum_by(rows, key, measure='student_count'):
+    totals = {}
+    for row in rows:
+        totals[row[key]] = totals.get(row[key], 0) + row[measure]
+    return totals
+
+
+def _sort_key(*values):
+    # Les valeurs manquantes d'abord, comme le tri SQL.
+    return tuple((value is not None, value if value is not None else '') for value in values)
+
+
+def _ranked(counts, label_key):
+    return [
+        {label_key: label, 'count': count}
+        for label, count in sorted(counts.items(), key=lambda item: (-item[1], *_sort_key(item[0])))
+    ]
@@ -0,0 +1,220 @@
+"""
+Exports tabulaires (CSV, XLSX) diffusés en continu.
+
+Les lignes sont produites au fil de l'eau par un itérateur (``KeysetPaginator.iterate``
+pour les querysets) et envoyées dans une ``StreamingHttpResponse`` : la mémoire
+utilisée ne dépend pas du nombre de lignes.
+
+Le fichier XLSX est écrit sans dépendance : une archive ZIP minimale (classeur d'une
+feuille, chaînes en ligne) dont la feuille est compressée au fil des lignes, l'archive
+étant écrite dans un tampon vidé à chaque morceau envoyé au client.
+"""
+
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+EXPORT_CHUNK_SIZE = 2000
+STREAM_FLUSH_SIZE = 64 * 1024
+
+# Caractères interdits en XML 1.0.
+ILLEGAL_XML_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Préfixes interprétés comme formule par les tableurs à l'ouverture d'un CSV (injection CSV).
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def build_export_response(export_format, filename, headers, rows, sheet_name='Export'):
+    """
+    Réponse diffusant ``rows`` (itérable de séquences de valeurs) sous ``headers``.
+
+    ``export_format`` vaut ``csv`` ou ``xlsx`` (404 sinon) ; ``filename`` est complété
+    par la date du jour et l'extension.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise Http404("Format d'export inconnu")
+
+    if export_format == 'csv':
+        content = stream_csv(headers, rows)
+    else:
+        content = stream_xlsx(headers, rows, sheet_name)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}_{timezone.localdate():%Y%m%d}.{export_format}"'
+    )
+    return response
+
+
+def stream_csv(headers, rows):
+    """CSV (séparateur « ; », BOM UTF-8 pour les tableurs en français), par morceaux d'environ ``STREAM_FLUSH_SIZE`` caractères."""
+    writer = csv.writer(_Echo(), delimiter=';')
+    lines = ['\ufeff' + writer.writerow(headers)]
+    size = 0
+    for row in rows:
+        line = writer.writerow([_csv_value(value) for value in row])
+        lines.append(line)
+        size += len(line)
+        if size >= STREAM_FLUSH_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def stream_xlsx(headers, rows, sheet_name='Export'):
+    """Classeur XLSX d'une feuille, produit par morceaux d'environ ``STREAM_FLUSH_SIZE`` octets."""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(name=escape(_sheet_name(sheet_name), {'"': '&quot;'})))
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_HEADER.encode())
+            sheet.write(_xlsx_row(1, headers))
+            for index, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(index, row))
+                if buffer.size >= STREAM_FLUSH_SIZE:
+                    yield buffer.pop()
+            sheet.write(XLSX_SHEET_FOOTER.encode())
+    yield buffer.pop()
+
+
+class _Echo:
+    """Pseudo-fichier renvoyant ce qu'on y écrit (``csv.writer`` ligne par ligne)."""
+
+    def write(self, value):
+        return value
+
+
+class _ChunkBuffer:
+    """Flux en écriture seule accumulant les octets jusqu'au prochain ``pop``."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Oui' if value else 'Non'
+    if isinstance(value, (datetime.date, datetime.time)):
+        return _format_temporal(value)
+    if isinstance(value, str):
+        return _neutralize_formula(value)
+    return value
+
+
+def _xlsx_row(index, values):
+    cells = []
+    for column, value in enumerate(values):
+        if value is None or value == '':
+            continue
+        reference = f'{_column_letter(column)}{index}'
+        if isinstance(value, bool):
+            cells.append(f'<c r="{reference}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c r="{reference}"><v>{value}</v></c>')
+        else:
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = _format_temporal(value)
+            # Chaîne en ligne : jamais évaluée comme formule, le texte est conservé tel quel.
+            text = escape(ILLEGAL_XML_CHARACTERS.sub('', str(value)))
+            cells.append(f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{index}">{"".join(cells)}</row>'.encode()
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _format_temporal(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%d/%m/%Y %H:%M')
+    if isinstance(value, datetime.date):
+        return value.strftime('%d/%m/%Y')
+    return value.strftime('%H:%M')
+
+
+def _neutralize_formula(value):
+    return f"'{value}" if value.startswith(FORMULA_PREFIXES) else value
+
+
+def _sheet_name(name):
+    # Excel : 31 caractères au plus, sans []:*?/\
+    return re.sub(r'[\[\]:*?/\\]', ' ', name)[:31] or 'Export'
@@ -0,0 +1,37 @@
+import tempfile
+
+from django.core.files import File
+
+from jobs.queue import is_eager
+from jobs.registry import register_task
+from jobs.storage import save_job_output
+
+from .pdf_batch import export_pre_inscriptions_pdf, get_export_workers, get_pre_inscription_pdf_queryset
+from .utils import get_filtered_pre_inscriptions_queryset
+
+
+PRE_INSCRIPTIONS_PDF_FILENAME = 'preinscriptions_filtrees.pdf'
+
+
+@register_task('main.export_pre_inscriptions_pdf')
+def export_pre_inscriptions_pdf_task(job, filters=None):
+    """Produit le PDF combiné des pré-inscriptions filtrées et l'enregistre dans le stockage."""
+    students = get_filtered_pre_inscriptions_queryset(filters or {}, queryset=get_pre_inscription_pdf_queryset())
+
+    with tempfile.TemporaryFile() as output:
+        count = export_pre_inscriptions_pdf(
+            students,
+            output,
+            # Pas de pool de processus dans le processus web (mode JOBS_EAGER).
+            workers=0 if is_eager() else get_export_workers(),
+            progress=lambda done, total: job.report_progress(done, total, f"{done}/{total} dossier(s) fusionné(s)"),
+        )
+        output.seek(0)
+        file_name = save_job_output(job, PRE_INSCRIPTIONS_PDF_FILENAME, File(output))
+
+    return {
+        'file': file_name,
+        'filename': PRE_INSCRIPTIONS_PDF_FILENAME,
+        'content_type': 'application/pdf',
+        'count': count,
+    }
@@ -2,6 +2,8 @@ import os
 
 from django import template
 
+from main.pagination import CURSOR_PARAM
+
 
 register = template.Library()
 
@@ -11,4 +13,14 @@ def basename(value):
     """Retourne le nom final d'un chemin de fichier."""
     if not value:
         return ''
-    return os.path.basename(str(value))
\ No newline at end of file
+    return os.path.basename(str(value))
+
+@register.simple_tag(takes_context=True)
+def cursor_query(context, cursor=None):
+    """Querystring courante avec le curseur de pagination ``cursor`` (sans numéro de page)."""
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    params.pop(CURSOR_PARAM, None)
+    if cursor:
+        params[CURSOR_PARAM] = cursor
+    return f'?{params.urlencode()}'
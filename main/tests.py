@@ -1,16 +1,25 @@
 import os
-from io import BytesIO
+import re
+from io import BytesIO, StringIO
 from tempfile import TemporaryDirectory
 from datetime import date, datetime
 from decimal import Decimal
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, Mock, patch
 from urllib.parse import parse_qs, urlparse
 
 from django import forms
 from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db.models import FileField
+from django.db.models.fields.files import FieldFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from PIL import Image
@@ -21,9 +30,35 @@ from rest_framework.test import APIClient
 from academic.document_requirements import PROGRAM_DOCUMENT_FIELD_NAMES
 from academic.models import AcademicYear, Level, Program, ProgramDocumentRequirement, Speciality
 from accounts.models import BaseUser, Godfather
+from audit import pipeline as audit_pipeline
 from audit.models import AuditLog
+from audit.pipeline import audit_batch, get_audit_pipeline_metrics
 from main.forms import BulkDocumentCreationForm, InscriptionCompleteForm, OfficialDocumentForm, SecondaryDiplomaForm, UniversityLevelForm
-from main.models import SystemSettings
+from jobs.models import Job
+from main.annexes import get_converted_annex_name, load_annex
+from main.checks import check_shared_cache
+from main.models import (
+    ReferenceSequence,
+    StatisticsCubeRow,
+    StatisticsCubeState,
+    SystemSettings,
+    SystemSettingsCache,
+    _system_settings_cache,
+)
+from main.pagination import KeysetPaginator
+from main.utils import get_filtered_pre_inscriptions_queryset
+from main.statistics import REBUILD_LOCK_KEY
+from main.views import StatistiquesView
+from main.pdf_batch import export_pre_inscriptions_pdf, get_pre_inscription_pdf_queryset
+from main.pdf_cache import (
+    cache_size as pdf_cache_size,
+    evict_if_needed as evict_pdf_cache,
+    get_or_render_pdf,
+    get_pdf_cache_metrics,
+    get_pdf_cache_root,
+    metrics as pdf_cache_metrics,
+)
+from main.utils import allocate_final_registration_identifiers, register_approved_pre_inscriptions
 from payments.models import Payment, PaymentInstallment
 from prospection.models import Agent
 from schools.models import School, SecondaryDiploma, UniversityLevel
@@ -1255,17 +1290,19 @@ class AuditLogIntegrationTests(TestCase):
         self.settings_url = reverse('main:parametres')
 
     def test_web_login_and_logout_create_audit_entries(self):
-        response = self.client.post(self.login_url, {
-            'username': self.user.username,
-            'password': 'testpass123',
-        })
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.login_url, {
+                'username': self.user.username,
+                'password': 'testpass123',
+            })
 
         self.assertEqual(response.status_code, 302)
         login_entry = AuditLog.objects.filter(category='auth', action='login').latest('id')
         self.assertEqual(login_entry.actor_user, self.user)
         self.assertEqual(login_entry.context['channel'], 'web')
 
-        response = self.client.get(self.logout_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(self.logout_url)
 
         self.assertEqual(response.status_code, 302)
         logout_entry = AuditLog.objects.filter(category='auth', action='logout').latest('id')
@@ -1276,13 +1313,14 @@ class AuditLogIntegrationTests(TestCase):
         self.client.force_login(self.user)
         settings = SystemSettings.get_settings()
 
-        response = self.client.post(self.settings_url, {
-            'form_type': 'data_management',
-            'backup_frequency': settings.backup_frequency,
-            'data_retention': 9,
-            'audit_log': 'on',
-            'data_encryption': 'on',
-        })
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.settings_url, {
+                'form_type': 'data_management',
+                'backup_frequency': settings.backup_frequency,
+                'data_retention': 9,
+                'audit_log': 'on',
+                'data_encryption': 'on',
+            })
 
         self.assertEqual(response.status_code, 302)
         entry = AuditLog.objects.filter(
@@ -1302,10 +1340,11 @@ class AuditLogIntegrationTests(TestCase):
             is_active=True,
         )
 
-        response = self.client.post(self.settings_url, {
-            'form_type': 'academic_year',
-            'active_academic_year': academic_year.pk,
-        })
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.settings_url, {
+                'form_type': 'academic_year',
+                'active_academic_year': academic_year.pk,
+            })
 
         self.assertEqual(response.status_code, 302)
         entry = AuditLog.objects.filter(category='business', action='update').latest('id')
@@ -1329,10 +1368,11 @@ class AuditLogIntegrationTests(TestCase):
         agent.save()
 
         api_client = APIClient()
-        response = api_client.post('/api/v1/auth/login/', {
-            'email': agent.email,
-            'password': 'secret123',
-        }, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api_client.post('/api/v1/auth/login/', {
+                'email': agent.email,
+                'password': 'secret123',
+            }, format='json')
 
         self.assertEqual(response.status_code, 200)
         entry = AuditLog.objects.filter(category='auth', action='login', actor_agent_id=agent.id).latest('id')
@@ -1340,6 +1380,209 @@ class AuditLogIntegrationTests(TestCase):
         self.assertEqual(entry.actor_identifier, agent.email)
 
 
+class AuditPipelineTests(TestCase):
+    def setUp(self):
+        AuditLog.objects.all().delete()
+        audit_pipeline.metrics.reset()
+
+    def test_batch_flushes_committed_events_in_one_write(self):
+        with audit_batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                for index in range(3):
+                    Level.objects.create(name=f'Niveau {index}')
+            self.assertFalse(AuditLog.objects.filter(target_model='Level').exists())
+
+        self.assertEqual(AuditLog.objects.filter(target_model='Level', action='create').count(), 3)
+        metrics = get_audit_pipeline_metrics()
+        self.assertEqual(metrics['flush_count'], 1)
+        self.assertEqual(metrics['last_flush_size'], 3)
+        self.assertEqual(metrics['max_buffer_size'], 3)
+
+    def test_events_of_rolled_back_transaction_are_dropped(self):
+        with audit_batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        Level.objects.create(name='Niveau annulé')
+                        raise RuntimeError('rollback')
+                Level.objects.create(name='Niveau conservé')
+
+        self.assertEqual(
+            list(AuditLog.objects.filter(target_model='Level').values_list('target_repr', flat=True)),
+            ['Niveau conservé'],
+        )
+
+    def test_audit_setting_is_read_once_per_batch(self):
+        with patch('audit.utils.read_audit_setting', return_value=True) as read_audit_setting:
+            with audit_batch():
+                with self.captureOnCommitCallbacks(execute=True):
+                    Level.objects.create(name='Licence 1')
+                    Level.objects.create(name='Licence 2')
+
+        read_audit_setting.assert_called_once_with()
+
+    @override_settings(AUDIT_WRITE_MODE='immediate')
+    def test_immediate_mode_writes_each_event_synchronously(self):
+        Level.objects.create(name='Licence 1')
+
+        self.assertTrue(AuditLog.objects.filter(target_model='Level', action='create').exists())
+
+    @override_settings(AUDIT_WRITE_MODE='background')
+    def test_background_mode_hands_batches_to_writer_thread(self):
+        with patch('audit.pipeline.write_entries') as write_entries:
+            with audit_batch():
+                with self.captureOnCommitCallbacks(execute=True):
+                    Level.objects.create(name='Licence 1')
+                    Level.objects.create(name='Licence 2')
+            audit_pipeline.get_background_writer().drain()
+
+        write_entries.assert_called_once()
+        self.assertEqual(len(write_entries.call_args.args[0]), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        created_at = timezone.make_aware(datetime(2024, 9, 1, 8, 0))
+        for index in range(7):
+            Student.objects.create(matricule=f'KEY-{index:02d}', firstname='Test', lastname=f'Nom {index % 3}')
+        # Dates en double et NULL pour éprouver le départage par les colonnes suivantes.
+        Student.objects.filter(matricule__in=['KEY-00', 'KEY-01', 'KEY-02']).update(created_at=created_at)
+        Student.objects.filter(matricule='KEY-03').update(created_at=None)
+        self.queryset = Student.objects.filter(matricule__startswith='KEY-').order_by('-created_at', 'lastname')
+        self.expected = list(self.queryset.order_by('-created_at', 'lastname', 'pk').values_list('matricule', flat=True))
+
+    def walk(self, page, cursor_name):
+        matricules = [student.matricule for student in page]
+        while getattr(page, cursor_name):
+            page = KeysetPaginator(self.queryset, 3).get_page(getattr(page, cursor_name))
+            matricules += [student.matricule for student in page]
+        return matricules
+
+    def test_cursors_walk_the_whole_list_forward_and_backward(self):
+        first = KeysetPaginator(self.queryset, 3).get_page()
+        self.assertEqual(self.walk(first, 'next_cursor'), self.expected)
+
+        last = KeysetPaginator(self.queryset, 3).get_page('last')
+        self.assertEqual((last.number, last.has_next()), (3, False))
+        backward = [student.matricule for student in last]
+        page = last
+        while page.previous_cursor:
+            page = KeysetPaginator(self.queryset, 3).get_page(page.previous_cursor)
+            backward = [student.matricule for student in page] + backward
+        self.assertEqual(backward, self.expected)
+        self.assertFalse(page.has_previous())
+
+    def test_deep_pages_seek_without_offset_and_reuse_the_cached_count(self):
+        second = KeysetPaginator(self.queryset, 3).get_page()
+        second = KeysetPaginator(self.queryset, 3).get_page(second.next_cursor)
+        self.assertEqual(second.paginator.count, 7)
+
+        paginator = KeysetPaginator(self.queryset, 3)
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.get_page(second.next_cursor)
+            self.assertEqual((page.number, paginator.num_pages), (3, 3))
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+        self.assertEqual([student.matricule for student in page], self.expected[6:])
+
+    def test_iterate_reads_the_whole_list_chunk_by_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            matricules = [student.matricule for student in KeysetPaginator(self.queryset, 3).iterate()]
+
+        self.assertEqual(matricules, self.expected)
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in queries))
+
+        rows = list(KeysetPaginator(self.queryset, 2).iterate('matricule'))
+        self.assertEqual([row['matricule'] for row in rows], self.expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = KeysetPaginator(self.queryset, 3).get_page('pas-un-curseur')
+
+        self.assertEqual(page.number, 1)
+        self.assertEqual([student.matricule for student in page], self.expected[:3])
+
+    def test_audit_log_admin_pages_by_cursor(self):
+        AuditLog.objects.bulk_create([AuditLog(category='model', action='create') for _ in range(5)])
+        admin_user = BaseUser.objects.create_superuser(username='audit_admin', password='testpass123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:audit_auditlog_changelist')
+
+        with self.settings(PAGINATION_COUNT_CACHE_TIMEOUT=0):
+            with patch('audit.admin.AuditLogAdmin.list_per_page', 2):
+                first = self.client.get(url)
+                second = self.client.get(url + first.context['cl'].next_page_url)
+
+        self.assertContains(first, 'Suivant')
+        self.assertEqual(second.status_code, 200)
+        first_ids = [entry.pk for entry in first.context['cl'].result_list]
+        second_ids = [entry.pk for entry in second.context['cl'].result_list]
+        self.assertEqual(len(first_ids), 2)
+        self.assertFalse(set(first_ids) & set(second_ids))
+        self.assertGreater(min(first_ids), max(second_ids))
+
+
+class ListFilterQueryPlanTests(TestCase):
+    """Les filtres sur relations multivaluées passent par EXISTS : ni DISTINCT ni doublons."""
+
+    def setUp(self):
+        self.year = AcademicYear.objects.create(start_at=date(2024, 9, 1), end_at=date(2025, 6, 30))
+        self.level_1 = Level.objects.create(name='Licence 1')
+        self.level_2 = Level.objects.create(name='Licence 2')
+        self.student = Student.objects.create(matricule='PLAN-01', firstname='Plan', lastname='Test', status='registered')
+        for level in (self.level_1, self.level_2):
+            student_level = StudentLevel.objects.create(
+                student=self.student, level=level, academic_year=self.year, is_active=level == self.level_2,
+            )
+            OfficialDocument.objects.create(student_level=student_level, type='transcript', status='available')
+
+    def assert_exists_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        self.assertNotIn('DISTINCT', sql.upper())
+        self.assertIn('EXISTS', sql.upper())
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            # La sous-requête corrélée cherche dans un index, sans parcourir la table liée.
+            self.assertTrue(any(re.search(r'SEARCH \w+ USING (COVERING )?INDEX', step) for step in plan), plan)
+            self.assertFalse(any(step.startswith('SCAN U') for step in plan), plan)
+
+    def test_pre_inscription_academic_year_filter(self):
+        self.student.status = 'pending'
+        self.student.save()
+
+        students = get_filtered_pre_inscriptions_queryset({'academic_year': str(self.year.pk)})
+
+        self.assert_exists_plan(students)
+        self.assertEqual(list(students), [self.student])
+
+    def test_student_list_level_filters(self):
+        from students.views import STUDENT_LIST_FILTERS
+
+        students = STUDENT_LIST_FILTERS.apply(Student.objects.all(), {'current_level': str(self.level_2.pk)})
+
+        self.assert_exists_plan(students)
+        self.assertEqual(list(students), [self.student])
+
+    def test_live_statistics_count_each_student_once(self):
+        filters = dict.fromkeys([
+            'program', 'school', 'gender', 'lang', 'start_level', 'current_level', 'speciality', 'document_type',
+        ])
+        filters['document_status'] = 'available'
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = StatistiquesView()._compute_live_statistics(None, filters)
+
+        self.assertEqual(stats['total_students'], 1)
+        self.assertEqual(stats['total_documents'], 2)
+        self.assertFalse([query['sql'] for query in queries if 'SELECT DISTINCT "students_student"."id"' in query['sql']])
+
+
 class SystemSettingsLogoUploadTests(TestCase):
     def setUp(self):
         self.temporary_media = TemporaryDirectory()
@@ -1364,22 +1607,23 @@ class SystemSettingsLogoUploadTests(TestCase):
     def test_general_settings_form_accepts_logo_upload(self):
         settings = SystemSettings.get_settings()
 
-        response = self.client.post(self.settings_url, {
-            'form_type': 'general',
-            'institution_name': settings.institution_name,
-            'institution_code': settings.institution_code,
-            'address': settings.address,
-            'phone': settings.phone,
-            'email': settings.email,
-            'website': settings.website,
-            'timezone': settings.timezone,
-            'language': settings.language,
-            'logo': SimpleUploadedFile(
-                'institution-logo.png',
-                self._build_test_png(color='teal'),
-                content_type='image/png',
-            ),
-        })
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.settings_url, {
+                'form_type': 'general',
+                'institution_name': settings.institution_name,
+                'institution_code': settings.institution_code,
+                'address': settings.address,
+                'phone': settings.phone,
+                'email': settings.email,
+                'website': settings.website,
+                'timezone': settings.timezone,
+                'language': settings.language,
+                'logo': SimpleUploadedFile(
+                    'institution-logo.png',
+                    self._build_test_png(color='teal'),
+                    content_type='image/png',
+                ),
+            })
 
         self.assertEqual(response.status_code, 302)
         settings.refresh_from_db()
@@ -1388,6 +1632,78 @@ class SystemSettingsLogoUploadTests(TestCase):
         self.assertTrue(os.path.exists(settings.logo.path))
 
 
+class SystemSettingsCacheTests(TransactionTestCase):
+    """Le cache n'est alimenté qu'en dehors des transactions : ``TransactionTestCase`` est requis."""
+
+    def setUp(self):
+        cache.clear()
+        _system_settings_cache.clear_local()
+        self.addCleanup(_system_settings_cache.clear_local)
+        self.addCleanup(cache.clear)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        SystemSettings.get_settings()
+
+        with self.assertNumQueries(0):
+            settings = SystemSettings.get_settings()
+
+        self.assertEqual(settings.pk, 1)
+
+    def test_shared_cache_serves_a_process_without_local_copy(self):
+        SystemSettings.get_settings()
+        _system_settings_cache.clear_local()
+
+        with self.assertNumQueries(0):
+            settings = SystemSettings.get_settings()
+
+        self.assertEqual(settings.institution_name, 'YSEM')
+
+    def test_save_invalidates_cached_settings(self):
+        settings = SystemSettings.get_settings()
+        settings.institution_name = 'YSEM Campus'
+        settings.save()
+
+        self.assertEqual(SystemSettings.get_settings().institution_name, 'YSEM Campus')
+        with self.assertNumQueries(0):
+            self.assertEqual(SystemSettings.get_settings().institution_name, 'YSEM Campus')
+
+    @override_settings(SYSTEM_SETTINGS_LOCAL_CACHE_TTL=0)
+    def test_version_bumped_by_another_process_refreshes_local_copy(self):
+        SystemSettings.get_settings()
+        SystemSettings.objects.filter(pk=1).update(institution_name='Autre processus')
+        cache.set(SystemSettingsCache.VERSION_KEY, 'version-autre-processus', None)
+
+        self.assertEqual(SystemSettings.get_settings().institution_name, 'Autre processus')
+
+    def test_returned_instance_is_a_copy(self):
+        settings = SystemSettings.get_settings()
+        settings.institution_name = 'Modifié sans enregistrer'
+
+        self.assertEqual(SystemSettings.get_settings().institution_name, 'YSEM')
+
+    def test_reads_inside_a_transaction_are_not_cached(self):
+        with transaction.atomic():
+            SystemSettings.get_settings()
+
+        with self.assertNumQueries(1):
+            SystemSettings.get_settings()
+
+    def test_get_settings_without_creation_returns_none(self):
+        self.assertIsNone(SystemSettings.get_settings(create=False))
+        self.assertFalse(SystemSettings.objects.exists())
+
+    def test_process_local_cache_is_rejected_with_several_workers(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis'}}
+
+        with self.settings(CACHES=locmem), patch.dict(os.environ, {'WEB_CONCURRENCY': '3'}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['main.E001'])
+        with self.settings(CACHES=redis), patch.dict(os.environ, {'WEB_CONCURRENCY': '3'}):
+            self.assertEqual(check_shared_cache(None), [])
+        with self.settings(CACHES=locmem), patch.dict(os.environ, {'WEB_CONCURRENCY': '1'}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
 class PreInscriptionRegistrationAuditTests(TestCase):
     def setUp(self):
         AuditLog.objects.all().delete()
@@ -1456,7 +1772,8 @@ class PreInscriptionRegistrationAuditTests(TestCase):
         self.register_url = reverse('main:inscription_register', kwargs={'pk': self.student.matricule})
 
     def test_registration_flow_creates_business_audit_entry(self):
-        response = self.client.post(self.register_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.register_url)
 
         self.assertEqual(response.status_code, 302)
         entry = AuditLog.objects.filter(category='business', action='bulk_update').latest('id')
@@ -1696,7 +2013,7 @@ class PreInscriptionPdfExportTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pdf')
 
-        reader = PdfReader(BytesIO(response.content))
+        reader = PdfReader(BytesIO(b''.join(response.streaming_content)))
         full_text = '\n'.join(page.extract_text() or '' for page in reader.pages)
         self.assertIn('Alice Ngono', full_text)
         self.assertIn('PDF002', full_text)
@@ -1712,7 +2029,7 @@ class PreInscriptionPdfExportTests(TestCase):
         self.assertEqual(response['Content-Type'], 'application/pdf')
         self.assertIn('preinscriptions_filtrees.pdf', response['Content-Disposition'])
 
-        reader = PdfReader(BytesIO(response.content))
+        reader = PdfReader(BytesIO(b''.join(response.streaming_content)))
         self.assertGreaterEqual(len(reader.pages), 6)
 
         full_text = '\n'.join(page.extract_text() or '' for page in reader.pages)
@@ -1724,6 +2041,303 @@ class PreInscriptionPdfExportTests(TestCase):
         self.assertNotIn('PDF003', full_text)
 
 
+class PreInscriptionBatchPdfExportTests(TestCase):
+    def setUp(self):
+        self.program = Program.objects.create(name='Informatique')
+        self.students = [
+            Student.objects.create(
+                matricule=f'BATCH00{index}',
+                firstname=f'Candidat{index}',
+                lastname='Export',
+                status='pending',
+                metadata=StudentMetaData.objects.create(original_country='Cameroun'),
+                program=self.program,
+            )
+            for index in range(1, 4)
+        ]
+
+    def _write_named_pdf(self, student, output):
+        pdf_canvas = canvas.Canvas(output)
+        pdf_canvas.drawString(72, 760, f'Dossier {student.matricule}')
+        pdf_canvas.showPage()
+        pdf_canvas.save()
+
+    def _export(self, students, **kwargs):
+        output = BytesIO()
+        with patch('main.pdf_batch.write_pre_inscription_pdf', side_effect=self._write_named_pdf):
+            count = export_pre_inscriptions_pdf(students, output, **kwargs)
+        return count, PdfReader(BytesIO(output.getvalue()))
+
+    def test_dossiers_are_merged_in_queryset_order_with_progress(self):
+        progress = []
+        queryset = get_pre_inscription_pdf_queryset(Student.objects.order_by('-matricule'))
+
+        count, reader = self._export(queryset, workers=0, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            [page.extract_text().strip() for page in reader.pages],
+            ['Dossier BATCH003', 'Dossier BATCH002', 'Dossier BATCH001'],
+        )
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    def test_pool_is_not_used_inside_a_transaction(self):
+        with patch('main.pdf_batch._render_in_pool') as render_in_pool:
+            count, reader = self._export(Student.objects.order_by('matricule'), workers=4)
+
+        render_in_pool.assert_not_called()
+        self.assertEqual(count, 3)
+        self.assertEqual(len(reader.pages), 3)
+
+    @override_settings(PDF_EXPORT_WORKERS=4)
+    def test_direct_export_renders_serially_outside_a_transaction(self):
+        with patch('main.pdf_batch.connection', Mock(in_atomic_block=False)), \
+                patch('main.pdf_batch._render_in_pool') as render_in_pool:
+            count, reader = self._export(Student.objects.order_by('matricule'))
+
+        render_in_pool.assert_not_called()
+        self.assertEqual(count, 3)
+        self.assertEqual(len(reader.pages), 3)
+
+    def test_dossiers_are_copied_with_their_own_page_size(self):
+        def write_dossier(student, output):
+            pdf_canvas = canvas.Canvas(output, pagesize=(400 + len(student.matricule), 500))
+            for page_number in (1, 2):
+                pdf_canvas.drawString(72, 400, f'{student.matricule} page {page_number}')
+                pdf_canvas.showPage()
+            pdf_canvas.save()
+
+        output = BytesIO()
+        students = [self.students[0], Student(matricule='BATCH0004')]
+        with patch('main.pdf_batch.write_pre_inscription_pdf', side_effect=write_dossier):
+            export_pre_inscriptions_pdf(students, output)
+        reader = PdfReader(BytesIO(output.getvalue()), strict=True)
+
+        self.assertEqual(
+            [page.extract_text().strip() for page in reader.pages],
+            ['BATCH001 page 1', 'BATCH001 page 2', 'BATCH0004 page 1', 'BATCH0004 page 2'],
+        )
+        self.assertEqual([float(page.mediabox.width) for page in reader.pages], [408, 408, 409, 409])
+
+    def test_empty_selection_produces_placeholder_page(self):
+        count, reader = self._export(Student.objects.none(), workers=0)
+
+        self.assertEqual(count, 0)
+        self.assertIn('Aucune pré-inscription', reader.pages[0].extract_text())
+
+    def test_background_export_is_enqueued(self):
+        user = BaseUser.objects.create_user(username='batch_pdf_user', password='testpass123', role='scholar')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('main:inscriptions_print_pdf'), {'program': self.program.pk, 'background': '1'})
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.json()['job'])
+        self.assertEqual(job.task, 'main.export_pre_inscriptions_pdf')
+        self.assertEqual(job.payload, {'filters': {'program': str(self.program.pk)}})
+        self.assertEqual(response.json()['status_url'], reverse('jobs:status', kwargs={'pk': job.pk}))
+
+    @override_settings(PDF_EXPORT_SYNC_MAX_DOSSIERS=2)
+    def test_large_direct_export_is_handed_to_the_worker(self):
+        user = BaseUser.objects.create_user(username='batch_pdf_direct', password='testpass123', role='scholar')
+        self.client.force_login(user)
+
+        with patch('main.custom_views.pre_inscriptions_views.export_pre_inscriptions_pdf') as export:
+            response = self.client.get(reverse('main:inscriptions_print_pdf'), {'program': self.program.pk})
+
+        export.assert_not_called()
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'filters': {'program': str(self.program.pk)}})
+        self.assertRedirects(
+            response, f"{reverse('main:inscriptions')}?program={self.program.pk}", fetch_redirect_response=False,
+        )
+
+        # La liste reprend le suivi de la tâche une seule fois.
+        self.assertContains(self.client.get(response['Location']), f'data-job-id="{job.pk}"')
+        self.assertNotContains(self.client.get(response['Location']), 'data-job-id=')
+
+
+class PdfArtifactCacheTests(TestCase):
+    def setUp(self):
+        self.temporary_media = TemporaryDirectory()
+        self.addCleanup(self.temporary_media.cleanup)
+        self.cache_root = os.path.join(self.temporary_media.name, 'pdf_cache')
+        media_override = override_settings(MEDIA_ROOT=self.temporary_media.name, PDF_CACHE_ROOT=self.cache_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        pdf_cache_metrics.reset()
+        pdf_cache_size.reset()
+
+        self.student = Student.objects.create(
+            matricule='CACHE001',
+            firstname='Paul',
+            lastname='Cache',
+            status='approved',
+            metadata=StudentMetaData.objects.create(original_country='Cameroun'),
+        )
+        self.render = MagicMock(side_effect=lambda: b'%PDF-cache')
+
+    def _get(self, context=None):
+        context = context if context is not None else {'student': self.student}
+        return get_or_render_pdf(('student', self.student.pk), 'main/pdf/test.html', context, self.render)
+
+    def test_second_download_is_served_from_cache(self):
+        self.assertEqual(self._get(), b'%PDF-cache')
+        self.assertEqual(self._get(), b'%PDF-cache')
+
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(get_pdf_cache_metrics()['hits'], 1)
+        self.assertEqual(get_pdf_cache_metrics()['misses'], 1)
+
+    def test_generation_timestamp_does_not_change_the_key(self):
+        self._get({'student': self.student, 'generated_on': timezone.now()})
+        self._get({'student': self.student, 'generated_on': timezone.now()})
+
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_owner_change_invalidates_cached_pdf(self):
+        self._get()
+        self.student.firstname = 'Pierre'
+        self.student.save()
+        self._get()
+
+        self.assertEqual(self.render.call_count, 2)
+        self.assertEqual(get_pdf_cache_metrics()['invalidations'], 1)
+
+    def test_settings_change_invalidates_cached_pdf(self):
+        self._get()
+        settings = SystemSettings.get_settings()
+        settings.institution_name = 'YSEM Campus'
+        settings.save()
+        self._get()
+
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_least_recently_served_pdf_is_evicted_first(self):
+        first_context = {'student': self.student, 'page': 1}
+        second_context = {'student': self.student, 'page': 2}
+        self._get(first_context)
+        self._get(second_context)
+        first_path = os.path.join(self.cache_root, 'student', str(self.student.pk))
+        oldest = min(os.listdir(first_path), key=lambda name: os.path.getmtime(os.path.join(first_path, name)))
+        os.utime(os.path.join(first_path, oldest), (0, 0))
+
+        self.assertEqual(evict_pdf_cache(max_size=len(b'%PDF-cache')), 1)
+        self.assertEqual(len(os.listdir(first_path)), 1)
+        self.assertNotIn(oldest, os.listdir(first_path))
+
+    @override_settings(PDF_CACHE_MAX_SIZE=3 * len(b'%PDF-cache'))
+    def test_cache_directory_is_walked_only_when_the_tracked_size_exceeds_the_limit(self):
+        with patch('main.pdf_cache.os.walk', wraps=os.walk) as walk:
+            for page in range(1, 4):
+                self._get({'student': self.student, 'page': page})
+            self.assertEqual(walk.call_count, 1)
+
+            self._get({'student': self.student, 'page': 4})
+
+        self.assertEqual(walk.call_count, 2)
+        self.assertEqual(get_pdf_cache_metrics()['evictions'], 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_root, 'student', str(self.student.pk)))), 3)
+
+    @override_settings(PDF_CACHE_ROOT=None)
+    def test_default_cache_root_is_outside_media_root(self):
+        self.assertFalse(get_pdf_cache_root().startswith(self.temporary_media.name))
+
+
+class AnnexConversionCacheTests(TestCase):
+    def setUp(self):
+        self.temporary_media = TemporaryDirectory()
+        self.addCleanup(self.temporary_media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.temporary_media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def _build_png(self, size=(3000, 4000)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color='white').save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def _create_metadata(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StudentMetaData.objects.create(
+                original_country='Cameroun',
+                acte_naissance=SimpleUploadedFile('acte.png', self._build_png(), content_type='image/png'),
+            )
+
+    def test_uploaded_image_is_converted_once_next_to_the_original(self):
+        metadata = self._create_metadata()
+        original_path = metadata.acte_naissance.path
+        converted = [name for name in os.listdir(os.path.dirname(original_path)) if name.endswith('.annex.pdf')]
+        self.assertEqual(len(converted), 1)
+
+        with patch('main.annexes.image_to_pdf') as image_to_pdf:
+            status, details, pdf_bytes = load_annex(metadata.acte_naissance)
+
+        image_to_pdf.assert_not_called()
+        self.assertEqual(status, 'Inclus')
+        page = PdfReader(BytesIO(pdf_bytes)).pages[0]
+        self.assertLessEqual(float(page.mediabox.width), 596)
+        self.assertLessEqual(float(page.mediabox.height), 842)
+
+    def test_replaced_file_is_converted_again(self):
+        metadata = self._create_metadata()
+        first_name = get_converted_annex_name(metadata.acte_naissance.name, 'x')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            metadata.acte_naissance = SimpleUploadedFile('acte.png', self._build_png(size=(200, 100)), content_type='image/png')
+            metadata.save()
+
+        directory = os.path.dirname(metadata.acte_naissance.path)
+        converted = [name for name in os.listdir(directory) if name.endswith('.annex.pdf')]
+        self.assertEqual(len(converted), 1)
+        self.assertNotEqual(first_name, get_converted_annex_name(metadata.acte_naissance.name, 'x'))
+        self.assertTrue(converted[0].startswith(f'{os.path.basename(metadata.acte_naissance.name)}.'))
+
+    def test_images_sharing_a_base_name_keep_their_own_conversion(self):
+        png = default_storage.save('annexes/photo.png', ContentFile(self._build_png(size=(200, 100))))
+        jpg_buffer = BytesIO()
+        Image.new('RGB', (100, 200), color='white').save(jpg_buffer, format='JPEG')
+        jpg = default_storage.save('annexes/photo.jpg', ContentFile(jpg_buffer.getvalue()))
+
+        load_annex(FieldFile(None, FileField(), png))
+        load_annex(FieldFile(None, FileField(), jpg))
+
+        converted = [name for name in os.listdir(default_storage.path('annexes')) if name.endswith('.annex.pdf')]
+        self.assertEqual(sorted(name.split('.')[1] for name in converted), ['jpg', 'png'])
+        with patch('main.annexes.image_to_pdf') as image_to_pdf:
+            load_annex(FieldFile(None, FileField(), png))
+        image_to_pdf.assert_not_called()
+
+    def test_cached_conversion_is_found_without_reading_the_original(self):
+        metadata = self._create_metadata()
+
+        with patch('django.db.models.fields.files.FieldFile.open') as open_original:
+            status, details, pdf_bytes = load_annex(metadata.acte_naissance)
+
+        open_original.assert_not_called()
+        self.assertEqual(status, 'Inclus')
+        self.assertTrue(pdf_bytes.startswith(b'%PDF'))
+
+    def test_deleting_the_record_removes_its_conversions(self):
+        metadata = self._create_metadata()
+        directory = os.path.dirname(metadata.acte_naissance.path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            metadata.delete()
+
+        self.assertEqual([name for name in os.listdir(directory) if name.endswith('.annex.pdf')], [])
+
+    def test_saving_without_new_upload_does_not_convert(self):
+        metadata = self._create_metadata()
+
+        with patch('main.signals.prebuild_annex') as prebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                metadata.is_complete = True
+                metadata.save()
+
+        prebuild.assert_not_called()
+
+
 class EtudiantProfilePhotoTests(TestCase):
     def setUp(self):
         self.temporary_media = TemporaryDirectory()
@@ -2713,68 +3327,70 @@ class PaymentStatusViewTests(TestCase):
         self.program = Program.objects.create(name='Informatique')
         self.level = Level.objects.create(name='Licence 1', academic_order=1)
 
-        self.student_up_to_date = Student.objects.create(
-            matricule='PAY-STATUS-001',
-            firstname='Jean',
-            lastname='Dupont',
-            gender='M',
-            status='registered',
-            program=self.program,
-        )
-        self.student_overdue = Student.objects.create(
-            matricule='PAY-STATUS-002',
-            firstname='Alice',
-            lastname='Ngono',
-            gender='F',
-            status='registered',
-            program=self.program,
-        )
+        # Les soldes sont écrits par les signaux, à la validation de la transaction.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student_up_to_date = Student.objects.create(
+                matricule='PAY-STATUS-001',
+                firstname='Jean',
+                lastname='Dupont',
+                gender='M',
+                status='registered',
+                program=self.program,
+            )
+            self.student_overdue = Student.objects.create(
+                matricule='PAY-STATUS-002',
+                firstname='Alice',
+                lastname='Ngono',
+                gender='F',
+                status='registered',
+                program=self.program,
+            )
 
-        StudentLevel.objects.create(
-            student=self.student_up_to_date,
-            level=self.level,
-            academic_year=self.academic_year,
-            is_active=True,
-            is_registered=True,
-        )
-        StudentLevel.objects.create(
-            student=self.student_overdue,
-            level=self.level,
-            academic_year=self.academic_year,
-            is_active=True,
-            is_registered=True,
-        )
+            StudentLevel.objects.create(
+                student=self.student_up_to_date,
+                level=self.level,
+                academic_year=self.academic_year,
+                is_active=True,
+                is_registered=True,
+            )
+            StudentLevel.objects.create(
+                student=self.student_overdue,
+                level=self.level,
+                academic_year=self.academic_year,
+                is_active=True,
+                is_registered=True,
+            )
 
-        self.first_installment = PaymentInstallment.objects.create(
-            program=self.program,
-            academic_year=self.academic_year,
-            level=self.level,
-            name='Tranche 1',
-            order_number=1,
-            amount=50000,
-            due_date=today - timezone.timedelta(days=30),
-        )
-        self.second_installment = PaymentInstallment.objects.create(
-            program=self.program,
-            academic_year=self.academic_year,
-            level=self.level,
-            name='Tranche 2',
-            order_number=2,
-            amount=70000,
-            due_date=today + timezone.timedelta(days=30),
-        )
+            self.first_installment = PaymentInstallment.objects.create(
+                program=self.program,
+                academic_year=self.academic_year,
+                level=self.level,
+                name='Tranche 1',
+                order_number=1,
+                amount=50000,
+                due_date=today - timezone.timedelta(days=30),
+            )
+            self.second_installment = PaymentInstallment.objects.create(
+                program=self.program,
+                academic_year=self.academic_year,
+                level=self.level,
+                name='Tranche 2',
+                order_number=2,
+                amount=70000,
+                due_date=today + timezone.timedelta(days=30),
+            )
 
-        Payment.objects.create(
-            student=self.student_up_to_date,
-            installment=self.first_installment,
-            academic_year=self.academic_year,
-            category='frais_scolarite',
-            author=self.user,
-            amount_paid=50000,
-            payment_date=timezone.make_aware(datetime.combine(today, datetime.min.time())),
-            receipt_number='REC-STATUS-001',
-            source='cash',
-        )
+            Payment.objects.create(
+                student=self.student_up_to_date,
+                installment=self.first_installment,
+                academic_year=self.academic_year,
+                category='frais_scolarite',
+                author=self.user,
+                amount_paid=50000,
+                payment_date=timezone.make_aware(datetime.combine(today, datetime.min.time())),
+                receipt_number='REC-STATUS-001',
+                source='cash',
+            )
 
         self.url = reverse('payments:payment_status')
         self.detail_url = reverse('payments:payment_status_student_detail', args=[self.student_up_to_date.matricule])
@@ -2980,3 +3596,285 @@ class StatistiquesViewTests(TestCase):
         self.assertEqual(applied_filters['Programme'], self.program_1.name)
         self.assertEqual(applied_filters['Genre'], 'Féminin')
         self.assertEqual(applied_filters['Statut document'], 'Déchargé')
+
+
+    STATISTICS_CONTEXT_KEYS = (
+        'total_students', 'total_documents', 'withdrawn_documents', 'available_documents', 'levels_count',
+        'represented_schools_count', 'active_specialities_count', 'new_enrollments', 'gender_stats',
+        'level_stats', 'program_stats', 'school_stats', 'speciality_stats', 'document_stats',
+        'document_type_stats', 'documents_per_student', 'document_withdrawal_rate',
+    )
+
+    def _statistics(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {key: response.context[key] for key in self.STATISTICS_CONTEXT_KEYS}
+
+    def test_statistics_view_reads_selected_year_from_cube(self):
+        response = self.client.get(self.url)
+
+        state = StatisticsCubeState.objects.get(academic_year=self.active_year)
+        self.assertFalse(state.is_stale)
+        self.assertEqual(response.context['statistics_refreshed_at'], state.refreshed_at)
+        self.assertContains(response, 'Données agrégées le')
+        self.assertTrue(StatisticsCubeRow.objects.filter(academic_year=self.active_year).exists())
+        self.assertFalse(StatisticsCubeState.objects.filter(academic_year=self.old_year).exists())
+
+        self.client.get(self.url)
+        self.assertEqual(StatisticsCubeState.objects.get(pk=state.pk).refreshed_at, state.refreshed_at)
+
+    def test_cube_statistics_match_live_statistics_for_filter_combinations(self):
+        second_student = Student.objects.create(
+            matricule='STAT-003',
+            firstname='Carine',
+            lastname='Mbarga',
+            gender='M',
+            lang='en',
+            status='registered',
+            program=self.program_1,
+            school=self.school_2,
+            start_level=self.level_1,
+        )
+        second_level = StudentLevel.objects.create(
+            student=second_student,
+            level=self.level_2,
+            academic_year=self.active_year,
+            is_active=True,
+        )
+        OfficialDocument.objects.create(
+            student_level=second_level,
+            type=OfficialDocument.TYPE_CERTIFICATE,
+            status='available',
+        )
+        OfficialDocument.objects.create(
+            student_level=second_level,
+            type=OfficialDocument.TYPE_CERTIFICATE,
+            status='withdrawn',
+        )
+
+        combinations = [
+            {},
+            {'program': str(self.program_1.id)},
+            {'gender': 'M', 'lang': 'en'},
+            {'current_level': str(self.level_2.id)},
+            {'speciality': str(self.speciality_1.id)},
+            {'document_status': 'withdrawn'},
+            {'document_type': OfficialDocument.TYPE_CERTIFICATE},
+            {'document_status': 'available', 'document_type': OfficialDocument.TYPE_CERTIFICATE},
+            {'school': str(self.school_2.id), 'document_status': 'lost'},
+            {'year': str(self.old_year.id), 'document_type': OfficialDocument.TYPE_DIPLOMA},
+        ]
+        for params in combinations:
+            with self.subTest(params=params):
+                from_cube = self._statistics(params)
+                with override_settings(STATISTICS_CUBE_ENABLED=False):
+                    live = self._statistics(params)
+                self.assertEqual(from_cube, live)
+
+    def test_cube_is_rebuilt_after_official_document_change(self):
+        self.assertEqual(self.client.get(self.url).context['total_documents'], 2)
+
+        OfficialDocument.objects.create(
+            student_level=self.student_level_active,
+            type=OfficialDocument.TYPE_STUDENT_CARD,
+            status='available',
+        )
+
+        self.assertTrue(StatisticsCubeState.objects.get(academic_year=self.active_year).is_stale)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['total_documents'], 3)
+        self.assertEqual(response.context['available_documents'], 2)
+        self.assertFalse(StatisticsCubeState.objects.get(academic_year=self.active_year).is_stale)
+
+    def test_stale_cube_is_served_while_another_request_rebuilds_it(self):
+        self.client.get(self.url)
+        state = StatisticsCubeState.objects.get(academic_year=self.active_year)
+        OfficialDocument.objects.create(
+            student_level=self.student_level_active,
+            type=OfficialDocument.TYPE_STUDENT_CARD,
+            status='available',
+        )
+        lock_key = REBUILD_LOCK_KEY.format(self.active_year.pk)
+        cache.add(lock_key, True)
+        self.addCleanup(cache.delete, lock_key)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.context['total_documents'], 2)
+        self.assertEqual(response.context['statistics_refreshed_at'], state.refreshed_at)
+        self.assertTrue(StatisticsCubeState.objects.get(pk=state.pk).is_stale)
+
+        cache.delete(lock_key)
+        self.assertEqual(self.client.get(self.url).context['total_documents'], 3)
+        self.assertIsNone(cache.get(lock_key))
+
+    def test_year_never_aggregated_is_computed_live_while_its_cube_is_being_built(self):
+        lock_key = REBUILD_LOCK_KEY.format(self.active_year.pk)
+        cache.add(lock_key, True)
+        self.addCleanup(cache.delete, lock_key)
+
+        response = self.client.get(self.url)
+
+        self.assertIsNone(response.context['statistics_refreshed_at'])
+        self.assertEqual(response.context['total_documents'], 2)
+        self.assertFalse(StatisticsCubeRow.objects.filter(academic_year=self.active_year).exists())
+
+    def test_year_with_students_at_several_levels_is_computed_live(self):
+        StudentLevel.objects.create(
+            student=self.student_active,
+            level=self.level_2,
+            academic_year=self.active_year,
+        )
+
+        response = self.client.get(self.url)
+
+        self.assertTrue(StatisticsCubeState.objects.get(academic_year=self.active_year).has_multiple_levels)
+        self.assertEqual(response.context['total_students'], 1)
+        self.assertEqual(len(response.context['level_stats']), 2)
+
+    def test_rebuild_statistics_command_refreshes_every_year(self):
+        output = StringIO()
+
+        call_command('rebuild_statistics', stdout=output)
+
+        self.assertIn('2 année(s)', output.getvalue())
+        self.assertEqual(
+            set(StatisticsCubeState.objects.exclude(refreshed_at=None).values_list('academic_year_id', flat=True)),
+            {self.active_year.id, self.old_year.id},
+        )
+
+
+class ReferenceSequenceTests(TestCase):
+    def test_allocate_returns_consecutive_values_per_key(self):
+        self.assertEqual(list(ReferenceSequence.allocate('TEST-A-')), [1])
+        self.assertEqual(list(ReferenceSequence.allocate('TEST-A-', count=3)), [2, 3, 4])
+        self.assertEqual(list(ReferenceSequence.allocate('TEST-B-')), [1])
+
+    def test_allocate_seeds_new_sequence_from_initial_callable_once(self):
+        initial = MagicMock(return_value=41)
+
+        self.assertEqual(list(ReferenceSequence.allocate('TEST-SEED-', initial=initial)), [42])
+        self.assertEqual(list(ReferenceSequence.allocate('TEST-SEED-', initial=initial)), [43])
+        initial.assert_called_once_with()
+
+    def test_allocate_block_uses_constant_query_count(self):
+        ReferenceSequence.allocate('TEST-BLOCK-')
+
+        with self.assertNumQueries(4):
+            block = ReferenceSequence.allocate('TEST-BLOCK-', count=500)
+
+        self.assertEqual((block.start, block.stop), (2, 502))
+
+
+class FinalRegistrationIdentifierAllocationTests(TestCase):
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2025, 9, 1),
+            end_at=date(2026, 6, 30),
+            is_active=True,
+        )
+        self.level = Level.objects.create(name='Licence 3')
+        self.program = Program.objects.create(name='Licence gestion')
+        Student.objects.create(
+            matricule='EXISTING_REGISTERED',
+            dossier_number='L0164',
+            firstname='Déjà',
+            lastname='Inscrit',
+            gender='M',
+            lang='fr',
+            status='registered',
+            metadata=StudentMetaData.objects.create(original_country='Cameroun'),
+            program=self.program,
+        )
+
+    def create_approved_students(self, count):
+        students = []
+        for index in range(count):
+            student = Student.objects.create(
+                matricule=f'INT_BULK_{index:03d}',
+                firstname=f'Prénom {index}',
+                lastname='Lot',
+                gender='F',
+                lang='fr',
+                status='approved',
+                metadata=StudentMetaData.objects.create(original_country='Cameroun'),
+                program=self.program,
+            )
+            StudentLevel.objects.create(
+                student=student,
+                level=self.level,
+                academic_year=self.academic_year,
+                is_active=True,
+            )
+            students.append(student)
+        return students
+
+    def test_bulk_allocation_resumes_sequence_after_stored_dossiers(self):
+        students = self.create_approved_students(3)
+
+        identifiers = allocate_final_registration_identifiers(students)
+
+        self.assertEqual(
+            [identifiers[student.pk][0] for student in students],
+            ['L0165', 'L0166', 'L0167'],
+        )
+        self.assertEqual(identifiers[students[0].pk][1], '251301659')
+        self.assertEqual(len({matricule for _, matricule in identifiers.values()}), 3)
+        self.assertEqual(ReferenceSequence.objects.get(key='DOSSIER').last_value, 167)
+
+    def test_bulk_allocation_query_count_does_not_depend_on_batch_size(self):
+        students = self.create_approved_students(13)
+        allocate_final_registration_identifiers(students[:1])
+
+        with CaptureQueriesContext(connection) as small_batch_queries:
+            allocate_final_registration_identifiers(students[1:3])
+        with CaptureQueriesContext(connection) as large_batch_queries:
+            allocate_final_registration_identifiers(students[3:])
+
+        self.assertEqual(len(small_batch_queries), len(large_batch_queries))
+
+    def test_bulk_allocation_skips_matricules_already_taken(self):
+        Student.objects.create(
+            matricule='251301659',
+            firstname='Matricule',
+            lastname='Occupé',
+            gender='M',
+            lang='fr',
+            status='registered',
+            metadata=StudentMetaData.objects.create(original_country='Cameroun'),
+            program=self.program,
+        )
+        student = self.create_approved_students(1)[0]
+
+        dossier_number, matricule = allocate_final_registration_identifiers([student])[student.pk]
+
+        self.assertNotEqual(matricule, '251301659')
+        self.assertNotEqual(dossier_number, 'L0165')
+
+    @override_settings(DOSSIER_SEQUENCE_SCOPE='prefix_year')
+    def test_prefix_year_scope_uses_dedicated_sequence(self):
+        student = self.create_approved_students(1)[0]
+
+        dossier_number, _ = allocate_final_registration_identifiers([student])[student.pk]
+
+        self.assertEqual(dossier_number, 'L0001')
+        self.assertTrue(ReferenceSequence.objects.filter(key='DOSSIER-L-25').exists())
+        self.assertFalse(ReferenceSequence.objects.filter(key='DOSSIER').exists())
+
+    def test_register_approved_pre_inscriptions_registers_batch_in_one_call(self):
+        students = self.create_approved_students(3)
+
+        registered_students = register_approved_pre_inscriptions(students)
+
+        self.assertEqual([student.dossier_number for student in registered_students], ['L0165', 'L0166', 'L0167'])
+        self.assertEqual(Student.objects.filter(lastname='Lot', status='registered').count(), 3)
+        self.assertFalse(StudentLevel.objects.filter(student__lastname='Lot', is_active=True, is_registered=False).exists())
+
+    def test_register_approved_pre_inscriptions_rejects_non_approved_students(self):
+        student = self.create_approved_students(1)[0]
+        student.status = 'pending'
+
+        with self.assertRaises(forms.ValidationError):
+            register_approved_pre_inscriptions([student])
+
+        self.assertFalse(ReferenceSequence.objects.filter(key='DOSSIER').exists())
@@ -1,6 +1,7 @@
 from django.contrib import messages
 import re
 
+from django.conf import settings
 from django.db import transaction
 from django.shortcuts import redirect, render
 from django.urls import reverse
@@ -18,11 +19,30 @@ from main.program_documents import build_program_document_entries
 from django.forms import ValidationError
 
 from academic.models import Program
+from main.filters import FieldFilter, FilterSpec, RelationFilter
+from main.models import ReferenceSequence
 
 
 SECONDARY_DIPLOMA_FORMSET_PREFIX = 'secondary_diplomas'
 UNIVERSITY_LEVEL_FORMSET_PREFIX = 'university_levels'
 PRE_INSCRIPTION_STATUSES = ['pending', 'abandoned', 'approved', 'rejected']
+DOSSIER_SEQUENCE_KEY = 'DOSSIER'
+DOSSIER_SEQUENCE_SCOPE_PREFIX_YEAR = 'prefix_year'
+MAX_IDENTIFIER_ALLOCATION_ROUNDS = 10
+
+# Filtres GET de la liste des pré-inscriptions (statut traité à part).
+PRE_INSCRIPTION_FILTERS = FilterSpec(
+    FieldFilter('is_online_registration', 'metadata__is_online_registration'),
+    FieldFilter('is_complete', 'metadata__is_complete'),
+    FieldFilter('gender', 'gender'),
+    FieldFilter('school', 'school_id'),
+    FieldFilter('program', 'program_id'),
+    FieldFilter('godfather', 'godfather_id'),
+    FieldFilter('language', 'lang'),
+    RelationFilter('academic_year', StudentLevel, 'student', 'academic_year_id'),
+    FieldFilter('date_from', 'created_at__date__gte'),
+    FieldFilter('date_to', 'created_at__date__lte'),
+)
 
 
 def get_program_from_value(program_value):
@@ -162,45 +182,185 @@ def build_student_matricule(year_code, program_code, cycle_code, dossier_last4):
     return f"{base}{check_digit}"
 
 
-def get_next_dossier_sequence():
-    """Retourne la prochaine séquence de dossier disponible."""
-    stored_sequences = [
-        sequence
-        for sequence in (
-            extract_dossier_sequence(value)
-            for value in Student.objects.exclude(dossier_number__isnull=True)
-            .exclude(dossier_number__exact='')
-            .values_list('dossier_number', flat=True)
+def is_dossier_sequence_scoped():
+    """Indique si les séquences de dossier sont tenues par préfixe et par année."""
+    return getattr(settings, 'DOSSIER_SEQUENCE_SCOPE', 'global') == DOSSIER_SEQUENCE_SCOPE_PREFIX_YEAR
+
+
+def get_dossier_sequence_key(dossier_prefix=None, year_code=None):
+    """Retourne la clé de séquence à utiliser pour un préfixe et une année donnés."""
+    if is_dossier_sequence_scoped() and dossier_prefix and year_code:
+        return f"{DOSSIER_SEQUENCE_KEY}-{dossier_prefix}-{year_code}"
+    return DOSSIER_SEQUENCE_KEY
+
+
+def get_highest_stored_dossier_sequence(dossier_prefix=None, year_code=None):
+    """Retourne la plus haute séquence de dossier déjà enregistrée (reprise de l'existant)."""
+    students = Student.objects.exclude(dossier_number__isnull=True).exclude(dossier_number__exact='')
+    if dossier_prefix:
+        students = students.filter(dossier_number__startswith=dossier_prefix)
+    if year_code:
+        students = students.filter(matricule__startswith=year_code)
+
+    highest_sequence = max(
+        (
+            sequence
+            for sequence in (extract_dossier_sequence(value) for value in students.values_list('dossier_number', flat=True))
+            if sequence is not None
+        ),
+        default=0,
+    )
+    if dossier_prefix or year_code:
+        return highest_sequence
+    return max(highest_sequence, Student.objects.count())
+
+
+def allocate_dossier_sequences(count=1, dossier_prefix=None, year_code=None):
+    """
+    Réserve ``count`` séquences de dossier consécutives et retourne le ``range`` obtenu.
+
+    La séquence est persistée dans ``ReferenceSequence`` : l'historique des dossiers n'est
+    parcouru qu'une seule fois, à la création de la séquence.
+    """
+    if is_dossier_sequence_scoped():
+        initial = lambda: get_highest_stored_dossier_sequence(dossier_prefix, year_code)  # noqa: E731
+    else:
+        initial = get_highest_stored_dossier_sequence
+
+    return ReferenceSequence.allocate(
+        get_dossier_sequence_key(dossier_prefix, year_code),
+        count=count,
+        initial=initial,
+    )
+
+
+def get_next_dossier_sequence(dossier_prefix=None, year_code=None):
+    """Réserve et retourne la prochaine séquence de dossier disponible."""
+    return allocate_dossier_sequences(1, dossier_prefix=dossier_prefix, year_code=year_code)[0]
+
+
+def _get_registration_levels(students):
+    """Niveau actif (ou le plus récent) de chaque étudiant, chargé en une seule requête."""
+    registration_levels = {}
+    student_levels = StudentLevel.objects.filter(
+        student_id__in=[student.pk for student in students],
+    ).select_related('level', 'academic_year').order_by(
+        'student_id', '-is_active', '-academic_year__start_at', 'level__name'
+    )
+    for student_level in student_levels:
+        registration_levels.setdefault(student_level.student_id, student_level)
+    return registration_levels
+
+
+def allocate_final_registration_identifiers(students):
+    """
+    Génère les numéros de dossier et matricules définitifs d'un lot de pré-inscriptions approuvées.
+
+    Retourne un dictionnaire {pk étudiant: (numéro de dossier, matricule)}. Les séquences
+    sont réservées en bloc et les collisions vérifiées en une requête par tour, si bien que
+    le nombre de requêtes ne dépend pas de la taille du lot.
+    """
+    students = list(students)
+    registration_levels = _get_registration_levels(students)
+
+    plans = []
+    for student in students:
+        student_level = registration_levels.get(student.pk)
+        if not student_level or not student_level.level or not student_level.academic_year:
+            raise ValidationError("Impossible d'inscrire cet étudiant sans niveau et année académique actifs.")
+
+        year_code = str(student_level.academic_year.start_at.year)[-2:]
+        plans.append({
+            'student': student,
+            'year_code': year_code,
+            'program_code': infer_program_code(student, student_level),
+            'cycle_code': infer_cycle_code(student_level),
+            'dossier_prefix': infer_dossier_prefix(student, student_level),
+            'sequence': extract_dossier_sequence(student.dossier_number),
+        })
+
+    student_ids = [student.pk for student in students]
+    identifiers = {}
+    used_matricules = set()
+    pending_plans = plans
+
+    for _ in range(MAX_IDENTIFIER_ALLOCATION_ROUNDS):
+        plans_by_key = {}
+        for plan in pending_plans:
+            if plan['sequence'] is None:
+                key = get_dossier_sequence_key(plan['dossier_prefix'], plan['year_code'])
+                plans_by_key.setdefault(key, []).append(plan)
+
+        for key_plans in plans_by_key.values():
+            sequences = allocate_dossier_sequences(
+                len(key_plans),
+                dossier_prefix=key_plans[0]['dossier_prefix'],
+                year_code=key_plans[0]['year_code'],
+            )
+            for plan, sequence in zip(key_plans, sequences):
+                plan['sequence'] = sequence
+
+        for plan in pending_plans:
+            plan['dossier_last4'] = f"{plan['sequence']:04d}"
+            plan['matricule'] = build_student_matricule(
+                plan['year_code'], plan['program_code'], plan['cycle_code'], plan['dossier_last4'],
+            )
+
+        taken_matricules = set(
+            Student.objects.filter(
+                matricule__in=[plan['matricule'] for plan in pending_plans],
+            ).exclude(pk__in=student_ids).values_list('matricule', flat=True)
         )
-        if sequence is not None
-    ]
-    highest_sequence = max(stored_sequences, default=0)
-    return max(highest_sequence, Student.objects.count()) + 1
+
+        next_pending_plans = []
+        for plan in pending_plans:
+            if plan['matricule'] in taken_matricules or plan['matricule'] in used_matricules:
+                plan['sequence'] = None
+                next_pending_plans.append(plan)
+                continue
+
+            used_matricules.add(plan['matricule'])
+            identifiers[plan['student'].pk] = (
+                f"{plan['dossier_prefix']}{plan['dossier_last4']}",
+                plan['matricule'],
+            )
+
+        pending_plans = next_pending_plans
+        if not pending_plans:
+            return identifiers
+
+    raise ValidationError("Aucun matricule définitif disponible n'a pu être généré.")
 
 
 def generate_final_registration_identifiers(student):
     """Génère le numéro de dossier et le matricule définitif d'une pré-inscription approuvée."""
-    student_level = get_student_level_for_edit(student)
-    if not student_level or not student_level.level or not student_level.academic_year:
-        raise ValidationError("Impossible d'inscrire cet étudiant sans niveau et année académique actifs.")
+    return allocate_final_registration_identifiers([student])[student.pk]
 
-    year_code = str(student_level.academic_year.start_at.year)[-2:]
-    program_code = infer_program_code(student, student_level)
-    cycle_code = infer_cycle_code(student_level)
-    dossier_prefix = infer_dossier_prefix(student, student_level)
-    sequence = extract_dossier_sequence(student.dossier_number) or get_next_dossier_sequence()
 
-    for _ in range(10000):
-        dossier_last4 = f"{sequence:04d}"
-        dossier_number = f"{dossier_prefix}{dossier_last4}"
-        matricule = build_student_matricule(year_code, program_code, cycle_code, dossier_last4)
+def register_approved_pre_inscriptions(students):
+    """
+    Inscrit définitivement un lot de pré-inscriptions approuvées dans une seule transaction.
 
-        if not Student.objects.filter(matricule=matricule).exclude(pk=student.pk).exists():
-            return dossier_number, matricule
+    Les identifiants définitifs sont attribués en bloc. La vérification du paiement de la
+    première tranche reste à la charge de l'appelant.
+    """
+    students = list(students)
+    if any(student.status != 'approved' for student in students):
+        raise ValidationError("Seules les pré-inscriptions approuvées peuvent être inscrites définitivement.")
 
-        sequence += 1
+    registered_students = []
+    with transaction.atomic():
+        identifiers = allocate_final_registration_identifiers(students)
+        for student in students:
+            dossier_number, final_matricule = identifiers[student.pk]
+            registered_student = replace_student_primary_key(student, final_matricule, dossier_number)
+            registered_student_level = registered_student.get_active_level()
+            if registered_student_level:
+                registered_student_level.mark_as_registered()
+            ensure_registration_certificate(registered_student)
+            registered_students.append(registered_student)
 
-    raise ValidationError("Aucun matricule définitif disponible n'a pu être généré.")
+    return registered_students
 
 
 def build_registration_certificate_reference(student, student_level):
@@ -277,17 +437,6 @@ def get_filtered_pre_inscriptions_queryset(params, queryset=None):
     students = students.filter(deleted_at__isnull=True)
 
     status = params.get('status')
-    is_online_registration = params.get('is_online_registration')
-    is_complete = params.get('is_complete')
-    gender = params.get('gender')
-    school_id = params.get('school')
-    program_id = params.get('program')
-    godfather_id = params.get('godfather')
-    language = params.get('language')
-
-    academic_year_id = params.get('academic_year')
-    date_from = params.get('date_from') or ''
-    date_to = params.get('date_to') or ''
     include_rejected = params.get('include_rejected') == 'yes'
 
     if status:
@@ -298,28 +447,7 @@ def get_filtered_pre_inscriptions_queryset(params, queryset=None):
             allowed_statuses = [s for s in allowed_statuses if s != 'rejected']
         students = students.filter(status__in=allowed_statuses)
 
-    if is_online_registration:
-        students = students.filter(metadata__is_online_registration=is_online_registration)
-
-    if is_complete:
-        students = students.filter(metadata__is_complete=is_complete)
-
-    if gender:
-        students = students.filter(gender=gender)
-    if school_id:
-        students = students.filter(school_id=school_id)
-    if program_id:
-        students = students.filter(program_id=program_id)
-    if godfather_id:
-        students = students.filter(godfather_id=godfather_id)
-    if language:
-        students = students.filter(lang=language)
-    if academic_year_id:
-        students = students.filter(student_levels__academic_year_id=academic_year_id).distinct()
-    if date_from:
-        students = students.filter(created_at__date__gte=date_from)
-    if date_to:
-        students = students.filter(created_at__date__lte=date_to)
+    students = PRE_INSCRIPTION_FILTERS.apply(students, params)
 
     return students.order_by('-created_at', 'matricule')
 
@@ -19,6 +19,8 @@ from student_portal.decorators import scholar_admin_required
 
 from django.contrib import messages
 from .models import SystemSettings
+from .filters import related_exists
+from .statistics import get_cube_statistics, is_statistics_cube_enabled
 # from .forms import (
 #     GeneralSettingsForm, AcademicSettingsForm, ProgramLevelSettingsForm,
 #     UserSettingsForm, DocumentSettingsForm, NotificationSettingsForm,
@@ -144,7 +146,6 @@ class StatistiquesView(LoginRequiredMixin, TemplateView):
         return stats
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Count
         from schools.models import School
 
         context = super().get_context_data(**kwargs)
@@ -200,141 +201,56 @@ class StatistiquesView(LoginRequiredMixin, TemplateView):
         }
         gender_colors = {'M': '#4e73df', 'F': '#e74a3b'}
 
-        # Jeu de données de base pour la scolarité
-        base_student_levels = StudentLevel.objects.filter(
-            student__status='registered'
-        ).select_related(
-            'student',
-            'student__program',
-            'student__school',
-            'student__start_level',
-            'level',
-            'academic_year',
-            'speciality',
-        )
-
-        if current_year:
-            base_student_levels = base_student_levels.filter(academic_year=current_year)
-        if selected_program:
-            base_student_levels = base_student_levels.filter(student__program_id=selected_program)
-        if selected_school:
-            base_student_levels = base_student_levels.filter(student__school_id=selected_school)
-        if selected_gender:
-            base_student_levels = base_student_levels.filter(student__gender=selected_gender)
-        if selected_lang:
-            base_student_levels = base_student_levels.filter(student__lang=selected_lang)
-        if selected_start_level:
-            base_student_levels = base_student_levels.filter(student__start_level_id=selected_start_level)
-        if selected_current_level:
-            base_student_levels = base_student_levels.filter(level_id=selected_current_level)
-        if selected_speciality:
-            base_student_levels = base_student_levels.filter(speciality_id=selected_speciality)
-
-        documents_query = OfficialDocument.objects.filter(student_level__in=base_student_levels)
-        if selected_document_status:
-            documents_query = documents_query.filter(status=selected_document_status)
-        if selected_document_type:
-            documents_query = documents_query.filter(type=selected_document_type)
-
-        filtered_student_levels = base_student_levels
-        if selected_document_status or selected_document_type:
-            matching_level_ids = documents_query.values_list('student_level_id', flat=True)
-            filtered_student_levels = base_student_levels.filter(id__in=matching_level_ids).distinct()
-
-        students_query = Student.objects.filter(
-            status='registered',
-            student_levels__in=filtered_student_levels,
-        ).distinct()
-
-        documents_query = OfficialDocument.objects.filter(student_level__in=filtered_student_levels)
-        if selected_document_status:
-            documents_query = documents_query.filter(status=selected_document_status)
-        if selected_document_type:
-            documents_query = documents_query.filter(type=selected_document_type)
-
-        # KPI principaux
-        total_students = students_query.count()
-        total_documents = documents_query.count()
-        withdrawn_documents = documents_query.filter(status='withdrawn').count()
-        available_documents = documents_query.filter(status='available').count()
-        levels_count = filtered_student_levels.values('level_id').distinct().count()
-        represented_schools_count = students_query.exclude(school__isnull=True).values('school_id').distinct().count()
-        active_specialities_count = filtered_student_levels.exclude(speciality__isnull=True).values('speciality_id').distinct().count()
+        filters = {
+            'program': selected_program,
+            'school': selected_school,
+            'gender': selected_gender,
+            'lang': selected_lang,
+            'start_level': selected_start_level,
+            'current_level': selected_current_level,
+            'speciality': selected_speciality,
+            'document_status': selected_document_status,
+            'document_type': selected_document_type,
+        }
+        statistics = None
+        cube_state = None
+        if current_year and is_statistics_cube_enabled():
+            statistics, cube_state = get_cube_statistics(current_year, filters)
+        if statistics is None:
+            statistics = self._compute_live_statistics(current_year, filters)
+
+        total_students = statistics['total_students']
+        total_documents = statistics['total_documents']
+        withdrawn_documents = statistics['withdrawn_documents']
+        available_documents = statistics['available_documents']
+        levels_count = statistics['levels_count']
+        represented_schools_count = statistics['represented_schools_count']
+        active_specialities_count = statistics['active_specialities_count']
+        new_enrollments = statistics['new_enrollments']
         documents_per_student = round(total_documents / total_students, 1) if total_students else 0
         document_withdrawal_rate = self._compute_percentage(withdrawn_documents, total_documents)
 
-        if current_year:
-            new_enrollments = students_query.filter(
-                created_at__date__gte=current_year.start_at,
-                created_at__date__lte=current_year.end_at,
-            ).count()
-        else:
-            new_enrollments = students_query.count()
-
         # Répartitions
-        gender_stats = list(
-            students_query.values('gender').annotate(count=Count('id')).order_by('gender')
-        )
+        gender_stats = statistics['gender_stats']
         for stat in gender_stats:
             stat['label'] = gender_labels.get(stat['gender'], 'Non spécifié')
             stat['percentage'] = self._compute_percentage(stat['count'], total_students)
             stat['color'] = gender_colors.get(stat['gender'], '#858796')
 
-        level_stats = self._decorate_stats(
-            list(
-                filtered_student_levels.values('level__name').annotate(
-                    count=Count('student_id', distinct=True)
-                ).order_by('level__academic_order', 'level__name')
-            ),
-            'level__name',
-            total_students,
-            colors,
-        )
-
-        program_stats = self._decorate_stats(
-            list(
-                students_query.values('program__name').annotate(
-                    count=Count('id')
-                ).order_by('-count', 'program__name')
-            ),
-            'program__name',
-            total_students,
-            colors,
-        )
-
-        school_stats = self._decorate_stats(
-            list(
-                students_query.values('school__name').annotate(
-                    count=Count('id')
-                ).order_by('-count', 'school__name')[:8]
-            ),
-            'school__name',
-            total_students,
-            colors,
-        )
-
+        level_stats = self._decorate_stats(statistics['level_stats'], 'level__name', total_students, colors)
+        program_stats = self._decorate_stats(statistics['program_stats'], 'program__name', total_students, colors)
+        school_stats = self._decorate_stats(statistics['school_stats'], 'school__name', total_students, colors)
         speciality_stats = self._decorate_stats(
-            list(
-                filtered_student_levels.exclude(speciality__isnull=True).values('speciality__name').annotate(
-                    count=Count('student_id', distinct=True)
-                ).order_by('-count', 'speciality__name')[:8]
-            ),
-            'speciality__name',
-            total_students,
-            colors,
+            statistics['speciality_stats'], 'speciality__name', total_students, colors
         )
 
-        document_stats = list(
-            documents_query.values('status').annotate(count=Count('id')).order_by('status')
-        )
+        document_stats = statistics['document_stats']
         for stat in document_stats:
             stat['label'] = document_status_labels.get(stat['status'], stat['status'])
             stat['percentage'] = self._compute_percentage(stat['count'], total_documents)
             stat['color'] = document_status_colors.get(stat['status'], '#858796')
 
-        document_type_stats = list(
-            documents_query.values('type').annotate(count=Count('id')).order_by('-count', 'type')
-        )
+        document_type_stats = statistics['document_type_stats']
         for stat in document_type_stats:
             stat['label'] = document_type_labels.get(stat['type'], stat['type'])
             stat['percentage'] = self._compute_percentage(stat['count'], total_documents)
@@ -423,10 +339,116 @@ class StatistiquesView(LoginRequiredMixin, TemplateView):
             'document_withdrawal_rate': document_withdrawal_rate,
             'male_percentage': male_percentage,
             'female_percentage': female_percentage,
+            'statistics_refreshed_at': cube_state.refreshed_at if cube_state else None,
         })
 
         return context
 
+    def _compute_live_statistics(self, current_year, filters):
+        """Calcule les statistiques directement sur les inscriptions (toutes années, ou cube inutilisable)."""
+        from django.db.models import Count
+
+        selected_program = filters['program']
+        selected_school = filters['school']
+        selected_gender = filters['gender']
+        selected_lang = filters['lang']
+        selected_start_level = filters['start_level']
+        selected_current_level = filters['current_level']
+        selected_speciality = filters['speciality']
+        selected_document_status = filters['document_status']
+        selected_document_type = filters['document_type']
+
+        # Jeu de données de base pour la scolarité
+        base_student_levels = StudentLevel.objects.filter(student__status='registered')
+
+        if current_year:
+            base_student_levels = base_student_levels.filter(academic_year=current_year)
+        if selected_program:
+            base_student_levels = base_student_levels.filter(student__program_id=selected_program)
+        if selected_school:
+            base_student_levels = base_student_levels.filter(student__school_id=selected_school)
+        if selected_gender:
+            base_student_levels = base_student_levels.filter(student__gender=selected_gender)
+        if selected_lang:
+            base_student_levels = base_student_levels.filter(student__lang=selected_lang)
+        if selected_start_level:
+            base_student_levels = base_student_levels.filter(student__start_level_id=selected_start_level)
+        if selected_current_level:
+            base_student_levels = base_student_levels.filter(level_id=selected_current_level)
+        if selected_speciality:
+            base_student_levels = base_student_levels.filter(speciality_id=selected_speciality)
+
+        document_filters = {}
+        if selected_document_status:
+            document_filters['status'] = selected_document_status
+        if selected_document_type:
+            document_filters['type'] = selected_document_type
+
+        filtered_student_levels = base_student_levels
+        if document_filters:
+            filtered_student_levels = base_student_levels.filter(
+                related_exists(OfficialDocument, 'student_level', **document_filters)
+            )
+
+        students_query = Student.objects.filter(
+            related_exists(filtered_student_levels, 'student'),
+            status='registered',
+        )
+
+        documents_query = OfficialDocument.objects.filter(student_level__in=filtered_student_levels)
+        if selected_document_status:
+            documents_query = documents_query.filter(status=selected_document_status)
+        if selected_document_type:
+            documents_query = documents_query.filter(type=selected_document_type)
+
+        if current_year:
+            new_enrollments = students_query.filter(
+                created_at__date__gte=current_year.start_at,
+                created_at__date__lte=current_year.end_at,
+            ).count()
+        else:
+            new_enrollments = students_query.count()
+
+        return {
+            'total_students': students_query.count(),
+            'total_documents': documents_query.count(),
+            'withdrawn_documents': documents_query.filter(status='withdrawn').count(),
+            'available_documents': documents_query.filter(status='available').count(),
+            'levels_count': filtered_student_levels.values('level_id').distinct().count(),
+            'represented_schools_count': students_query.exclude(school__isnull=True).values('school_id').distinct().count(),
+            'active_specialities_count': filtered_student_levels.exclude(speciality__isnull=True).values('speciality_id').distinct().count(),
+            'new_enrollments': new_enrollments,
+            'gender_stats': list(
+                students_query.values('gender').annotate(count=Count('id')).order_by('gender')
+            ),
+            'level_stats': list(
+                filtered_student_levels.values('level__name').annotate(
+                    count=Count('student_id', distinct=True)
+                ).order_by('level__academic_order', 'level__name')
+            ),
+            'program_stats': list(
+                students_query.values('program__name').annotate(
+                    count=Count('id')
+                ).order_by('-count', 'program__name')
+            ),
+            'school_stats': list(
+                students_query.values('school__name').annotate(
+                    count=Count('id')
+                ).order_by('-count', 'school__name')[:8]
+            ),
+            'speciality_stats': list(
+                filtered_student_levels.exclude(speciality__isnull=True).values('speciality__name').annotate(
+                    count=Count('student_id', distinct=True)
+                ).order_by('-count', 'speciality__name')[:8]
+            ),
+            'document_stats': list(
+                documents_query.values('status').annotate(count=Count('id')).order_by('status')
+            ),
+            'document_type_stats': list(
+                documents_query.values('type').annotate(count=Count('id')).order_by('-count', 'type')
+            ),
+        }
+
 
 # class ParametresView(LoginRequiredMixin, TemplateView):
 #     """Vue pour les paramètres"""
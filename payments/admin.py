@@ -23,3 +23,12 @@ class PaymentAdmin(admin.ModelAdmin):
     readonly_fields = ['payment_date', 'created_at', 'updated_at']
     save_on_top = True
 
+
+
+@admin.register(StudentBalance)
+class StudentBalanceAdmin(admin.ModelAdmin):
+    list_display = ['student', 'academic_year', 'level', 'total_amount_due', 'amount_paid', 'remaining_amount', 'overdue_amount', 'status', 'computed_for']
+    list_filter = ['academic_year', 'status', 'level']
+    search_fields = ['student__matricule', 'student__firstname', 'student__lastname']
+    ordering = ['student__lastname', 'student__firstname']
+    readonly_fields = ['computed_for', 'next_due_date', 'updated_at']
@@ -0,0 +1,337 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from academic.models import AcademicYear
+from audit.context import suspend_audit
+from payments.models import Payment, PaymentInstallment, StudentBalance
+from students.models import Student, StudentLevel
+
+
+ZERO = Decimal('0.00')
+
+
+def _get_current_levels(student_ids, academic_year):
+    """Retourne le niveau retenu pour chaque étudiant sur l'année (actif en priorité)."""
+    current_levels = {}
+    student_levels = StudentLevel.objects.filter(
+        student_id__in=student_ids,
+        academic_year=academic_year,
+    ).select_related('level').order_by(
+        'student_id', '-is_active', 'level__academic_order', 'level__name'
+    )
+    for student_level in student_levels:
+        current_levels.setdefault(student_level.student_id, student_level)
+    return current_levels
+
+
+def _get_installments_by_key(program_ids, academic_year):
+    """Regroupe les tranches de l'année par couple (programme, niveau)."""
+    installments_by_key = defaultdict(list)
+    if not program_ids:
+        return installments_by_key
+
+    installments = PaymentInstallment.objects.filter(
+        deleted_at__isnull=True,
+        academic_year=academic_year,
+        program_id__in=program_ids,
+    ).order_by('order_number', 'name', 'pk')
+    for installment in installments:
+        installments_by_key[(installment.program_id, installment.level_id)].append(installment)
+    return installments_by_key
+
+
+def _get_paid_amounts(student_ids, academic_year):
+    """Retourne le total des frais de scolarité versés par étudiant sur l'année."""
+    return {
+        item['student_id']: (item['total_paid'] or ZERO)
+        for item in Payment.objects.filter(
+            student_id__in=student_ids,
+            academic_year=academic_year,
+            category='frais_scolarite',
+        ).values('student_id').annotate(total_paid=Sum('amount_paid'))
+    }
+
+
+def resolve_student_installments(installments_by_key, program_id, level_id):
+    """Tranches spécifiques au niveau, à défaut les tranches génériques du programme."""
+    installments = installments_by_key.get((program_id, level_id)) if level_id else None
+    return installments or installments_by_key.get((program_id, None), [])
+
+
+def build_financial_status(academic_year, current_level, installments, amount_paid, as_of_date):
+    """Construit le dictionnaire de statut financier à partir des données déjà chargées."""
+    total_due = sum((installment.amount or ZERO for installment in installments), ZERO)
+    due_amount = sum(
+        (
+            installment.amount or ZERO
+            for installment in installments
+            if installment.due_date and installment.due_date <= as_of_date
+        ),
+        ZERO,
+    )
+
+    next_due_date = min(
+        (
+            installment.due_date
+            for installment in installments
+            if installment.due_date and installment.due_date > as_of_date
+        ),
+        default=None,
+    )
+
+    remaining_amount = max(total_due - amount_paid, ZERO)
+    overdue_amount = max(due_amount - amount_paid, ZERO)
+
+    return {
+        'academic_year': academic_year,
+        'current_level': current_level,
+        'total_amount_due': total_due,
+        'amount_paid': amount_paid,
+        'remaining_amount': remaining_amount,
+        'due_amount': due_amount,
+        'overdue_amount': overdue_amount,
+        'status': 'overdue' if overdue_amount > ZERO else 'up_to_date',
+        'next_due_date': next_due_date,
+    }
+
+
+def compute_financial_status(students, academic_year=None, as_of_date=None):
+    """
+    Calcule le statut financier d'un lot d'étudiants en un nombre fixe de requêtes.
+
+    Retourne un dictionnaire {pk étudiant: statut}, chaque statut ayant la même
+    forme que celui de ``Student.get_financial_status``. Le dictionnaire est vide
+    si aucune année académique n'est fournie ni active.
+    """
+    if not academic_year:
+        academic_year = AcademicYear.objects.filter(is_active=True).first()
+
+    if not academic_year:
+        return {}
+
+    students = list(students)
+    if not students:
+        return {}
+
+    as_of_date = as_of_date or timezone.localdate()
+    student_ids = [student.pk for student in students]
+    program_ids = {student.program_id for student in students if student.program_id}
+
+    current_levels = _get_current_levels(student_ids, academic_year)
+    installments_by_key = _get_installments_by_key(program_ids, academic_year)
+    paid_amounts = _get_paid_amounts(student_ids, academic_year)
+
+    statuses = {}
+    for student in students:
+        current_level = current_levels.get(student.pk)
+        installments = resolve_student_installments(
+            installments_by_key,
+            student.program_id,
+            current_level.level_id if current_level else None,
+        )
+        statuses[student.pk] = build_financial_status(
+            academic_year,
+            current_level,
+            installments,
+            paid_amounts.get(student.pk, ZERO),
+            as_of_date,
+        )
+    return statuses
+
+
+# ===== REGISTRE DES SOLDES (StudentBalance) =====
+
+BALANCE_FIELDS = [
+    'level',
+    'total_amount_due',
+    'amount_paid',
+    'remaining_amount',
+    'due_amount',
+    'overdue_amount',
+    'status',
+    'computed_for',
+    'next_due_date',
+]
+BALANCE_BATCH_SIZE = 500
+
+
+def _balance_students_queryset(academic_year):
+    """Étudiants concernés par un solde sur l'année (niveau ou paiement de scolarité)."""
+    return Student.objects.filter(
+        Exists(StudentLevel.objects.filter(student_id=OuterRef('pk'), academic_year=academic_year))
+        | Exists(Payment.objects.filter(
+            student_id=OuterRef('pk'),
+            academic_year=academic_year,
+            category='frais_scolarite',
+        ))
+    )
+
+
+def _resolve_academic_year(academic_year):
+    if isinstance(academic_year, AcademicYear):
+        return academic_year
+    if not academic_year:
+        return None
+    return AcademicYear.objects.filter(pk=academic_year).first()
+
+
+def refresh_student_balances(student_ids, academic_year, as_of_date=None):
+    """
+    Recalcule et enregistre les soldes des étudiants donnés pour une année académique.
+
+    Les soldes des étudiants qui ne sont plus concernés par l'année (ni niveau, ni
+    paiement de scolarité) sont supprimés. Retourne le nombre de soldes écrits.
+    """
+    academic_year = _resolve_academic_year(academic_year)
+    student_ids = {student_id for student_id in student_ids if student_id}
+    if not academic_year or not student_ids:
+        return 0
+
+    as_of_date = as_of_date or timezone.localdate()
+    students = list(
+        _balance_students_queryset(academic_year).filter(pk__in=student_ids).only('pk', 'program')
+    )
+    statuses = compute_financial_status(students, academic_year=academic_year, as_of_date=as_of_date)
+    existing = {
+        balance.student_id: balance
+        for balance in StudentBalance.objects.filter(academic_year=academic_year, student_id__in=student_ids)
+    }
+
+    to_create = []
+    to_update = []
+    for student_id, financial_status in statuses.items():
+        current_level = financial_status['current_level']
+        values = {
+            'level_id': current_level.level_id if current_level else None,
+            'total_amount_due': financial_status['total_amount_due'],
+            'amount_paid': financial_status['amount_paid'],
+            'remaining_amount': financial_status['remaining_amount'],
+            'due_amount': financial_status['due_amount'],
+            'overdue_amount': financial_status['overdue_amount'],
+            'status': financial_status['status'],
+            'computed_for': as_of_date,
+            'next_due_date': financial_status['next_due_date'],
+        }
+        balance = existing.get(student_id)
+        if balance is None:
+            to_create.append(StudentBalance(student_id=student_id, academic_year=academic_year, **values))
+            continue
+        for field_name, value in values.items():
+            setattr(balance, field_name, value)
+        to_update.append(balance)
+
+    obsolete_ids = [balance.pk for student_id, balance in existing.items() if student_id not in statuses]
+
+    with transaction.atomic(), suspend_audit():
+        if obsolete_ids:
+            StudentBalance.objects.filter(pk__in=obsolete_ids).delete()
+        StudentBalance.objects.bulk_create(to_create, batch_size=BALANCE_BATCH_SIZE)
+        StudentBalance.objects.bulk_update(to_update, BALANCE_FIELDS, batch_size=BALANCE_BATCH_SIZE)
+
+    return len(to_create) + len(to_update)
+
+
+def refresh_program_balances(program_id, academic_year):
+    """Recalcule les soldes de tous les étudiants d'un programme sur une année."""
+    academic_year = _resolve_academic_year(academic_year)
+    if not program_id or not academic_year:
+        return 0
+
+    student_ids = set(
+        _balance_students_queryset(academic_year).filter(program_id=program_id).values_list('pk', flat=True)
+    )
+    student_ids.update(
+        StudentBalance.objects.filter(
+            academic_year=academic_year,
+            student__program_id=program_id,
+        ).values_list('student_id', flat=True)
+    )
+    return refresh_student_balances(student_ids, academic_year)
+
+
+def ensure_student_balances(academic_year, as_of_date=None):
+    """
+    Met le registre d'une année à jour avant lecture.
+
+    Crée les soldes manquants (étudiants inscrits sans ligne) et recalcule ceux dont une
+    tranche est arrivée à échéance depuis le dernier calcul.
+    """
+    academic_year = _resolve_academic_year(academic_year)
+    if not academic_year:
+        return 0
+
+    as_of_date = as_of_date or timezone.localdate()
+    stale_ids = _due_balance_student_ids(academic_year, as_of_date)
+    stale_ids.update(
+        _balance_students_queryset(academic_year).filter(
+            status='registered',
+            deleted_at__isnull=True,
+        ).exclude(
+            Exists(StudentBalance.objects.filter(student_id=OuterRef('pk'), academic_year=academic_year))
+        ).values_list('pk', flat=True)
+    )
+    return refresh_student_balances(stale_ids, academic_year, as_of_date=as_of_date)
+
+
+def refresh_due_student_balances(academic_year, as_of_date=None):
+    """
+    Recalcule les seuls soldes dont une tranche est arrivée à échéance depuis le dernier calcul.
+
+    Lecture indexée sans écriture tant qu'aucune échéance n'est passée : appelée avant
+    l'affichage des soldes, elle fait passer les étudiants « à jour » en « en retard » le
+    jour même de l'échéance.
+    """
+    academic_year = _resolve_academic_year(academic_year)
+    if not academic_year:
+        return 0
+
+    as_of_date = as_of_date or timezone.localdate()
+    stale_ids = _due_balance_student_ids(academic_year, as_of_date)
+    if not stale_ids:
+        return 0
+    return refresh_student_balances(stale_ids, academic_year, as_of_date=as_of_date)
+
+
+def _due_balance_student_ids(academic_year, as_of_date):
+    return set(
+        StudentBalance.objects.filter(
+            academic_year=academic_year,
+        ).filter(
+            Q(next_due_date__lte=as_of_date) | Q(computed_for__gt=as_of_date)
+        ).values_list('student_id', flat=True)
+    )
+
+
+def rebuild_student_balances(academic_year=None):
+    """Reconstruit intégralement le registre des soldes (toutes les années par défaut)."""
+    academic_years = [academic_year] if academic_year else list(AcademicYear.objects.all())
+    total = 0
+    for year in academic_years:
+        year = _resolve_academic_year(year)
+        if not year:
+            continue
+        student_ids = set(_balance_students_queryset(year).values_list('pk', flat=True))
+        student_ids.update(
+            StudentBalance.objects.filter(academic_year=year).values_list('student_id', flat=True)
+        )
+        total += refresh_student_balances(student_ids, year)
+    return total
+
+
+def schedule_student_balance_refresh(student_ids, academic_year_id):
+    """Planifie le recalcul des soldes après validation de la transaction courante."""
+    student_ids = [student_id for student_id in student_ids if student_id]
+    if not student_ids or not academic_year_id:
+        return
+    transaction.on_commit(lambda: refresh_student_balances(student_ids, academic_year_id))
+
+
+def schedule_program_balance_refresh(program_id, academic_year_id):
+    """Planifie le recalcul des soldes d'un programme après validation de la transaction."""
+    if not program_id or not academic_year_id:
+        return
+    transaction.on_commit(lambda: refresh_program_balances(program_id, academic_year_id))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic.models import AcademicYear
+from payments.balances import ensure_student_balances, rebuild_student_balances
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit intégralement le registre des soldes étudiants (StudentBalance). "
+        "Avec --stale, ne recalcule que les soldes manquants ou dont une tranche est arrivée "
+        "à échéance (à planifier chaque jour)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--academic-year',
+            type=int,
+            help="Identifiant de l'année académique à reconstruire (toutes les années par défaut).",
+        )
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help="Ne recalcule que les soldes manquants ou arrivés à échéance.",
+        )
+
+    def handle(self, *args, **options):
+        academic_year = None
+        academic_year_id = options.get('academic_year')
+        if academic_year_id:
+            academic_year = AcademicYear.objects.filter(pk=academic_year_id).first()
+            if not academic_year:
+                raise CommandError(f"Année académique introuvable : {academic_year_id}")
+
+        if options['stale']:
+            academic_years = [academic_year] if academic_year else AcademicYear.objects.all()
+            count = sum(ensure_student_balances(year) for year in academic_years)
+        else:
+            count = rebuild_student_balances(academic_year)
+        self.stdout.write(self.style.SUCCESS(f"{count} solde(s) étudiant(s) recalculé(s)."))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_alter_studentmetadata_acte_naissance_and_more'),
+        ('academic', '0008_alter_subject_options_alter_course_subject'),
+        ('payments', '0004_payment_group_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount_due', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Montant total dû')),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Montant payé')),
+                ('remaining_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Reste à payer')),
+                ('due_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Montant échu')),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Montant échu non réglé')),
+                ('status', models.CharField(choices=[('up_to_date', 'À jour'), ('overdue', 'En retard')], default='up_to_date', max_length=20, verbose_name='Statut')),
+                ('computed_for', models.DateField(verbose_name='Calculé à la date du')),
+                ('next_due_date', models.DateField(blank=True, help_text='Date à partir de laquelle le solde doit être recalculé (prochaine tranche à échoir).', null=True, verbose_name='Prochaine échéance')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_balances', to='academic.academicyear', verbose_name='Année académique')),
+                ('level', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='student_balances', to='academic.level', verbose_name='Niveau retenu')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='students.student', verbose_name='Étudiant')),
+            ],
+            options={
+                'verbose_name': 'Solde étudiant',
+                'verbose_name_plural': 'Soldes étudiants',
+                'indexes': [models.Index(fields=['academic_year', 'status'], name='payments_st_academi_a6103a_idx'), models.Index(fields=['academic_year', 'next_due_date'], name='payments_st_academi_4488b2_idx')],
+                'unique_together': {('student', 'academic_year')},
+            },
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.utils import timezone
 from academic.models import AcademicYear, Level, Program
 from students.models import Student
 from accounts.models import BaseUser
+from main.models import ReferenceSequence
 
 
 class PaymentInstallment(models.Model):
@@ -82,29 +83,42 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
 
     @classmethod
-    def _generate_sequenced_reference(cls, field_name, prefix):
+    def _get_last_sequence(cls, field_name, prefix):
+        """Dernière séquence déjà utilisée pour le préfixe (reprise des références existantes)."""
         last_value = cls.objects.filter(
             **{f'{field_name}__startswith': prefix},
         ).order_by(f'-{field_name}').values_list(field_name, flat=True).first()
 
-        next_sequence = 1
-        if last_value:
-            try:
-                next_sequence = int(last_value.rsplit('-', 1)[-1]) + 1
-            except (TypeError, ValueError):
-                next_sequence = cls.objects.filter(**{f'{field_name}__startswith': prefix}).count() + 1
+        if not last_value:
+            return 0
+        try:
+            return int(last_value.rsplit('-', 1)[-1])
+        except (TypeError, ValueError):
+            return cls.objects.filter(**{f'{field_name}__startswith': prefix}).count()
 
-        return f"{prefix}{next_sequence:04d}"
+    @classmethod
+    def _reserve_sequenced_references(cls, field_name, prefix, count=1):
+        sequences = ReferenceSequence.allocate(
+            prefix,
+            count=count,
+            initial=lambda: cls._get_last_sequence(field_name, prefix),
+        )
+        return [f"{prefix}{sequence:04d}" for sequence in sequences]
 
     @classmethod
-    def generate_transaction_id(cls):
+    def reserve_transaction_ids(cls, count):
+        """Réserve ``count`` identifiants de transaction en une seule allocation (imports en masse)."""
         date_part = timezone.localdate().strftime('%Y%m%d')
-        return cls._generate_sequenced_reference('transaction_id', f"PAY-{date_part}-")
+        return cls._reserve_sequenced_references('transaction_id', f"PAY-{date_part}-", count=count)
+
+    @classmethod
+    def generate_transaction_id(cls):
+        return cls.reserve_transaction_ids(1)[0]
 
     @classmethod
     def generate_group_reference(cls):
         date_part = timezone.localdate().strftime('%Y%m%d')
-        return cls._generate_sequenced_reference('group_reference', f"GRP-{date_part}-")
+        return cls._reserve_sequenced_references('group_reference', f"GRP-{date_part}-")[0]
 
     def save(self, *args, **kwargs):
         if not self.transaction_id:
@@ -122,4 +136,48 @@ class Payment(models.Model):
     class Meta:
         verbose_name = "Paiement"
         verbose_name_plural = "Paiements"
-        ordering = ['-payment_date']
\ No newline at end of file
+        ordering = ['-payment_date']
+
+class StudentBalance(models.Model):
+    """
+    Solde dénormalisé de la scolarité d'un étudiant pour une année académique.
+
+    Maintenu de façon incrémentale à chaque écriture de paiement, de tranche ou de niveau
+    étudiant (voir ``payments.signals``) et reconstructible via la commande
+    ``rebuild_student_balances``.
+    """
+
+    STATUS_CHOICES = [
+        ('up_to_date', 'À jour'),
+        ('overdue', 'En retard'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='balances', verbose_name="Étudiant")
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name='student_balances', verbose_name="Année académique")
+    level = models.ForeignKey(Level, null=True, blank=True, on_delete=models.SET_NULL, related_name='student_balances', verbose_name="Niveau retenu")
+    total_amount_due = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Montant total dû")
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Montant payé")
+    remaining_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Reste à payer")
+    due_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Montant échu")
+    overdue_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Montant échu non réglé")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='up_to_date', verbose_name="Statut")
+    computed_for = models.DateField(verbose_name="Calculé à la date du")
+    next_due_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Prochaine échéance",
+        help_text="Date à partir de laquelle le solde doit être recalculé (prochaine tranche à échoir).",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    def __str__(self):
+        return f"Solde {self.student_id} - {self.academic_year_id} ({self.remaining_amount} FCFA)"
+
+    class Meta:
+        verbose_name = "Solde étudiant"
+        verbose_name_plural = "Soldes étudiants"
+        unique_together = ['student', 'academic_year']
+        indexes = [
+            models.Index(fields=['academic_year', 'status']),
+            models.Index(fields=['academic_year', 'next_due_date']),
+        ]
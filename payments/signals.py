@@ -0,0 +1,91 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from payments.balances import (
+    rebuild_student_balances,
+    schedule_program_balance_refresh,
+    schedule_student_balance_refresh,
+)
+from payments.models import Payment, PaymentInstallment, StudentBalance
+from students.models import Student, StudentLevel
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=StudentLevel)
+def capture_previous_balance_key(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+
+    # Étudiant et année avant modification : l'ancien solde doit aussi être recalculé.
+    instance._previous_balance_key = sender.objects.filter(pk=instance.pk).values_list(
+        'student_id', 'academic_year_id'
+    ).first()
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_balance_on_payment_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    _refresh_balance_keys(instance)
+
+
+@receiver(post_save, sender=PaymentInstallment)
+@receiver(post_delete, sender=PaymentInstallment)
+def refresh_balances_on_installment_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    schedule_program_balance_refresh(instance.program_id, instance.academic_year_id)
+
+
+@receiver(post_save, sender=StudentLevel)
+@receiver(post_delete, sender=StudentLevel)
+def refresh_balance_on_student_level_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    _refresh_balance_keys(instance)
+
+
+@receiver(pre_save, sender=Student)
+def capture_previous_student_program(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+
+    instance._previous_program_id = sender.objects.filter(pk=instance.pk).values_list('program_id', flat=True).first()
+
+
+@receiver(post_save, sender=Student)
+def refresh_balances_on_program_change(sender, instance, created=False, raw=False, **kwargs):
+    previous_program_id = instance.__dict__.pop('_previous_program_id', None)
+    if raw or created or previous_program_id == instance.program_id:
+        return
+
+    # Les tranches dépendent du programme : tous les soldes de l'étudiant sont à revoir.
+    academic_year_ids = set(
+        StudentLevel.objects.filter(student_id=instance.pk, academic_year__isnull=False)
+        .values_list('academic_year_id', flat=True)
+    )
+    academic_year_ids.update(StudentBalance.objects.filter(student_id=instance.pk).values_list('academic_year_id', flat=True))
+    for academic_year_id in academic_year_ids:
+        schedule_student_balance_refresh([instance.pk], academic_year_id)
+
+
+def _refresh_balance_keys(instance):
+    keys = {(instance.student_id, instance.academic_year_id)}
+    previous_key = instance.__dict__.pop('_previous_balance_key', None)
+    if previous_key:
+        keys.add(previous_key)
+    for student_id, academic_year_id in keys:
+        schedule_student_balance_refresh([student_id], academic_year_id)
+
+
+def backfill_student_balances(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Construit le registre des soldes après ``migrate`` tant qu'il est vide (premier déploiement)."""
+    if using != DEFAULT_DB_ALIAS or StudentBalance.objects.exists():
+        return
+
+    rebuild_student_balances()
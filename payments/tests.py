@@ -1,13 +1,19 @@
+import zipfile
 from datetime import date, datetime
 from decimal import Decimal
+from io import BytesIO, StringIO
 
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
 
 from academic.models import AcademicYear, Level, Program
 from accounts.models import BaseUser
-from payments.models import Payment, PaymentInstallment
+from payments.balances import compute_financial_status, ensure_student_balances, refresh_due_student_balances
+from payments.models import Payment, PaymentInstallment, StudentBalance
+from payments.signals import backfill_student_balances
 from students.models import Student, StudentLevel
 
 
@@ -473,3 +479,436 @@ class PaymentListViewTests(TestCase):
         self.assertContains(response, "Flux d'inscription définitive en cours")
         self.assertContains(response, 'name="registration_flow" value="1"')
         self.assertContains(response, "Payer et finaliser l'inscription")
+
+
+class PaymentTabularExportTests(TestCase):
+    def setUp(self):
+        self.user = BaseUser.objects.create_user(username='scholar_exports', password='testpass123', role='scholar')
+        self.client.force_login(self.user)
+
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1),
+            end_at=date(2025, 6, 30),
+            is_active=True,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            level = Level.objects.create(name='Licence 1')
+            self.program = Program.objects.create(name='Informatique')
+            self.other_program = Program.objects.create(name='Gestion')
+            installment = PaymentInstallment.objects.create(
+                program=self.program,
+                academic_year=self.academic_year,
+                level=level,
+                name='Tranche 1',
+                order_number=1,
+                amount=50000,
+                due_date=date(2024, 10, 15),
+            )
+            student = Student.objects.create(
+                matricule='PAY001', firstname='Jean', lastname='Dupont', status='registered', program=self.program,
+            )
+            other_student = Student.objects.create(
+                matricule='PAY002', firstname='Alice', lastname='Ngono', status='registered', program=self.other_program,
+            )
+            for each in (student, other_student):
+                StudentLevel.objects.create(student=each, level=level, academic_year=self.academic_year, is_active=True)
+
+            self.payment = Payment.objects.create(
+                student=student,
+                installment=installment,
+                academic_year=self.academic_year,
+                category='inscription',
+                author=self.user,
+                amount_paid=25000,
+                payment_date=date(2024, 1, 10),
+                receipt_number='REC001',
+                source='cash',
+            )
+            Payment.objects.create(
+                student=other_student,
+                academic_year=self.academic_year,
+                category='frais_scolarite',
+                author=self.user,
+                amount_paid=45000,
+                payment_date=date(2024, 2, 5),
+                receipt_number='REC002',
+                source='mobile_money',
+            )
+
+    def test_payments_export_streams_filtered_rows_as_csv(self):
+        response = self.client.get(reverse('payments:payments_export', args=['csv']), {
+            'program': self.program.pk,
+            'date_from': '2024-01-01',
+            'date_to': '2024-01-31',
+            'cursor': 'ignoré',
+        })
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('attachment; filename="paiements_', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0].split(';')[:3], ['Date', 'Matricule', 'Prénom'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('10/01/2024;PAY001;Jean;Dupont;Informatique;Tranche 1', lines[1])
+        self.assertIn('REC001', lines[1])
+
+    def test_payments_export_xlsx_is_a_valid_workbook(self):
+        Payment.objects.filter(pk=self.payment.pk).update(receipt_number='=HYPERLINK("x")')
+
+        response = self.client.get(reverse('payments:payments_export', args=['xlsx']))
+
+        self.assertEqual(
+            response['Content-Type'],
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertIn('[Content_Types].xml', workbook.namelist())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row '), 3)
+        self.assertIn('<v>45000', sheet)
+        # Texte en ligne, jamais évalué comme formule : conservé sans apostrophe.
+        self.assertIn('<t xml:space="preserve">=HYPERLINK("x")</t>', sheet)
+        self.assertNotIn('<f>', sheet)
+
+    def test_payments_export_rejects_unknown_format(self):
+        response = self.client.get(reverse('payments:payments_export', args=['pdf']))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_payment_status_export_honours_list_filters(self):
+        response = self.client.get(
+            reverse('payments:payment_status_export', args=['csv']),
+            {'academic_year': self.academic_year.pk, 'program': self.other_program.pk},
+        )
+
+        rows = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(rows[0].split(';')[:2], ['Matricule', 'Prénom'])
+        self.assertEqual([row.split(';')[0] for row in rows[1:]], ['PAY002'])
+
+
+class FinancialStatusEngineTests(TestCase):
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1),
+            end_at=date(2025, 6, 30),
+            is_active=True,
+        )
+        self.program = Program.objects.create(name='Informatique')
+        self.level = Level.objects.create(name='Licence 1', academic_order=1)
+        self.other_level = Level.objects.create(name='Licence 2', academic_order=2)
+
+        PaymentInstallment.objects.create(
+            program=self.program,
+            academic_year=self.academic_year,
+            level=self.level,
+            name='Tranche 1',
+            order_number=1,
+            amount=Decimal('50000'),
+            due_date=date(2024, 10, 15),
+        )
+        PaymentInstallment.objects.create(
+            program=self.program,
+            academic_year=self.academic_year,
+            level=self.level,
+            name='Tranche 2',
+            order_number=2,
+            amount=Decimal('40000'),
+            due_date=date(2025, 1, 15),
+        )
+        PaymentInstallment.objects.create(
+            program=self.program,
+            academic_year=self.academic_year,
+            level=self.other_level,
+            name='Tranche unique',
+            order_number=1,
+            amount=Decimal('120000'),
+            due_date=date(2024, 10, 15),
+        )
+
+        self.students = []
+        for index in range(6):
+            student = Student.objects.create(
+                matricule=f'BAL{index:03d}',
+                firstname='Etudiant',
+                lastname=f'Numero {index}',
+                status='registered',
+                program=self.program,
+            )
+            StudentLevel.objects.create(
+                student=student,
+                level=self.level if index % 2 == 0 else self.other_level,
+                academic_year=self.academic_year,
+                is_active=True,
+            )
+            self.students.append(student)
+
+        Payment.objects.create(
+            student=self.students[0],
+            academic_year=self.academic_year,
+            category='frais_scolarite',
+            amount_paid=Decimal('50000'),
+            payment_date=date(2024, 10, 1),
+        )
+        Payment.objects.create(
+            student=self.students[1],
+            academic_year=self.academic_year,
+            category='frais_scolarite',
+            amount_paid=Decimal('20000'),
+            payment_date=date(2024, 10, 1),
+        )
+
+    def test_compute_financial_status_uses_constant_query_count(self):
+        with self.assertNumQueries(3):
+            statuses = compute_financial_status(
+                self.students,
+                academic_year=self.academic_year,
+                as_of_date=date(2024, 11, 1),
+            )
+
+        self.assertEqual(len(statuses), len(self.students))
+
+        up_to_date = statuses[self.students[0].pk]
+        self.assertEqual(up_to_date['total_amount_due'], Decimal('90000'))
+        self.assertEqual(up_to_date['amount_paid'], Decimal('50000'))
+        self.assertEqual(up_to_date['remaining_amount'], Decimal('40000'))
+        self.assertEqual(up_to_date['overdue_amount'], Decimal('0.00'))
+        self.assertEqual(up_to_date['status'], 'up_to_date')
+        self.assertEqual(up_to_date['current_level'].level, self.level)
+
+        overdue = statuses[self.students[1].pk]
+        self.assertEqual(overdue['total_amount_due'], Decimal('120000'))
+        self.assertEqual(overdue['overdue_amount'], Decimal('100000'))
+        self.assertEqual(overdue['status'], 'overdue')
+
+    def test_student_get_financial_status_matches_batch_engine(self):
+        as_of_date = date(2025, 2, 1)
+        statuses = compute_financial_status(
+            self.students,
+            academic_year=self.academic_year,
+            as_of_date=as_of_date,
+        )
+
+        for student in self.students:
+            self.assertEqual(
+                student.get_financial_status(academic_year=self.academic_year, as_of_date=as_of_date),
+                statuses[student.pk],
+            )
+
+    def test_compute_financial_status_returns_empty_mapping_without_academic_year(self):
+        self.academic_year.is_active = False
+        self.academic_year.save()
+
+        self.assertEqual(compute_financial_status(self.students), {})
+        self.assertIsNone(self.students[0].get_financial_status())
+
+
+class StudentBalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1),
+            end_at=date(2025, 6, 30),
+            is_active=True,
+        )
+        self.program = Program.objects.create(name='Informatique')
+        self.level = Level.objects.create(name='Licence 1', academic_order=1)
+        self.student = Student.objects.create(
+            matricule='LED001',
+            firstname='Paul',
+            lastname='Mbarga',
+            status='registered',
+            program=self.program,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentLevel.objects.create(
+                student=self.student,
+                level=self.level,
+                academic_year=self.academic_year,
+                is_active=True,
+            )
+            self.installment = PaymentInstallment.objects.create(
+                program=self.program,
+                academic_year=self.academic_year,
+                level=self.level,
+                name='Tranche 1',
+                order_number=1,
+                amount=Decimal('60000'),
+                due_date=timezone.localdate() + timezone.timedelta(days=10),
+            )
+
+    def _get_balance(self):
+        return StudentBalance.objects.get(student=self.student, academic_year=self.academic_year)
+
+    def test_student_level_and_installment_writes_create_balance(self):
+        balance = self._get_balance()
+
+        self.assertEqual(balance.level, self.level)
+        self.assertEqual(balance.total_amount_due, Decimal('60000'))
+        self.assertEqual(balance.remaining_amount, Decimal('60000'))
+        self.assertEqual(balance.status, 'up_to_date')
+        self.assertEqual(balance.next_due_date, self.installment.due_date)
+
+    def test_payment_save_and_delete_update_balance_incrementally(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = Payment.objects.create(
+                student=self.student,
+                installment=self.installment,
+                academic_year=self.academic_year,
+                category='frais_scolarite',
+                amount_paid=Decimal('45000'),
+                payment_date=timezone.localdate(),
+            )
+
+        balance = self._get_balance()
+        self.assertEqual(balance.amount_paid, Decimal('45000'))
+        self.assertEqual(balance.remaining_amount, Decimal('15000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.delete()
+
+        self.assertEqual(self._get_balance().amount_paid, Decimal('0'))
+
+    def test_installment_update_refreshes_program_balances(self):
+        self.installment.amount = Decimal('80000')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.installment.save()
+
+        self.assertEqual(self._get_balance().total_amount_due, Decimal('80000'))
+
+    def test_ensure_student_balances_recomputes_balances_once_installment_is_due(self):
+        self.assertEqual(self._get_balance().status, 'up_to_date')
+
+        ensure_student_balances(self.academic_year, as_of_date=self.installment.due_date)
+
+        balance = self._get_balance()
+        self.assertEqual(balance.status, 'overdue')
+        self.assertEqual(balance.overdue_amount, Decimal('60000'))
+        self.assertIsNone(balance.next_due_date)
+
+    def test_due_balances_are_refreshed_once_when_read(self):
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        PaymentInstallment.objects.filter(pk=self.installment.pk).update(due_date=yesterday)
+        StudentBalance.objects.update(next_due_date=yesterday)
+
+        self.assertEqual(refresh_due_student_balances(self.academic_year), 1)
+        self.assertEqual(self._get_balance().status, 'overdue')
+        self.assertEqual(refresh_due_student_balances(self.academic_year), 0)
+
+    def test_migrate_backfills_an_empty_ledger(self):
+        StudentBalance.objects.all().delete()
+
+        backfill_student_balances(sender=None)
+
+        self.assertEqual(self._get_balance().total_amount_due, Decimal('60000'))
+
+    def test_moving_a_payment_to_another_student_refreshes_both_balances(self):
+        other_student = Student.objects.create(
+            matricule='LED002', firstname='Anne', lastname='Abena', status='registered', program=self.program,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentLevel.objects.create(
+                student=other_student, level=self.level, academic_year=self.academic_year, is_active=True,
+            )
+            payment = Payment.objects.create(
+                student=self.student,
+                installment=self.installment,
+                academic_year=self.academic_year,
+                category='frais_scolarite',
+                amount_paid=Decimal('45000'),
+                payment_date=timezone.localdate(),
+            )
+
+        payment.student = other_student
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+
+        self.assertEqual(self._get_balance().amount_paid, Decimal('0'))
+        self.assertEqual(
+            StudentBalance.objects.get(student=other_student, academic_year=self.academic_year).amount_paid,
+            Decimal('45000'),
+        )
+
+    def test_student_program_change_refreshes_balances(self):
+        other_program = Program.objects.create(name='Gestion')
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentInstallment.objects.create(
+                program=other_program,
+                academic_year=self.academic_year,
+                level=self.level,
+                name='Tranche 1',
+                order_number=1,
+                amount=Decimal('90000'),
+                due_date=timezone.localdate() + timezone.timedelta(days=10),
+            )
+
+        self.student.program = other_program
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+
+        self.assertEqual(self._get_balance().total_amount_due, Decimal('90000'))
+
+    def test_rebuild_command_stale_option_creates_missing_balances(self):
+        StudentBalance.objects.all().delete()
+
+        call_command('rebuild_student_balances', '--stale', stdout=StringIO())
+
+        self.assertEqual(self._get_balance().total_amount_due, Decimal('60000'))
+
+    def test_rebuild_command_recreates_missing_balances(self):
+        StudentBalance.objects.all().delete()
+
+        call_command('rebuild_student_balances', stdout=StringIO())
+
+        self.assertEqual(self._get_balance().total_amount_due, Decimal('60000'))
+
+
+class PaymentReferenceSequenceTests(TestCase):
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1),
+            end_at=date(2025, 6, 30),
+            is_active=True,
+        )
+        self.student = Student.objects.create(
+            matricule='REF001',
+            firstname='Marie',
+            lastname='Atangana',
+            status='registered',
+        )
+        self.date_part = timezone.localdate().strftime('%Y%m%d')
+
+    def _create_payment(self, **kwargs):
+        return Payment.objects.create(
+            student=self.student,
+            academic_year=self.academic_year,
+            category='inscription',
+            amount_paid=Decimal('1000'),
+            payment_date=timezone.localdate(),
+            **kwargs,
+        )
+
+    def test_transaction_ids_are_sequenced_per_day(self):
+        first = self._create_payment()
+        second = self._create_payment()
+
+        self.assertEqual(first.transaction_id, f'PAY-{self.date_part}-0001')
+        self.assertEqual(second.transaction_id, f'PAY-{self.date_part}-0002')
+
+    def test_sequence_resumes_after_existing_transaction_ids(self):
+        self._create_payment(transaction_id=f'PAY-{self.date_part}-0041')
+
+        self.assertEqual(Payment.generate_transaction_id(), f'PAY-{self.date_part}-0042')
+
+    def test_reserve_transaction_ids_allocates_a_block(self):
+        reserved = Payment.reserve_transaction_ids(500)
+
+        self.assertEqual(len(set(reserved)), 500)
+        self.assertEqual(reserved[0], f'PAY-{self.date_part}-0001')
+        self.assertEqual(reserved[-1], f'PAY-{self.date_part}-0500')
+        self.assertEqual(Payment.generate_transaction_id(), f'PAY-{self.date_part}-0501')
+
+    def test_group_references_use_their_own_sequence(self):
+        self._create_payment()
+
+        self.assertEqual(Payment.generate_group_reference(), f'GRP-{self.date_part}-0001')
+        self.assertEqual(Payment.generate_group_reference(), f'GRP-{self.date_part}-0002')
@@ -5,6 +5,7 @@ from .views import *
 app_name = 'payments'
 urlpatterns = [
     path('', PaymentListView.as_view(), name='payments_list'),
+    path('export/<str:export_format>/', payments_export, name='payments_export'),
     path('create/', payment_create, name='payment_create'),
     path('<int:pk>/', payment_detail, name='payment_detail'),
     path('<int:pk>/recu/', payment_receipt, name='payment_receipt'),
@@ -12,6 +13,7 @@ urlpatterns = [
     path('ajax/installment-summary/', payment_installment_summary, name='payment_installment_summary'),
 
     path('statut-paiement/', PaymentStatusView.as_view(), name='payment_status'),
+    path('statut-paiement/export/<str:export_format>/', PaymentStatusExportView.as_view(), name='payment_status_export'),
     path('statut-paiement/<str:pk>/', PaymentStatusStudentDetailView.as_view(), name='payment_status_student_detail'),
     path('statut-paiement/<str:pk>/releve.pdf', payment_status_student_statement_pdf, name='payment_status_student_statement_pdf'),
 
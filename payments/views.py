@@ -1,4 +1,3 @@
-from collections import defaultdict
 from decimal import Decimal
 from urllib.parse import urlencode
 
@@ -14,14 +13,18 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 
+from payments.balances import refresh_due_student_balances
 from payments.forms import PaymentForm, get_remaining_installments_data
 from students.models import Student, StudentLevel
-from payments.models import Payment, PaymentInstallment
+from payments.models import Payment, PaymentInstallment, StudentBalance
 from academic.models import AcademicYear, Level, Program
 from student_portal.decorators import scholar_admin_required
 from django.utils.decorators import method_decorator
 from main.models import SystemSettings
 from main.pdf_exports import build_student_account_statement_pdf
+from main.pagination import CURSOR_PARAM, KeysetPaginator
+from main.tabular_exports import EXPORT_CHUNK_SIZE, build_export_response
+from search.autocomplete import autocomplete_students
 from payments.utils import (
     amount_to_french_words,
     build_student_financial_statement,
@@ -173,7 +176,8 @@ def _create_remaining_balance_payments(form, author):
     created_payments = []
     with transaction.atomic():
         group_reference = Payment.generate_group_reference() if len(remaining_installments) > 1 else None
-        for item in remaining_installments:
+        transaction_ids = Payment.reserve_transaction_ids(len(remaining_installments)) if remaining_installments else []
+        for item, transaction_id in zip(remaining_installments, transaction_ids):
             created_payments.append(Payment.objects.create(
                 student=student,
                 installment=item['installment'],
@@ -183,6 +187,7 @@ def _create_remaining_balance_payments(form, author):
                 amount_paid=item['remaining_amount'],
                 payment_date=payment_date,
                 receipt_number=receipt_number,
+                transaction_id=transaction_id,
                 source=source,
                 group_reference=group_reference,
             ))
@@ -303,69 +308,88 @@ def _validate_registration_flow_payment(form, flow_context):
         form.add_error('installment', "Veuillez solder au minimum la première tranche requise avant l'inscription définitive.")
 
 
-@method_decorator(scholar_admin_required, name='dispatch')
-class PaymentListView(LoginRequiredMixin, TemplateView):
-    """Vue principale pour la liste des paiements étudiants."""
-    template_name = 'payments/payments.html'
+PAYMENT_EXPORT_HEADERS = (
+    'Date', 'Matricule', 'Prénom', 'Nom', 'Programme', 'Tranche', 'Année académique', 'Catégorie', 'Source',
+    'Montant payé', 'N° de reçu', 'Transaction', 'Référence de groupe',
+)
+PAYMENT_STATUS_EXPORT_HEADERS = (
+    'Matricule', 'Prénom', 'Nom', 'Programme', 'Niveau', 'Année académique', 'Montant total dû', 'Montant payé',
+    'Restant à payer', 'Montant en retard', 'Statut',
+)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['page_title'] = 'Paiements'
 
-        payments = Payment.objects.select_related(
-            'student', 'student__program', 'installment', 'installment__program', 'academic_year', 'author'
-        ).all().order_by('-payment_date', '-created_at')
-
-        search = (self.request.GET.get('search') or '').strip()
-        academic_year_id = self.request.GET.get('academic_year')
-        program_id = self.request.GET.get('program')
-        installment_id = self.request.GET.get('installment')
-        category = self.request.GET.get('category')
-        source = self.request.GET.get('source')
-        date_from = (self.request.GET.get('date_from') or '').strip()
-        date_to = (self.request.GET.get('date_to') or '').strip()
-
-        # Utiliser l'année active par défaut si aucun filtre n'est fourni
-        selected_academic_year = None
-        if academic_year_id:
-            selected_academic_year = AcademicYear.objects.filter(pk=academic_year_id).first()
-        else:
-            selected_academic_year = AcademicYear.get_active_year()
+def _get_filtered_payments(params):
+    """
+    Paiements filtrés selon les paramètres GET de la liste, et année académique retenue
+    (l'année active si aucune n'est demandée).
+    """
+    payments = Payment.objects.select_related(
+        'student', 'student__program', 'installment', 'installment__program', 'academic_year', 'author'
+    ).all().order_by('-payment_date', '-created_at')
+
+    search = (params.get('search') or '').strip()
+    academic_year_id = params.get('academic_year')
+    program_id = params.get('program')
+    installment_id = params.get('installment')
+    category = params.get('category')
+    source = params.get('source')
+    date_from = (params.get('date_from') or '').strip()
+    date_to = (params.get('date_to') or '').strip()
+
+    # Utiliser l'année active par défaut si aucun filtre n'est fourni
+    selected_academic_year = None
+    if academic_year_id:
+        selected_academic_year = AcademicYear.objects.filter(pk=academic_year_id).first()
+    else:
+        selected_academic_year = AcademicYear.get_active_year()
+
+    if search:
+        payments = payments.filter(
+            models.Q(student__matricule__icontains=search)
+            | models.Q(student__firstname__icontains=search)
+            | models.Q(student__lastname__icontains=search)
+            | models.Q(receipt_number__icontains=search)
+            | models.Q(transaction_id__icontains=search)
+            | models.Q(group_reference__icontains=search)
+        )
 
-        if search:
-            payments = payments.filter(
-                models.Q(student__matricule__icontains=search)
-                | models.Q(student__firstname__icontains=search)
-                | models.Q(student__lastname__icontains=search)
-                | models.Q(receipt_number__icontains=search)
-                | models.Q(transaction_id__icontains=search)
-                | models.Q(group_reference__icontains=search)
-            )
+    if selected_academic_year:
+        payments = payments.filter(academic_year=selected_academic_year)
 
-        if selected_academic_year:
-            payments = payments.filter(academic_year=selected_academic_year)
+    if program_id:
+        payments = payments.filter(student__program_id=program_id)
 
-        if program_id:
-            payments = payments.filter(student__program_id=program_id)
+    if installment_id:
+        payments = payments.filter(installment_id=installment_id)
+
+    if category:
+        payments = payments.filter(category=category)
+
+    if source:
+        payments = payments.filter(source=source)
+
+    # payment_date est une DateField : comparaison directe, sans transformation __date.
+    if date_from:
+        payments = payments.filter(payment_date__gte=date_from)
 
-        if installment_id:
-            payments = payments.filter(installment_id=installment_id)
+    if date_to:
+        payments = payments.filter(payment_date__lte=date_to)
 
-        if category:
-            payments = payments.filter(category=category)
+    return payments, selected_academic_year
 
-        if source:
-            payments = payments.filter(source=source)
 
-        if date_from:
-            payments = payments.filter(payment_date__date__gte=date_from)
+@method_decorator(scholar_admin_required, name='dispatch')
+class PaymentListView(LoginRequiredMixin, TemplateView):
+    """Vue principale pour la liste des paiements étudiants."""
+    template_name = 'payments/payments.html'
 
-        if date_to:
-            payments = payments.filter(payment_date__date__lte=date_to)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Paiements'
+
+        payments, selected_academic_year = _get_filtered_payments(self.request.GET)
 
-        filtered_payments_count = payments.count()
         per_page = self.request.GET.get('per_page', 10)
-        page = self.request.GET.get('page', 1)
 
         try:
             per_page = int(per_page)
@@ -374,17 +398,16 @@ class PaymentListView(LoginRequiredMixin, TemplateView):
         except (TypeError, ValueError):
             per_page = 10
 
-        paginator = Paginator(payments, per_page)
-        page_obj = paginator.get_page(page)
+        page_obj = KeysetPaginator(payments, per_page).get_page(self.request.GET.get(CURSOR_PARAM))
 
         has_filter = any(
-            value for key, value in self.request.GET.items() if key not in {'page', 'per_page'}
+            value for key, value in self.request.GET.items() if key not in {'page', 'per_page', CURSOR_PARAM}
         )
 
         context.update({
             'payments': page_obj.object_list,
             'page_obj': page_obj,
-            'filtered_payments_count': filtered_payments_count,
+            'filtered_payments_count': page_obj.paginator.count,
             'has_filter': has_filter,
             'per_page': per_page,
             'per_page_choices': [5, 10, 25, 50, 100],
@@ -400,6 +423,40 @@ class PaymentListView(LoginRequiredMixin, TemplateView):
         return context
 
 
+@scholar_admin_required
+def payments_export(request, export_format):
+    """Export CSV/XLSX des paiements avec les filtres de ``PaymentListView``."""
+    payments, _ = _get_filtered_payments(request.GET)
+    academic_years = {year.pk: str(year) for year in AcademicYear.objects.all()}
+    categories = dict(Payment.PAYMENTS_CATEGORIES)
+    sources = dict(Payment.PAYMENT_SOURCES)
+
+    fields = (
+        'payment_date', 'student__matricule', 'student__firstname', 'student__lastname', 'student__program__name',
+        'installment__name', 'academic_year_id', 'category', 'source', 'amount_paid', 'receipt_number',
+        'transaction_id', 'group_reference',
+    )
+    rows = (
+        (
+            payment['payment_date'],
+            payment['student__matricule'],
+            payment['student__firstname'],
+            payment['student__lastname'],
+            payment['student__program__name'],
+            payment['installment__name'],
+            academic_years.get(payment['academic_year_id']),
+            categories.get(payment['category'], payment['category']),
+            sources.get(payment['source'], payment['source']),
+            payment['amount_paid'],
+            payment['receipt_number'],
+            payment['transaction_id'],
+            payment['group_reference'],
+        )
+        for payment in KeysetPaginator(payments, EXPORT_CHUNK_SIZE).iterate(*fields)
+    )
+    return build_export_response(export_format, 'paiements', PAYMENT_EXPORT_HEADERS, rows, 'Paiements')
+
+
 @scholar_admin_required
 def payment_create(request):
     """Vue pour enregistrer un nouveau paiement."""
@@ -566,15 +623,7 @@ def payment_student_search(request):
     if not query:
         return JsonResponse({'results': []})
 
-    students = Student.objects.select_related('program').filter(
-        deleted_at__isnull=True,
-        status='registered',
-    ).filter(
-        models.Q(matricule__icontains=query)
-        | models.Q(firstname__icontains=query)
-        | models.Q(lastname__icontains=query)
-        | models.Q(program__name__icontains=query)
-    ).order_by('matricule')[:10]
+    students = autocomplete_students(query, exclude_deleted=True)
 
     return JsonResponse({
         'results': [
@@ -626,10 +675,7 @@ class PaymentStatusView(LoginRequiredMixin, TemplateView):
     """Vue principale pour la liste des statuts de paiement"""
     template_name = 'payments/payment_status.html'
 
-    STATUS_CHOICES = [
-        ('up_to_date', 'À jour'),
-        ('overdue', 'En retard'),
-    ]
+    STATUS_CHOICES = StudentBalance.STATUS_CHOICES
     PER_PAGE_CHOICES = [10, 25, 50, 100]
 
     def _get_selected_academic_year(self):
@@ -645,177 +691,108 @@ class PaymentStatusView(LoginRequiredMixin, TemplateView):
             return self.PER_PAGE_CHOICES[0]
         return per_page
 
-    @staticmethod
-    def _get_student_level(student):
-        levels = getattr(student, 'payment_status_levels', [])
-        if not levels:
-            return None
-
-        active_level = next((level for level in levels if level.is_active), None)
-        return active_level or levels[0]
-
-    def _build_payment_rows(self, academic_year, search, program_id, level_id, status_filter):
-        if not academic_year:
-            return []
-
-        students = Student.objects.select_related('program').filter(
-            status='registered',
-            deleted_at__isnull=True,
+    def _get_balances_queryset(self, academic_year, search, program_id, level_id, status_filter):
+        refresh_due_student_balances(academic_year)
+        balances = StudentBalance.objects.select_related(
+            'student', 'student__program', 'level', 'academic_year'
         ).filter(
-            models.Q(student_levels__academic_year=academic_year)
-            | models.Q(payments__academic_year=academic_year, payments__category='frais_scolarite')
-        ).distinct()
+            academic_year=academic_year,
+            student__status='registered',
+            student__deleted_at__isnull=True,
+        )
 
         if search:
-            students = students.filter(
-                models.Q(matricule__icontains=search)
-                | models.Q(firstname__icontains=search)
-                | models.Q(lastname__icontains=search)
+            balances = balances.filter(
+                models.Q(student__matricule__icontains=search)
+                | models.Q(student__firstname__icontains=search)
+                | models.Q(student__lastname__icontains=search)
             )
 
         if program_id:
-            students = students.filter(program_id=program_id)
+            balances = balances.filter(student__program_id=program_id)
 
         if level_id:
-            students = students.filter(
-                student_levels__academic_year=academic_year,
-                student_levels__level_id=level_id,
+            balances = balances.filter(
+                models.Exists(StudentLevel.objects.filter(
+                    student_id=models.OuterRef('student_id'),
+                    academic_year=academic_year,
+                    level_id=level_id,
+                ))
             )
 
-        students = list(
-            students.prefetch_related(
-                models.Prefetch(
-                    'student_levels',
-                    queryset=StudentLevel.objects.select_related('level', 'academic_year').filter(
-                        academic_year=academic_year,
-                    ).order_by('-is_active', 'level__academic_order', 'level__name'),
-                    to_attr='payment_status_levels',
-                )
-            ).order_by('lastname', 'firstname', 'matricule')
-        )
+        if status_filter:
+            balances = balances.filter(status=status_filter)
 
-        if not students:
-            return []
+        return balances.order_by('student__lastname', 'student__firstname', 'student__matricule')
 
-        student_ids = [student.pk for student in students]
-        payment_totals = {
-            item['student_id']: (item['total_paid'] or Decimal('0.00'))
-            for item in Payment.objects.filter(
-                student_id__in=student_ids,
-                academic_year=academic_year,
-                category='frais_scolarite',
-            ).values('student_id').annotate(total_paid=models.Sum('amount_paid'))
+    def _build_payment_row(self, balance):
+        student = balance.student
+        academic_year = balance.academic_year
+        return {
+            'student': student,
+            'full_name': f"{student.firstname} {student.lastname}".strip(),
+            'academic_year': academic_year,
+            'level': balance.level,
+            'total_amount_due': balance.total_amount_due,
+            'amount_paid': balance.amount_paid,
+            'remaining_amount': balance.remaining_amount,
+            'overdue_amount': balance.overdue_amount,
+            'status': balance.status,
+            'status_label': balance.get_status_display(),
+            'status_badge_class': 'bg-danger' if balance.status == 'overdue' else 'bg-success',
+            'detail_url': (
+                f"{reverse('payments:payment_status_student_detail', args=[student.matricule])}?"
+                f"{urlencode({'academic_year': academic_year.pk, 'return_url': self.request.get_full_path()})}"
+            ),
         }
 
-        print(payment_totals)
+    def _get_filters(self):
+        status_filter = self.request.GET.get('status') or ''
+        if status_filter not in {choice[0] for choice in self.STATUS_CHOICES}:
+            status_filter = ''
 
-        program_ids = {student.program_id for student in students if student.program_id}
-        level_ids = {
-            current_level.level_id
-            for student in students
-            for current_level in [self._get_student_level(student)]
-            if current_level and current_level.level_id
+        return {
+            'search': (self.request.GET.get('search') or '').strip(),
+            'program_id': self.request.GET.get('program') or '',
+            'level_id': self.request.GET.get('level') or '',
+            'status_filter': status_filter,
         }
 
-        installment_queryset = PaymentInstallment.objects.filter(
-            deleted_at__isnull=True,
-            academic_year=academic_year,
-            program_id__in=program_ids,
-        ).select_related('program', 'level').order_by('order_number', 'name', 'pk')
-
-        if level_ids:
-            installment_queryset = installment_queryset.filter(
-                models.Q(level_id__in=level_ids) | models.Q(level__isnull=True)
-            )
-        else:
-            installment_queryset = installment_queryset.filter(level__isnull=True)
-
-        installments_by_key = defaultdict(list)
-        for installment in installment_queryset:
-            installments_by_key[(installment.program_id, installment.level_id)].append(installment)
-
-        today = timezone.localdate()
-        rows = []
-
-        for student in students:
-            current_level = self._get_student_level(student)
-            current_level_id = current_level.level_id if current_level else None
-
-            installments = installments_by_key.get((student.program_id, current_level_id))
-            if not installments:
-                installments = installments_by_key.get((student.program_id, None), [])
-
-            total_due = sum((installment.amount or Decimal('0.00')) for installment in installments)
-            amount_paid = payment_totals.get(student.pk, Decimal('0.00'))
-            remaining_amount = total_due - amount_paid
-            if remaining_amount < Decimal('0.00'):
-                remaining_amount = Decimal('0.00')
-
-            due_amount = sum(
-                (installment.amount or Decimal('0.00'))
-                for installment in installments
-                if installment.due_date and installment.due_date <= today
-            )
-            overdue_amount = due_amount - amount_paid
-            if overdue_amount < Decimal('0.00'):
-                overdue_amount = Decimal('0.00')
-
-            status = 'overdue' if overdue_amount > Decimal('0.00') else 'up_to_date'
-            if status_filter and status != status_filter:
-                continue
-
-            rows.append({
-                'student': student,
-                'full_name': f"{student.firstname} {student.lastname}".strip(),
-                'academic_year': academic_year,
-                'level': current_level.level if current_level and current_level.level_id else None,
-                'total_amount_due': total_due,
-                'amount_paid': amount_paid,
-                'remaining_amount': remaining_amount,
-                'overdue_amount': overdue_amount,
-                'status': status,
-                'status_label': 'En retard' if status == 'overdue' else 'À jour',
-                'status_badge_class': 'bg-danger' if status == 'overdue' else 'bg-success',
-                'detail_url': (
-                    f"{reverse('payments:payment_status_student_detail', args=[student.matricule])}?"
-                    f"{urlencode({'academic_year': academic_year.pk, 'return_url': self.request.get_full_path()})}"
-                ),
-            })
-
-        return rows
+    def _get_filtered_balances(self, academic_year, filters):
+        if not academic_year:
+            return StudentBalance.objects.none()
+        return self._get_balances_queryset(academic_year=academic_year, **filters)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Statut de paiement'
 
         academic_year = self._get_selected_academic_year()
-        search = (self.request.GET.get('search') or '').strip()
-        program_id = self.request.GET.get('program') or ''
-        level_id = self.request.GET.get('level') or ''
-        status_filter = self.request.GET.get('status') or ''
-
-        if status_filter not in {choice[0] for choice in self.STATUS_CHOICES}:
-            status_filter = ''
-
-        payment_rows = self._build_payment_rows(
-            academic_year=academic_year,
-            search=search,
-            program_id=program_id,
-            level_id=level_id,
-            status_filter=status_filter,
+        filters = self._get_filters()
+        search = filters['search']
+        program_id = filters['program_id']
+        level_id = filters['level_id']
+        status_filter = filters['status_filter']
+
+        balances = self._get_filtered_balances(academic_year, filters)
+
+        stats = balances.aggregate(
+            total=models.Count('pk'),
+            up_to_date=models.Count('pk', filter=models.Q(status='up_to_date')),
+            overdue=models.Count('pk', filter=models.Q(status='overdue')),
+            total_due=Coalesce(models.Sum('total_amount_due'), Decimal('0.00')),
+            total_paid=Coalesce(models.Sum('amount_paid'), Decimal('0.00')),
+            remaining=Coalesce(models.Sum('remaining_amount'), Decimal('0.00')),
         )
 
         per_page = self._get_per_page()
-        page_obj = Paginator(payment_rows, per_page).get_page(self.request.GET.get('page', 1))
-
-        total_due = sum((row['total_amount_due'] for row in payment_rows), Decimal('0.00'))
-        total_paid = sum((row['amount_paid'] for row in payment_rows), Decimal('0.00'))
-        total_remaining = sum((row['remaining_amount'] for row in payment_rows), Decimal('0.00'))
+        page_obj = Paginator(balances, per_page).get_page(self.request.GET.get('page', 1))
+        page_obj.object_list = [self._build_payment_row(balance) for balance in page_obj.object_list]
 
         context.update({
             'page_obj': page_obj,
             'payment_rows': page_obj.object_list,
-            'filtered_students_count': len(payment_rows),
+            'filtered_students_count': stats['total'],
             'has_filter': any([
                 search,
                 self.request.GET.get('academic_year'),
@@ -830,19 +807,45 @@ class PaymentStatusView(LoginRequiredMixin, TemplateView):
             'programs': Program.objects.all().order_by('name'),
             'levels': Level.objects.all().order_by('academic_order', 'name'),
             'status_choices': self.STATUS_CHOICES,
-            'stats': {
-                'total': len(payment_rows),
-                'up_to_date': sum(1 for row in payment_rows if row['status'] == 'up_to_date'),
-                'overdue': sum(1 for row in payment_rows if row['status'] == 'overdue'),
-                'total_due': total_due,
-                'total_paid': total_paid,
-                'remaining': total_remaining,
-            },
+            'stats': stats,
         })
 
         return context
 
 
+class PaymentStatusExportView(PaymentStatusView):
+    """Export CSV/XLSX des statuts de paiement avec les filtres de ``PaymentStatusView``."""
+
+    def get(self, request, export_format):
+        academic_year = self._get_selected_academic_year()
+        balances = self._get_filtered_balances(academic_year, self._get_filters())
+        statuses = dict(self.STATUS_CHOICES)
+
+        fields = (
+            'student__matricule', 'student__firstname', 'student__lastname', 'student__program__name', 'level__name',
+            'total_amount_due', 'amount_paid', 'remaining_amount', 'overdue_amount', 'status',
+        )
+        rows = (
+            (
+                balance['student__matricule'],
+                balance['student__firstname'],
+                balance['student__lastname'],
+                balance['student__program__name'],
+                balance['level__name'],
+                str(academic_year),
+                balance['total_amount_due'],
+                balance['amount_paid'],
+                balance['remaining_amount'],
+                balance['overdue_amount'],
+                statuses.get(balance['status'], balance['status']),
+            )
+            for balance in KeysetPaginator(balances, EXPORT_CHUNK_SIZE).iterate(*fields)
+        )
+        return build_export_response(
+            export_format, 'statut_paiement', PAYMENT_STATUS_EXPORT_HEADERS, rows, 'Statut de paiement'
+        )
+
+
 @method_decorator(scholar_admin_required, name='dispatch')
 class PaymentStatusStudentDetailView(LoginRequiredMixin, TemplateView):
     """Vue détaillée de la situation financière d'un étudiant."""
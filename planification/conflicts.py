@@ -0,0 +1,237 @@
+"""
+Détection des conflits de réservation des séances de cours.
+
+Une salle, un enseignant ou un niveau ne peut pas être engagé dans deux séances
+qui se chevauchent le même jour. Une séance annulée libère son enseignant et son
+niveau mais garde sa salle : la contrainte d'unicité (salle, créneau, date) de
+``CourseSession`` s'applique aussi aux séances annulées.
+
+Les séances existantes sont chargées en une seule requête dans un ``ConflictIndex`` (index d'intervalles en mémoire), qui valide
+ensuite un lot complet de séances (une semaine, un emploi du temps généré) en une
+seule passe. Formulaires, vues et générateur partagent ce même index.
+"""
+
+from bisect import insort
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db.models import Exists, OuterRef
+
+from .models import CourseSession, ScheduleSession
+
+
+RESOURCE_LABELS = {
+    'classroom': 'La salle',
+    'lecturer': "L'enseignant",
+    'level': 'Le niveau',
+}
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+@dataclass(frozen=True)
+class SessionInterval:
+    """Séance ramenée aux seules données utiles à la détection des conflits."""
+    date: object
+    start: int
+    end: int
+    classroom_id: object
+    lecturer_id: object
+    level_id: object
+    pk: object = None
+    label: str = ''
+    cancelled: bool = False
+    ref: object = field(default=None, compare=False, hash=False)
+
+    def resource_keys(self):
+        if self.cancelled:
+            return (('classroom', self.classroom_id),)
+        return (
+            ('classroom', self.classroom_id),
+            ('lecturer', self.lecturer_id),
+            ('level', self.level_id),
+        )
+
+    def overlaps(self, other):
+        return self.date == other.date and self.start < other.end and other.start < self.end
+
+
+@dataclass(frozen=True)
+class SessionConflict:
+    """Conflit entre une séance candidate et une séance déjà réservée."""
+    resource: str
+    session: SessionInterval
+    other: SessionInterval
+
+    @property
+    def message(self):
+        start = f"{self.other.start // 60:02d}:{self.other.start % 60:02d}"
+        end = f"{self.other.end // 60:02d}:{self.other.end % 60:02d}"
+        return (
+            f"{RESOURCE_LABELS[self.resource]} est déjà occupé(e) le {self.other.date.strftime('%d/%m/%Y')} "
+            f"de {start} à {end} par le cours '{self.other.label}'."
+        )
+
+
+def session_interval(session):
+    """Construit un ``SessionInterval`` à partir d'une séance ou d'un dictionnaire du générateur."""
+    if isinstance(session, SessionInterval):
+        return session
+
+    if isinstance(session, dict):
+        time_slot = session['time_slot']
+        course = session.get('course')
+        return SessionInterval(
+            date=session['date'],
+            start=_minutes(time_slot.start_time),
+            end=_minutes(time_slot.end_time),
+            classroom_id=getattr(session.get('classroom'), 'pk', None),
+            lecturer_id=getattr(session.get('lecturer'), 'pk', None),
+            level_id=getattr(session.get('level'), 'pk', None),
+            label=getattr(course, 'label', '') or '',
+            cancelled=session.get('status') == 'cancelled',
+            ref=session,
+        )
+
+    time_slot = session.time_slot
+    return SessionInterval(
+        date=session.date,
+        start=_minutes(time_slot.start_time),
+        end=_minutes(time_slot.end_time),
+        classroom_id=session.classroom_id,
+        lecturer_id=session.lecturer_id,
+        level_id=session.level_id,
+        pk=session.pk,
+        label=session.course.label if session.course_id else '',
+        cancelled=session.status == 'cancelled',
+        ref=session,
+    )
+
+
+class ConflictIndex:
+    """Index d'intervalles par (date, ressource), trié par heure de début."""
+
+    def __init__(self, intervals=()):
+        self._intervals = defaultdict(list)
+        self.intervals = []
+        for interval in intervals:
+            self.add(interval)
+
+    def add(self, session):
+        interval = session_interval(session)
+        self.intervals.append(interval)
+        for resource, resource_id in interval.resource_keys():
+            if resource_id is None:
+                continue
+            insort(self._intervals[(interval.date, resource, resource_id)], (interval.start, interval.end, id(interval), interval))
+        return interval
+
+    def conflicts_for(self, session, exclude_pks=()):
+        """Retourne les conflits d'une séance avec les séances déjà indexées."""
+        interval = session_interval(session)
+        conflicts = []
+        for resource, resource_id in interval.resource_keys():
+            if resource_id is None:
+                continue
+            for start, end, _, other in self._intervals.get((interval.date, resource, resource_id), ()):
+                if start >= interval.end:
+                    break
+                if other is interval or (interval.pk is not None and other.pk == interval.pk):
+                    continue
+                if other.pk is not None and other.pk in exclude_pks:
+                    continue
+                if interval.overlaps(other):
+                    conflicts.append(SessionConflict(resource, interval, other))
+        return conflicts
+
+    def validate(self, sessions, exclude_pks=()):
+        """
+        Valide un lot de séances en une passe.
+
+        Chaque séance est confrontée aux séances indexées puis ajoutée à l'index, si
+        bien que les conflits internes au lot sont également détectés.
+        """
+        conflicts = []
+        for session in sessions:
+            interval = session_interval(session)
+            conflicts.extend(self.conflicts_for(interval, exclude_pks=exclude_pks))
+            self.add(interval)
+        return conflicts
+
+
+def _interval_rows(queryset, *extra_fields):
+    """Lit les séances d'un queryset sous forme de ``SessionInterval`` (suivis des champs demandés)."""
+    rows = []
+    for pk, session_date, start_time, end_time, classroom_id, lecturer_id, level_id, label, status, *extra in queryset.values_list(
+        'pk', 'date', 'time_slot__start_time', 'time_slot__end_time',
+        'classroom_id', 'lecturer_id', 'level_id', 'course__label', 'status', *extra_fields,
+    ):
+        interval = SessionInterval(
+            date=session_date,
+            start=_minutes(start_time),
+            end=_minutes(end_time),
+            classroom_id=classroom_id,
+            lecturer_id=lecturer_id,
+            level_id=level_id,
+            pk=pk,
+            label=label or '',
+            cancelled=status == 'cancelled',
+        )
+        rows.append((interval, *extra) if extra_fields else interval)
+    return rows
+
+
+def load_conflict_index(start_date, end_date, exclude_pks=()):
+    """
+    Charge en une requête les séances de la période dans un ``ConflictIndex`` ; les
+    séances annulées n'y occupent que leur salle.
+    """
+    queryset = CourseSession.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+    )
+    if exclude_pks:
+        queryset = queryset.exclude(pk__in=list(exclude_pks))
+
+    return ConflictIndex(_interval_rows(queryset))
+
+
+def find_session_conflicts(sessions, exclude_pks=()):
+    """
+    Retourne les conflits d'un lot de séances avec la base et entre elles.
+
+    Une seule requête est exécutée, quelle que soit la taille du lot.
+    """
+    intervals = [session_interval(session) for session in sessions]
+    if not intervals:
+        return []
+
+    exclude_pks = set(exclude_pks) | {interval.pk for interval in intervals if interval.pk is not None}
+    index = load_conflict_index(
+        min(interval.date for interval in intervals),
+        max(interval.date for interval in intervals),
+        exclude_pks=exclude_pks,
+    )
+    return index.validate(intervals)
+
+
+def find_schedule_conflicts(schedule):
+    """
+    Retourne les conflits des séances d'un emploi du temps (une seule requête).
+
+    Les séances de l'emploi du temps sont validées entre elles et contre toutes les
+    autres séances de la période (les séances annulées ne comptent que pour la salle).
+    """
+    rows = _interval_rows(
+        CourseSession.objects.filter(
+            date__gte=schedule.start_date,
+            date__lte=schedule.end_date,
+        ).annotate(
+            in_schedule=Exists(ScheduleSession.objects.filter(schedule=schedule, course_session=OuterRef('pk'))),
+        ),
+        'in_schedule',
+    )
+    index = ConflictIndex(interval for interval, in_schedule in rows if not in_schedule)
+    return index.validate(interval for interval, in_schedule in rows if in_schedule)
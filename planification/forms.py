@@ -5,6 +5,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import re
 from .models import Classroom, TimeSlot, CourseSession, Schedule, LecturerAvailability, ScheduleSession
+from .conflicts import find_session_conflicts
 from Teaching.models import Lecturer
 from academic.models import Course, Level, AcademicYear
 from main.validators import validate_phone_number
@@ -958,7 +959,7 @@ class CourseSessionForm(forms.ModelForm):
         self.fields['course'].queryset = Course.objects.all().order_by('label')
         self.fields['lecturer'].queryset = Lecturer.objects.all().order_by('lastname', 'firstname')
         self.fields['classroom'].queryset = Classroom.objects.filter(is_active=True).order_by('code')
-        self.fields['time_slot'].queryset = TimeSlot.objects.filter(is_active=True).order_by('day_of_week', 'start_time')
+        self.fields['time_slot'].queryset = TimeSlot.objects.filter(is_active=True).order_by('start_time', 'end_time')
         self.fields['level'].queryset = Level.objects.all().order_by('name')
         self.fields['academic_year'].queryset = AcademicYear.objects.all().order_by('-start_at')
 
@@ -987,23 +988,23 @@ class CourseSessionForm(forms.ModelForm):
                     f"et {academic_year.end_at.strftime('%d/%m/%Y')} (année académique {academic_year.name})."
                 )
 
-        # Vérifier la disponibilité de la salle (pas de conflit)
+        # Vérifier la disponibilité de la salle, de l'enseignant et du niveau (pas de conflit).
+        # Une séance annulée n'est vérifiée que pour sa salle (contrainte d'unicité).
+        lecturer = cleaned_data.get('lecturer')
         if classroom and time_slot and date:
-            existing_session = CourseSession.objects.filter(
+            candidate = CourseSession(
+                pk=self.instance.pk,
+                course=course,
+                lecturer=lecturer,
                 classroom=classroom,
                 time_slot=time_slot,
-                date=date
+                level=level,
+                date=date,
+                status=cleaned_data.get('status'),
             )
-            if self.instance.pk:
-                existing_session = existing_session.exclude(pk=self.instance.pk)
-
-            if existing_session.exists():
-                session = existing_session.first()
-                raise ValidationError(
-                    f"La salle '{classroom.name}' est déjà occupée le {date.strftime('%d/%m/%Y')} "
-                    f"de {time_slot.start_time.strftime('%H:%M')} à {time_slot.end_time.strftime('%H:%M')} "
-                    f"par le cours '{session.course.label}'."
-                )
+            conflicts = find_session_conflicts([candidate])
+            if conflicts:
+                raise ValidationError(conflicts[0].message)
 
         return cleaned_data
 
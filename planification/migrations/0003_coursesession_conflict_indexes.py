@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-18 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planification', '0002_alter_coursesession_lecturer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursesession',
+            index=models.Index(fields=['date', 'time_slot', 'classroom'], name='session_date_slot_room_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursesession',
+            index=models.Index(fields=['date', 'time_slot', 'lecturer'], name='session_date_slot_lect_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursesession',
+            index=models.Index(fields=['date', 'time_slot', 'level'], name='session_date_slot_level_idx'),
+        ),
+    ]
@@ -221,6 +221,11 @@ class CourseSession(models.Model):
         verbose_name_plural = "Séances de cours"
         ordering = ['-date', 'time_slot__start_time']
         unique_together = ['classroom', 'time_slot', 'date']
+        indexes = [
+            models.Index(fields=['date', 'time_slot', 'classroom'], name='session_date_slot_room_idx'),
+            models.Index(fields=['date', 'time_slot', 'lecturer'], name='session_date_slot_lect_idx'),
+            models.Index(fields=['date', 'time_slot', 'level'], name='session_date_slot_level_idx'),
+        ]
 
 
 class Schedule(models.Model):
@@ -2,285 +2,337 @@
 Services pour la génération automatique d'emploi du temps
 """
 
-from django.db import transaction
-from django.core.exceptions import ValidationError
-from datetime import datetime, timedelta
-import random
+import logging
+import time
 from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.core.exceptions import ValidationError
 
 from .models import (
-    Schedule, CourseSession, ScheduleSession, TimeSlot, 
+    Schedule, CourseSession, ScheduleSession, TimeSlot,
     Classroom, LecturerAvailability
 )
+from .conflicts import load_conflict_index
+from .solver import (
+    WEEKDAYS, LecturerAvailabilityIndex, OccupancyIndex, SessionRequest,
+    SlotDefinition, SlotGrid, TimetableSolver,
+)
+from audit.context import suspend_audit
+from audit.utils import log_audit_event
 from Teaching.models import Lecturer
 from academic.models import Course
+from recruitment.models import LecturerCourse
+from students.models import StudentLevel
+
+
+logger = logging.getLogger(__name__)
 
 
 class ScheduleGenerationService:
     """
     Service pour la génération automatique d'emploi du temps
+
+    Toutes les données sont chargées en un nombre fixe de requêtes puis indexées en
+    mémoire (voir ``planification.solver``) ; la recherche ne touche plus la base.
+    Les créneaux horaires n'étant pas rattachés à un jour, chaque créneau actif est
+    proposé du lundi au vendredi.
+
+    Par défaut, les séances générées sont enregistrées par lots (``bulk_create``) et
+    l'audit reçoit un seul événement récapitulatif ; ``bulk_save=False`` conserve
+    l'enregistrement ligne par ligne, avec un événement d'audit par séance.
     """
-    
-    def __init__(self, schedule, courses, sessions_per_week=2, 
-                 prefer_morning=True, avoid_consecutive_sessions=True, 
-                 max_daily_sessions=4):
+
+    BULK_BATCH_SIZE = 500
+
+    def __init__(self, schedule, courses, sessions_per_week=2,
+                 prefer_morning=True, avoid_consecutive_sessions=True,
+                 max_daily_sessions=4, bulk_save=True):
         self.schedule = schedule
         self.courses = courses
         self.sessions_per_week = sessions_per_week
         self.prefer_morning = prefer_morning
         self.avoid_consecutive_sessions = avoid_consecutive_sessions
         self.max_daily_sessions = max_daily_sessions
-        
+        self.bulk_save = bulk_save
+
         # Structures de données pour la génération
         self.available_time_slots = []
         self.available_classrooms = []
         self.lecturer_availabilities = {}
         self.generated_sessions = []
         self.weekly_schedule = defaultdict(list)  # {week_number: [sessions]}
-        
+
+        # Index en mémoire et mesures
+        self.time_slots = []
+        self.course_lecturers = {}
+        self.default_lecturers = []
+        self.availability_rows = []
+        self.conflict_index = None
+        self.level_headcount = 0
+        self.grid = None
+        self.occupancy = None
+        self.availability_index = None
+        self.solver = None
+        self.timings = {}
+
     def generate_schedule(self):
         """
         Génère automatiquement l'emploi du temps
         """
+        started_at = time.perf_counter()
         try:
             with transaction.atomic():
-                # 1. Préparer les données
-                self._prepare_data()
-                
-                # 2. Valider la faisabilité
-                self._validate_feasibility()
-                
+                # 1. Charger les données
+                with self._timed('load'):
+                    self._prepare_data()
+
+                # 2. Valider la faisabilité et construire les index
+                with self._timed('index'):
+                    self._validate_feasibility()
+                    self._build_indexes()
+
                 # 3. Générer les séances
-                self._generate_sessions()
-                
+                with self._timed('solve'):
+                    self._generate_sessions()
+                    self._check_generated_conflicts()
+
                 # 4. Sauvegarder les résultats
-                self._save_generated_sessions()
-                
-                # 5. Marquer l'emploi du temps comme généré
-                self.schedule.is_generated = True
-                self.schedule.status = 'active'
-                self.schedule.save()
-                
+                with self._timed('save'):
+                    self._save_generated_sessions()
+
+                    # 5. Marquer l'emploi du temps comme généré
+                    self.schedule.is_generated = True
+                    self.schedule.status = 'active'
+                    self.schedule.save()
+
+                self.timings['total'] = time.perf_counter() - started_at
+                unplaced_count = self.solver.stats.unplaced
+                logger.info(
+                    "Emploi du temps %s généré : %s séances, %s non placées, durées %s",
+                    self.schedule.pk, len(self.generated_sessions), unplaced_count, self._format_timings(),
+                )
+
+                message = f'Emploi du temps généré avec succès. {len(self.generated_sessions)} séances créées.'
+                if unplaced_count:
+                    message += f' {unplaced_count} séances n\'ont pas pu être placées.'
                 return {
                     'success': True,
-                    'message': f'Emploi du temps généré avec succès. {len(self.generated_sessions)} séances créées.',
-                    'sessions_count': len(self.generated_sessions)
+                    'message': message,
+                    'sessions_count': len(self.generated_sessions),
+                    'unplaced_count': unplaced_count,
+                    'timings': self.timings,
                 }
-                
+
         except Exception as e:
+            self.timings['total'] = time.perf_counter() - started_at
             return {
                 'success': False,
                 'message': f'Erreur lors de la génération: {str(e)}',
-                'sessions_count': 0
+                'sessions_count': 0,
+                'unplaced_count': 0,
+                'timings': self.timings,
             }
-    
+
+    @contextmanager
+    def _timed(self, phase):
+        """Mesure la durée d'une phase de la génération."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = time.perf_counter() - started_at
+
+    def _format_timings(self):
+        return ', '.join(f"{phase}={duration * 1000:.1f}ms" for phase, duration in self.timings.items())
+
     def _prepare_data(self):
         """
-        Prépare les données nécessaires pour la génération
+        Prépare les données nécessaires pour la génération (requêtes groupées)
         """
-        # Récupérer les créneaux horaires disponibles (lundi à vendredi)
-        self.available_time_slots = list(
-            TimeSlot.objects.filter(
-                is_active=True,
-                day_of_week__in=['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
-            ).order_by('day_of_week', 'start_time')
-        )
-        
-        # Trier par préférence (matin en premier si demandé)
-        if self.prefer_morning:
-            self.available_time_slots.sort(key=lambda ts: (ts.day_of_week, ts.start_time))
-        
+        self.courses = list(self.courses)
+        course_ids = [course.pk for course in self.courses]
+
+        # Tous les créneaux sont indexés (un créneau inactif peut porter une séance existante)
+        self.time_slots = list(TimeSlot.objects.order_by('start_time', 'end_time', 'pk'))
+        self.available_time_slots = [time_slot for time_slot in self.time_slots if time_slot.is_active]
+
         # Récupérer les salles disponibles
         self.available_classrooms = list(
-            Classroom.objects.filter(is_active=True).order_by('capacity')
+            Classroom.objects.filter(is_active=True).order_by('capacity', 'code')
         )
-        
-        # Récupérer les disponibilités des enseignants
-        availabilities = LecturerAvailability.objects.filter(
+
+        # Effectif du niveau pour la contrainte de capacité des salles
+        self.level_headcount = StudentLevel.objects.filter(
+            level=self.schedule.level,
             academic_year=self.schedule.academic_year,
-            status__in=['available', 'preferred']
-        ).select_related('lecturer', 'time_slot')
-        
-        for availability in availabilities:
-            lecturer_id = availability.lecturer.matricule
-            time_slot_id = availability.time_slot.id
-            
-            if lecturer_id not in self.lecturer_availabilities:
-                self.lecturer_availabilities[lecturer_id] = {}
-            
-            self.lecturer_availabilities[lecturer_id][time_slot_id] = availability
-    
+            is_active=True,
+        ).count()
+
+        # Récupérer les disponibilités des enseignants (toutes, y compris les indisponibilités)
+        self.availability_rows = list(
+            LecturerAvailability.objects.filter(
+                academic_year=self.schedule.academic_year,
+            ).select_related('lecturer', 'time_slot')
+        )
+        self.lecturer_availabilities = {}
+        for availability in self.availability_rows:
+            if availability.status not in ['available', 'preferred']:
+                continue
+            self.lecturer_availabilities.setdefault(availability.lecturer_id, {})[availability.time_slot_id] = availability
+
+        # Enseignants validés pour chaque cours
+        self.course_lecturers = defaultdict(list)
+        for course_id, lecturer_id in LecturerCourse.objects.filter(
+            course_id__in=course_ids,
+            status='validated',
+        ).order_by('lecturer_id').values_list('course_id', 'lecturer_id'):
+            self.course_lecturers[course_id].append(lecturer_id)
+
+        self.default_lecturers = sorted(self.lecturer_availabilities)
+        if not self.default_lecturers:
+            first_lecturer = Lecturer.objects.first()
+            self.default_lecturers = [first_lecturer.pk] if first_lecturer else []
+
+        # Séances déjà programmées sur la période (tous niveaux)
+        self.conflict_index = load_conflict_index(self.schedule.start_date, self.schedule.end_date)
+
     def _validate_feasibility(self):
         """
         Valide la faisabilité de la génération
         """
         total_sessions_needed = len(self.courses) * self.sessions_per_week
-        total_weeks = self._get_total_weeks()
-        
+
         # Vérifier qu'il y a assez de créneaux
-        available_slots_per_week = len(self.available_time_slots)
-        max_sessions_per_week = min(available_slots_per_week, self.max_daily_sessions * 5)
-        
+        available_slots_per_week = len(self.available_time_slots) * len(WEEKDAYS)
+        max_sessions_per_week = min(available_slots_per_week, self.max_daily_sessions * len(WEEKDAYS))
+
         if total_sessions_needed > max_sessions_per_week:
             raise ValidationError(
                 f"Impossible de programmer {total_sessions_needed} séances par semaine. "
                 f"Maximum possible: {max_sessions_per_week}"
             )
-        
+
         # Vérifier qu'il y a des salles disponibles
         if not self.available_classrooms:
             raise ValidationError("Aucune salle de classe disponible.")
-        
+
+        if not any(classroom.capacity >= self.level_headcount for classroom in self.available_classrooms):
+            raise ValidationError(
+                f"Aucune salle ne peut accueillir les {self.level_headcount} étudiants du niveau."
+            )
+
         # Vérifier qu'il y a des créneaux disponibles
         if not self.available_time_slots:
             raise ValidationError("Aucun créneau horaire disponible.")
-    
-    def _generate_sessions(self):
+
+        if not self.default_lecturers and not any(self.course_lecturers.values()):
+            raise ValidationError("Aucun enseignant disponible.")
+
+    def _build_indexes(self):
         """
-        Génère les séances de cours
+        Construit les index en mémoire (créneaux, occupation, disponibilités)
         """
-        total_weeks = self._get_total_weeks()
-        
-        for week_number in range(1, total_weeks + 1):
-            self._generate_week_sessions(week_number)
-    
-    def _generate_week_sessions(self, week_number):
+        self.grid = SlotGrid([
+            SlotDefinition(time_slot.pk, time_slot.start_time, time_slot.end_time, time_slot.is_active)
+            for time_slot in self.time_slots
+        ])
+
+        self.occupancy = OccupancyIndex(self.grid)
+        for interval in self.conflict_index.intervals:
+            # Une séance annulée garde sa salle (contrainte d'unicité salle/créneau/date).
+            self.occupancy.add_mask(
+                interval.date, self.grid.occupancy_mask_for(interval.start, interval.end),
+                room_key=interval.classroom_id,
+                lecturer_key=None if interval.cancelled else interval.lecturer_id,
+                level_key=None if interval.cancelled else interval.level_id,
+            )
+
+        self.availability_index = LecturerAvailabilityIndex(self.grid)
+        for availability in self.availability_rows:
+            self.availability_index.add(
+                availability.lecturer_id,
+                availability.time_slot_id,
+                availability.status,
+                availability.start_date,
+                availability.end_date,
+            )
+
+        self.solver = TimetableSolver(
+            grid=self.grid,
+            occupancy=self.occupancy,
+            availability=self.availability_index,
+            room_keys=[
+                classroom.pk for classroom in self.available_classrooms
+                if classroom.capacity >= self.level_headcount
+            ],
+            level_key=self.schedule.level_id,
+            max_daily_sessions=self.max_daily_sessions,
+            prefer_morning=self.prefer_morning,
+            avoid_consecutive_sessions=self.avoid_consecutive_sessions,
+        )
+
+    def _build_session_requests(self):
         """
-        Génère les séances pour une semaine donnée
+        Construit la liste des séances hebdomadaires à placer
         """
-        week_sessions = []
-        used_time_slots = set()
-        
+        requests = []
         for course in self.courses:
-            sessions_created = 0
-            attempts = 0
-            max_attempts = 50
-            
-            while sessions_created < self.sessions_per_week and attempts < max_attempts:
-                attempts += 1
-                
-                # Sélectionner un créneau disponible
-                available_slots = [
-                    ts for ts in self.available_time_slots 
-                    if ts.id not in used_time_slots
-                ]
-                
-                if not available_slots:
-                    break
-                
-                time_slot = self._select_best_time_slot(course, available_slots, week_sessions)
-                if not time_slot:
-                    continue
-                
-                # Trouver un enseignant disponible
-                lecturer = self._find_available_lecturer(course, time_slot)
-                if not lecturer:
-                    continue
-                
-                # Trouver une salle disponible
-                classroom = self._find_available_classroom(time_slot, week_number)
-                if not classroom:
-                    continue
-                
-                # Créer la séance
-                session_date = self._get_session_date(week_number, time_slot.day_of_week)
-                session = self._create_session(
-                    course, lecturer, classroom, time_slot, session_date, week_number
-                )
-                
-                week_sessions.append(session)
-                used_time_slots.add(time_slot.id)
-                sessions_created += 1
-        
-        self.weekly_schedule[week_number] = week_sessions
-        self.generated_sessions.extend(week_sessions)
-    
-    def _select_best_time_slot(self, course, available_slots, existing_sessions):
+            lecturer_keys = tuple(self.course_lecturers.get(course.pk) or self.default_lecturers)
+            for occurrence in range(self.sessions_per_week):
+                requests.append(SessionRequest(course.pk, occurrence, lecturer_keys))
+        return requests
+
+    def _generate_sessions(self):
         """
-        Sélectionne le meilleur créneau pour un cours
+        Génère les séances de cours, semaine par semaine
         """
-        if not available_slots:
-            return None
-        
-        # Si on évite les séances consécutives, filtrer
-        if self.avoid_consecutive_sessions:
-            course_sessions_today = [
-                s for s in existing_sessions 
-                if s['course'] == course
+        courses_by_pk = {course.pk: course for course in self.courses}
+        time_slots_by_pk = {time_slot.pk: time_slot for time_slot in self.time_slots}
+        lecturers_by_pk = Lecturer.objects.in_bulk({
+            lecturer_key
+            for lecturer_keys in list(self.course_lecturers.values()) + [self.default_lecturers]
+            for lecturer_key in lecturer_keys
+        })
+        classrooms_by_pk = {classroom.pk: classroom for classroom in self.available_classrooms}
+
+        requests = self._build_session_requests()
+        previous_week = None
+        for week_number in range(1, self._get_total_weeks() + 1):
+            week_days = {
+                weekday: session_date
+                for weekday, session_date in (
+                    (weekday, self._get_session_date(week_number, weekday)) for weekday in range(len(WEEKDAYS))
+                )
+                if session_date <= self.schedule.end_date
+            }
+            placements = self.solver.solve_week(requests, week_days, previous_week)
+            previous_week = placements
+
+            week_sessions = [
+                self._create_session(
+                    courses_by_pk[placement.request.course_key],
+                    lecturers_by_pk[placement.lecturer_key],
+                    classrooms_by_pk[placement.room_key],
+                    time_slots_by_pk[self.grid.slots[placement.slot_index].pk],
+                    placement.day,
+                    week_number,
+                )
+                for placement in sorted(placements, key=lambda item: (item.day, item.slot_index))
             ]
-            
-            if course_sessions_today:
-                # Éviter les créneaux adjacents
-                used_slots = [s['time_slot'] for s in course_sessions_today]
-                available_slots = [
-                    ts for ts in available_slots
-                    if not self._is_adjacent_time_slot(ts, used_slots)
-                ]
-        
-        if not available_slots:
-            return None
-        
-        # Privilégier les créneaux préférés si disponibles
-        preferred_slots = []
-        for time_slot in available_slots:
-            for lecturer_id, availabilities in self.lecturer_availabilities.items():
-                if time_slot.id in availabilities:
-                    availability = availabilities[time_slot.id]
-                    if availability.status == 'preferred':
-                        preferred_slots.append(time_slot)
-                        break
-        
-        if preferred_slots:
-            return random.choice(preferred_slots)
-        
-        return random.choice(available_slots)
-    
-    def _find_available_lecturer(self, course, time_slot):
-        """
-        Trouve un enseignant disponible pour un cours et un créneau
-        """
-        # Pour cette version simplifiée, on prend le premier enseignant disponible
-        # Dans une version plus avancée, on pourrait avoir une relation Course-Lecturer
-        available_lecturers = []
-        
-        for lecturer_id, availabilities in self.lecturer_availabilities.items():
-            if time_slot.id in availabilities:
-                availability = availabilities[time_slot.id]
-                if availability.status in ['available', 'preferred']:
-                    try:
-                        lecturer = Lecturer.objects.get(matricule=lecturer_id)
-                        available_lecturers.append(lecturer)
-                    except Lecturer.DoesNotExist:
-                        continue
-        
-        if available_lecturers:
-            return random.choice(available_lecturers)
-        
-        # Si aucun enseignant spécifiquement disponible, prendre le premier
-        return Lecturer.objects.first()
-    
-    def _find_available_classroom(self, time_slot, week_number):
+            self.weekly_schedule[week_number] = week_sessions
+            self.generated_sessions.extend(week_sessions)
+
+    def _check_generated_conflicts(self):
         """
-        Trouve une salle disponible pour un créneau
+        Vérifie en une passe, sans requête, que les séances générées n'entrent pas en conflit
         """
-        session_date = self._get_session_date(week_number, time_slot.day_of_week)
-        
-        # Vérifier les salles non occupées à cette date et ce créneau
-        occupied_classrooms = CourseSession.objects.filter(
-            date=session_date,
-            time_slot=time_slot
-        ).values_list('classroom_id', flat=True)
-        
-        available_classrooms = [
-            classroom for classroom in self.available_classrooms
-            if classroom.code not in occupied_classrooms
-        ]
-        
-        if available_classrooms:
-            return available_classrooms[0]  # Prendre la première disponible
-        
-        return None
-    
+        conflicts = self.conflict_index.validate(self.generated_sessions)
+        if conflicts:
+            raise ValidationError(conflicts[0].message)
+
     def _create_session(self, course, lecturer, classroom, time_slot, session_date, week_number):
         """
         Crée une structure de données pour une séance
@@ -295,11 +347,86 @@ class ScheduleGenerationService:
             'level': self.schedule.level,
             'academic_year': self.schedule.academic_year
         }
-    
+
     def _save_generated_sessions(self):
         """
         Sauvegarde les séances générées en base de données
         """
+        if self.bulk_save:
+            self._bulk_save_generated_sessions()
+        else:
+            self._save_generated_sessions_one_by_one()
+
+    def _bulk_save_generated_sessions(self):
+        """
+        Enregistre les séances par lots, sans signal d'audit par ligne
+        """
+        course_sessions = [
+            CourseSession(
+                course=session_data['course'],
+                lecturer=session_data['lecturer'],
+                classroom=session_data['classroom'],
+                time_slot=session_data['time_slot'],
+                level=session_data['level'],
+                academic_year=session_data['academic_year'],
+                date=session_data['date'],
+                session_type='lecture',
+                status='scheduled'
+            )
+            for session_data in self.generated_sessions
+        ]
+
+        with suspend_audit():
+            CourseSession.objects.bulk_create(course_sessions, batch_size=self.BULK_BATCH_SIZE)
+            if course_sessions and not connection.features.can_return_rows_from_bulk_insert:
+                self._resolve_course_session_pks(course_sessions)
+
+            ScheduleSession.objects.bulk_create(
+                [
+                    ScheduleSession(
+                        schedule=self.schedule,
+                        course_session=course_session,
+                        week_number=session_data['week_number'],
+                        is_recurring=True
+                    )
+                    for course_session, session_data in zip(course_sessions, self.generated_sessions)
+                ],
+                batch_size=self.BULK_BATCH_SIZE,
+            )
+
+        log_audit_event(
+            category='business',
+            action='bulk_create',
+            instance=self.schedule,
+            context={
+                'operation': 'schedule_generation',
+                'sessions_count': len(course_sessions),
+                'weeks_count': len(self.weekly_schedule),
+                'courses': [course.pk for course in self.courses],
+            },
+            message=f"Génération automatique de l'emploi du temps : {len(course_sessions)} séances créées.",
+        )
+
+    def _resolve_course_session_pks(self, course_sessions):
+        """
+        Récupère les identifiants des séances insérées quand la base ne les renvoie pas (MySQL)
+        """
+        pks_by_key = {
+            (classroom_id, time_slot_id, session_date): pk
+            for pk, classroom_id, time_slot_id, session_date in CourseSession.objects.filter(
+                level=self.schedule.level,
+                date__gte=self.schedule.start_date,
+                date__lte=self.schedule.end_date,
+            ).values_list('pk', 'classroom_id', 'time_slot_id', 'date')
+        }
+        for course_session in course_sessions:
+            course_session.pk = pks_by_key[(course_session.classroom_id, course_session.time_slot_id, course_session.date)]
+            course_session._state.adding = False
+
+    def _save_generated_sessions_one_by_one(self):
+        """
+        Enregistre les séances une à une (chemin historique, audit par ligne)
+        """
         for session_data in self.generated_sessions:
             # Créer la séance de cours
             course_session = CourseSession.objects.create(
@@ -313,7 +440,7 @@ class ScheduleGenerationService:
                 session_type='lecture',
                 status='scheduled'
             )
-            
+
             # Lier à l'emploi du temps
             ScheduleSession.objects.create(
                 schedule=self.schedule,
@@ -321,34 +448,21 @@ class ScheduleGenerationService:
                 week_number=session_data['week_number'],
                 is_recurring=True
             )
-    
+
     def _get_total_weeks(self):
         """
         Calcule le nombre total de semaines dans la période
         """
         delta = self.schedule.end_date - self.schedule.start_date
         return max(1, delta.days // 7)
-    
+
     def _get_session_date(self, week_number, day_of_week):
         """
         Calcule la date d'une séance basée sur la semaine et le jour
+
+        La semaine ``n`` couvre les 7 jours qui suivent ``start_date + 7 * (n - 1)`` ;
+        le jour peut être donné par son nom ('monday') ou son indice (0 = lundi).
         """
-        days_mapping = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 
-            'thursday': 3, 'friday': 4
-        }
-        
-        start_date = self.schedule.start_date
-        days_to_add = (week_number - 1) * 7 + days_mapping[day_of_week]
-        
-        return start_date + timedelta(days=days_to_add)
-    
-    def _is_adjacent_time_slot(self, time_slot, used_slots):
-        """
-        Vérifie si un créneau est adjacent à des créneaux utilisés
-        """
-        for used_slot in used_slots:
-            if (time_slot.day_of_week == used_slot.day_of_week and
-                abs((time_slot.start_time.hour - used_slot.start_time.hour)) <= 2):
-                return True
-        return False
+        weekday = WEEKDAYS.index(day_of_week) if isinstance(day_of_week, str) else day_of_week
+        week_start = self.schedule.start_date + timedelta(days=(week_number - 1) * 7)
+        return week_start + timedelta(days=(weekday - week_start.weekday()) % 7)
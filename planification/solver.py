@@ -0,0 +1,396 @@
+"""
+Moteur de résolution des emplois du temps.
+
+Les données (créneaux, salles, disponibilités, séances existantes) sont chargées
+une seule fois puis indexées sous forme de masques de bits : chaque créneau horaire
+reçoit un indice, et l'occupation d'une ressource sur une date est un entier dont
+le bit ``i`` vaut 1 si le créneau ``i`` est pris. Un conflit se vérifie alors par
+un simple ``&`` avec le masque des créneaux qui chevauchent le créneau visé.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, time
+
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+ADJACENT_SESSION_HOURS = 2
+NOON = time(12, 0)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+@dataclass(frozen=True)
+class SlotDefinition:
+    """Créneau horaire indexé (indépendant du jour de la semaine)."""
+    pk: int
+    start_time: time
+    end_time: time
+    is_active: bool = True
+
+
+@dataclass
+class LecturerWindow:
+    """Fenêtre de disponibilité (ou d'indisponibilité) d'un enseignant."""
+    mask: int
+    start_date: date = None
+    end_date: date = None
+    status: str = 'available'
+
+    def covers(self, day):
+        if self.start_date and day < self.start_date:
+            return False
+        if self.end_date and day > self.end_date:
+            return False
+        return True
+
+
+@dataclass
+class SessionRequest:
+    """Séance hebdomadaire à placer pour un cours."""
+    course_key: object
+    occurrence: int
+    lecturer_keys: tuple
+
+
+@dataclass
+class Placement:
+    request: SessionRequest
+    day: date
+    slot_index: int
+    lecturer_key: object
+    room_key: object
+
+
+@dataclass
+class SolverStats:
+    nodes: int = 0
+    backtracks: int = 0
+    unplaced: int = 0
+    weeks: int = 0
+    reused_weeks: int = 0
+
+
+class SlotGrid:
+    """Indexe les créneaux et précalcule les masques de chevauchement et d'adjacence."""
+
+    def __init__(self, slots):
+        self.slots = sorted(slots, key=lambda slot: (slot.start_time, slot.end_time, slot.pk))
+        self.index_by_pk = {slot.pk: index for index, slot in enumerate(self.slots)}
+        self.index_by_minutes = {}
+        for index, slot in enumerate(self.slots):
+            self.index_by_minutes.setdefault((_minutes(slot.start_time), _minutes(slot.end_time)), index)
+        self.overlap_masks = []
+        self.adjacent_masks = []
+        for slot in self.slots:
+            overlap_mask = 0
+            adjacent_mask = 0
+            for index, other in enumerate(self.slots):
+                if other.start_time < slot.end_time and slot.start_time < other.end_time:
+                    overlap_mask |= 1 << index
+                if abs(_minutes(other.start_time) - _minutes(slot.start_time)) <= ADJACENT_SESSION_HOURS * 60:
+                    adjacent_mask |= 1 << index
+            self.overlap_masks.append(overlap_mask)
+            self.adjacent_masks.append(adjacent_mask)
+
+        self.active_indexes = [index for index, slot in enumerate(self.slots) if slot.is_active]
+        self.full_mask = (1 << len(self.slots)) - 1
+
+    def occupancy_mask_for(self, start_minutes, end_minutes):
+        """
+        Masque à marquer pour une séance occupant l'intervalle donné (en minutes).
+
+        Le bit du créneau identique s'il existe, sinon (prudemment) ceux de tous les
+        créneaux qui chevauchent l'intervalle.
+        """
+        index = self.index_by_minutes.get((start_minutes, end_minutes))
+        if index is not None:
+            return 1 << index
+        mask = 0
+        for index, slot in enumerate(self.slots):
+            if _minutes(slot.start_time) < end_minutes and start_minutes < _minutes(slot.end_time):
+                mask |= 1 << index
+        return mask
+
+    def mask_for(self, slot_pks):
+        mask = 0
+        for slot_pk in slot_pks:
+            index = self.index_by_pk.get(slot_pk)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def is_morning(self, index):
+        return self.slots[index].start_time < NOON
+
+
+class OccupancyIndex:
+    """Occupation des salles, enseignants et niveaux par date, sous forme de masques."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.rooms = defaultdict(int)
+        self.lecturers = defaultdict(int)
+        self.levels = defaultdict(int)
+
+    def add(self, day, slot_index, room_key=None, lecturer_key=None, level_key=None):
+        self.add_mask(day, 1 << slot_index, room_key, lecturer_key, level_key)
+
+    def add_mask(self, day, bit, room_key=None, lecturer_key=None, level_key=None):
+        if room_key is not None:
+            self.rooms[(day, room_key)] |= bit
+        if lecturer_key is not None:
+            self.lecturers[(day, lecturer_key)] |= bit
+        if level_key is not None:
+            self.levels[(day, level_key)] |= bit
+
+    def remove(self, day, slot_index, room_key=None, lecturer_key=None, level_key=None):
+        bit = ~(1 << slot_index)
+        if room_key is not None:
+            self.rooms[(day, room_key)] &= bit
+        if lecturer_key is not None:
+            self.lecturers[(day, lecturer_key)] &= bit
+        if level_key is not None:
+            self.levels[(day, level_key)] &= bit
+
+    def room_is_free(self, day, slot_index, room_key):
+        return not self.rooms.get((day, room_key), 0) & self.grid.overlap_masks[slot_index]
+
+    def lecturer_is_free(self, day, slot_index, lecturer_key):
+        return not self.lecturers.get((day, lecturer_key), 0) & self.grid.overlap_masks[slot_index]
+
+    def level_is_free(self, day, slot_index, level_key):
+        return not self.levels.get((day, level_key), 0) & self.grid.overlap_masks[slot_index]
+
+
+class LecturerAvailabilityIndex:
+    """Masques de disponibilité des enseignants, résolus par date et mis en cache."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.windows = defaultdict(list)
+        self._cache = {}
+
+    def add(self, lecturer_key, slot_pk, status, start_date=None, end_date=None):
+        mask = self.grid.mask_for([slot_pk])
+        if mask:
+            self.windows[lecturer_key].append(LecturerWindow(mask, start_date, end_date, status))
+
+    def has_declarations(self, lecturer_key):
+        return bool(self.windows.get(lecturer_key))
+
+    def masks(self, lecturer_key, day):
+        """Retourne (masque disponible, masque préféré) de l'enseignant pour une date."""
+        cache_key = (lecturer_key, day)
+        if cache_key not in self._cache:
+            windows = self.windows.get(lecturer_key)
+            if not windows:
+                self._cache[cache_key] = (self.grid.full_mask, 0)
+            else:
+                available = preferred = unavailable = 0
+                for window in windows:
+                    if not window.covers(day):
+                        continue
+                    if window.status == 'unavailable':
+                        unavailable |= window.mask
+                    elif window.status == 'preferred':
+                        preferred |= window.mask
+                    else:
+                        available |= window.mask
+                available = (available | preferred) & ~unavailable
+                self._cache[cache_key] = (available, preferred & ~unavailable)
+        return self._cache[cache_key]
+
+
+@dataclass
+class TimetableSolver:
+    """
+    Place les séances hebdomadaires d'un niveau par recherche gloutonne avec retour arrière.
+
+    Les variables (séances à placer) sont triées de la plus contrainte à la moins
+    contrainte, et les valeurs candidates (jour, créneau, enseignant) sont ordonnées
+    par score de préférence. La recherche est entièrement déterministe ; au-delà de
+    ``max_backtracks`` retours arrière sur une semaine, les séances restantes sont
+    placées au mieux et celles qui n'ont pas de place sont comptées comme non placées.
+    La semaine précédente sert de modèle : si elle reste valide, elle est reprise telle
+    quelle, ce qui produit un emploi du temps récurrent.
+    """
+    grid: SlotGrid
+    occupancy: OccupancyIndex
+    availability: LecturerAvailabilityIndex
+    room_keys: list
+    level_key: object
+    max_daily_sessions: int = 4
+    prefer_morning: bool = True
+    avoid_consecutive_sessions: bool = True
+    max_backtracks: int = 2000
+    stats: SolverStats = field(default_factory=SolverStats)
+
+    def solve_week(self, requests, week_days, previous_week=None):
+        """
+        Place les séances d'une semaine.
+
+        ``week_days`` associe chaque jour ouvré (0 = lundi) à sa date dans la semaine,
+        les jours hors période étant absents. Retourne la liste des ``Placement``.
+        """
+        self.stats.weeks += 1
+        self._week_days = week_days
+        self._daily_counts = defaultdict(int)
+        self._course_days = defaultdict(int)
+        self._backtracks_left = self.max_backtracks
+
+        reused = self._reuse_previous_week(requests, previous_week)
+        if reused is not None:
+            self.stats.reused_weeks += 1
+            return reused
+
+        ordered_requests = sorted(requests, key=self._constraint_rank)
+        placements = []
+        self._search(ordered_requests, 0, placements)
+        if len(placements) < len(ordered_requests):
+            placements = self._complete_greedily(ordered_requests, placements)
+        return placements
+
+    # ----- reprise de la semaine précédente -----
+
+    def _reuse_previous_week(self, requests, previous_week):
+        if not previous_week or len(previous_week) != len(requests):
+            return None
+
+        placements = []
+        for previous in previous_week:
+            day = self._week_days.get(previous.day.weekday())
+            if day is None:
+                break
+            if not self._is_consistent(previous.request, day, previous.slot_index, previous.lecturer_key):
+                break
+            room_key = self._find_room(day, previous.slot_index, preferred=previous.room_key)
+            if room_key is None:
+                break
+            placement = Placement(previous.request, day, previous.slot_index, previous.lecturer_key, room_key)
+            self._assign(placement)
+            placements.append(placement)
+        else:
+            return placements
+
+        for placement in reversed(placements):
+            self._unassign(placement)
+        return None
+
+    # ----- recherche -----
+
+    def _constraint_rank(self, request):
+        return (len(request.lecturer_keys), str(request.course_key), request.occurrence)
+
+    def _search(self, requests, position, placements):
+        if position == len(requests):
+            return True
+
+        request = requests[position]
+        for day, slot_index, lecturer_key in self._candidates(request):
+            self.stats.nodes += 1
+            room_key = self._find_room(day, slot_index)
+            if room_key is None:
+                continue
+
+            placement = Placement(request, day, slot_index, lecturer_key, room_key)
+            self._assign(placement)
+            placements.append(placement)
+            if self._search(requests, position + 1, placements):
+                return True
+            placements.pop()
+            self._unassign(placement)
+
+            self.stats.backtracks += 1
+            self._backtracks_left -= 1
+            if self._backtracks_left <= 0:
+                return False
+        return False
+
+    def _complete_greedily(self, requests, placements):
+        """Termine la semaine sans retour arrière une fois le budget épuisé."""
+        for placement in reversed(placements):
+            self._unassign(placement)
+
+        placements = []
+        for request in requests:
+            for day, slot_index, lecturer_key in self._candidates(request):
+                room_key = self._find_room(day, slot_index)
+                if room_key is None:
+                    continue
+                placement = Placement(request, day, slot_index, lecturer_key, room_key)
+                self._assign(placement)
+                placements.append(placement)
+                break
+            else:
+                self.stats.unplaced += 1
+        return placements
+
+    def _candidates(self, request):
+        candidates = []
+        for weekday, day in self._week_days.items():
+            for slot_index in self.grid.active_indexes:
+                if not self._is_slot_open(request, day, slot_index):
+                    continue
+                for lecturer_rank, lecturer_key in enumerate(request.lecturer_keys):
+                    if not self._is_lecturer_open(day, slot_index, lecturer_key):
+                        continue
+                    _, preferred_mask = self.availability.masks(lecturer_key, day)
+                    score = (
+                        0 if preferred_mask & (1 << slot_index) else 1,
+                        1 if self._course_days[(request.course_key, day)] else 0,
+                        self._daily_counts[day],
+                        0 if not self.prefer_morning or self.grid.is_morning(slot_index) else 1,
+                        lecturer_rank,
+                        weekday,
+                        slot_index,
+                    )
+                    candidates.append((score, day, slot_index, lecturer_key))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [(day, slot_index, lecturer_key) for _, day, slot_index, lecturer_key in candidates]
+
+    def _is_slot_open(self, request, day, slot_index):
+        if self._daily_counts[day] >= self.max_daily_sessions:
+            return False
+        if not self.occupancy.level_is_free(day, slot_index, self.level_key):
+            return False
+        if self.avoid_consecutive_sessions:
+            course_mask = self._course_days[(request.course_key, day)]
+            if course_mask & self.grid.adjacent_masks[slot_index]:
+                return False
+        return True
+
+    def _is_lecturer_open(self, day, slot_index, lecturer_key):
+        available_mask, _ = self.availability.masks(lecturer_key, day)
+        if not available_mask & (1 << slot_index):
+            return False
+        return self.occupancy.lecturer_is_free(day, slot_index, lecturer_key)
+
+    def _is_consistent(self, request, day, slot_index, lecturer_key):
+        return self._is_slot_open(request, day, slot_index) and self._is_lecturer_open(day, slot_index, lecturer_key)
+
+    def _find_room(self, day, slot_index, preferred=None):
+        if preferred is not None and preferred in self.room_keys and self.occupancy.room_is_free(day, slot_index, preferred):
+            return preferred
+        for room_key in self.room_keys:
+            if self.occupancy.room_is_free(day, slot_index, room_key):
+                return room_key
+        return None
+
+    def _assign(self, placement):
+        self.occupancy.add(
+            placement.day, placement.slot_index,
+            room_key=placement.room_key, lecturer_key=placement.lecturer_key, level_key=self.level_key,
+        )
+        self._daily_counts[placement.day] += 1
+        self._course_days[(placement.request.course_key, placement.day)] |= 1 << placement.slot_index
+
+    def _unassign(self, placement):
+        self.occupancy.remove(
+            placement.day, placement.slot_index,
+            room_key=placement.room_key, lecturer_key=placement.lecturer_key, level_key=self.level_key,
+        )
+        self._daily_counts[placement.day] -= 1
+        self._course_days[(placement.request.course_key, placement.day)] &= ~(1 << placement.slot_index)
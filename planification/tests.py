@@ -3,13 +3,23 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from datetime import date, time
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from datetime import date, time, timedelta
+from unittest.mock import PropertyMock, patch
 
 from .models import Classroom, TimeSlot, CourseSession, Schedule, LecturerAvailability, ScheduleSession
+from .conflicts import find_schedule_conflicts, find_session_conflicts
 from .services import ScheduleGenerationService
-from .forms import TimeSlotForm, TimeSlotSearchForm
+from .solver import (
+    LecturerAvailabilityIndex, OccupancyIndex, SessionRequest, SlotDefinition, SlotGrid, TimetableSolver,
+)
+from .forms import CourseSessionForm, TimeSlotForm, TimeSlotSearchForm
 from Teaching.models import Lecturer
 from academic.models import Course, Level, AcademicYear
+from audit.models import AuditLog
+from recruitment.models import LecturerCourse
+from students.models import Student, StudentLevel
 
 User = get_user_model()
 
@@ -754,6 +764,420 @@ class ScheduleGenerationServiceTest(TestCase):
         self.assertIn('sessions_count', result)
 
 
+class TimetableSolverTest(TestCase):
+    """Tests pour le moteur de résolution en mémoire"""
+
+    def setUp(self):
+        self.grid = SlotGrid([
+            SlotDefinition(1, time(8, 0), time(10, 0)),
+            SlotDefinition(2, time(14, 0), time(16, 0)),
+        ])
+        self.monday = date(2024, 9, 2)
+
+    def build_solver(self, availability):
+        return TimetableSolver(
+            grid=self.grid,
+            occupancy=OccupancyIndex(self.grid),
+            availability=availability,
+            room_keys=['A101'],
+            level_key=1,
+            max_daily_sessions=2,
+        )
+
+    def test_overlapping_slots_share_conflict_mask(self):
+        grid = SlotGrid([
+            SlotDefinition(1, time(8, 0), time(10, 0)),
+            SlotDefinition(2, time(9, 0), time(11, 0)),
+            SlotDefinition(3, time(10, 0), time(12, 0)),
+        ])
+        occupancy = OccupancyIndex(grid)
+        occupancy.add(self.monday, grid.index_by_pk[2], room_key='A101')
+
+        self.assertFalse(occupancy.room_is_free(self.monday, grid.index_by_pk[1], 'A101'))
+        self.assertFalse(occupancy.room_is_free(self.monday, grid.index_by_pk[3], 'A101'))
+        self.assertTrue(occupancy.room_is_free(self.monday, grid.index_by_pk[1], 'B201'))
+
+    def test_backtracks_when_greedy_choice_blocks_a_later_session(self):
+        availability = LecturerAvailabilityIndex(self.grid)
+        availability.add('ENS001', 1, 'preferred')
+        availability.add('ENS001', 2, 'available')
+        availability.add('ENS002', 1, 'available')
+        solver = self.build_solver(availability)
+
+        placements = solver.solve_week(
+            [SessionRequest('INF101', 0, ('ENS001',)), SessionRequest('MAT101', 0, ('ENS002',))],
+            {0: self.monday},
+        )
+
+        slots_by_course = {
+            placement.request.course_key: self.grid.slots[placement.slot_index].pk for placement in placements
+        }
+        self.assertEqual(slots_by_course, {'INF101': 2, 'MAT101': 1})
+        self.assertGreater(solver.stats.backtracks, 0)
+        self.assertEqual(solver.stats.unplaced, 0)
+
+    def test_unavailable_window_is_respected_by_date(self):
+        availability = LecturerAvailabilityIndex(self.grid)
+        availability.add('ENS001', 1, 'available')
+        availability.add('ENS001', 1, 'unavailable', date(2024, 9, 1), date(2024, 9, 7))
+
+        available_mask, _ = availability.masks('ENS001', self.monday)
+        self.assertEqual(available_mask, 0)
+        available_mask, _ = availability.masks('ENS001', date(2024, 9, 9))
+        self.assertEqual(available_mask, 1 << self.grid.index_by_pk[1])
+
+
+class ScheduleGenerationEngineTest(TestCase):
+    """Tests de bout en bout du générateur d'emploi du temps"""
+
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1),
+            end_at=date(2025, 6, 30),
+            is_active=True
+        )
+        self.level = Level.objects.create(name="Licence 1")
+        self.other_level = Level.objects.create(name="Licence 2")
+        self.schedule = Schedule.objects.create(
+            name="Semestre 1",
+            academic_year=self.academic_year,
+            level=self.level,
+            start_date=date(2024, 9, 2),
+            end_date=date(2024, 9, 29),
+            duration_type='1_month'
+        )
+        self.courses = [
+            Course.objects.create(course_code=f"INF10{index}", label=f"Cours {index}", credit_count=3, level=self.level)
+            for index in range(4)
+        ]
+        self.lecturer1 = Lecturer.objects.create(matricule="ENS001", firstname="Jean", lastname="Dupont")
+        self.lecturer2 = Lecturer.objects.create(matricule="ENS002", firstname="Marie", lastname="Martin")
+        self.morning = TimeSlot.objects.create(start_time=time(8, 0), end_time=time(10, 0))
+        self.afternoon = TimeSlot.objects.create(start_time=time(14, 0), end_time=time(16, 0))
+        self.small_room = Classroom.objects.create(code="A101", name="Salle A101", capacity=2)
+        self.large_room = Classroom.objects.create(code="B201", name="Amphi B201", capacity=100)
+        for lecturer in [self.lecturer1, self.lecturer2]:
+            for time_slot in [self.morning, self.afternoon]:
+                LecturerAvailability.objects.create(
+                    lecturer=lecturer,
+                    time_slot=time_slot,
+                    academic_year=self.academic_year,
+                    status='available'
+                )
+        for index in range(3):
+            student = Student.objects.create(matricule=f"ETU00{index}", firstname="Étudiant", lastname=str(index))
+            StudentLevel.objects.create(student=student, level=self.level, academic_year=self.academic_year, is_active=True)
+
+    def build_service(self, **kwargs):
+        kwargs.setdefault('sessions_per_week', 2)
+        return ScheduleGenerationService(schedule=self.schedule, courses=self.courses, **kwargs)
+
+    def test_generation_respects_room_lecturer_and_level_conflicts(self):
+        CourseSession.objects.create(
+            course=self.courses[0],
+            lecturer=self.lecturer1,
+            classroom=self.large_room,
+            time_slot=self.morning,
+            level=self.other_level,
+            academic_year=self.academic_year,
+            date=date(2024, 9, 2),
+        )
+
+        result = self.build_service().generate_schedule()
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['sessions_count'], 4 * 2 * 3)
+        self.assertEqual(result['unplaced_count'], 0)
+        generated = CourseSession.objects.filter(level=self.level)
+        self.assertFalse(generated.filter(classroom=self.small_room).exists())
+        self.assertFalse(generated.filter(date=date(2024, 9, 2), time_slot=self.morning).exists())
+        for field_name in ['classroom', 'lecturer', 'level']:
+            keys = list(CourseSession.objects.values_list('date', 'time_slot', field_name))
+            self.assertEqual(len(keys), len(set(keys)), field_name)
+        self.assertTrue(all(session.date.weekday() < 5 for session in generated))
+
+    def test_generation_keeps_rooms_of_cancelled_sessions(self):
+        CourseSession.objects.create(
+            course=self.courses[0],
+            lecturer=self.lecturer1,
+            classroom=self.large_room,
+            time_slot=self.morning,
+            level=self.level,
+            academic_year=self.academic_year,
+            date=date(2024, 9, 2),
+            status='cancelled',
+        )
+
+        result = self.build_service().generate_schedule()
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['unplaced_count'], 0)
+        self.assertEqual(
+            CourseSession.objects.filter(classroom=self.large_room, time_slot=self.morning, date=date(2024, 9, 2)).count(),
+            1,
+        )
+
+    def test_generation_uses_validated_course_lecturers(self):
+        validator = User.objects.create_user(username='validator', password='testpass123', role='planning')
+        for course in self.courses:
+            LecturerCourse.objects.create(lecturer=self.lecturer2, course=course, status='validated', validated_by=validator)
+
+        result = self.build_service(sessions_per_week=1).generate_schedule()
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(
+            set(CourseSession.objects.values_list('lecturer_id', flat=True)),
+            {self.lecturer2.pk},
+        )
+
+    def test_generation_is_deterministic_and_reports_timings(self):
+        first_service = self.build_service()
+        first_result = first_service.generate_schedule()
+        first_plan = [
+            (session['course'].pk, session['date'], session['time_slot'].pk, session['lecturer'].pk)
+            for session in first_service.generated_sessions
+        ]
+        CourseSession.objects.all().delete()
+        self.schedule.status = 'draft'
+        self.schedule.save()
+
+        second_service = self.build_service()
+        second_service.generate_schedule()
+        second_plan = [
+            (session['course'].pk, session['date'], session['time_slot'].pk, session['lecturer'].pk)
+            for session in second_service.generated_sessions
+        ]
+
+        self.assertEqual(first_plan, second_plan)
+        self.assertEqual(set(first_result['timings']), {'load', 'index', 'solve', 'save', 'total'})
+
+    def test_solve_phase_query_count_does_not_depend_on_course_count(self):
+        small_service = self.build_service()
+        small_service.courses = self.courses[:1]
+        large_service = self.build_service()
+
+        with CaptureQueriesContext(connection) as small_queries:
+            small_service._prepare_data()
+            small_service._build_indexes()
+            small_service._generate_sessions()
+        with CaptureQueriesContext(connection) as large_queries:
+            large_service._prepare_data()
+            large_service._build_indexes()
+            large_service._generate_sessions()
+
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_bulk_save_logs_single_summary_audit_event(self):
+        service = self.build_service()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = service.generate_schedule()
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(ScheduleSession.objects.filter(schedule=self.schedule).count(), result['sessions_count'])
+        self.assertFalse(AuditLog.objects.filter(target_model='CourseSession').exists())
+        self.assertFalse(AuditLog.objects.filter(target_model='ScheduleSession').exists())
+        summary = AuditLog.objects.get(action='bulk_create', target_model='Schedule')
+        self.assertEqual(summary.context['sessions_count'], result['sessions_count'])
+
+    def test_bulk_save_query_count_does_not_depend_on_session_count(self):
+        service = self.build_service()
+        service._prepare_data()
+        service._build_indexes()
+        service._generate_sessions()
+
+        with CaptureQueriesContext(connection) as queries:
+            service._save_generated_sessions()
+
+        self.assertLess(len(queries), 20)
+        self.assertEqual(CourseSession.objects.count(), len(service.generated_sessions))
+
+    def test_bulk_save_resolves_primary_keys_when_backend_does_not_return_them(self):
+        service = self.build_service()
+        service._prepare_data()
+        service._build_indexes()
+        service._generate_sessions()
+
+        with patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=PropertyMock, return_value=False,
+        ):
+            service._save_generated_sessions()
+
+        for schedule_session in ScheduleSession.objects.select_related('course_session'):
+            self.assertEqual(schedule_session.course_session.level, self.level)
+        self.assertEqual(ScheduleSession.objects.count(), len(service.generated_sessions))
+
+    def test_row_by_row_save_remains_available(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.build_service(sessions_per_week=1, bulk_save=False).generate_schedule()
+
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(ScheduleSession.objects.filter(schedule=self.schedule).count(), result['sessions_count'])
+        self.assertEqual(
+            AuditLog.objects.filter(target_model='CourseSession', action='create').count(),
+            result['sessions_count'],
+        )
+        self.assertFalse(AuditLog.objects.filter(action='bulk_create').exists())
+
+    def test_generation_fails_when_no_room_fits_the_level(self):
+        self.large_room.capacity = 2
+        self.large_room.save()
+
+        result = self.build_service().generate_schedule()
+
+        self.assertFalse(result['success'])
+        self.assertIn('Aucune salle', result['message'])
+
+
+class SessionConflictIndexTest(TestCase):
+    """Tests pour l'index de conflits des séances"""
+
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            start_at=date(2099, 9, 1),
+            end_at=date(2100, 6, 30),
+            is_active=True
+        )
+        self.level = Level.objects.create(name="Licence 1")
+        self.other_level = Level.objects.create(name="Licence 2")
+        self.course = Course.objects.create(course_code="INF101", label="Algorithmique", credit_count=3, level=self.level)
+        self.other_course = Course.objects.create(course_code="MAT201", label="Analyse", credit_count=3, level=self.other_level)
+        self.lecturer = Lecturer.objects.create(matricule="ENS001", firstname="Jean", lastname="Dupont")
+        self.other_lecturer = Lecturer.objects.create(matricule="ENS002", firstname="Marie", lastname="Martin")
+        self.room = Classroom.objects.create(code="A101", name="Salle A101", capacity=50)
+        self.other_room = Classroom.objects.create(code="B201", name="Salle B201", capacity=50)
+        self.morning = TimeSlot.objects.create(start_time=time(8, 0), end_time=time(10, 0))
+        self.overlapping = TimeSlot.objects.create(start_time=time(9, 0), end_time=time(11, 0))
+        self.session_date = date(2099, 10, 5)
+        self.existing = CourseSession.objects.create(
+            course=self.other_course,
+            lecturer=self.lecturer,
+            classroom=self.room,
+            time_slot=self.morning,
+            level=self.other_level,
+            academic_year=self.academic_year,
+            date=self.session_date,
+        )
+
+    def candidate(self, **kwargs):
+        values = {
+            'course': self.course,
+            'lecturer': self.other_lecturer,
+            'classroom': self.other_room,
+            'time_slot': self.overlapping,
+            'level': self.level,
+            'academic_year': self.academic_year,
+            'date': self.session_date,
+        }
+        values.update(kwargs)
+        return CourseSession(**values)
+
+    def test_overlapping_time_slots_conflict_on_shared_lecturer(self):
+        conflicts = find_session_conflicts([self.candidate(lecturer=self.lecturer)])
+
+        self.assertEqual([conflict.resource for conflict in conflicts], ['lecturer'])
+        self.assertEqual(conflicts[0].other.pk, self.existing.pk)
+        self.assertIn("Analyse", conflicts[0].message)
+
+    def test_batch_is_validated_in_one_query_including_internal_conflicts(self):
+        batch = [
+            self.candidate(date=self.session_date + timedelta(days=offset), classroom=self.room)
+            for offset in range(1, 6)
+        ] + [self.candidate(date=self.session_date + timedelta(days=1), time_slot=self.morning)]
+
+        with self.assertNumQueries(1):
+            conflicts = find_session_conflicts(batch)
+
+        self.assertEqual(
+            sorted(conflict.resource for conflict in conflicts),
+            ['lecturer', 'level'],
+        )
+
+    def test_cancelled_sessions_keep_only_their_room_and_edited_sessions_are_ignored(self):
+        self.assertEqual(find_session_conflicts([self.existing]), [])
+
+        self.existing.status = 'cancelled'
+        self.existing.save()
+        conflicts = find_session_conflicts([self.candidate(lecturer=self.lecturer, classroom=self.room)])
+        self.assertEqual([conflict.resource for conflict in conflicts], ['classroom'])
+        self.assertEqual(find_session_conflicts([self.candidate(lecturer=self.lecturer)]), [])
+
+    def test_course_session_form_rejects_lecturer_double_booking(self):
+        form = CourseSessionForm(data={
+            'course': self.other_course.pk,
+            'lecturer': self.lecturer.pk,
+            'classroom': self.other_room.pk,
+            'time_slot': self.overlapping.pk,
+            'level': self.other_level.pk,
+            'academic_year': self.academic_year.pk,
+            'date': self.session_date.isoformat(),
+            'session_type': 'lecture',
+            'status': 'scheduled',
+            'duration_hours': '1.5',
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("L'enseignant est déjà occupé(e)", form.non_field_errors()[0])
+
+    def test_course_session_form_checks_the_room_of_a_cancelled_session(self):
+        data = {
+            'course': self.other_course.pk,
+            'lecturer': self.lecturer.pk,
+            'classroom': self.room.pk,
+            'time_slot': self.overlapping.pk,
+            'level': self.other_level.pk,
+            'academic_year': self.academic_year.pk,
+            'date': self.session_date.isoformat(),
+            'session_type': 'lecture',
+            'status': 'cancelled',
+            'duration_hours': '1.5',
+        }
+
+        form = CourseSessionForm(data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("La salle est déjà occupé(e)", form.non_field_errors()[0])
+
+        form = CourseSessionForm(data={**data, 'classroom': self.other_room.pk})
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_schedule_conflicts_include_rooms_of_cancelled_sessions(self):
+        schedule = Schedule.objects.create(
+            name="Semestre 1",
+            academic_year=self.academic_year,
+            level=self.level,
+            start_date=date(2099, 10, 1),
+            end_date=date(2099, 10, 31),
+        )
+        self.existing.status = 'cancelled'
+        self.existing.save()
+        scheduled = self.candidate(lecturer=self.lecturer, classroom=self.room)
+        scheduled.save()
+        ScheduleSession.objects.create(schedule=schedule, course_session=scheduled, week_number=1)
+
+        conflicts = find_schedule_conflicts(schedule)
+
+        self.assertEqual([conflict.resource for conflict in conflicts], ['classroom'])
+
+    def test_schedule_conflicts_are_reported(self):
+        schedule = Schedule.objects.create(
+            name="Semestre 1",
+            academic_year=self.academic_year,
+            level=self.level,
+            start_date=date(2099, 10, 1),
+            end_date=date(2099, 10, 31),
+        )
+        scheduled = self.candidate(lecturer=self.lecturer)
+        scheduled.save()
+        ScheduleSession.objects.create(schedule=schedule, course_session=scheduled, week_number=1)
+
+        with self.assertNumQueries(1):
+            conflicts = find_schedule_conflicts(schedule)
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0].session.pk, scheduled.pk)
+        self.assertEqual(conflicts[0].other.pk, self.existing.pk)
+
+
 class ScheduleViewsTest(TestCase):
     """Tests pour les vues d'emploi du temps"""
 
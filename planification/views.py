@@ -17,6 +17,7 @@ from .forms import (
     ScheduleForm, LecturerAvailabilityForm, ScheduleGenerationForm,
     TimeSlotForm, TimeSlotSearchForm, CourseSessionForm
 )
+from .conflicts import find_schedule_conflicts
 from .services import ScheduleGenerationService
 from Teaching.models import Lecturer
 from academic.models import Course, Level, AcademicYear
@@ -976,13 +977,14 @@ class ScheduleDetailView(LoginRequiredMixin, DetailView):
         for session in schedule_sessions.select_related(
             'course_session__course', 'course_session__lecturer',
             'course_session__classroom', 'course_session__time_slot'
-        ).order_by('week_number', 'course_session__time_slot__day_of_week', 'course_session__time_slot__start_time'):
+        ).order_by('week_number', 'course_session__date', 'course_session__time_slot__start_time'):
             week = session.week_number
             if week not in sessions_by_week:
                 sessions_by_week[week] = []
             sessions_by_week[week].append(session)
 
         context['sessions_by_week'] = sessions_by_week
+        context['conflicts'] = find_schedule_conflicts(self.object)
 
         return context
 
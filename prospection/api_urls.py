@@ -25,6 +25,13 @@ urlpatterns = [
     path('equipes/<int:equipe_id>/membres/<int:agent_id>/', api_views.supprimer_membre_equipe, name='supprimer_membre'),
     path('equipes/reconduire/', api_views.reconduire_equipe, name='reconduire_equipe'),
 
+    # Synchronisation hors ligne
+    path('prospects/sync/', api_views.ProspectSyncView.as_view(), name='prospects_sync'),
+    path('sync/seances/', api_views.DeltaSyncView.as_view(source_name='seances'), name='sync_seances'),
+    path('sync/equipes/', api_views.DeltaSyncView.as_view(source_name='equipes'), name='sync_equipes'),
+    path('sync/agents/', api_views.DeltaSyncView.as_view(source_name='agents'), name='sync_agents'),
+    path('sync/schools/', api_views.DeltaSyncView.as_view(source_name='schools'), name='sync_schools'),
+
     # Utilitaires
     path('agents-actifs/', api_views.agents_actifs, name='agents_actifs'),
 
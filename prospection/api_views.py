@@ -1,3 +1,5 @@
+from collections import Counter
+
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -5,12 +7,24 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password
+from django.utils.http import parse_etags
 
 from audit.utils import log_audit_event
 from authentication.models import LoginHistory
 from authentication.services import record_login
 from .models import Agent, SeanceProspection, Equipe
 from .authentication import AgentJWTAuthentication
+from .sync import (
+    DELTA_SOURCES,
+    SYNC_CREATED,
+    SYNC_DUPLICATE,
+    SYNC_REJECTED,
+    SYNC_UPDATED,
+    GzipJSONParser,
+    build_delta_page,
+    parse_delta_since,
+    sync_prospects,
+)
 from .serializers import (
     AgentRegistrationSerializer,
     AgentLoginSerializer,
@@ -890,3 +904,77 @@ def statistiques_agents(request):
             'taux_activation': round((agents_actifs / total_agents * 100) if total_agents > 0 else 0, 2)
         }
     }, status=status.HTTP_200_OK)
+
+
+# ===== SYNCHRONISATION HORS LIGNE =====
+
+class ProspectSyncView(APIView):
+    """
+    Vue pour synchroniser en une requête les prospects collectés hors ligne
+    (corps JSON ``{"prospects": [...]}``, éventuellement compressé en gzip)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [GzipJSONParser]
+
+    def post(self, request):
+        agent = getattr(request.user, 'agent', None)
+        items = request.data.get('prospects') if isinstance(request.data, dict) else request.data
+        results, cursor = sync_prospects(items, agent=agent)
+
+        counts = Counter(result['status'] for result in results)
+        return Response({
+            'success': True,
+            'message': f"{counts[SYNC_CREATED]} prospect(s) créé(s), {counts[SYNC_UPDATED]} mis à jour, "
+                       f"{counts[SYNC_REJECTED]} rejeté(s)",
+            'counts': {status_name: counts[status_name] for status_name in (
+                SYNC_CREATED, SYNC_UPDATED, SYNC_DUPLICATE, SYNC_REJECTED,
+            )},
+            'results': results,
+            'sync_cursor': cursor,
+        }, status=status.HTTP_200_OK)
+
+
+class DeltaSyncView(APIView):
+    """
+    Vue de synchronisation différentielle d'une donnée de référence
+    (paramètres ``cursor`` ou ``updated_since``, et ``limit``)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    source_name = None
+
+    def get(self, request):
+        source = DELTA_SOURCES[self.source_name]
+        try:
+            since = parse_delta_since(
+                cursor=request.query_params.get('cursor'),
+                updated_since=request.query_params.get('updated_since'),
+            )
+            limit = self.get_limit(request)
+        except ValueError as exc:
+            return Response({
+                'success': False,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        page = build_delta_page(source, since=since, limit=limit)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if page.etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({
+                'success': True,
+                'results': page.serialize(),
+                'deleted': page.deleted,
+                'next_cursor': page.next_cursor,
+                'has_more': page.has_more,
+            }, status=status.HTTP_200_OK)
+        response['ETag'] = page.etag
+        return response
+
+    def get_limit(self, request):
+        limit = request.query_params.get('limit')
+        if not limit:
+            return None
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError('Paramètre « limit » invalide.')
+        return int(limit)
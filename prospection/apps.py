@@ -5,3 +5,6 @@ class ProspectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prospection'
     verbose_name = 'Prospection'
+
+    def ready(self):
+        import prospection.signals  # noqa: F401
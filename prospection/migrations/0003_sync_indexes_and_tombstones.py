@@ -0,0 +1,44 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prospection', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Modèle')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Identifiant supprimé')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Supprimé le')),
+            ],
+            options={
+                'verbose_name': 'Trace de suppression',
+                'verbose_name_plural': 'Traces de suppression',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(fields=['updated_at', 'id'], name='prospection_agent_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipe',
+            index=models.Index(fields=['updated_at', 'id'], name='prospection_equipe_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seanceprospection',
+            index=models.Index(fields=['updated_at', 'id'], name='prospection_seance_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['model_name', 'deleted_at', 'id'], name='prospection_tombstone_idx'),
+        ),
+    ]
@@ -106,6 +106,9 @@ class Agent(models.Model):
         verbose_name = "Agent de prospection"
         verbose_name_plural = "Agents de prospection"
         ordering = ['nom', 'prenom']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='prospection_agent_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.matricule} - {self.nom} {self.prenom}"
@@ -250,6 +253,9 @@ class Equipe(models.Model):
         verbose_name = "Équipe de prospection"
         verbose_name_plural = "Équipes de prospection"
         ordering = ['seance', 'nom']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='prospection_equipe_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nom} - {self.seance.nom}"
@@ -452,6 +458,27 @@ class SeanceProspection(models.Model):
         verbose_name_plural = "Séances de prospection"
         ordering = ['-date_seance']
         unique_together = ['campagne', 'date_seance']  # Une seule séance par campagne par jour
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='prospection_seance_sync_idx'),
+        ]
 
 
+class SyncTombstone(models.Model):
+    """
+    Trace de suppression transmise aux applications mobiles lors des synchronisations
+    différentielles (séances, équipes, agents, écoles)
+    """
+    model_name = models.CharField(max_length=50, verbose_name="Modèle")
+    object_id = models.PositiveBigIntegerField(verbose_name="Identifiant supprimé")
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="Supprimé le")
 
+    class Meta:
+        verbose_name = "Trace de suppression"
+        verbose_name_plural = "Traces de suppression"
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['model_name', 'deleted_at', 'id'], name='prospection_tombstone_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} supprimé le {self.deleted_at:%d/%m/%Y %H:%M}"
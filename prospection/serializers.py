@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
+from schools.models import School
+
 from .models import Agent, SeanceProspection, Equipe
 
 
@@ -215,7 +217,8 @@ class EquipeSerializer(serializers.ModelSerializer):
 
     def get_agents_actifs_count(self, obj):
         """Retourne le nombre d'agents actifs dans l'équipe"""
-        return obj.agents_actifs.count()
+        # Parcourt obj.agents.all() pour profiter d'un éventuel prefetch_related('agents').
+        return sum(1 for agent in obj.agents.all() if agent.is_active)
 
     def get_agents(self, obj):
         """Retourne la liste des agents de l'équipe"""
@@ -369,3 +372,41 @@ class AgentListSerializer(serializers.ModelSerializer):
             'last_login', 'created_at'
         ]
         read_only_fields = ['matricule', 'created_at']
+
+
+class ProspectSyncItemSerializer(serializers.Serializer):
+    """
+    Serializer d'un prospect collecté hors ligne (synchronisation par lots).
+
+    Les équipes et établissements sont vérifiés pour tout le lot à la fois par
+    ``prospection.sync`` : seuls leurs identifiants sont validés ici.
+    """
+    client_id = serializers.CharField(max_length=64)
+    nom = serializers.CharField(max_length=100)
+    prenom = serializers.CharField(max_length=100)
+    telephone = serializers.CharField(max_length=20)
+    telephone_pere = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    telephone_mere = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    equipe = serializers.IntegerField()
+    etablissement_origine = serializers.IntegerField(required=False, allow_null=True)
+    date_collecte = serializers.DateTimeField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class AgentSyncSerializer(AgentListSerializer):
+    """
+    Serializer des agents pour la synchronisation différentielle
+    """
+
+    class Meta(AgentListSerializer.Meta):
+        fields = AgentListSerializer.Meta.fields + ['updated_at']
+
+
+class SchoolSyncSerializer(serializers.ModelSerializer):
+    """
+    Serializer des établissements pour la synchronisation différentielle
+    """
+
+    class Meta:
+        model = School
+        fields = ['id', 'name', 'address', 'phone_number', 'level', 'last_updated']
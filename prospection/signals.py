@@ -0,0 +1,81 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from schools.models import School
+
+from .models import Agent, Campagne, Equipe, SeanceProspection
+from .sync import record_deletion, touch_sync_rows
+
+
+DELTA_SOURCE_NAMES = {
+    SeanceProspection: 'seances',
+    Equipe: 'equipes',
+    Agent: 'agents',
+    School: 'schools',
+}
+
+
+@receiver(post_delete, sender=SeanceProspection)
+@receiver(post_delete, sender=Equipe)
+@receiver(post_delete, sender=Agent)
+@receiver(post_delete, sender=School)
+def record_deletion_for_delta_sync(sender, instance, **kwargs):
+    record_deletion(DELTA_SOURCE_NAMES[sender], instance.pk)
+
+
+@receiver(post_save, sender=Equipe)
+@receiver(post_delete, sender=Equipe)
+def touch_seance_on_equipe_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.seance_id:
+        return
+
+    # Les séances exposent le nombre d'équipes et d'agents.
+    touch_sync_rows(SeanceProspection.objects.filter(pk=instance.seance_id))
+
+
+@receiver(m2m_changed, sender=Equipe.agents.through)
+def touch_equipes_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # agent.equipes.clear() : les équipes concernées ne sont plus connues après coup.
+        instance._cleared_equipe_ids = list(instance.equipes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # agent.equipes.add(...) : pk_set contient les équipes.
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_equipe_ids', None)
+        equipes = Equipe.objects.filter(pk__in=pk_set) if pk_set else Equipe.objects.none()
+    else:
+        equipes = Equipe.objects.filter(pk=instance.pk)
+    seance_ids = list(equipes.values_list('seance_id', flat=True))
+    touch_sync_rows(equipes)
+    touch_sync_rows(SeanceProspection.objects.filter(pk__in=seance_ids))
+
+
+# Champs des agents exposés par les équipes (EquipeSerializer.get_agents, chef d'équipe).
+EQUIPE_AGENT_FIELDS = {'matricule', 'nom', 'prenom', 'email', 'telephone', 'type_agent', 'statut', 'is_active'}
+
+
+@receiver(post_save, sender=Agent)
+def touch_equipes_on_agent_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    # Une connexion (last_login) ou un changement de mot de passe ne modifie pas les équipes.
+    if update_fields is not None and not EQUIPE_AGENT_FIELDS.intersection(update_fields):
+        return
+
+    # Les équipes exposent les agents qui les composent.
+    touch_sync_rows(Equipe.objects.filter(Q(agents=instance) | Q(chef_equipe=instance)))
+
+
+@receiver(post_save, sender=Campagne)
+def touch_seances_on_campagne_change(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+
+    # Séances et équipes exposent le nom de la campagne.
+    touch_sync_rows(SeanceProspection.objects.filter(campagne=instance))
+    touch_sync_rows(Equipe.objects.filter(seance__campagne=instance))
@@ -0,0 +1,409 @@
+"""
+Synchronisation par lots des applications mobiles de prospection.
+
+Les agents collectent les prospects hors ligne puis envoient toute la collecte en
+une requête (JSON éventuellement compressé en gzip). Le lot est validé en bloc
+(une requête pour les équipes, une pour les établissements) puis enregistré par
+``bulk_create`` en mode upsert sur la contrainte ``(telephone, equipe)`` : un
+prospect déjà connu est mis à jour au lieu de faire échouer l'envoi. Sa date de
+collecte n'est remplacée que si l'élément en fournit une, et son agent collecteur
+n'est jamais réattribué (il n'est renseigné que s'il manquait).
+
+Chaque élément reçoit un résultat (``created``, ``updated``, ``duplicate`` ou
+``rejected``) associé à son ``client_id`` ; la réponse porte aussi un curseur
+de synchronisation (dernière modification enregistrée).
+
+Les données de référence (séances, équipes, agents, écoles) se synchronisent par
+différence : chaque page contient les lignes modifiées après le curseur, triées par
+``(date de modification, identifiant)`` sur un index dédié, ainsi que les
+suppressions (``SyncTombstone``) de la même période. Les dates de modification sont
+fixées à l'écriture et non à la validation de la transaction : une page s'arrête donc
+``PROSPECTION_DELTA_SAFETY_WINDOW`` secondes avant l'instant présent, pour qu'une ligne
+validée en retard ne tombe jamais avant un curseur déjà remis à un client. L'ETag
+d'une page est calculé avant la sérialisation : une application à jour reçoit un 304
+sans corps.
+"""
+
+import base64
+import gzip
+import hashlib
+import io
+import zlib
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from audit.context import suspend_audit
+from schools.models import School
+
+from .models import Agent, Equipe, Prospect, SeanceProspection, SyncTombstone
+from .serializers import (
+    AgentSyncSerializer,
+    EquipeSerializer,
+    ProspectSyncItemSerializer,
+    SchoolSyncSerializer,
+    SeanceProspectionSerializer,
+)
+
+
+SYNC_CREATED = 'created'
+SYNC_UPDATED = 'updated'
+SYNC_DUPLICATE = 'duplicate'
+SYNC_REJECTED = 'rejected'
+WRITE_BATCH_SIZE = 500
+
+# Champs mis à jour sur un prospect existant (``date_collecte`` seulement si fournie).
+PROSPECT_SYNC_FIELDS = [
+    'nom', 'prenom', 'telephone_pere', 'telephone_mere', 'etablissement_origine', 'notes', 'updated_at',
+]
+
+
+def get_sync_max_items():
+    return getattr(settings, 'PROSPECTION_SYNC_MAX_ITEMS', 5000)
+
+
+def get_sync_max_payload_size():
+    return getattr(settings, 'PROSPECTION_SYNC_MAX_PAYLOAD_SIZE', 20 * 1024 * 1024)
+
+
+def get_delta_page_size():
+    return getattr(settings, 'PROSPECTION_DELTA_PAGE_SIZE', 500)
+
+
+def get_delta_horizon():
+    """Date au-delà de laquelle les modifications ne sont pas encore synchronisées."""
+    return timezone.now() - timedelta(seconds=getattr(settings, 'PROSPECTION_DELTA_SAFETY_WINDOW', 60))
+
+
+@dataclass(frozen=True)
+class DeltaSource:
+    """Données de référence synchronisées par différence."""
+    name: str
+    model: type
+    timestamp_field: str
+    serializer_class: type
+    select_related: tuple = ()
+    prefetch_related: tuple = ()
+
+    def queryset(self):
+        return self.model._default_manager.select_related(*self.select_related).prefetch_related(
+            *self.prefetch_related
+        )
+
+
+DELTA_SOURCES = {
+    source.name: source for source in (
+        DeltaSource(
+            'seances', SeanceProspection, 'updated_at', SeanceProspectionSerializer,
+            select_related=('campagne',), prefetch_related=('equipes__agents',),
+        ),
+        DeltaSource(
+            'equipes', Equipe, 'updated_at', EquipeSerializer,
+            select_related=('chef_equipe', 'seance__campagne'), prefetch_related=('agents',),
+        ),
+        DeltaSource('agents', Agent, 'updated_at', AgentSyncSerializer),
+        DeltaSource('schools', School, 'last_updated', SchoolSyncSerializer),
+    )
+}
+
+
+@dataclass
+class DeltaPage:
+    """Page de synchronisation différentielle, sérialisée seulement si nécessaire."""
+    source: DeltaSource
+    keys: list
+    deleted: list
+    next_cursor: str
+    has_more: bool
+    etag: str = field(init=False)
+
+    def __post_init__(self):
+        digest = hashlib.sha256(repr((
+            self.source.name,
+            [(pk, timestamp.isoformat()) for pk, timestamp in self.keys],
+            self.deleted,
+            self.next_cursor,
+        )).encode()).hexdigest()
+        self.etag = f'"{digest[:32]}"'
+
+    def serialize(self):
+        objects = self.source.queryset().in_bulk([pk for pk, _ in self.keys])
+        return self.source.serializer_class(
+            [objects[pk] for pk, _ in self.keys if pk in objects], many=True,
+        ).data
+
+
+class GzipJSONParser(JSONParser):
+    """Analyse un corps JSON, décompressé au préalable s'il est envoyé avec ``Content-Encoding: gzip``."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').lower() if request is not None else ''
+        if encoding not in ('gzip', 'x-gzip'):
+            return super().parse(stream, media_type=media_type, parser_context=parser_context)
+
+        max_size = get_sync_max_payload_size()
+        try:
+            with gzip.GzipFile(fileobj=stream) as decompressed:
+                # Lecture bornée : une archive malveillante ne peut pas saturer la mémoire.
+                payload = decompressed.read(max_size + 1)
+        except (OSError, EOFError, zlib.error) as exc:
+            raise ParseError(f'Contenu gzip invalide : {exc}')
+        if len(payload) > max_size:
+            raise ParseError('Contenu décompressé trop volumineux.')
+        return super().parse(io.BytesIO(payload), media_type=media_type, parser_context=parser_context)
+
+
+def encode_sync_cursor(updated_at, pk):
+    """Curseur opaque ``(date de modification, identifiant)`` transmis aux applications mobiles."""
+    raw = f'{updated_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """Retourne ``(date de modification, identifiant)`` ; lève ``ValueError`` si le curseur est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        updated_at, pk = raw.rsplit('|', 1)
+        updated_at = parse_datetime(updated_at)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError, base64.binascii.Error):
+        raise ValueError('Curseur de synchronisation invalide.')
+    if updated_at is None:
+        raise ValueError('Curseur de synchronisation invalide.')
+    return updated_at, pk
+
+
+def sync_prospects(items, agent=None):
+    """
+    Valide et enregistre un lot de prospects ; retourne ``(résultats, curseur)``.
+
+    ``agent`` (agent connecté) devient l'agent collecteur des prospects qui n'en ont
+    pas et limite le lot à ses équipes (membre ou chef) ; sans agent, toute équipe
+    existante est acceptée.
+    """
+    if not isinstance(items, list):
+        raise ParseError('La liste « prospects » est requise.')
+    if len(items) > get_sync_max_items():
+        raise ParseError(f'Un lot ne peut pas dépasser {get_sync_max_items()} prospects.')
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = ProspectSyncItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            client_id = item.get('client_id') if isinstance(item, dict) else None
+            results[index] = _result(client_id, SYNC_REJECTED, errors=serializer.errors)
+
+    equipes = Equipe.objects.filter(pk__in={data['equipe'] for _, data in valid})
+    if agent is not None:
+        equipes = equipes.filter(Q(agents=agent) | Q(chef_equipe=agent))
+    equipe_ids = set(equipes.values_list('pk', flat=True).distinct())
+    school_ids = set(
+        School.objects.filter(
+            pk__in={data['etablissement_origine'] for _, data in valid if data.get('etablissement_origine')}
+        ).values_list('pk', flat=True)
+    )
+
+    # Le dernier envoi d'un même couple (téléphone, équipe) l'emporte.
+    prospects_by_key = {}
+    dated_keys = set()
+    duplicates = {}
+    for index, data in valid:
+        errors = {}
+        if data['equipe'] not in equipe_ids:
+            errors['equipe'] = ['Équipe introuvable ou non attribuée à cet agent.']
+        if data.get('etablissement_origine') and data['etablissement_origine'] not in school_ids:
+            errors['etablissement_origine'] = ['Établissement introuvable.']
+        if errors:
+            results[index] = _result(data['client_id'], SYNC_REJECTED, errors=errors)
+            continue
+
+        key = (data['telephone'], data['equipe'])
+        if key in prospects_by_key:
+            previous_index, _ = prospects_by_key[key]
+            duplicates[previous_index] = key
+        prospects_by_key[key] = (index, _build_prospect(data, agent))
+        if data.get('date_collecte'):
+            dated_keys.add(key)
+        else:
+            dated_keys.discard(key)
+
+    if not prospects_by_key:
+        return results, None
+
+    existing_keys = _existing_keys(prospects_by_key)
+    # Un upsert ne met à jour que des champs fixes : un lot par présence de la date de collecte.
+    batches = {False: [], True: []}
+    for key, (_, prospect) in prospects_by_key.items():
+        batches[key in dated_keys].append(prospect)
+    with transaction.atomic(), suspend_audit():
+        for update_date_collecte, prospects in batches.items():
+            if prospects:
+                Prospect.objects.bulk_create(
+                    prospects,
+                    batch_size=WRITE_BATCH_SIZE,
+                    **_upsert_options(update_date_collecte),
+                )
+        saved = _saved_prospects(prospects_by_key)
+        if agent is not None and existing_keys:
+            Prospect.objects.filter(
+                pk__in=[saved[key][0] for key in existing_keys], agent_collecteur__isnull=True,
+            ).update(agent_collecteur=agent)
+
+    last = None
+    for key, (index, _) in prospects_by_key.items():
+        pk, updated_at = saved[key]
+        status = SYNC_UPDATED if key in existing_keys else SYNC_CREATED
+        results[index] = _result(items[index]['client_id'], status, pk=pk, updated_at=updated_at)
+        if last is None or (updated_at, pk) > last:
+            last = (updated_at, pk)
+
+    for index, key in duplicates.items():
+        pk, updated_at = saved[key]
+        results[index] = _result(items[index]['client_id'], SYNC_DUPLICATE, pk=pk, updated_at=updated_at)
+
+    return results, encode_sync_cursor(*last)
+
+
+def _build_prospect(data, agent):
+    return Prospect(
+        nom=data['nom'],
+        prenom=data['prenom'],
+        telephone=data['telephone'],
+        telephone_pere=data.get('telephone_pere') or None,
+        telephone_mere=data.get('telephone_mere') or None,
+        equipe_id=data['equipe'],
+        agent_collecteur=agent,
+        etablissement_origine_id=data.get('etablissement_origine'),
+        date_collecte=data.get('date_collecte') or timezone.now(),
+        notes=data.get('notes') or None,
+    )
+
+
+def _upsert_options(update_date_collecte=False):
+    update_fields = PROSPECT_SYNC_FIELDS + ['date_collecte'] if update_date_collecte else PROSPECT_SYNC_FIELDS
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    # MySQL (ON DUPLICATE KEY UPDATE) n'accepte pas de champs uniques explicites.
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['telephone', 'equipe']
+    return options
+
+
+def _lookup(prospects_by_key):
+    return Prospect.objects.filter(
+        equipe_id__in={equipe_id for _, equipe_id in prospects_by_key},
+        telephone__in={telephone for telephone, _ in prospects_by_key},
+    )
+
+
+def _existing_keys(prospects_by_key):
+    return {
+        key for key in _lookup(prospects_by_key).values_list('telephone', 'equipe_id')
+        if key in prospects_by_key
+    }
+
+
+def _saved_prospects(prospects_by_key):
+    # Les identifiants ne sont pas renvoyés par un upsert : relecture en une requête.
+    return {
+        (telephone, equipe_id): (pk, updated_at)
+        for pk, telephone, equipe_id, updated_at in _lookup(prospects_by_key).values_list(
+            'pk', 'telephone', 'equipe_id', 'updated_at'
+        )
+        if (telephone, equipe_id) in prospects_by_key
+    }
+
+
+def _result(client_id, status, pk=None, updated_at=None, errors=None):
+    result = {'client_id': client_id, 'status': status, 'id': pk}
+    if updated_at is not None:
+        result['updated_at'] = updated_at
+    if errors:
+        result['errors'] = errors
+    return result
+
+
+
+def parse_delta_since(cursor=None, updated_since=None):
+    """Point de départ ``(date, identifiant)`` d'une synchronisation ; ``None`` pour tout recevoir."""
+    if cursor:
+        return decode_sync_cursor(cursor)
+    if updated_since:
+        since = parse_datetime(updated_since)
+        if since is None:
+            raise ValueError('Date « updated_since » invalide.')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since, 0
+    return None
+
+
+def build_delta_page(source, since=None, limit=None):
+    """
+    Lignes de ``source`` modifiées après ``since`` et suppressions de la même période.
+
+    Seuls les identifiants et dates sont lus ici (une requête par flux) ; ``DeltaPage.serialize``
+    charge ensuite les objets de la page.
+    """
+    page_size = get_delta_page_size()
+    limit = min(limit or page_size, page_size)
+    timestamp_field = source.timestamp_field
+
+    horizon = get_delta_horizon()
+
+    # Une transaction encore ouverte peut valider plus tard des lignes datées d'avant
+    # l'horizon : le curseur ne le dépasse jamais, elles seront lues à la page suivante.
+    rows = source.model._default_manager.filter(**{f'{timestamp_field}__lte': horizon})
+    # Un premier chargement complet n'a pas de suppressions à appliquer.
+    tombstones = SyncTombstone.objects.none()
+    if since is not None:
+        since_at, since_pk = since
+        rows = rows.filter(
+            Q(**{f'{timestamp_field}__gt': since_at}) | Q(**{timestamp_field: since_at, 'pk__gt': since_pk})
+        )
+        tombstones = SyncTombstone.objects.filter(model_name=source.name, deleted_at__gt=since_at, deleted_at__lte=horizon)
+
+    keys = list(rows.order_by(timestamp_field, 'pk').values_list('pk', timestamp_field)[:limit + 1])
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+    if has_more:
+        # Les suppressions postérieures à la page arriveront avec la page suivante.
+        tombstones = tombstones.filter(deleted_at__lte=keys[-1][1])
+    deleted = list(tombstones.order_by('deleted_at', 'pk').values_list('object_id', 'deleted_at'))
+
+    positions = [(timestamp, pk) for pk, timestamp in keys]
+    positions.extend((deleted_at, 0) for _, deleted_at in deleted)
+    if positions:
+        next_cursor = encode_sync_cursor(*max(positions))
+    elif since is not None:
+        next_cursor = encode_sync_cursor(*since)
+    else:
+        next_cursor = None
+    return DeltaPage(
+        source=source,
+        keys=keys,
+        deleted=sorted({object_id for object_id, _ in deleted}),
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+
+
+def record_deletion(source_name, object_id):
+    """Enregistre la suppression d'une donnée de référence pour les synchronisations différentielles."""
+    with suspend_audit():
+        SyncTombstone.objects.create(model_name=source_name, object_id=object_id)
+
+
+def touch_sync_rows(queryset, timestamp_field='updated_at'):
+    """Marque des lignes comme modifiées (données imbriquées changées) sans déclencher de signaux."""
+    return queryset.update(**{timestamp_field: timezone.now()})
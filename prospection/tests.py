@@ -1,7 +1,16 @@
-from django.test import TestCase
+import gzip
+import json
+
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.utils import timezone
 from datetime import date, timedelta
-from .models import Agent, Campagne, Equipe, Prospect
+from rest_framework.test import APIClient
+from .authentication import AgentWrapper
+from .models import Agent, Campagne, Equipe, Prospect, SeanceProspection
+from .sync import decode_sync_cursor, sync_prospects
 from academic.models import AcademicYear
 from schools.models import School
 
@@ -94,3 +103,249 @@ class ProspectionModelsTest(TestCase):
         self.assertEqual(prospect.nom_complet, "Doe John")
         self.assertEqual(self.equipe.prospects_collectes, 1)
         self.assertEqual(self.equipe.taux_realisation, 2.0)  # 1/50 * 100
+
+
+class ProspectSyncAPITests(TestCase):
+    """Tests de la synchronisation par lots des prospects"""
+
+    def setUp(self):
+        academic_year = AcademicYear.objects.create(start_at=date(2024, 9, 1), end_at=date(2025, 6, 30))
+        campagne = Campagne.objects.create(
+            nom="Campagne Sync",
+            annee_academique=academic_year,
+            date_debut=date(2024, 6, 1),
+            date_fin=date(2024, 8, 31),
+            objectif_global=100,
+        )
+        seance = SeanceProspection.objects.create(campagne=campagne, date_seance=date(2024, 6, 3))
+        self.agent = Agent.objects.create(
+            matricule="AGT-SYNC-01",
+            nom="Abena",
+            prenom="Luc",
+            telephone="690000001",
+            email="luc@example.com",
+            type_agent="interne",
+            date_embauche=date(2024, 1, 1),
+            statut="actif",
+            is_active=True,
+        )
+        self.equipe = Equipe.objects.create(nom="Équipe Sync", seance=seance, chef_equipe=self.agent)
+        self.other_equipe = Equipe.objects.create(nom="Autre équipe", seance=seance)
+        self.school = School.objects.create(name="Lycée Sync", level="secondary")
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentWrapper(self.agent))
+        self.url = reverse('prospection_api:prospects_sync')
+
+    def item(self, client_id, telephone, **extra):
+        return {
+            'client_id': client_id,
+            'nom': 'Mbarga',
+            'prenom': 'Eva',
+            'telephone': telephone,
+            'equipe': self.equipe.pk,
+            **extra,
+        }
+
+    def post_gzip(self, payload):
+        return self.client.generic(
+            'POST',
+            self.url,
+            gzip.compress(json.dumps(payload).encode()),
+            content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip',
+        )
+
+    def test_compressed_batch_is_upserted_with_per_item_results(self):
+        Prospect.objects.create(nom='Ancien', prenom='Nom', telephone='677000002', equipe=self.equipe)
+
+        response = self.post_gzip({'prospects': [
+            self.item('c1', '677000001', etablissement_origine=self.school.pk),
+            self.item('c2', '677000002', notes='Rappeler'),
+            self.item('c3', '677000003', equipe=self.other_equipe.pk),
+            self.item('c4', ''),
+            self.item('c5', '677000001', prenom='Eve'),
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        statuses = {result['client_id']: result['status'] for result in response.data['results']}
+        self.assertEqual(statuses, {
+            'c1': 'duplicate', 'c2': 'updated', 'c3': 'rejected', 'c4': 'rejected', 'c5': 'created',
+        })
+        self.assertEqual(Prospect.objects.count(), 2)
+
+        updated = Prospect.objects.get(telephone='677000002')
+        self.assertEqual((updated.nom, updated.notes, updated.agent_collecteur), ('Mbarga', 'Rappeler', self.agent))
+        created = Prospect.objects.get(telephone='677000001')
+        self.assertEqual(created.prenom, 'Eve')
+        self.assertEqual(response.data['results'][0]['id'], created.pk)
+        self.assertEqual(
+            decode_sync_cursor(response.data['sync_cursor']),
+            max((created.updated_at, created.pk), (updated.updated_at, updated.pk)),
+        )
+
+    def test_resync_keeps_the_attribution_and_collection_date_of_known_prospects(self):
+        teammate = Agent.objects.create(
+            matricule="AGT-SYNC-02",
+            nom="Ngono",
+            prenom="Paul",
+            telephone="690000002",
+            email="paul@example.com",
+            type_agent="interne",
+            date_embauche=date(2024, 1, 1),
+            statut="actif",
+            is_active=True,
+        )
+        collected_at = timezone.now() - timedelta(days=10)
+        Prospect.objects.create(
+            nom='Ancien', prenom='Nom', telephone='677000010', equipe=self.equipe,
+            agent_collecteur=teammate, date_collecte=collected_at,
+        )
+        Prospect.objects.create(
+            nom='Ancien', prenom='Nom', telephone='677000011', equipe=self.equipe,
+            agent_collecteur=teammate, date_collecte=collected_at,
+        )
+
+        new_date = collected_at + timedelta(days=1)
+        response = self.client.post(self.url, {'prospects': [
+            self.item('c1', '677000010'),
+            self.item('c2', '677000011', date_collecte=new_date.isoformat()),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        sync_prospects([self.item('c3', '677000010', notes='Relance')])
+
+        undated = Prospect.objects.get(telephone='677000010')
+        self.assertEqual((undated.nom, undated.notes), ('Mbarga', 'Relance'))
+        self.assertEqual((undated.agent_collecteur, undated.date_collecte), (teammate, collected_at))
+        dated = Prospect.objects.get(telephone='677000011')
+        self.assertEqual((dated.agent_collecteur, dated.date_collecte), (teammate, new_date))
+
+    def test_batch_size_is_limited(self):
+        with self.settings(PROSPECTION_SYNC_MAX_ITEMS=1):
+            response = self.client.post(
+                self.url, {'prospects': [self.item('c1', '1'), self.item('c2', '2')]}, format='json',
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Prospect.objects.exists())
+
+
+@override_settings(PROSPECTION_DELTA_SAFETY_WINDOW=0)
+class DeltaSyncAPITests(TestCase):
+    """Tests de la synchronisation différentielle des données de référence"""
+
+    def setUp(self):
+        academic_year = AcademicYear.objects.create(start_at=date(2024, 9, 1), end_at=date(2025, 6, 30))
+        self.campagne = Campagne.objects.create(
+            nom="Campagne Delta",
+            annee_academique=academic_year,
+            date_debut=date(2024, 6, 1),
+            date_fin=date(2024, 8, 31),
+            objectif_global=100,
+        )
+        self.seance = SeanceProspection.objects.create(campagne=self.campagne, date_seance=date(2024, 6, 3))
+        self.agents = [
+            Agent.objects.create(
+                matricule=f"AGT-DELTA-{index}",
+                nom=f"Agent {index}",
+                prenom="Test",
+                telephone=f"69000000{index}",
+                email=f"agent{index}@example.com",
+                type_agent="interne",
+                date_embauche=date(2024, 1, 1),
+                statut="actif",
+                is_active=True,
+            )
+            for index in range(3)
+        ]
+        self.equipe = Equipe.objects.create(nom="Équipe Delta", seance=self.seance, chef_equipe=self.agents[0])
+        self.equipe.agents.add(*self.agents[:2])
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=AgentWrapper(self.agents[0]))
+
+    def get(self, name, **params):
+        return self.client.get(reverse(f'prospection_api:sync_{name}'), params)
+
+    def test_agents_are_paged_with_a_keyset_cursor(self):
+        first = self.get('agents', limit=2)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.data['has_more'])
+
+        second = self.get('agents', cursor=first.data['next_cursor'])
+        self.assertFalse(second.data['has_more'])
+        ids = [agent['id'] for agent in first.data['results'] + second.data['results']]
+        self.assertEqual(sorted(ids), sorted(agent.pk for agent in self.agents))
+
+        self.assertEqual(self.get('agents', cursor=second.data['next_cursor']).data['results'], [])
+
+    def test_changes_and_deletions_since_cursor(self):
+        cursor = self.get('equipes').data['next_cursor']
+        self.assertEqual(self.get('equipes', cursor=cursor).data['results'], [])
+
+        # Un changement de composition ou d'un agent membre remonte l'équipe (et sa séance).
+        self.equipe.agents.add(self.agents[2])
+        response = self.get('equipes', cursor=cursor)
+        self.assertEqual([equipe['id'] for equipe in response.data['results']], [self.equipe.pk])
+        self.assertEqual(len(response.data['results'][0]['agents']), 3)
+        self.assertEqual(len(self.get('seances', cursor=cursor).data['results']), 1)
+
+        cursor = response.data['next_cursor']
+        self.agents[1].telephone = '699999999'
+        self.agents[1].save()
+        self.assertEqual(len(self.get('equipes', cursor=cursor).data['results']), 1)
+
+        cursor = self.get('equipes', cursor=cursor).data['next_cursor']
+        equipe_id = self.equipe.pk
+        self.equipe.delete()
+        response = self.get('equipes', cursor=cursor)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['deleted'], [equipe_id])
+
+    def test_agent_login_does_not_touch_its_equipes(self):
+        cursor = self.get('equipes').data['next_cursor']
+
+        self.agents[0].last_login = timezone.now()
+        self.agents[0].save(update_fields=['last_login'])
+        self.assertEqual(self.get('equipes', cursor=cursor).data['results'], [])
+
+        self.agents[0].statut = 'inactif'
+        self.agents[0].save(update_fields=['statut'])
+        self.assertEqual(len(self.get('equipes', cursor=cursor).data['results']), 1)
+
+    def test_clearing_the_equipes_of_an_agent_touches_them(self):
+        cursor = self.get('equipes').data['next_cursor']
+
+        self.agents[1].equipes.clear()
+
+        response = self.get('equipes', cursor=cursor)
+        self.assertEqual([equipe['id'] for equipe in response.data['results']], [self.equipe.pk])
+        self.assertEqual(len(response.data['results'][0]['agents']), 1)
+
+    @override_settings(PROSPECTION_DELTA_SAFETY_WINDOW=60)
+    def test_recent_changes_are_held_back_by_the_safety_window(self):
+        response = self.get('agents')
+        self.assertEqual(response.data['results'], [])
+        self.assertIsNone(response.data['next_cursor'])
+
+        with patch('prospection.sync.timezone.now', return_value=timezone.now() + timedelta(seconds=61)):
+            response = self.get('agents')
+
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_unchanged_page_returns_not_modified(self):
+        response = self.get('seances')
+        etag = response['ETag']
+
+        not_modified = self.client.get(reverse('prospection_api:sync_seances'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.seance.statut = 'en_cours'
+        self.seance.save()
+        modified = self.client.get(reverse('prospection_api:sync_seances'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(modified.data['results'][0]['statut'], 'en_cours')
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.get('schools', cursor='invalide').status_code, 400)
+        self.assertEqual(self.get('schools', updated_since='hier').status_code, 400)
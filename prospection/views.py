@@ -15,6 +15,8 @@ from .forms import (
     AgentSearchForm, CampagneSearchForm, EquipeSearchForm, ProspectSearchForm
 )
 from academic.models import AcademicYear
+from main.pagination import CURSOR_PARAM, KeysetPaginator
+from search.index import search_queryset
 
 
 @method_decorator(scholar_admin_required, name='dispatch')
@@ -73,12 +75,7 @@ class AgentsView(LoginRequiredMixin, ListView):
             statut = form.cleaned_data.get('statut')
             
             if search:
-                queryset = queryset.filter(
-                    Q(nom__icontains=search) |
-                    Q(prenom__icontains=search) |
-                    Q(matricule__icontains=search) |
-                    Q(telephone__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, 'agent')
             
             if type_agent:
                 queryset = queryset.filter(type_agent=type_agent)
@@ -425,6 +422,10 @@ class ProspectsView(LoginRequiredMixin, ListView):
 
         return queryset.order_by('-date_collecte')
 
+    def paginate_queryset(self, queryset, page_size):
+        page = KeysetPaginator(queryset, page_size).get_page(self.request.GET.get(CURSOR_PARAM))
+        return page.paginator, page, page.object_list, page.has_other_pages()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Gestion des Prospects'
@@ -708,12 +709,7 @@ class GestionAgentsView(LoginRequiredMixin, ListView):
 
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nom__icontains=search) |
-                Q(prenom__icontains=search) |
-                Q(matricule__icontains=search) |
-                Q(email__icontains=search)
-            )
+            queryset = search_queryset(queryset, search, 'agent')
 
         return queryset.order_by('statut', 'nom', 'prenom')
 
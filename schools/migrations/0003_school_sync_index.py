@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='school',
+            index=models.Index(fields=['last_updated', 'id'], name='school_sync_idx'),
+        ),
+    ]
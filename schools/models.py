@@ -23,6 +23,9 @@ class School(models.Model):
     class Meta:
         verbose_name = "École"
         verbose_name_plural = "Écoles"
+        indexes = [
+            models.Index(fields=['last_updated', 'id'], name='school_sync_idx'),
+        ]
 
 
 class UniversityLevel(models.Model):
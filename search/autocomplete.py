@@ -0,0 +1,276 @@
+"""
+Index en mémoire pour l'autocomplete des étudiants inscrits.
+
+Chaque processus garde une copie compacte des étudiants inscrits (matricule, noms,
+programme) et une liste triée de leurs jetons normalisés : une recherche par préfixe
+se résout par dichotomie, sans requête SQL. La copie est reconstruite au plus tard
+après ``SEARCH_AUTOCOMPLETE_INDEX_TTL`` secondes, ou dès que la version partagée
+change ; les signaux de ``search.signals`` renouvellent cette version, revérifiée au
+plus toutes les ``SEARCH_AUTOCOMPLETE_VERSION_CHECK_INTERVAL`` secondes.
+
+Seuls les mots et le matricule compacté sont indexés (pas les suffixes, ni l'email ou
+le téléphone) : une recherche sans résultat en mémoire repasse par l'index SQL
+(``search.index.search_queryset``).
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from students.models import Student, StudentLevel
+
+from .index import search_queryset
+from .text import TOKEN_MAX_LENGTH, tokenize
+
+
+AUTOCOMPLETE_LIMIT = 10
+VERSION_KEY = 'search:autocomplete:students:version'
+
+
+@dataclass(frozen=True)
+class IndexedProgram:
+    pk: int
+    name: str
+
+
+@dataclass(frozen=True)
+class IndexedStudent:
+    """Étudiant tel que conservé dans l'index ; mêmes attributs que ``Student`` pour l'affichage."""
+    pk: int
+    matricule: str
+    firstname: str
+    lastname: str
+    program_id: Optional[int]
+    program: Optional[IndexedProgram]
+    is_deleted: bool
+    has_academic_year: bool
+
+
+class StudentPrefixIndex:
+    """
+    Jetons triés (``tokens``) et rang de l'étudiant propriétaire de chacun (``owners``) ;
+    ``student_tokens`` garde les jetons de chaque étudiant (mêmes chaînes, partagées).
+    """
+
+    def __init__(self, students):
+        # Les étudiants sont triés par matricule : le rang donne l'ordre d'affichage.
+        self.students = students
+        self.student_tokens = [tuple(_student_tokens(student)) for student in students]
+        pairs = sorted(
+            (token, rank)
+            for rank, tokens in enumerate(self.student_tokens)
+            for token in tokens
+        )
+        self.tokens = [token for token, _ in pairs]
+        self.owners = array('I', (rank for _, rank in pairs))
+
+    @classmethod
+    def build(cls):
+        programs = {}
+        students = []
+        rows = Student.objects.filter(status='registered').annotate(
+            has_academic_year=Exists(
+                StudentLevel.objects.filter(student_id=OuterRef('pk'), academic_year__isnull=False)
+            ),
+        ).order_by('matricule').values_list(
+            'pk', 'matricule', 'firstname', 'lastname', 'program_id', 'program__name', 'deleted_at',
+            'has_academic_year',
+        )
+        for pk, matricule, firstname, lastname, program_id, program_name, deleted_at, has_academic_year in rows:
+            program = None
+            if program_id:
+                program = programs.get(program_id)
+                if program is None:
+                    program = programs[program_id] = IndexedProgram(program_id, program_name or '')
+            students.append(IndexedStudent(
+                pk, matricule or '', firstname or '', lastname or '', program_id, program,
+                deleted_at is not None, has_academic_year,
+            ))
+        return cls(students)
+
+    def search(self, query, predicate=None, limit=AUTOCOMPLETE_LIMIT):
+        """Étudiants (ordre du matricule) dont chaque mot de ``query`` commence un jeton."""
+        prefixes = [token[:TOKEN_MAX_LENGTH] for token in dict.fromkeys(tokenize(query))]
+        if not prefixes:
+            return []
+
+        # Le préfixe le plus sélectif fournit les candidats, les autres les filtrent.
+        ranges = sorted(
+            (self._prefix_range(prefix) + (prefix,) for prefix in prefixes),
+            key=lambda item: item[1] - item[0],
+        )
+        candidates = None
+        for start, end, prefix in ranges:
+            if start == end:
+                return []
+            if candidates is None:
+                candidates = set(self.owners[start:end])
+            elif end - start <= 4 * len(candidates):
+                candidates.intersection_update(self.owners[start:end])
+            else:
+                candidates = {
+                    rank for rank in candidates
+                    if any(token.startswith(prefix) for token in self.student_tokens[rank])
+                }
+            if not candidates:
+                return []
+
+        # Candidats nombreux : parcours dans l'ordre des rangs, arrêté dès ``limit`` résultats.
+        if len(candidates) * 8 > len(self.students):
+            ordered = (rank for rank in range(len(self.students)) if rank in candidates)
+        else:
+            ordered = sorted(candidates)
+
+        results = []
+        for rank in ordered:
+            student = self.students[rank]
+            if predicate is None or predicate(student):
+                results.append(student)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _prefix_range(self, prefix):
+        start = bisect_left(self.tokens, prefix)
+        # '\uffff' est supérieur à tout caractère produit par ``tokenize``.
+        return start, bisect_left(self.tokens, prefix + '\uffff', start)
+
+    def __len__(self):
+        return len(self.students)
+
+
+class StudentAutocompleteCache:
+    """
+    Copie locale de l'index, reconstruite à l'expiration de son TTL ou au changement
+    de la version stockée dans le cache partagé (même principe que ``SystemSettingsCache``).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.clear_local()
+
+    def clear_local(self):
+        with self._lock:
+            self._index = None
+            self._index_version = None
+            self._built_at = 0.0
+            self._version = None
+            self._checked_at = 0.0
+
+    def get_index(self):
+        # Jamais d'index construit sur un état non validé.
+        if connection.in_atomic_block:
+            return None
+
+        index = self._fresh_index()
+        if index is not None:
+            return index
+
+        with self._build_lock:
+            index = self._fresh_index()
+            if index is None:
+                version = self.get_version()
+                built_at = time.monotonic()
+                index = StudentPrefixIndex.build()
+                with self._lock:
+                    self._index = index
+                    self._index_version = version
+                    self._built_at = built_at
+        return index
+
+    def get_version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self._version_check_interval():
+                return self._version
+
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+
+        with self._lock:
+            self._version = version
+            self._checked_at = now
+        return version
+
+    def bump_version(self):
+        cache.set(VERSION_KEY, uuid4().hex, None)
+        self.clear_local()
+
+    def _fresh_index(self):
+        version = self.get_version()
+        with self._lock:
+            if (
+                self._index is not None
+                and self._index_version == version
+                and time.monotonic() - self._built_at < self._ttl()
+            ):
+                return self._index
+        return None
+
+    @staticmethod
+    def _ttl():
+        return getattr(settings, 'SEARCH_AUTOCOMPLETE_INDEX_TTL', 300)
+
+    @staticmethod
+    def _version_check_interval():
+        return getattr(settings, 'SEARCH_AUTOCOMPLETE_VERSION_CHECK_INTERVAL', 5)
+
+
+_student_autocomplete_cache = StudentAutocompleteCache()
+
+
+def autocomplete_students(query, *, exclude_deleted=False, require_academic_year=False, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Étudiants inscrits correspondant à ``query`` pour les champs d'autocomplete.
+
+    ``exclude_deleted`` écarte les dossiers supprimés ; ``require_academic_year`` ne
+    garde que les étudiants ayant un niveau rattaché à une année académique. Le
+    résultat mélange des ``IndexedStudent`` (index en mémoire) ou des ``Student``
+    (repli SQL), qui exposent les mêmes attributs d'affichage.
+    """
+    def predicate(student):
+        if exclude_deleted and student.is_deleted:
+            return False
+        return student.has_academic_year or not require_academic_year
+
+    index = _student_autocomplete_cache.get_index()
+    if index is not None:
+        results = index.search(query, predicate, limit)
+        if results:
+            return results
+
+    queryset = Student.objects.select_related('program').filter(status='registered')
+    if exclude_deleted:
+        queryset = queryset.filter(deleted_at__isnull=True)
+    if require_academic_year:
+        queryset = queryset.filter(
+            Exists(StudentLevel.objects.filter(student_id=OuterRef('pk'), academic_year__isnull=False))
+        )
+    return list(search_queryset(queryset, query, 'student').order_by('matricule')[:limit])
+
+
+def invalidate_student_autocomplete():
+    """Invalide l'index d'autocomplete de tous les processus (tout de suite et après validation)."""
+    _student_autocomplete_cache.bump_version()
+    transaction.on_commit(_student_autocomplete_cache.bump_version)
+
+
+def _student_tokens(student):
+    program_name = student.program.name if student.program else ''
+    tokens = tokenize(f'{student.matricule} {student.firstname} {student.lastname} {program_name}')
+    compact = ''.join(tokenize(student.matricule))
+    if compact:
+        tokens.append(compact)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from academic.models import Program
+from search.autocomplete import StudentPrefixIndex
+from search.index import index_records, search_queryset
+from students.models import Student
+
+
+FIRSTNAMES = ('Éric', 'Hélène', 'Paul', 'Aïcha', 'Jean', 'Marie', 'Luc', 'Brice', 'Nadège', 'Serge')
+LASTNAMES = ('Ndongo', 'Mbarga', 'Abena', 'Fotso', 'Kamga', 'Nkoulou', 'Tchoua', 'Ewane', 'Onana', 'Biya')
+PROGRAMS = ('Génie Logiciel', 'Réseaux et Télécoms', 'Comptabilité', 'Marketing')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare l'autocomplete étudiant en mémoire et par l'index SQL sur un jeu "
+        "d'étudiants fictifs créé dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000, help="Nombre d'étudiants fictifs (20000 par défaut).")
+        parser.add_argument('--queries', type=int, default=200, help="Nombre de recherches par méthode (200 par défaut).")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur aléatoire.")
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['queries'] < 1:
+            raise CommandError("--students et --queries doivent être positifs.")
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            queries = self._populate(rng, options['students'], options['queries'])
+
+            started = time.perf_counter()
+            index = StudentPrefixIndex.build()
+            build_seconds = time.perf_counter() - started
+            self.stdout.write(f"Index en mémoire : {len(index)} étudiant(s), {len(index.tokens)} jeton(s), construit en {build_seconds * 1000:.1f} ms.")
+
+            sql_queryset = Student.objects.select_related('program').filter(status='registered')
+            self._report('Mémoire', queries, lambda query: index.search(query))
+            self._report(
+                'SQL',
+                queries,
+                lambda query: list(search_queryset(sql_queryset, query, 'student').order_by('matricule')[:10]),
+            )
+
+            transaction.set_rollback(True)
+
+    def _populate(self, rng, count, query_count):
+        programs = [Program.objects.create(name=name) for name in PROGRAMS]
+        students = Student.objects.bulk_create(
+            [
+                Student(
+                    matricule=f'BENCH{index:06d}',
+                    firstname=rng.choice(FIRSTNAMES),
+                    lastname=f'{rng.choice(LASTNAMES)}{index % 97}',
+                    status='registered',
+                    program=rng.choice(programs),
+                )
+                for index in range(count)
+            ],
+            batch_size=1000,
+        )
+        index_records('student', [student.pk for student in students])
+
+        queries = []
+        for _ in range(query_count):
+            student = rng.choice(students)
+            queries.append(rng.choice((
+                student.matricule[:rng.randint(6, len(student.matricule))],
+                student.lastname[:rng.randint(3, len(student.lastname))],
+                f'{student.firstname} {student.lastname[:4]}',
+            )))
+        return queries
+
+    def _report(self, label, queries, search):
+        durations = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            durations.append((time.perf_counter() - started) * 1_000_000)
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{label} : médiane {statistics.median(durations):.0f} µs, p95 {p95:.0f} µs sur {len(durations)} recherche(s)."
+        ))
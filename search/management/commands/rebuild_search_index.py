@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.index import SEARCH_SOURCES, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des étudiants, enseignants et agents."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            help=f"Source à reconstruire ({', '.join(SEARCH_SOURCES)}) ; toutes par défaut.",
+        )
+
+    def handle(self, *args, **options):
+        source_name = options.get('source')
+        if source_name and source_name not in SEARCH_SOURCES:
+            raise CommandError(f"Source inconnue : {source_name}")
+
+        counts = rebuild_search_index(source_name)
+        for name, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"Index « {name} » reconstruit : {count} enregistrement(s)."))
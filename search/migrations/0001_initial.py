@@ -0,0 +1,57 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('prospection', '0003_sync_indexes_and_tombstones'),
+        ('lecturers', '0007_lecturer_created_at_lecturer_deleted_at_and_more'),
+        ('students', '0007_alter_studentmetadata_acte_naissance_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='Jeton')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Jeton de recherche étudiant',
+                'verbose_name_plural': 'Jetons de recherche étudiants',
+                'indexes': [models.Index(fields=['token', 'owner'], name='search_student_token_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LecturerSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='Jeton')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='lecturers.lecturer')),
+            ],
+            options={
+                'verbose_name': 'Jeton de recherche enseignant',
+                'verbose_name_plural': 'Jetons de recherche enseignants',
+                'indexes': [models.Index(fields=['token', 'owner'], name='search_lecturer_token_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AgentSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='Jeton')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='prospection.agent')),
+            ],
+            options={
+                'verbose_name': 'Jeton de recherche agent',
+                'verbose_name_plural': 'Jetons de recherche agents',
+                'indexes': [models.Index(fields=['token', 'owner'], name='search_agent_token_idx')],
+            },
+        ),
+    ]
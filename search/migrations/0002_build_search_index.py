@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from search.text import build_tokens
+
+
+# Champs indexés au moment de la migration (voir search.index.SEARCH_SOURCES).
+SOURCES = (
+    (
+        'students', 'Student', 'StudentSearchToken',
+        ('matricule', 'firstname', 'lastname', 'email', 'phone_number', 'program__name'),
+        ('matricule', 'phone_number'),
+    ),
+    (
+        'lecturers', 'Lecturer', 'LecturerSearchToken',
+        ('matricule', 'firstname', 'lastname', 'email', 'phone_number', 'phone_number_2'),
+        ('matricule', 'phone_number', 'phone_number_2'),
+    ),
+    (
+        'prospection', 'Agent', 'AgentSearchToken',
+        ('matricule', 'nom', 'prenom', 'email', 'telephone'),
+        ('matricule', 'telephone'),
+    ),
+)
+BATCH_SIZE = 1000
+
+
+def build_search_index(apps, schema_editor):
+    for app_label, model_name, token_model_name, fields, identifier_fields in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        token_model = apps.get_model('search', token_model_name)
+        batch = []
+        for row in model._default_manager.order_by('pk').values('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+            tokens = build_tokens((row[field] for field in fields), (row[field] for field in identifier_fields))
+            batch.extend(token_model(owner_id=row['pk'], token=token) for token in tokens)
+            if len(batch) >= BATCH_SIZE:
+                token_model.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+                batch = []
+        if batch:
+            token_model.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import models
+
+from lecturers.models import Lecturer
+from prospection.models import Agent
+from students.models import Student
+
+
+class SearchToken(models.Model):
+    """Jeton normalisé d'un enregistrement (voir ``search.text``), recherché par préfixe indexé."""
+
+    token = models.CharField(max_length=64, verbose_name="Jeton")
+
+    class Meta:
+        abstract = True
+
+
+class StudentSearchToken(SearchToken):
+    owner = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='search_tokens')
+
+    class Meta:
+        verbose_name = "Jeton de recherche étudiant"
+        verbose_name_plural = "Jetons de recherche étudiants"
+        indexes = [models.Index(fields=['token', 'owner'], name='search_student_token_idx')]
+
+
+class LecturerSearchToken(SearchToken):
+    owner = models.ForeignKey(Lecturer, on_delete=models.CASCADE, related_name='search_tokens')
+
+    class Meta:
+        verbose_name = "Jeton de recherche enseignant"
+        verbose_name_plural = "Jetons de recherche enseignants"
+        indexes = [models.Index(fields=['token', 'owner'], name='search_lecturer_token_idx')]
+
+
+class AgentSearchToken(SearchToken):
+    owner = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name='search_tokens')
+
+    class Meta:
+        verbose_name = "Jeton de recherche agent"
+        verbose_name_plural = "Jetons de recherche agents"
+        indexes = [models.Index(fields=['token', 'owner'], name='search_agent_token_idx')]
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from academic.models import Program
+from lecturers.models import Lecturer
+from prospection.models import Agent
+from students.models import Student, StudentLevel
+
+from .autocomplete import invalidate_student_autocomplete
+from .index import index_records
+
+
+SEARCH_SOURCE_NAMES = {
+    Student: 'student',
+    Lecturer: 'lecturer',
+    Agent: 'agent',
+}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Lecturer)
+@receiver(post_save, sender=Agent)
+def index_record_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    index_records(SEARCH_SOURCE_NAMES[sender], [instance.pk])
+
+
+@receiver(post_save, sender=Program)
+def reindex_students_on_program_change(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+
+    # Le nom du programme fait partie des jetons des étudiants.
+    index_records('student', Student.objects.filter(program=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=StudentLevel)
+@receiver(post_delete, sender=StudentLevel)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+def invalidate_autocomplete_on_change(sender, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_student_autocomplete()
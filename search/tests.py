@@ -0,0 +1,175 @@
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from academic.models import AcademicYear, Level, Program
+from lecturers.models import Lecturer
+from prospection.models import Agent
+from students.models import Student, StudentLevel
+
+from .autocomplete import IndexedStudent, _student_autocomplete_cache, autocomplete_students
+from .index import search_queryset
+from .models import StudentSearchToken
+from .text import build_tokens, normalize, tokenize
+
+
+class SearchTextTests(TestCase):
+    def test_values_are_folded_and_tokenized(self):
+        self.assertEqual(normalize('Éric ŒUVRE'), 'eric œuvre')
+        self.assertEqual(tokenize("Éric N'Guessan-Kouamé"), ['eric', 'n', 'guessan', 'kouame'])
+
+    def test_identifiers_are_indexed_with_their_suffixes(self):
+        tokens = build_tokens(['ETU-24-001'], ['ETU-24-001'])
+
+        self.assertIn('etu', tokens)
+        self.assertIn('etu24001', tokens)
+        self.assertIn('24001', tokens)
+        self.assertNotIn('1', tokens)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.program = Program.objects.create(name='Génie Logiciel')
+        self.eric = Student.objects.create(
+            matricule='ETU-24-001',
+            firstname='Éric',
+            lastname='Ndongo',
+            email='eric.ndongo@example.com',
+            phone_number='+237 690 11 22 33',
+            gender='M',
+            status='registered',
+            program=self.program,
+        )
+        self.helene = Student.objects.create(
+            matricule='ETU-24-002',
+            firstname='Hélène',
+            lastname='Mbarga',
+            gender='F',
+            status='registered',
+        )
+
+    def search(self, query):
+        return list(search_queryset(Student.objects.order_by('matricule'), query, 'student'))
+
+    def test_search_is_accent_insensitive_and_word_order_free(self):
+        self.assertEqual(self.search('eric'), [self.eric])
+        self.assertEqual(self.search('HELENE'), [self.helene])
+        self.assertEqual(self.search('ndongo Éri'), [self.eric])
+        self.assertEqual(self.search('genie log'), [self.eric])
+        self.assertEqual(self.search('eric mbarga'), [])
+
+    def test_identifiers_match_on_any_part(self):
+        self.assertEqual(self.search('ETU-24'), [self.eric, self.helene])
+        self.assertEqual(self.search('24002'), [self.helene])
+        self.assertEqual(self.search('11 22 33'), [self.eric])
+        self.assertEqual(self.search('690112233'), [self.eric])
+
+    def test_index_follows_saves_and_program_renames(self):
+        self.helene.lastname = 'Ékambi'
+        self.helene.save()
+        self.assertEqual(self.search('ekambi'), [self.helene])
+        self.assertEqual(self.search('mbarga'), [])
+
+        self.program.name = 'Réseaux'
+        self.program.save()
+        self.assertEqual(self.search('reseaux'), [self.eric])
+
+    def test_lecturers_and_agents_are_indexed(self):
+        lecturer = Lecturer.objects.create(matricule='ENS-SRCH-01', firstname='Célestin', lastname='Owona')
+        agent = Agent.objects.create(
+            matricule='AGT-SRCH-01',
+            nom='Fouda',
+            prenom='Amélie',
+            telephone='677 00 11 22',
+            email='amelie@example.com',
+            type_agent='interne',
+            date_embauche=date(2024, 1, 1),
+        )
+
+        self.assertEqual(list(search_queryset(Lecturer.objects.all(), 'celestin', 'lecturer')), [lecturer])
+        self.assertEqual(list(search_queryset(Agent.objects.all(), 'amelie 1122', 'agent')), [agent])
+
+    def test_rebuild_command_restores_the_index(self):
+        StudentSearchToken.objects.all().delete()
+        Student.objects.filter(pk=self.eric.pk).update(firstname='Erick')
+
+        output = StringIO()
+        call_command('rebuild_search_index', '--source', 'student', stdout=output)
+
+        self.assertIn('2 enregistrement(s)', output.getvalue())
+        self.assertEqual(self.search('erick'), [self.eric])
+
+
+class StudentAutocompleteTests(TransactionTestCase):
+    """L'index n'est construit qu'en dehors des transactions : ``TransactionTestCase`` est requis."""
+
+    def setUp(self):
+        cache.clear()
+        _student_autocomplete_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(_student_autocomplete_cache.clear_local)
+
+        self.program = Program.objects.create(name='Génie Logiciel')
+        self.eric = Student.objects.create(
+            matricule='ETU-24-001',
+            firstname='Éric',
+            lastname='Ndongo',
+            phone_number='690112233',
+            status='registered',
+            program=self.program,
+        )
+        self.helene = Student.objects.create(
+            matricule='ETU-24-002', firstname='Hélène', lastname='Mbarga', status='registered',
+        )
+        Student.objects.create(matricule='ETU-24-003', firstname='Éric', lastname='Fotso', status='pending')
+
+    def matricules(self, query, **filters):
+        return [student.matricule for student in autocomplete_students(query, **filters)]
+
+    def test_warm_index_answers_without_queries(self):
+        self.assertEqual(self.matricules('eric'), ['ETU-24-001'])
+
+        with self.assertNumQueries(0):
+            results = autocomplete_students('etu24')
+            self.assertEqual(self.matricules('ndon eri'), ['ETU-24-001'])
+            self.assertEqual(self.matricules('genie'), ['ETU-24-001'])
+
+        self.assertEqual([student.matricule for student in results], ['ETU-24-001', 'ETU-24-002'])
+        self.assertIsInstance(results[0], IndexedStudent)
+        self.assertEqual(results[0].program.name, 'Génie Logiciel')
+
+    def test_filters_and_signal_invalidation(self):
+        self.assertEqual(self.matricules('etu', require_academic_year=True), [])
+
+        academic_year = AcademicYear.objects.create(start_at=date(2024, 9, 1), end_at=date(2025, 6, 30))
+        StudentLevel.objects.create(
+            student=self.helene, academic_year=academic_year, level=Level.objects.create(name='Licence 1'),
+        )
+        self.assertEqual(self.matricules('etu', require_academic_year=True), ['ETU-24-002'])
+
+        self.helene.deleted_at = timezone.now()
+        self.helene.save()
+        self.assertEqual(self.matricules('helene'), ['ETU-24-002'])
+        self.assertEqual(self.matricules('etu', exclude_deleted=True), ['ETU-24-001'])
+
+        self.program.name = 'Réseaux'
+        self.program.save()
+        self.assertEqual(self.matricules('reseaux'), ['ETU-24-001'])
+
+    def test_miss_falls_back_to_sql_index(self):
+        # Suffixes de matricule et téléphone ne sont indexés que côté SQL.
+        self.assertEqual(self.matricules('24002'), ['ETU-24-002'])
+        self.assertEqual(self.matricules('112233'), ['ETU-24-001'])
+        self.assertIsInstance(autocomplete_students('112233')[0], Student)
+
+    def test_benchmark_command_compares_both_paths(self):
+        output = StringIO()
+        call_command('benchmark_autocomplete', '--students', '50', '--queries', '5', stdout=output)
+
+        self.assertIn('Mémoire', output.getvalue())
+        self.assertIn('SQL', output.getvalue())
+        self.assertEqual(Student.objects.count(), 3)
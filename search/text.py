@@ -0,0 +1,47 @@
+"""
+Normalisation des textes indexés pour la recherche.
+
+Les valeurs sont repliées (minuscules, sans accents) puis découpées en mots
+alphanumériques : « Éric N'Guessan » donne ``eric``, ``n`` et ``guessan``. Les
+identifiants (matricule, téléphone) sont en plus indexés sans séparateurs, avec
+tous leurs suffixes, pour qu'une partie du numéro suffise à les retrouver.
+
+Module sans dépendance aux modèles : il sert aussi aux migrations.
+"""
+
+import re
+import unicodedata
+
+
+TOKEN_MAX_LENGTH = 64
+MIN_SUFFIX_LENGTH = 2
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize(value):
+    """Texte en minuscules, sans accents ni ligatures."""
+    if value is None:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value).casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(value):
+    """Mots alphanumériques normalisés de ``value``, dans l'ordre."""
+    return TOKEN_PATTERN.findall(normalize(value))
+
+
+def identifier_tokens(value):
+    """Identifiant compacté (sans séparateurs) et ses suffixes."""
+    compact = ''.join(tokenize(value))
+    return {compact[index:] for index in range(len(compact) - MIN_SUFFIX_LENGTH + 1)} if compact else set()
+
+
+def build_tokens(values, identifier_values=()):
+    """Jetons d'indexation d'un enregistrement, tronqués à ``TOKEN_MAX_LENGTH`` caractères."""
+    tokens = set()
+    for value in values:
+        tokens.update(tokenize(value))
+    for value in identifier_values:
+        tokens.update(identifier_tokens(value))
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudentPortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student_portal'
+
+    def ready(self):
+        import student_portal.signals  # noqa: F401
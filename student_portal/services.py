@@ -0,0 +1,202 @@
+"""
+Synthèse du portail étudiant : documents officiels et situation financière.
+
+La synthèse couvre toutes les années de l'étudiant (années de ses niveaux, de ses
+paiements et année active) en un nombre fixe de requêtes groupées, puis est mise en
+cache par étudiant. La clé dépend d'une version propre à l'étudiant, renouvelée par
+les signaux de ``student_portal.signals`` à chaque modification d'un document, d'un
+paiement, d'un niveau ou du dossier, d'une version globale (tranches, années
+académiques) et de la date du jour (échéances).
+"""
+
+from collections import defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from academic.models import AcademicYear
+from payments.balances import ZERO, build_financial_status, resolve_student_installments
+from payments.models import Payment, PaymentInstallment
+from students.models import OfficialDocument, StudentLevel
+
+
+SUMMARY_CACHE_PREFIX = 'student_portal:summary'
+GLOBAL_VERSION_KEY = f'{SUMMARY_CACHE_PREFIX}:version'
+DOCUMENT_STATUSES = ('available', 'withdrawn', 'returned', 'lost')
+NO_ACTIVE_YEAR_REASON = "Aucune année académique active trouvée"
+
+
+def get_summary_cache_timeout():
+    return getattr(settings, 'STUDENT_PORTAL_SUMMARY_CACHE_TIMEOUT', 300)
+
+
+def get_portal_summary(student):
+    """
+    Retourne la synthèse du portail pour ``student`` (depuis le cache si possible).
+
+    ``documents`` : nombre de documents par statut (et ``total``) toutes années confondues ;
+    ``years`` : par identifiant d'année, ses compteurs de documents et sa situation financière ;
+    ``active_year_id`` : année active au moment du calcul.
+    """
+    as_of_date = timezone.localdate()
+    student_version_key = _student_version_key(student.pk)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, student_version_key])
+    global_version = versions.get(GLOBAL_VERSION_KEY) or _bump_version(GLOBAL_VERSION_KEY)
+    student_version = versions.get(student_version_key) or _bump_version(student_version_key)
+    cache_key = f'{SUMMARY_CACHE_PREFIX}:{student.pk}:{global_version}:{student_version}:{as_of_date.isoformat()}'
+
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = build_portal_summary(student, as_of_date=as_of_date)
+        # Jamais de mise en cache d'un état non validé.
+        if not connection.in_atomic_block:
+            cache.set(cache_key, summary, get_summary_cache_timeout())
+    return summary
+
+
+def get_year_withdrawal_permission(summary, academic_year_id):
+    """Équivalent de ``Student.can_withdraw_documents`` lu dans la synthèse : ``(autorisé, motif)``."""
+    year_id = academic_year_id or summary['active_year_id']
+    year_summary = summary['years'].get(year_id)
+    if not year_summary:
+        return False, NO_ACTIVE_YEAR_REASON
+    financial = year_summary['financial']
+    return financial['can_withdraw_documents'], financial['withdrawal_reason']
+
+
+def build_portal_summary(student, as_of_date=None):
+    """Calcule la synthèse du portail sans passer par le cache."""
+    as_of_date = as_of_date or timezone.localdate()
+    active_year = AcademicYear.objects.filter(is_active=True).first()
+
+    documents = _empty_document_counts()
+    documents_by_year = defaultdict(_empty_document_counts)
+    for item in OfficialDocument.objects.filter(student_level__student=student).values(
+        'student_level__academic_year_id', 'status'
+    ).annotate(count=Count('id')).order_by():
+        for counts in (documents, documents_by_year[item['student_level__academic_year_id']]):
+            counts['total'] += item['count']
+            if item['status'] in counts:
+                counts[item['status']] += item['count']
+
+    levels = list(
+        StudentLevel.objects.filter(student=student, academic_year__isnull=False).select_related('level').order_by(
+            'academic_year_id', '-is_active', 'level__academic_order', 'level__name'
+        )
+    )
+    paid_amounts = list(
+        Payment.objects.filter(student=student, category='frais_scolarite', academic_year__isnull=False).values(
+            'academic_year_id', 'installment_id'
+        ).annotate(total=Sum('amount_paid')).order_by()
+    )
+    year_ids = {level.academic_year_id for level in levels} | {item['academic_year_id'] for item in paid_amounts}
+    if active_year:
+        year_ids.add(active_year.pk)
+
+    current_levels = {}
+    for level in levels:
+        current_levels.setdefault(level.academic_year_id, level)
+
+    paid_by_year = defaultdict(lambda: ZERO)
+    paid_by_installment = defaultdict(lambda: ZERO)
+    for item in paid_amounts:
+        amount = item['total'] or ZERO
+        paid_by_year[item['academic_year_id']] += amount
+        if item['installment_id']:
+            paid_by_installment[item['installment_id']] += amount
+
+    installments_by_year = defaultdict(lambda: defaultdict(list))
+    if student.program_id and year_ids:
+        for installment in PaymentInstallment.objects.filter(
+            deleted_at__isnull=True,
+            academic_year_id__in=year_ids,
+            program_id=student.program_id,
+        ).order_by('order_number', 'name', 'pk'):
+            installments_by_year[installment.academic_year_id][(installment.program_id, installment.level_id)].append(
+                installment
+            )
+
+    years = {}
+    for year_id in year_ids:
+        current_level = current_levels.get(year_id)
+        installments = resolve_student_installments(
+            installments_by_year[year_id],
+            student.program_id,
+            current_level.level_id if current_level else None,
+        )
+        years[year_id] = {
+            'documents': dict(documents_by_year.get(year_id) or _empty_document_counts()),
+            'financial': _build_financial_summary(
+                current_level, installments, paid_by_year[year_id], paid_by_installment, as_of_date,
+            ),
+        }
+
+    return {
+        'documents': documents,
+        'years': years,
+        'active_year_id': active_year.pk if active_year else None,
+    }
+
+
+def invalidate_portal_summary(student_id):
+    """Invalide la synthèse mise en cache d'un étudiant (tout de suite et après validation)."""
+    if not student_id:
+        return
+    version_key = _student_version_key(student_id)
+    _bump_version(version_key)
+    transaction.on_commit(lambda: _bump_version(version_key))
+
+
+def invalidate_all_portal_summaries():
+    """Invalide les synthèses de tous les étudiants (tranches, années académiques)."""
+    _bump_version(GLOBAL_VERSION_KEY)
+    transaction.on_commit(lambda: _bump_version(GLOBAL_VERSION_KEY))
+
+
+def _build_financial_summary(current_level, installments, amount_paid, paid_by_installment, as_of_date):
+    # Totaux du relevé (build_student_financial_statement) : retard calculé tranche par tranche.
+    total_amount_due = ZERO
+    overdue_amount = ZERO
+    for installment in installments:
+        installment_amount = installment.amount or ZERO
+        remaining = max(installment_amount - paid_by_installment[installment.pk], ZERO)
+        if installment.due_date and installment.due_date <= as_of_date and remaining > ZERO:
+            overdue_amount += remaining
+        total_amount_due += installment_amount
+
+    status = 'overdue' if overdue_amount > ZERO else 'up_to_date'
+    # Autorisation de retrait : mêmes règles que Student.can_withdraw_documents.
+    withdrawal_status = build_financial_status(None, current_level, installments, amount_paid, as_of_date)
+    can_withdraw = withdrawal_status['overdue_amount'] <= ZERO
+
+    return {
+        'totals': {
+            'total_amount_due': total_amount_due,
+            'amount_paid': amount_paid,
+            'remaining_amount': max(total_amount_due - amount_paid, ZERO),
+            'overdue_amount': overdue_amount,
+        },
+        'status': status,
+        'status_label': 'En retard' if status == 'overdue' else 'À jour',
+        'status_badge_class': 'bg-danger text-white' if status == 'overdue' else 'bg-success text-white',
+        'can_withdraw_documents': can_withdraw,
+        'withdrawal_reason': "Autorisation accordée" if can_withdraw else "Situation financière non régularisée",
+    }
+
+
+def _empty_document_counts():
+    return {'total': 0, **{status: 0 for status in DOCUMENT_STATUSES}}
+
+
+def _student_version_key(student_id):
+    return f'{SUMMARY_CACHE_PREFIX}:version:{student_id}'
+
+
+def _bump_version(key):
+    version = uuid4().hex
+    cache.set(key, version, None)
+    return version
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from academic.models import AcademicYear
+from payments.models import Payment, PaymentInstallment
+from student_portal.services import invalidate_all_portal_summaries, invalidate_portal_summary
+from students.models import OfficialDocument, Student, StudentLevel
+
+
+@receiver(post_save, sender=OfficialDocument)
+@receiver(post_delete, sender=OfficialDocument)
+def invalidate_portal_summary_on_official_document_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.student_level_id:
+        return
+
+    invalidate_portal_summary(
+        StudentLevel.objects.filter(pk=instance.student_level_id).values_list('student_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=StudentLevel)
+@receiver(post_delete, sender=StudentLevel)
+def invalidate_portal_summary_on_student_record_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_portal_summary(instance.student_id)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_portal_summary_on_student_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_portal_summary(instance.pk)
+
+
+@receiver(post_save, sender=PaymentInstallment)
+@receiver(post_delete, sender=PaymentInstallment)
+@receiver(post_save, sender=AcademicYear)
+@receiver(post_delete, sender=AcademicYear)
+def invalidate_portal_summaries_on_schedule_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_all_portal_summaries()
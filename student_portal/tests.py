@@ -1,12 +1,23 @@
+from datetime import date
+from decimal import Decimal
 from io import BytesIO
 from tempfile import TemporaryDirectory
 
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, override_settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from PIL import Image
 
-from students.models import Student, StudentMetaData
+from academic.models import AcademicYear, Level, Program
+from accounts.models import BaseUser
+from payments.models import Payment, PaymentInstallment
+from payments.utils import build_student_financial_statement
+from student_portal.services import build_portal_summary, get_portal_summary, get_year_withdrawal_permission
+from students.models import OfficialDocument, Student, StudentLevel, StudentMetaData
 
 
 class StudentDashboardProfilePhotoTests(TestCase):
@@ -51,3 +62,132 @@ class StudentDashboardProfilePhotoTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Photo de profil')
         self.assertContains(response, self.student.profile_photo.url)
+
+
+class StudentPortalSummaryTests(TransactionTestCase):
+    """Le cache n'est alimenté qu'en dehors des transactions : ``TransactionTestCase`` est requis."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = BaseUser.objects.create_user(username='scholar_portal', password='testpass123', role='scholar')
+        self.program = Program.objects.create(name='Informatique')
+        self.level = Level.objects.create(name='Licence 1')
+        self.previous_year = AcademicYear.objects.create(start_at=date(2023, 9, 1), end_at=date(2024, 6, 30))
+        self.active_year = AcademicYear.objects.create(
+            start_at=date(2024, 9, 1), end_at=date(2025, 6, 30), is_active=True,
+        )
+        self.student = Student.objects.create(
+            matricule='PORTAL-SUM-01',
+            firstname='Paul',
+            lastname='Essomba',
+            gender='M',
+            status='registered',
+            program=self.program,
+            must_change_password=False,
+        )
+        self.previous_level = StudentLevel.objects.create(
+            student=self.student, level=self.level, academic_year=self.previous_year,
+        )
+        self.active_level = StudentLevel.objects.create(
+            student=self.student, level=self.level, academic_year=self.active_year, is_active=True,
+        )
+        self.previous_installment = PaymentInstallment.objects.create(
+            program=self.program, level=self.level, academic_year=self.previous_year, name='Tranche unique',
+            order_number=1, amount=100000, due_date=date(2023, 10, 15),
+        )
+        self.installment = PaymentInstallment.objects.create(
+            program=self.program, level=self.level, academic_year=self.active_year, name='Tranche 1',
+            order_number=1, amount=50000, due_date=date(2024, 10, 15),
+        )
+        PaymentInstallment.objects.create(
+            program=self.program, level=self.level, academic_year=self.active_year, name='Tranche 2',
+            order_number=2, amount=40000, due_date=date(2099, 1, 15),
+        )
+        self.create_payment(self.previous_year, self.previous_installment, 100000, 'PORTAL-REC-01')
+        self.create_payment(self.active_year, self.installment, 20000, 'PORTAL-REC-02')
+
+        OfficialDocument.objects.create(student_level=self.previous_level, type='transcript', status='withdrawn')
+        OfficialDocument.objects.create(student_level=self.previous_level, type='diploma', status='lost')
+        OfficialDocument.objects.create(student_level=self.active_level, type='student_card')
+
+    def create_payment(self, academic_year, installment, amount, receipt_number):
+        return Payment.objects.create(
+            student=self.student,
+            installment=installment,
+            academic_year=academic_year,
+            category='frais_scolarite',
+            author=self.user,
+            amount_paid=amount,
+            payment_date=timezone.now(),
+            receipt_number=receipt_number,
+            transaction_id=receipt_number,
+            source='cash',
+        )
+
+    def test_summary_covers_every_year_of_the_student(self):
+        summary = get_portal_summary(self.student)
+
+        self.assertEqual(summary['documents'], {'total': 3, 'available': 1, 'withdrawn': 1, 'returned': 0, 'lost': 1})
+        self.assertEqual(summary['years'][self.previous_year.pk]['documents']['total'], 2)
+        self.assertEqual(summary['years'][self.active_year.pk]['documents']['available'], 1)
+
+        financial = summary['years'][self.active_year.pk]['financial']
+        statement = build_student_financial_statement(self.student, self.active_year)
+        self.assertEqual(financial['totals'], statement['totals'])
+        self.assertEqual(financial['status_label'], statement['status_label'])
+        self.assertEqual(financial['totals']['overdue_amount'], Decimal('30000.00'))
+
+        for academic_year in (self.previous_year, self.active_year, None):
+            self.assertEqual(
+                get_year_withdrawal_permission(summary, academic_year.pk if academic_year else None),
+                self.student.can_withdraw_documents(academic_year),
+            )
+
+    def test_summary_uses_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as small_queries:
+            build_portal_summary(self.student)
+
+        for index in range(3):
+            year = AcademicYear.objects.create(start_at=date(2019 + index, 9, 1), end_at=date(2020 + index, 6, 30))
+            student_level = StudentLevel.objects.create(student=self.student, level=self.level, academic_year=year)
+            OfficialDocument.objects.create(student_level=student_level, type='transcript')
+
+        with CaptureQueriesContext(connection) as large_queries:
+            summary = build_portal_summary(self.student)
+
+        self.assertEqual(len(summary['years']), 5)
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_repeated_reads_are_served_from_cache(self):
+        get_portal_summary(self.student)
+
+        with self.assertNumQueries(0):
+            get_portal_summary(self.student)
+
+    def test_document_and_payment_changes_invalidate_the_summary(self):
+        get_portal_summary(self.student)
+
+        OfficialDocument.objects.create(student_level=self.active_level, type='certificate', status='returned')
+        self.assertEqual(get_portal_summary(self.student)['documents']['returned'], 1)
+
+        self.create_payment(self.active_year, self.installment, 30000, 'PORTAL-REC-03')
+        financial = get_portal_summary(self.student)['years'][self.active_year.pk]['financial']
+        self.assertTrue(financial['can_withdraw_documents'])
+        self.assertEqual(financial['status_label'], 'À jour')
+
+    def test_dashboard_and_documents_use_the_summary(self):
+        session = self.client.session
+        session['student_authenticated'] = True
+        session['student_matricule'] = self.student.matricule
+        session['student_name'] = f'{self.student.firstname} {self.student.lastname}'
+        session.save()
+
+        response = self.client.get(reverse('student_portal:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['document_stats']['total'], 3)
+        self.assertEqual(response.context['financial_summary']['status_label'], 'En retard')
+
+        response = self.client.get(reverse('student_portal:documents'))
+        self.assertEqual(response.status_code, 200)
@@ -18,6 +18,7 @@ from main.pdf_exports import (
 )
 from payments.models import Payment
 from payments.utils import build_student_financial_statement
+from student_portal.services import get_portal_summary, get_year_withdrawal_permission
 from academic.models import AcademicYear
 from authentication.models import LoginHistory
 from authentication.services import record_login, record_logout
@@ -155,33 +156,21 @@ def student_dashboard(request):
     student = get_object_or_404(Student, matricule=matricule)
 
     # Récupération des niveaux de l'étudiant avec leurs documents
-    student_levels = student.student_levels.all().order_by('-academic_year__start_at', 'level__name')
-
-    # Statistiques des documents
-    total_documents = 0
-    available_documents = 0
-    withdrawn_documents = 0
-    lost_documents = 0
-
-    for level in student_levels:
-        docs = level.official_documents.all()
-        total_documents += docs.count()
-        available_documents += docs.filter(status='available').count()
-        withdrawn_documents += docs.filter(status='withdrawn').count()
-        lost_documents += docs.filter(status='lost').count()
+    student_levels = student.student_levels.select_related(
+        'level', 'academic_year'
+    ).prefetch_related('official_documents').order_by('-academic_year__start_at', 'level__name')
 
+    # Compteurs de documents et situation financière : synthèse groupée mise en cache
+    portal_summary = get_portal_summary(student)
     active_year = AcademicYear.get_active_year()
-    financial_summary = build_student_financial_statement(student, active_year) if active_year else None
+    financial_summary = None
+    if active_year and active_year.pk in portal_summary['years']:
+        financial_summary = portal_summary['years'][active_year.pk]['financial']
 
     context = {
         'student': student,
         'student_levels': student_levels,
-        'document_stats': {
-            'total': total_documents,
-            'available': available_documents,
-            'withdrawn': withdrawn_documents,
-            'lost': lost_documents
-        },
+        'document_stats': portal_summary['documents'],
         'financial_summary': financial_summary,
         'active_academic_year': active_year,
     }
@@ -225,15 +214,13 @@ def student_documents(request):
     page_obj = paginator.get_page(page)
 
     # Annoter chaque certificat d'inscription affiché avec son autorisation de téléchargement
-    download_check_cache = {}
+    portal_summary = get_portal_summary(student)
     for document in page_obj.object_list:
         if document.type != OfficialDocument.TYPE_REGISTRATION_CERTIFICATE:
             continue
-        academic_year = document.student_level.academic_year
-        cache_key = academic_year.pk if academic_year else None
-        if cache_key not in download_check_cache:
-            download_check_cache[cache_key] = student.can_withdraw_documents(academic_year)
-        can_download, reason = download_check_cache[cache_key]
+        can_download, reason = get_year_withdrawal_permission(
+            portal_summary, document.student_level.academic_year_id
+        )
         document.download_allowed = can_download
         document.download_block_reason = '' if can_download else reason
 
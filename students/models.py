@@ -219,63 +219,11 @@ class Student(models.Model):
 
     def get_financial_status(self, academic_year=None, as_of_date=None):
         """Calcule dynamiquement le statut financier de l'étudiant."""
-        if not academic_year:
-            academic_year = AcademicYear.objects.filter(is_active=True).first()
-
-        if not academic_year:
-            return None
-
-        from payments.models import Payment, PaymentInstallment
-
-        current_level = self.student_levels.filter(
-            academic_year=academic_year,
-        ).select_related('level').order_by(
-            '-is_active', 'level__academic_order', 'level__name'
-        ).first()
-
-        level_id = current_level.level_id if current_level else None
-        base_installments = PaymentInstallment.objects.filter(
-            deleted_at__isnull=True,
-            academic_year=academic_year,
-            program=self.program,
-        ).order_by('order_number', 'name', 'pk')
-
-        installments = list(base_installments.filter(level_id=level_id)) if level_id else []
-        if not installments:
-            installments = list(base_installments.filter(level__isnull=True))
-
-        as_of_date = as_of_date or timezone.localdate()
-        amount_paid = Payment.objects.filter(
-            student=self,
-            academic_year=academic_year,
-            category='frais_scolarite',
-        ).aggregate(total=models.Sum('amount_paid'))['total'] or Decimal('0.00')
-
-        total_due = sum((installment.amount or Decimal('0.00')) for installment in installments)
-        due_amount = sum(
-            (installment.amount or Decimal('0.00'))
-            for installment in installments
-            if installment.due_date and installment.due_date <= as_of_date
-        )
-
-        remaining_amount = total_due - amount_paid
-        if remaining_amount < Decimal('0.00'):
-            remaining_amount = Decimal('0.00')
-
-        overdue_amount = due_amount - amount_paid
-        if overdue_amount < Decimal('0.00'):
-            overdue_amount = Decimal('0.00')
-
-        return {
-            'academic_year': academic_year,
-            'current_level': current_level,
-            'total_amount_due': total_due,
-            'amount_paid': amount_paid,
-            'remaining_amount': remaining_amount,
-            'due_amount': due_amount,
-            'overdue_amount': overdue_amount,
-            'status': 'overdue' if overdue_amount > Decimal('0.00') else 'up_to_date',
-        }
+        from payments.balances import compute_financial_status
+
+        return compute_financial_status(
+            [self], academic_year=academic_year, as_of_date=as_of_date,
+        ).get(self.pk)
 
     def can_withdraw_documents(self, academic_year=None):
         """
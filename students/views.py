@@ -4,21 +4,23 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core import signing
-from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
 from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views.generic import TemplateView
 
-from django.db.models import Q
-
+from search.index import search_queryset
 from student_portal.decorators import scholar_admin_required
 from students.models import Student, StudentLevel, StudentMetaData
 from accounts.models import Godfather
 from schools.models import School
 from academic.models import Program, Level, Speciality
 from academic.document_requirements import PROGRAM_DOCUMENTS
+from main.filters import FieldFilter, FilterSpec, RelationFilter
+from main.pagination import CURSOR_PARAM, KeysetPaginator
+from main.tabular_exports import EXPORT_CHUNK_SIZE, build_export_response
 from main.utils import queue_student_status_email, render_student_edit
 
 
@@ -26,6 +28,33 @@ MOBILE_UPLOAD_TOKEN_SALT = 'students.mobile_file_upload'
 MOBILE_UPLOAD_TOKEN_MAX_AGE = 30 * 60
 MOBILE_UPLOAD_MAX_FILE_SIZE = 5 * 1024 * 1024
 
+# Filtres GET de la liste des étudiants (niveau et spécialité : inscription active).
+STUDENT_LIST_FILTERS = FilterSpec(
+    FieldFilter('gender', 'gender'),
+    FieldFilter('school', 'school_id'),
+    FieldFilter('program', 'program_id'),
+    FieldFilter('godfather', 'godfather_id'),
+    FieldFilter('language', 'lang'),
+    FieldFilter('start_level', 'start_level_id'),
+    RelationFilter('current_level', StudentLevel, 'student', 'level_id', {'is_active': True}),
+    RelationFilter('speciality', StudentLevel, 'student', 'speciality_id', {'is_active': True}),
+)
+
+
+STUDENT_EXPORT_HEADERS = (
+    'Matricule', 'Prénom', 'Nom', 'Programme', 'Niveau', 'Spécialité', 'Genre', 'Téléphone', 'Email',
+)
+
+
+def _get_filtered_students(params):
+    """Étudiants inscrits filtrés selon les paramètres GET de la liste."""
+    students = Student.objects.filter(status='registered')
+
+    search = params.get('search', '').strip()
+    if search:
+        students = search_queryset(students, search, 'student')
+    return STUDENT_LIST_FILTERS.apply(students, params)
+
 
 class EtudiantsView(LoginRequiredMixin, TemplateView):
     """Vue pour la gestion des étudiants"""
@@ -34,48 +63,7 @@ class EtudiantsView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Gestion des étudiants'
-        students = Student.objects.filter(status='registered')
-
-        gender = self.request.GET.get('gender')
-        school_id = self.request.GET.get('school')
-        program_id = self.request.GET.get('program')
-        godfather_id = self.request.GET.get('godfather')
-        language = self.request.GET.get('language')
-        search = self.request.GET.get('search', '').strip()
-        current_level_id = self.request.GET.get('current_level')
-        start_level_id = self.request.GET.get('start_level')
-        speciality_id = self.request.GET.get('speciality')
-
-        if search:
-            students = students.filter(
-                Q(firstname__icontains=search) |
-                Q(lastname__icontains=search) |
-                Q(matricule__icontains=search) |
-                Q(email__icontains=search) |
-                Q(phone_number__icontains=search)
-            )
-        if gender:
-            students = students.filter(gender=gender)
-        if school_id:
-            students = students.filter(school_id=school_id)
-        if program_id:
-            students = students.filter(program_id=program_id)
-        if godfather_id:
-            students = students.filter(godfather_id=godfather_id)
-        if language:
-            students = students.filter(lang=language)
-        if start_level_id:
-            students = students.filter(start_level_id=start_level_id)
-        if current_level_id:
-            student_ids = StudentLevel.objects.filter(
-                is_active=True, level_id=current_level_id
-            ).values_list('student_id', flat=True)
-            students = students.filter(pk__in=student_ids)
-        if speciality_id:
-            student_ids = StudentLevel.objects.filter(
-                is_active=True, speciality_id=speciality_id
-            ).values_list('student_id', flat=True)
-            students = students.filter(pk__in=student_ids)
+        students = _get_filtered_students(self.request.GET)
 
         schools = School.objects.all()
         programs = Program.objects.all()
@@ -84,10 +72,7 @@ class EtudiantsView(LoginRequiredMixin, TemplateView):
         specialities = Speciality.objects.all()
 
         per_page = self.request.GET.get('per_page', 10)
-        page = self.request.GET.get('page', 1)
-
-        paginator = Paginator(students, per_page)
-        page_obj = paginator.get_page(page)
+        page_obj = KeysetPaginator(students, per_page).get_page(self.request.GET.get(CURSOR_PARAM))
 
         context['students'] = page_obj.object_list
         context['page_obj'] = page_obj
@@ -102,6 +87,40 @@ class EtudiantsView(LoginRequiredMixin, TemplateView):
         return context
 
 
+@login_required
+def etudiants_export(request, export_format):
+    """
+    Export CSV/XLSX de la liste des étudiants avec les filtres de ``EtudiantsView``.
+    Niveau et spécialité actifs sont lus en sous-requête pour éviter une requête par ligne.
+    """
+    active_level = StudentLevel.objects.filter(student_id=OuterRef('pk'), is_active=True).order_by('pk')
+    students = _get_filtered_students(request.GET).annotate(
+        active_level_name=Subquery(active_level.values('level__name')[:1]),
+        active_speciality_name=Subquery(active_level.values('speciality__name')[:1]),
+    )
+    genders = dict(Student._meta.get_field('gender').choices)
+
+    fields = (
+        'matricule', 'firstname', 'lastname', 'program__name', 'active_level_name', 'active_speciality_name',
+        'gender', 'phone_number', 'email',
+    )
+    rows = (
+        (
+            student['matricule'],
+            student['firstname'],
+            student['lastname'],
+            student['program__name'],
+            student['active_level_name'],
+            student['active_speciality_name'],
+            genders.get(student['gender'], student['gender']),
+            student['phone_number'],
+            student['email'],
+        )
+        for student in KeysetPaginator(students, EXPORT_CHUNK_SIZE).iterate(*fields)
+    )
+    return build_export_response(export_format, 'etudiants', STUDENT_EXPORT_HEADERS, rows, 'Étudiants')
+
+
 
 @login_required
 def etudiant_detail(request, pk):
@@ -77,6 +77,80 @@ CORS_ORIGINS_WHITELIST = config('CORS_ORIGINS_WHITELIST', default=[], cast=lambd
 
 CLAMD_ENABLED = config("CLAMD_ENABLED")
 
+# Portée de la séquence des numéros de dossier : 'global' (une seule séquence)
+# ou 'prefix_year' (une séquence par préfixe de dossier et par année académique)
+DOSSIER_SEQUENCE_SCOPE = config("DOSSIER_SEQUENCE_SCOPE", default="global")
+
+# Écriture du journal d'audit : 'buffered' (par lot en fin de requête / après commit),
+# 'background' (lots écrits par un thread dédié) ou 'immediate' (une écriture par événement)
+AUDIT_WRITE_MODE = config("AUDIT_WRITE_MODE", default="buffered")
+AUDIT_BUFFER_MAX_SIZE = config("AUDIT_BUFFER_MAX_SIZE", default=500, cast=int)
+
+# Export PDF groupé des pré-inscriptions : nombre de processus de rendu dans le worker de
+# tâches de fond (0 ou 1 : rendu en série ; l'export direct depuis la vue est toujours
+# rendu en série) et taille au-delà de laquelle le PDF produit est déversé sur disque (octets)
+PDF_EXPORT_WORKERS = config("PDF_EXPORT_WORKERS", default=2, cast=int)
+PDF_EXPORT_SPOOL_MAX_SIZE = config("PDF_EXPORT_SPOOL_MAX_SIZE", default=10 * 1024 * 1024, cast=int)
+# Au-delà de ce nombre de dossiers, l'export est toujours confié au worker de tâches de fond
+PDF_EXPORT_SYNC_MAX_DOSSIERS = config("PDF_EXPORT_SYNC_MAX_DOSSIERS", default=20, cast=int)
+
+# Cache disque des PDF générés (certificats, reçus, relevés, dossiers enseignants).
+# Par défaut sous BASE_DIR/var/pdf_cache, hors de MEDIA_ROOT : ce répertoire ne doit
+# jamais être servi publiquement (dossiers, reçus et relevés nominatifs).
+PDF_CACHE_ENABLED = config("PDF_CACHE_ENABLED", default=True, cast=bool)
+PDF_CACHE_ROOT = config("PDF_CACHE_ROOT", default=str(BASE_DIR / "var" / "pdf_cache"))
+PDF_CACHE_MAX_SIZE = config("PDF_CACHE_MAX_SIZE", default=200 * 1024 * 1024, cast=int)
+
+# Tâches de fond (manage.py run_worker) : tentatives, délai de base des nouvelles
+# tentatives (doublé à chaque échec), délai au-delà duquel une tâche en cours est
+# considérée comme abandonnée, rétention des tâches terminées et de leurs fichiers
+# (jours) et fréquence de leur purge par le worker (secondes). JOBS_EAGER exécute les
+# tâches dans le processus web (développement sans worker).
+JOBS_EAGER = config("JOBS_EAGER", default=False, cast=bool)
+JOBS_MAX_ATTEMPTS = config("JOBS_MAX_ATTEMPTS", default=3, cast=int)
+JOBS_RETRY_BASE_DELAY = config("JOBS_RETRY_BASE_DELAY", default=30, cast=int)
+JOBS_RETRY_MAX_DELAY = config("JOBS_RETRY_MAX_DELAY", default=3600, cast=int)
+JOBS_STALE_TIMEOUT = config("JOBS_STALE_TIMEOUT", default=3600, cast=int)
+JOBS_POLL_INTERVAL = config("JOBS_POLL_INTERVAL", default=2.0, cast=float)
+# Fichiers produits par les tâches : hors de MEDIA_ROOT, téléchargés par la vue jobs:download
+JOBS_OUTPUT_ROOT = config("JOBS_OUTPUT_ROOT", default=str(BASE_DIR / "var" / "jobs"))
+JOBS_RETENTION_DAYS = config("JOBS_RETENTION_DAYS", default=7, cast=int)
+JOBS_PURGE_INTERVAL = config("JOBS_PURGE_INTERVAL", default=3600, cast=int)
+
+# Cube statistique de la scolarité : âge maximal (secondes) avant recalcul à la lecture,
+# en plus des recalculs déclenchés par les modifications (manage.py rebuild_statistics),
+# et durée maximale (secondes) du verrou qui réserve un recalcul à une seule requête
+STATISTICS_CUBE_ENABLED = config("STATISTICS_CUBE_ENABLED", default=True, cast=bool)
+STATISTICS_CUBE_MAX_AGE = config("STATISTICS_CUBE_MAX_AGE", default=900, cast=int)
+STATISTICS_CUBE_LOCK_TIMEOUT = config("STATISTICS_CUBE_LOCK_TIMEOUT", default=300, cast=int)
+
+# Synchronisation hors ligne des agents de prospection : nombre maximal de prospects
+# par lot et taille maximale (octets) du contenu JSON une fois décompressé
+PROSPECTION_SYNC_MAX_ITEMS = config("PROSPECTION_SYNC_MAX_ITEMS", default=5000, cast=int)
+PROSPECTION_SYNC_MAX_PAYLOAD_SIZE = config("PROSPECTION_SYNC_MAX_PAYLOAD_SIZE", default=20 * 1024 * 1024, cast=int)
+# Nombre maximal de lignes par page des synchronisations différentielles
+PROSPECTION_DELTA_PAGE_SIZE = config("PROSPECTION_DELTA_PAGE_SIZE", default=500, cast=int)
+# Retard (secondes) des synchronisations différentielles sur l'instant présent : doit
+# dépasser la durée de la plus longue transaction d'écriture (envoi d'un lot de prospects)
+PROSPECTION_DELTA_SAFETY_WINDOW = config("PROSPECTION_DELTA_SAFETY_WINDOW", default=60, cast=int)
+
+# Synthèse du portail étudiant (documents et situation financière) : durée de
+# conservation en cache, invalidée à chaque modification d'un document ou d'un paiement
+STUDENT_PORTAL_SUMMARY_CACHE_TIMEOUT = config("STUDENT_PORTAL_SUMMARY_CACHE_TIMEOUT", default=300, cast=int)
+
+# Durée (en secondes) de mise en cache du total des listes paginées par curseur
+PAGINATION_COUNT_CACHE_TIMEOUT = config("PAGINATION_COUNT_CACHE_TIMEOUT", default=60, cast=int)
+
+# Index d'autocomplete des étudiants gardé en mémoire par chaque processus : durée de vie
+# (en secondes) et délai au-delà duquel sa version est revérifiée dans le cache partagé
+SEARCH_AUTOCOMPLETE_INDEX_TTL = config("SEARCH_AUTOCOMPLETE_INDEX_TTL", default=300, cast=int)
+SEARCH_AUTOCOMPLETE_VERSION_CHECK_INTERVAL = config("SEARCH_AUTOCOMPLETE_VERSION_CHECK_INTERVAL", default=5, cast=float)
+
+# Cache des paramètres système : durée de conservation dans le cache partagé et délai
+# (en secondes) au-delà duquel chaque processus revérifie la version de sa copie locale
+SYSTEM_SETTINGS_CACHE_TIMEOUT = config("SYSTEM_SETTINGS_CACHE_TIMEOUT", default=86400, cast=int)
+SYSTEM_SETTINGS_LOCAL_CACHE_TTL = config("SYSTEM_SETTINGS_LOCAL_CACHE_TTL", default=5, cast=float)
+
 
 RECAPTCHA_PUBLIC_KEY = config("RECAPTCHA_PUBLIC_KEY")
 RECAPTCHA_PRIVATE_KEY = config("RECAPTCHA_PRIVATE_KEY")
@@ -124,6 +198,8 @@ INSTALLED_APPS = [
     "recruitment",
     "lecturers",
     "emails",
+    "jobs",
+    "search",
 ]
 
 MIDDLEWARE = [
@@ -190,6 +266,11 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('EMAIL_HOST_USER', default='contact@esnrating.com')
 
+# Envoi groupé (emails composés) : nombre de messages par lot sur la connexion partagée
+# et débit maximal en messages par seconde (0 : pas de limite)
+EMAIL_BATCH_SIZE = config('EMAIL_BATCH_SIZE', default=50, cast=int)
+EMAIL_RATE_LIMIT = config('EMAIL_RATE_LIMIT', default=0, cast=float)
+
 
 DATABASES = {}
 if USE_SQLITE3:
@@ -213,6 +294,18 @@ else:
     }
 
 
+# Cache partagé (paramètres système...). Le cache mémoire par défaut est propre à chaque
+# processus : en production multi-processus, utiliser un backend partagé, par exemple
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache et CACHE_LOCATION=redis://...
+# (service redis des fichiers docker-compose). La vérification main.E001 bloque le
+# démarrage si WEB_CONCURRENCY > 1 avec un cache propre au processus.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ysem'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -27,6 +27,7 @@ urlpatterns = [
     path("gestion-enseignants/", include("recruitment.admin_urls")),
     path("etudiants/", include("students.urls")),
     path("emails/", include("emails.urls")),
+    path("jobs/", include("jobs.urls")),
 
     # URLs pour la gestion des paiements
     path('paiements/', include('payments.urls')),